@@ -0,0 +1,188 @@
+"""
+Per-request overhead of the HTTP middleware stack.
+
+Builds a minimal FastAPI app with the same middleware stack ``create_app``
+installs in production (CORS, CSRF, rate limiting, security headers, request
+validation, database health, Apigee identity and the system request log) and
+drives it directly through the ASGI interface, so no server or network time
+is included. The result is compared with the same app without middleware.
+
+Usage (from the backend directory):
+
+    python benchmarks/middleware_overhead.py [--requests 5000] [--rounds 5]
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.middleware.cors import CORSMiddleware  # noqa: E402
+
+from easylifeauth.middleware.csrf import CSRFProtectMiddleware  # noqa: E402
+from easylifeauth.middleware.rate_limit import RateLimitMiddleware  # noqa: E402
+from easylifeauth.middleware.security import (  # noqa: E402
+    SecurityHeadersMiddleware, RequestValidationMiddleware
+)
+from easylifeauth.middleware.db_health import DatabaseHealthMiddleware  # noqa: E402
+from easylifeauth.middleware.apigee_identity import ApigeeIdentityMiddleware  # noqa: E402
+
+SECRET = "benchmark-secret"
+PATH = "/api/v1/items"
+
+
+class _HealthyDb:
+    async def ensure_connected(self, max_retries: int = 2) -> bool:
+        return True
+
+
+def _build_app(with_middleware: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get(PATH)
+    async def list_items():
+        return {"items": [1, 2, 3]}
+
+    @app.post(PATH)
+    async def create_item():
+        return {"created": True}
+
+    if not with_middleware:
+        return app
+
+    # Same order as create_app: the last middleware added is the outermost
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["http://localhost:3000"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    app.add_middleware(CSRFProtectMiddleware, secret_key=SECRET, cookie_secure=False)
+    # Limits are out of reach so only the bookkeeping is measured
+    app.add_middleware(
+        RateLimitMiddleware,
+        requests_per_minute=10 ** 9,
+        requests_per_hour=10 ** 9,
+        auth_requests_per_minute=10 ** 9,
+    )
+    app.add_middleware(SecurityHeadersMiddleware, enable_hsts=True, enable_csp=True)
+    app.add_middleware(RequestValidationMiddleware, max_body_size=10 * 1024 * 1024)
+    db = _HealthyDb()
+    app.add_middleware(DatabaseHealthMiddleware, db_getter=lambda: db, check_interval=60)
+    app.add_middleware(ApigeeIdentityMiddleware, app_name="benchmark")
+
+    try:
+        from easylifeauth.middleware.system_log import SystemLogMiddleware
+        app.add_middleware(SystemLogMiddleware)
+    except ImportError:
+        # Older trees define the request log as a function middleware in create_app
+        from fastapi import Request
+
+        @app.middleware("http")
+        async def system_log_middleware(request: Request, call_next):
+            start = time.perf_counter()
+            response = await call_next(request)
+            logging.getLogger("easylife.http").info(
+                "%s %s → %d (%.1fms)", request.method, request.url.path,
+                response.status_code, (time.perf_counter() - start) * 1000,
+            )
+            return response
+
+    return app
+
+
+def _csrf_token() -> str:
+    token = "benchmark-token"
+    signature = hmac.new(SECRET.encode(), token.encode(), hashlib.sha256).hexdigest()
+    return f"{token}.{signature}"
+
+
+def _scope(method: str, index: int, csrf_token: str) -> dict:
+    headers = [
+        (b"host", b"testserver"),
+        (b"user-agent", b"benchmark"),
+        (b"cookie", f"csrf_token={csrf_token}".encode()),
+    ]
+    if method == "POST":
+        headers += [
+            (b"content-type", b"application/json"),
+            (b"content-length", b"2"),
+            (b"x-csrf-token", csrf_token.encode()),
+        ]
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": PATH,
+        "raw_path": PATH.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": headers,
+        # A distinct client per request keeps the rate limiter's per-IP state small
+        "client": (f"10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}", 50000),
+        "server": ("testserver", 80),
+    }
+
+
+async def _run(app: FastAPI, requests: int, csrf_token: str) -> float:
+    """Send ``requests`` alternating GET/POST requests, return mean µs/request."""
+    statuses = set()
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.add(message["status"])
+
+    start = time.perf_counter()
+    for index in range(requests):
+        method = "POST" if index % 2 else "GET"
+        body = b"{}" if method == "POST" else b""
+
+        async def receive(body=body):
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        await app(_scope(method, index, csrf_token), receive, send)
+    elapsed = time.perf_counter() - start
+
+    if statuses != {200}:
+        raise RuntimeError(f"Unexpected response statuses: {sorted(statuses)}")
+    return elapsed / requests * 1_000_000
+
+
+async def main(requests: int, rounds: int) -> None:
+    logging.getLogger("easylife.http").setLevel(logging.WARNING)
+    csrf_token = _csrf_token()
+    bare, stacked = _build_app(False), _build_app(True)
+
+    # Warm up both apps (middleware stacks are built on first call)
+    await _run(bare, 200, csrf_token)
+    await _run(stacked, 200, csrf_token)
+
+    bare_times, stacked_times = [], []
+    for _ in range(rounds):
+        bare_times.append(await _run(bare, requests, csrf_token))
+        stacked_times.append(await _run(stacked, requests, csrf_token))
+
+    bare_us = statistics.median(bare_times)
+    stacked_us = statistics.median(stacked_times)
+    print(f"requests per round:   {requests} x {rounds} rounds")
+    print(f"app without stack:    {bare_us:8.1f} µs/request")
+    print(f"app with full stack:  {stacked_us:8.1f} µs/request")
+    print(f"middleware overhead:  {stacked_us - bare_us:8.1f} µs/request")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.rounds))
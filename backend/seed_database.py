@@ -15,6 +15,8 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from werkzeug.security import generate_password_hash
 import os
 
+from easylifeauth.db.indexes import ensure_indexes
+
 # MongoDB connection
 MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
 DATABASE_NAME = os.getenv("DATABASE_NAME", "easylife_auth")
@@ -311,37 +313,9 @@ async def seed_database():
     # ============================================
     # CREATE INDEXES
     # ============================================
-    try:
-        await db.users.create_index("email", unique=True)
-        await db.users.create_index("username", unique=True)
-        await db.users.create_index("is_active")
-        await db.users.create_index([("created_at", -1)])
-        await db.roles.create_index("roleId", unique=True)
-        await db.roles.create_index("status")
-        await db.groups.create_index("groupId", unique=True)
-        await db.groups.create_index("status")
-        await db.permissions.create_index("key", unique=True)
-        await db.permissions.create_index("module")
-        await db.customers.create_index("customerId", unique=True)
-        await db.customers.create_index("status")
-        await db.domains.create_index("key", unique=True)
-        await db.domains.create_index("status")
-        await db.domain_scenarios.create_index("key", unique=True)
-        await db.domain_scenarios.create_index("domainKey")
-        await db.domain_scenarios.create_index("status")
-        await db.playboards.create_index("key", unique=True)
-        await db.playboards.create_index("scenarioKey")
-        await db.playboards.create_index("status")
-        await db.configurations.create_index("config_id", unique=True)
-        await db.configurations.create_index("key")
-        await db.configurations.create_index("type")
-        await db.audit_logs.create_index([("timestamp", -1)])
-        await db.audit_logs.create_index("user_email")
-        await db.audit_logs.create_index("entity_type")
-        await db.audit_logs.create_index("action")
-        print("Created indexes")
-    except Exception as e:
-        print(f"Note: Some indexes may already exist: {e}")
+    # Same declared indexes the application ensures at startup
+    report = await ensure_indexes(db)
+    print(f"Ensured indexes ({len(report['created'])} created, {len(report['failed'])} failed)")
 
     # ============================================
     # SUMMARY
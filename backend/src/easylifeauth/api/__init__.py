@@ -11,6 +11,7 @@ from .health_routes import router as health_router
 from .bulk_upload_routes import router as bulk_upload_router
 from .activity_log_routes import router as activity_log_router
 from .export_routes import router as export_router
+from .export_job_routes import router as export_job_router
 from .dashboard_routes import router as dashboard_router
 from .users_routes import router as users_router
 from .roles_routes import router as roles_router
@@ -41,6 +42,7 @@ __all__ = [
     "bulk_upload_router",
     "activity_log_router",
     "export_router",
+    "export_job_router",
     "dashboard_router",
     "users_router",
     "roles_router",
@@ -6,26 +6,25 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from typing import Optional, Dict, Any, List
 from datetime import datetime, timezone, timedelta
 from bson import ObjectId
-import math
 
 from .dependencies import get_db
+from .pagination import create_pagination_meta as shared_pagination_meta, list_page
 from ..db.db_manager import DatabaseManager
 from ..security.access_control import CurrentUser, require_super_admin
+from ..services.activity_rollups import activity_rollups_covering, ranked
 
 router = APIRouter(prefix="/activity-logs", tags=["Activity Logs"])
 
 
-def create_pagination_meta(total: int, page: int, limit: int) -> Dict[str, Any]:
+def create_pagination_meta(
+    total: Optional[int],
+    page: int,
+    limit: int,
+    next_cursor: Optional[str] = None,
+    keyset: bool = False
+) -> Dict[str, Any]:
     """Create pagination metadata."""
-    pages = math.ceil(total / limit) if limit > 0 else 0
-    return {
-        "total": total,
-        "page": page,
-        "limit": limit,
-        "pages": pages,
-        "has_next": page < pages - 1,
-        "has_prev": page > 0
-    }
+    return shared_pagination_meta(total, page, limit, next_cursor, keyset).model_dump()
 
 
 @router.get("")
@@ -37,6 +36,9 @@ async def list_activity_logs(
     user_email: Optional[str] = None,
     entity_id: Optional[str] = None,
     days: Optional[int] = Query(None, ge=1, le=365, description="Filter logs from last N days"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page (keyset pagination)"),
+    include_total: Optional[bool] = Query(None, description="Count the total (default: only without cursor)"),
+    total: Optional[int] = Query(None, ge=0, description="Total returned by a previous page, reused instead of recounting"),
     current_user: CurrentUser = Depends(require_super_admin),
     db: DatabaseManager = Depends(get_db)
 ) -> Dict[str, Any]:
@@ -50,6 +52,9 @@ async def list_activity_logs(
     - **user_email**: Filter by user who performed the action
     - **entity_id**: Filter by specific entity ID
     - **days**: Filter logs from last N days
+    - **cursor**: ``next_cursor`` of the previous page, for keyset pagination
+    - **include_total**: Count the total (by default only without a cursor)
+    - **total**: Total returned by a previous page, reused instead of recounting
     """
     # Build query
     query = {}
@@ -77,20 +82,15 @@ async def list_activity_logs(
     if collection is None:
         return {"data": [], "pagination": create_pagination_meta(0, page, limit)}
 
-    # Get total count
-    total = await collection.count_documents(query)
-
-    # Get paginated data
-    skip = page * limit
-    cursor = collection.find(query).skip(skip).limit(limit).sort("timestamp", -1)
+    result = await list_page(collection, query, "timestamp", -1, page, limit, cursor, include_total, total)
     logs = []
-    async for log in cursor:
+    for log in result.docs:
         log["_id"] = str(log["_id"])
         logs.append(log)
 
     return {
         "data": logs,
-        "pagination": create_pagination_meta(total, page, limit)
+        "pagination": create_pagination_meta(result.total, page, limit, result.next_cursor, result.keyset)
     }
 
 
@@ -116,6 +116,19 @@ async def get_activity_stats(
             "period_days": days
         }
 
+    # Served from the hourly/daily rollups once they cover the window
+    rollups = await activity_rollups_covering(db, cutoff_date)
+    if rollups:
+        stats = await rollups.stats(cutoff_date)
+        return {
+            "total_activities": stats["total"],
+            "actions": [{"action": action, "count": count} for action, count in ranked(stats["actions"])],
+            "entities": [{"entity_type": entity, "count": count} for entity, count in ranked(stats["entities"])],
+            "top_users": [{"user_email": user, "count": count} for user, count in ranked(stats["users"], 10)],
+            "timeline": [{"date": date, "count": count} for date, count in stats["timeline"].items()],
+            "period_days": days
+        }
+
     # Count by action type
     action_pipeline = [
         {"$match": {"timestamp": {"$gte": cutoff_date}}},
@@ -202,6 +215,9 @@ async def get_user_activity(
     user_email: str,
     page: int = Query(0, ge=0),
     limit: int = Query(25, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page (keyset pagination)"),
+    include_total: Optional[bool] = Query(None, description="Count the total (default: only without cursor)"),
+    total: Optional[int] = Query(None, ge=0, description="Total returned by a previous page, reused instead of recounting"),
     current_user: CurrentUser = Depends(require_super_admin),
     db: DatabaseManager = Depends(get_db)
 ) -> Dict[str, Any]:
@@ -214,18 +230,15 @@ async def get_user_activity(
 
     query = {"user_email": user_email}
 
-    total = await collection.count_documents(query)
-    skip = page * limit
-
-    cursor = collection.find(query).skip(skip).limit(limit).sort("timestamp", -1)
+    result = await list_page(collection, query, "timestamp", -1, page, limit, cursor, include_total, total)
     logs = []
-    async for log in cursor:
+    for log in result.docs:
         log["_id"] = str(log["_id"])
         logs.append(log)
 
     return {
         "data": logs,
-        "pagination": create_pagination_meta(total, page, limit)
+        "pagination": create_pagination_meta(result.total, page, limit, result.next_cursor, result.keyset)
     }
 
 
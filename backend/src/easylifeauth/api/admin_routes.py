@@ -7,14 +7,17 @@ from .models import (
     UserRoleUpdate, UserGroupUpdate, UserDomainUpdate,
     PaginatedUsersResponse
 )
-from .dependencies import get_current_user, get_admin_service
+from .dependencies import get_current_user, get_admin_service, invalidate_read_caches_on_write
 from ..services.admin_service import AdminService
 from ..security.access_control import (
     CurrentUser, require_admin, require_super_admin, require_group_admin
 )
 from ..errors.auth_error import AuthError
 
-router = APIRouter(prefix="/admin/management", tags=["Admin Management"])
+router = APIRouter(
+    prefix="/admin/management", tags=["Admin Management"],
+    dependencies=[Depends(invalidate_read_caches_on_write)]
+)
 
 
 @router.get("/users")
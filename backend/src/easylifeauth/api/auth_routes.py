@@ -16,6 +16,7 @@ from ..services.user_service import UserService
 from ..services.password_service import PasswordResetService
 from ..services.token_manager import TokenManager
 from ..services.activity_log_service import ActivityLogService
+from ..services.dashboard_stats import invalidate_dashboard_stats
 from ..security.access_control import CurrentUser
 from ..errors.auth_error import AuthError
 from ..middleware.csrf import get_csrf_token
@@ -101,6 +102,7 @@ async def register(
             groups=["viewer"],
             domains=[]
         )
+        invalidate_dashboard_stats()
 
         # Set httpOnly cookies
         _set_auth_cookies(response, result["access_token"], result["refresh_token"])
@@ -5,16 +5,38 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile
 from fastapi.responses import StreamingResponse
 from typing import List, Optional, Dict, Any
 from io import BytesIO
+import os
+import tempfile
 from pydantic import BaseModel
 import pandas as pd
 
 from easylifeauth.db.db_manager import DatabaseManager
-from easylifeauth.api.dependencies import get_db
+from easylifeauth.api.dependencies import get_db, invalidate_read_caches_on_write
 from easylifeauth.security.access_control import CurrentUser, require_super_admin
 from easylifeauth.services.bulk_upload_service import BulkUploadService, BulkUploadResult
+from easylifeauth.services.bulk_upload_job_service import (
+    BulkUploadJobService,
+    get_bulk_upload_job_service,
+    init_bulk_upload_job_service,
+)
+from easylifeauth.services.email_outbox import EmailOutbox, get_email_outbox, init_email_outbox
+from easylifeauth.services.email_service import EmailService
 from easylifeauth.services.gcs_service import GCSService
-
-router = APIRouter(prefix="/bulk", tags=["Bulk Operations"])
+from easylifeauth.services.hash_policy import get_hash_policy
+from easylifeauth.utils.file_validation import MAX_FILE_SIZE
+
+router = APIRouter(
+    prefix="/bulk", tags=["Bulk Operations"],
+    dependencies=[Depends(invalidate_read_caches_on_write)]
+)
+
+# Uploads are spooled to disk in chunks of this size
+SPOOL_CHUNK_BYTES = 1024 * 1024
+# Enough of the file to check its magic bytes
+SIGNATURE_BYTES = 8
+DEFAULT_MAX_UPLOAD_MB = MAX_FILE_SIZE // (1024 * 1024)
+# Multipart boundaries, part headers and form fields around the uploaded file
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
 
 # Service instances
 _bulk_upload_service: Optional[BulkUploadService] = None
@@ -40,12 +62,80 @@ def get_gcs_service() -> Optional[GCSService]:
     return _gcs_service
 
 
-def init_bulk_services(db: DatabaseManager, gcs_config: Optional[Dict[str, Any]] = None):
-    """Initialize bulk upload services."""
+def _hash_password(password: str) -> str:
+    return get_hash_policy().hash(password)
+
+
+def init_bulk_services(
+    db: DatabaseManager,
+    gcs_config: Optional[Dict[str, Any]] = None,
+    email_service: Optional[EmailService] = None
+):
+    """Initialize bulk upload services; welcome emails go through the email outbox."""
     global _bulk_upload_service, _gcs_service
-    _bulk_upload_service = BulkUploadService(db)
+    email_outbox = init_email_outbox(email_service) if email_service else None
+    _bulk_upload_service = BulkUploadService(
+        db,
+        password_hasher=_hash_password,
+        email_service=email_service,
+        email_outbox=email_outbox
+    )
     if gcs_config:
         _gcs_service = GCSService(gcs_config)
+    init_bulk_upload_job_service(db, gcs_service=_gcs_service)
+
+
+def _require_job_service(service: Optional[BulkUploadJobService]) -> BulkUploadJobService:
+    if service is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Bulk upload job service not initialized"
+        )
+    return service
+
+
+def max_upload_size() -> int:
+    """Largest accepted bulk upload in bytes (``BULK_UPLOAD_MAX_FILE_MB``)."""
+    return int(os.getenv("BULK_UPLOAD_MAX_FILE_MB", str(DEFAULT_MAX_UPLOAD_MB))) * 1024 * 1024
+
+
+def max_upload_request_size() -> int:
+    """Largest accepted bulk upload request body in bytes, checked before authentication."""
+    return max_upload_size() + MULTIPART_OVERHEAD_BYTES
+
+
+def _temp_path(filename: str) -> str:
+    """Create an empty temporary file keeping ``filename``'s extension."""
+    fd, path = tempfile.mkstemp(prefix="bulk_upload_", suffix=os.path.splitext(filename or "")[1].lower())
+    os.close(fd)
+    return path
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+async def spool_upload(file: UploadFile, max_size: int) -> str:
+    """Copy an upload to a temporary file in fixed-size chunks; return its path."""
+    path = _temp_path(file.filename)
+    size = 0
+    try:
+        with open(path, "wb") as out:
+            while chunk := await file.read(SPOOL_CHUNK_BYTES):
+                size += len(chunk)
+                if size > max_size:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"File too large. Maximum size is {max_size // (1024 * 1024)}MB"
+                    )
+                out.write(chunk)
+    except BaseException:
+        _remove(path)
+        raise
+    return path
 
 
 @router.post("/upload/{entity_type}")
@@ -79,13 +169,16 @@ async def bulk_upload(
 
     # Validate file extension, MIME type, and magic bytes
     from ..utils.file_validation import validate_upload
-    content = await file.read()
-    validate_upload(file, {".csv", ".xlsx", ".xls"}, content=content)
+    head = await file.read(SIGNATURE_BYTES)
+    validate_upload(file, {".csv", ".xlsx", ".xls"}, content=head)
+    await file.seek(0)
 
+    # Spool to disk so the file is parsed in chunks instead of held in memory
+    local_path = await spool_upload(file, max_upload_size())
     try:
-        result = await bulk_service.process_entity(
+        result = await bulk_service.process_entity_file(
             entity_type,
-            content,
+            local_path,
             file.filename,
             send_password_emails
         )
@@ -100,6 +193,8 @@ async def bulk_upload(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error processing file: {str(e)}"
         )
+    finally:
+        _remove(local_path)
 
 
 @router.get("/template/{entity_type}")
@@ -190,32 +285,53 @@ async def bulk_upload_from_gcs(
             detail="GCS service not configured. Please set GCS_CREDENTIALS_JSON environment variable."
         )
 
-    # Download file from GCS
-    content = await gcs_service.download_file(request.file_path, request.bucket_name)
-    if content is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"File not found in GCS: {request.file_path}"
-        )
-
+    # Download file from GCS straight to disk
+    local_path = _temp_path(request.file_path)
     try:
-        result = await bulk_service.process_entity(
-            entity_type,
-            content,
-            request.file_path,
-            send_password_emails
-        )
-        return result.to_dict() if hasattr(result, 'to_dict') else result
-    except ValueError as e:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=str(e)
-        )
-    except Exception as e:
+        if not await gcs_service.download_to_path(request.file_path, local_path, request.bucket_name):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"File not found in GCS: {request.file_path}"
+            )
+
+        try:
+            result = await bulk_service.process_entity_file(
+                entity_type,
+                local_path,
+                request.file_path,
+                send_password_emails
+            )
+            return result.to_dict() if hasattr(result, 'to_dict') else result
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error processing file: {str(e)}"
+            )
+    finally:
+        _remove(local_path)
+
+
+@router.get("/emails/{batch_id}")
+async def get_email_batch_status(
+    batch_id: str,
+    current_user: CurrentUser = Depends(require_super_admin),
+    email_outbox: Optional[EmailOutbox] = Depends(get_email_outbox)
+) -> Dict[str, Any]:
+    """Delivery progress of the welcome emails queued by a bulk upload."""
+    if email_outbox is None:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error processing file: {str(e)}"
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Email outbox not configured"
         )
+    batch = email_outbox.batch_status(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Email batch not found")
+    return batch
 
 
 @router.get("/gcs/list")
@@ -254,3 +370,136 @@ async def get_gcs_status(
         "bucket_name": gcs_service.bucket_name if gcs_service.is_configured() else None,
         "error": gcs_service.get_init_error()
     }
+
+
+# ---------------------------------------------------------------------------
+# Background upload jobs: large files are processed outside the request.
+# Create a job, then poll it for per-chunk progress and the (partial) result.
+# ---------------------------------------------------------------------------
+
+@router.post("/jobs/upload/{entity_type}", status_code=status.HTTP_202_ACCEPTED)
+async def create_bulk_upload_job(
+    entity_type: str,
+    file: UploadFile = File(...),
+    send_password_emails: bool = Query(True, description="Send password emails for new users"),
+    current_user: CurrentUser = Depends(require_super_admin),
+    bulk_service: BulkUploadService = Depends(get_bulk_upload_service),
+    job_service: Optional[BulkUploadJobService] = Depends(get_bulk_upload_job_service)
+) -> Dict[str, Any]:
+    """Start a background bulk upload from a CSV/Excel file; poll the returned job."""
+    service = _require_job_service(job_service)
+    valid_types = ["users", "roles", "groups", "permissions", "customers", "domains", "domain_scenarios"]
+    if entity_type not in valid_types:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid entity type. Must be one of: {', '.join(valid_types)}"
+        )
+
+    from ..utils.file_validation import validate_upload
+    head = await file.read(SIGNATURE_BYTES)
+    validate_upload(file, {".csv", ".xlsx", ".xls"}, content=head)
+    await file.seek(0)
+
+    # The job owns the spooled file from here on and removes it when done
+    local_path = await spool_upload(file, max_upload_size())
+    try:
+        return await service.create_job(
+            bulk_service,
+            entity_type,
+            file.filename,
+            local_path,
+            send_password_emails=send_password_emails,
+            created_by=current_user.email
+        )
+    except ValueError as e:
+        _remove(local_path)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except RuntimeError as e:
+        _remove(local_path)
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+
+
+@router.post("/jobs/gcs/{entity_type}", status_code=status.HTTP_202_ACCEPTED)
+async def create_bulk_upload_job_from_gcs(
+    entity_type: str,
+    request: GCSUploadRequest,
+    send_password_emails: bool = Query(True, description="Send password emails for new users"),
+    current_user: CurrentUser = Depends(require_super_admin),
+    bulk_service: BulkUploadService = Depends(get_bulk_upload_service),
+    gcs_service: Optional[GCSService] = Depends(get_gcs_service),
+    job_service: Optional[BulkUploadJobService] = Depends(get_bulk_upload_job_service)
+) -> Dict[str, Any]:
+    """Start a background bulk upload from a file in a GCS bucket; the job downloads it."""
+    service = _require_job_service(job_service)
+    valid_types = ["users", "roles", "groups", "permissions", "customers", "domains", "domain_scenarios"]
+    if entity_type not in valid_types:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid entity type. Must be one of: {', '.join(valid_types)}"
+        )
+
+    if gcs_service is None or not gcs_service.is_configured():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="GCS service not configured. Please set GCS_CREDENTIALS_JSON environment variable."
+        )
+
+    local_path = _temp_path(request.file_path)
+    try:
+        return await service.create_job(
+            bulk_service,
+            entity_type,
+            request.file_path,
+            local_path,
+            send_password_emails=send_password_emails,
+            gcs_path=request.file_path,
+            gcs_bucket=request.bucket_name,
+            created_by=current_user.email
+        )
+    except ValueError as e:
+        _remove(local_path)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except RuntimeError as e:
+        _remove(local_path)
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+
+
+@router.get("/jobs")
+async def list_bulk_upload_jobs(
+    mine: bool = Query(False, description="Only jobs created by the current user"),
+    limit: int = Query(50, ge=1, le=200),
+    current_user: CurrentUser = Depends(require_super_admin),
+    job_service: Optional[BulkUploadJobService] = Depends(get_bulk_upload_job_service)
+) -> Dict[str, Any]:
+    """List recent bulk upload jobs, newest first (without row errors)."""
+    service = _require_job_service(job_service)
+    jobs = await service.list_jobs(created_by=current_user.email if mine else None, limit=limit)
+    return {"data": jobs}
+
+
+@router.get("/jobs/{job_id}")
+async def get_bulk_upload_job(
+    job_id: str,
+    current_user: CurrentUser = Depends(require_super_admin),
+    job_service: Optional[BulkUploadJobService] = Depends(get_bulk_upload_job_service)
+) -> Dict[str, Any]:
+    """Status, progress and (partial) result of a bulk upload job."""
+    service = _require_job_service(job_service)
+    job = await service.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bulk upload job not found")
+    return job
+
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_bulk_upload_job(
+    job_id: str,
+    current_user: CurrentUser = Depends(require_super_admin),
+    job_service: Optional[BulkUploadJobService] = Depends(get_bulk_upload_job_service)
+) -> Dict[str, Any]:
+    """Cancel a bulk upload job; a running job stops after its current chunk."""
+    service = _require_job_service(job_service)
+    job = await service.cancel_job(job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bulk upload job not found")
+    return job
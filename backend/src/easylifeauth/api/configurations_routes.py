@@ -10,18 +10,25 @@ from enum import Enum
 import json
 import os
 import uuid
-import math
 
 from easylifeauth.db.db_manager import DatabaseManager
-from easylifeauth.api.dependencies import get_db
+from easylifeauth.api.pagination import list_page, page_pagination_meta
+from easylifeauth.api.dependencies import get_db, invalidate_read_caches_on_write
 from easylifeauth.security.access_control import CurrentUser, require_super_admin
 from easylifeauth.api.models import (
     ConfigurationCreate, ConfigurationUpdate, ConfigurationResponse,
-    FileUploadResponse, PaginationMeta
+    FileUploadResponse
 )
 from easylifeauth.services.gcs_service import GCSService
+from easylifeauth.services.entity_counters import (
+    entity_counters_for, record_entity_change, record_entity_delete, record_entity_insert,
+)
+from easylifeauth.services.search_index import index_search_document, search_filter
 
-router = APIRouter(prefix="/configurations", tags=["Configurations"])
+router = APIRouter(
+    prefix="/configurations", tags=["Configurations"],
+    dependencies=[Depends(invalidate_read_caches_on_write)]
+)
 
 # GCS service instance - initialized via init_gcs_service
 _gcs_service: Optional[GCSService] = None
@@ -71,25 +78,15 @@ def serialize_config(config: dict) -> dict:
     return config
 
 
-def create_pagination_meta(total: int, page: int, limit: int) -> PaginationMeta:
-    """Create pagination metadata."""
-    pages = math.ceil(total / limit) if limit > 0 else 0
-    return PaginationMeta(
-        total=total,
-        page=page,
-        limit=limit,
-        pages=pages,
-        has_next=page < pages - 1,
-        has_prev=page > 0
-    )
-
-
 @router.get("")
 async def list_configurations(
     type: Optional[str] = None,
     search: Optional[str] = None,
     page: int = Query(0, ge=0, description="Page number (0-indexed)"),
     limit: int = Query(25, ge=1, le=1000, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page (keyset pagination)"),
+    include_total: Optional[bool] = Query(None, description="Count the total (default: only without cursor)"),
+    total: Optional[int] = Query(None, ge=0, description="Total returned by a previous page, reused instead of recounting"),
     current_user: CurrentUser = Depends(require_super_admin),
     db: DatabaseManager = Depends(get_db)
 ):
@@ -100,22 +97,13 @@ async def list_configurations(
         query["type"] = type
 
     if search:
-        query["$or"] = [
-            {"key": {"$regex": search, "$options": "i"}},
-            {"config_id": {"$regex": search, "$options": "i"}},
-        ]
-
-    # Get total count
-    total = await db.configurations.count_documents(query)
+        query.update(await search_filter(db, "configurations", search))
 
-    # Get paginated data
-    skip = page * limit
-    cursor = db.configurations.find(query).skip(skip).limit(limit).sort("row_update_stp", -1)
-    configs = await cursor.to_list(length=limit)
+    result = await list_page(db.configurations, query, "row_update_stp", -1, page, limit, cursor, include_total, total)
 
     return {
-        "data": [serialize_config(config) for config in configs],
-        "pagination": create_pagination_meta(total, page, limit)
+        "data": [serialize_config(config) for config in result.docs],
+        "pagination": page_pagination_meta(result, page, limit)
     }
 
 
@@ -126,6 +114,11 @@ async def count_configurations(
     db: DatabaseManager = Depends(get_db)
 ):
     """Get count of configurations."""
+    counters = entity_counters_for(db)
+    if counters:
+        values = [type] if type else []
+        return {"count": await counters.count("configurations", *values)}
+
     query = {}
     if type:
         query["type"] = type
@@ -307,6 +300,8 @@ async def create_configuration(
 
     result = await db.configurations.insert_one(config_doc)
     config_doc["_id"] = result.inserted_id
+    await record_entity_insert("configurations", config_doc)
+    await index_search_document("configurations", result.inserted_id)
 
     # Sync to GCS if configured (for non-GCS_DATA types)
     if config_data.type != DbConfigurationTypes.GCS_DATA_TYPE.value:
@@ -389,6 +384,9 @@ async def update_configuration(
         {"_id": config["_id"]},
         {"$set": update_doc}
     )
+    if "type" in update_doc:
+        await record_entity_change("configurations", config.get("type"), update_doc["type"])
+    await index_search_document("configurations", config["_id"])
 
     updated_config = await db.configurations.find_one({"_id": config["_id"]})
 
@@ -442,6 +440,8 @@ async def delete_configuration(
                 print(f"Failed to delete GCS sync file: {e}")
 
     await db.configurations.delete_one({"_id": config["_id"]})
+    await record_entity_delete("configurations", config)
+    await index_search_document("configurations", config["_id"])
 
     return {"message": "Configuration deleted successfully", "config_id": config_id}
 
@@ -520,6 +520,7 @@ async def upload_configuration_file(
                 {"_id": existing_config["_id"]},
                 {"$set": update_doc}
             )
+            await record_entity_change("configurations", existing_config.get("type"), update_doc["type"])
 
             config_id = existing_config.get("config_id", str(existing_config["_id"]))
 
@@ -570,6 +571,8 @@ async def upload_configuration_file(
                 config_doc["data"] = json_data.get("data", json_data)
 
             result = await db.configurations.insert_one(config_doc)
+            await record_entity_insert("configurations", config_doc)
+            await index_search_document("configurations", result.inserted_id)
 
             # Sync JSON to GCS as well
             config_doc["_id"] = result.inserted_id
@@ -657,6 +660,7 @@ async def upload_configuration_file(
                 {"_id": existing_config["_id"]},
                 {"$set": update_doc}
             )
+            await record_entity_change("configurations", existing_config.get("type"), update_doc["type"])
 
             config_id = existing_config.get("config_id", str(existing_config["_id"]))
         else:
@@ -684,7 +688,9 @@ async def upload_configuration_file(
                 }
             }
 
-            await db.configurations.insert_one(config_doc)
+            result = await db.configurations.insert_one(config_doc)
+            await record_entity_insert("configurations", config_doc)
+            await index_search_document("configurations", result.inserted_id)
 
         return FileUploadResponse(
             message=f"File uploaded successfully (version {version})",
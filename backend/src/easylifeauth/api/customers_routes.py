@@ -6,14 +6,21 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from typing import List, Optional
 from datetime import datetime, timezone
 from bson import ObjectId
-import math
 
 from pydantic import BaseModel, Field
 from easylifeauth.db.db_manager import DatabaseManager
-from easylifeauth.api.dependencies import get_db
+from easylifeauth.api.pagination import list_page, page_pagination_meta
+from easylifeauth.api.dependencies import get_db, invalidate_read_caches_on_write
 from easylifeauth.security.access_control import CurrentUser, require_super_admin, require_group_admin
+from easylifeauth.services.entity_counters import (
+    entity_counters_for, record_entity_change, record_entity_delete, record_entity_insert,
+)
+from easylifeauth.services.search_index import index_search_document, search_filter
 
-router = APIRouter(prefix="/customers", tags=["Customers"])
+router = APIRouter(
+    prefix="/customers", tags=["Customers"],
+    dependencies=[Depends(invalidate_read_caches_on_write)]
+)
 
 
 # Pydantic models for customers
@@ -46,28 +53,6 @@ class CustomerInDB(BaseModel):
         from_attributes = True
 
 
-class PaginationMeta(BaseModel):
-    total: int
-    page: int
-    limit: int
-    pages: int
-    has_next: bool
-    has_prev: bool
-
-
-def create_pagination_meta(total: int, page: int, limit: int) -> PaginationMeta:
-    """Create pagination metadata."""
-    pages = math.ceil(total / limit) if limit > 0 else 0
-    return PaginationMeta(
-        total=total,
-        page=page,
-        limit=limit,
-        pages=pages,
-        has_next=page < pages - 1,
-        has_prev=page > 0
-    )
-
-
 @router.get("")
 async def list_customers(
     page: int = Query(0, ge=0),
@@ -77,6 +62,9 @@ async def list_customers(
     tag: Optional[str] = None,
     location: Optional[str] = None,
     unit: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page (keyset pagination)"),
+    include_total: Optional[bool] = Query(None, description="Count the total (default: only without cursor)"),
+    total: Optional[int] = Query(None, ge=0, description="Total returned by a previous page, reused instead of recounting"),
     current_user: CurrentUser = Depends(require_group_admin),
     db: DatabaseManager = Depends(get_db)
 ):
@@ -84,12 +72,7 @@ async def list_customers(
     query = {}
 
     if search:
-        safe_search = re.escape(search)
-        query["$or"] = [
-            {"customerId": {"$regex": safe_search, "$options": "i"}},
-            {"name": {"$regex": safe_search, "$options": "i"}},
-            {"description": {"$regex": safe_search, "$options": "i"}}
-        ]
+        query.update(await search_filter(db, "customers", search))
 
     if status:
         query["status"] = status
@@ -103,16 +86,15 @@ async def list_customers(
     if unit:
         query["unit"] = {"$regex": f"^{re.escape(unit)}$", "$options": "i"}
 
-    total = await db.customers.count_documents(query)
-    cursor = db.customers.find(query).skip(page * limit).limit(limit).sort("created_at", -1)
-    customers = await cursor.to_list(length=limit)
+    result = await list_page(db.customers, query, "created_at", -1, page, limit, cursor, include_total, total)
+    customers = result.docs
 
     for c in customers:
         c["_id"] = str(c["_id"])
 
     return {
         "data": customers,
-        "pagination": create_pagination_meta(total, page, limit).model_dump()
+        "pagination": page_pagination_meta(result, page, limit).model_dump()
     }
 
 
@@ -124,13 +106,14 @@ async def count_customers(
     db: DatabaseManager = Depends(get_db)
 ):
     """Get total customer count."""
+    counters = entity_counters_for(db)
+    if counters and not search:
+        values = [status] if status else []
+        return {"count": await counters.count("customers", *values)}
+
     query = {}
     if search:
-        safe_search = re.escape(search)
-        query["$or"] = [
-            {"customerId": {"$regex": safe_search, "$options": "i"}},
-            {"name": {"$regex": safe_search, "$options": "i"}}
-        ]
+        query.update(await search_filter(db, "customers", search, fields=("customerId", "name")))
     if status:
         query["status"] = status
 
@@ -214,6 +197,8 @@ async def create_customer(
 
     result = await db.customers.insert_one(customer_dict)
     customer_dict["_id"] = str(result.inserted_id)
+    await record_entity_insert("customers", customer_dict)
+    await index_search_document("customers", result.inserted_id)
 
     return CustomerInDB(**customer_dict)
 
@@ -244,6 +229,9 @@ async def update_customer(
         {"_id": existing["_id"]},
         {"$set": update_data}
     )
+    if "status" in update_data:
+        await record_entity_change("customers", existing.get("status"), update_data["status"])
+    await index_search_document("customers", existing["_id"])
 
     updated = await db.customers.find_one({"_id": existing["_id"]})
     updated["_id"] = str(updated["_id"])
@@ -257,6 +245,7 @@ async def delete_customer(
     db: DatabaseManager = Depends(get_db)
 ):
     """Delete a customer and remove from all users."""
+    customer = None
     try:
         result = await db.customers.delete_one({"_id": ObjectId(customer_id)})
         customer_id_str = customer_id
@@ -273,6 +262,8 @@ async def delete_customer(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Customer not found"
         )
+    await record_entity_delete("customers", customer)
+    await index_search_document("customers", customer["_id"] if customer else ObjectId(customer_id))
 
     # Remove customer from all users
     await db.users.update_many(
@@ -312,6 +303,7 @@ async def toggle_customer_status(
         {"_id": customer["_id"]},
         {"$set": {"status": new_status, "updated_at": datetime.now(timezone.utc)}}
     )
+    await record_entity_change("customers", customer.get("status"), new_status)
 
     return {"message": f"Customer status changed to {new_status}", "status": new_status}
 
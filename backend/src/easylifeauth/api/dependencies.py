@@ -1,6 +1,6 @@
 """Async FastAPI Dependencies"""
 from typing import Optional, Dict, Any
-from fastapi import Depends
+from fastapi import Depends, Request
 
 from ..db.db_manager import DatabaseManager
 from ..services.token_manager import TokenManager
@@ -17,9 +17,17 @@ from ..services.jira_service import JiraService
 from ..services.atlassian_lookup_service import AtlassianLookupService
 from ..services.file_storage_service import FileStorageService
 from ..services.activity_log_service import ActivityLogService, init_activity_log_service
+from ..services.activity_rollups import init_activity_rollup_service
+from ..services.activity_log_buffer import ActivityLogBuffer
 from ..services.error_log_service import ErrorLogService, init_error_log_service
 from ..services.system_log_service import SystemLogService, init_system_log_service
 from ..services.gcs_service import GCSService
+from ..services.export_job_service import ExportJobService, init_export_job_service
+from ..services.entity_counters import init_entity_counter_service
+from ..services.search_index import init_search_index_service
+from ..services.analytics_snapshot import init_analytics_snapshot_service
+from ..services.dashboard_stats import invalidate_dashboard_stats
+from ..services.list_totals import invalidate_list_totals
 from ..services.ui_template_service import UITemplateService
 from ..security.access_control import CurrentUser, get_current_user, set_token_manager
 
@@ -43,6 +51,7 @@ _activity_log_service: Optional[ActivityLogService] = None
 _error_log_service: Optional[ErrorLogService] = None
 _system_log_service: Optional[SystemLogService] = None
 _gcs_service: Optional[GCSService] = None
+_export_job_service: Optional[ExportJobService] = None
 _ui_template_service: Optional[UITemplateService] = None
 _handshake_secret: Optional[str] = None
 _prevail_api_key: Optional[str] = None
@@ -68,6 +77,7 @@ def init_dependencies(
     global _scenario_request_service, _jira_service, _atlassian_lookup_service
     global _file_storage_service
     global _activity_log_service, _error_log_service, _gcs_service
+    global _export_job_service
     global _system_log_service
     global _ui_template_service, _handshake_secret, _prevail_api_key
 
@@ -107,7 +117,7 @@ def init_dependencies(
 
     # Initialize services
     _user_service = UserService(db, token_manager)
-    _admin_service = AdminService(db)
+    _admin_service = AdminService(db, token_manager)
     _password_service = PasswordResetService(db, token_manager, email_service)
     _domain_service = DataDomainService(db)
     _scenario_service = ScenarioService(db)
@@ -121,13 +131,18 @@ def init_dependencies(
     _ui_template_service = UITemplateService(ui_templates_db or db)
     print(f"✓ UI template service initialized (db: {'ui_templates' if ui_templates_db else 'shared'})")
 
-    # Initialize activity log service
-    _activity_log_service = init_activity_log_service(db)
+    # Initialize activity log service (batched writes, maintaining the hourly/daily rollups)
+    activity_rollups = init_activity_rollup_service(db)
+    _activity_log_service = init_activity_log_service(
+        db,
+        rollups=activity_rollups,
+        buffer=ActivityLogBuffer(db, rollups=activity_rollups)
+    )
     print("✓ Activity logging service initialized")
 
     # Initialize bulk upload services with GCS config
     from .bulk_upload_routes import init_bulk_services
-    init_bulk_services(db, gcs_config)
+    init_bulk_services(db, gcs_config, email_service)
     if gcs_config:
         print("✓ Bulk upload services initialized (with GCS)")
     else:
@@ -143,6 +158,22 @@ def init_dependencies(
         if _gcs_service.is_configured():
             print("✓ GCS service initialized for API configs")
 
+    # Initialize background export jobs (artifacts go to GCS when configured)
+    _export_job_service = init_export_job_service(db, gcs_service=_gcs_service)
+    print("✓ Export job service initialized")
+
+    # Incrementally maintained counts for the count endpoints and dashboard
+    init_entity_counter_service(db)
+    print("✓ Entity counter service initialized")
+
+    # Trigram index behind the listing searches
+    init_search_index_service(db)
+    print("✓ Search index service initialized")
+
+    # Dashboard analytics, refreshed in the background
+    init_analytics_snapshot_service(db)
+    print("✓ Analytics snapshot service initialized")
+
     # Initialize error log service with GCS for archival
     _error_log_service = init_error_log_service(
         db=db,
@@ -283,6 +314,11 @@ def get_gcs_service() -> Optional[GCSService]:
     return _gcs_service
 
 
+def get_export_job_service() -> Optional[ExportJobService]:
+    """Get export job service"""
+    return _export_job_service
+
+
 def get_error_log_service() -> Optional[ErrorLogService]:
     """Get error log service"""
     return _error_log_service
@@ -310,6 +346,19 @@ def get_ui_template_service() -> UITemplateService:
     return _ui_template_service
 
 
+async def invalidate_read_caches_on_write(request: Request):
+    """Router dependency: drop the cached dashboard counts and list totals after write requests.
+
+    Both caches live in this worker process only; other workers keep serving
+    their cached values until ``DASHBOARD_CACHE_TTL_SECONDS`` /
+    ``LIST_TOTALS_CACHE_TTL_SECONDS`` expire.
+    """
+    yield
+    if request.method not in ("GET", "HEAD", "OPTIONS"):
+        invalidate_dashboard_stats()
+        invalidate_list_totals()
+
+
 # Re-export get_current_user
 __all__ = [
     "init_dependencies",
@@ -330,10 +379,12 @@ __all__ = [
     "get_file_storage_service",
     "get_activity_log_service",
     "get_gcs_service",
+    "get_export_job_service",
     "get_error_log_service",
     "get_system_log_service",
     "get_handshake_secret",
     "get_prevail_api_key",
     "get_ui_template_service",
+    "invalidate_read_caches_on_write",
     "get_current_user",
 ]
@@ -12,12 +12,19 @@ from easylifeauth.api.models import (
     DomainCreate, DomainUpdate, DomainInDB, SubDomain, PaginationMeta
 )
 from easylifeauth.db.db_manager import DatabaseManager
-from easylifeauth.api.dependencies import get_db, get_user_service
+from easylifeauth.api.dependencies import get_db, get_user_service, invalidate_read_caches_on_write
 from easylifeauth.security.access_control import CurrentUser, require_super_admin, require_group_admin, get_current_user
 from easylifeauth.services.user_service import UserService
+from easylifeauth.services.entity_counters import (
+    entity_counters_for, mark_entity_counts_stale,
+    record_entity_change, record_entity_delete, record_entity_insert,
+)
 from easylifeauth.db.lookup import DomainTypes
 
-router = APIRouter(prefix="/domains", tags=["Domains"])
+router = APIRouter(
+    prefix="/domains", tags=["Domains"],
+    dependencies=[Depends(invalidate_read_caches_on_write)]
+)
 
 
 async def get_user_accessible_domains(
@@ -177,6 +184,11 @@ async def count_domains(
     db: DatabaseManager = Depends(get_db)
 ):
     """Get total count of domains."""
+    counters = entity_counters_for(db)
+    if counters:
+        values = [status_filter] if status_filter else []
+        return {"count": await counters.count("domains", *values)}
+
     query = {}
     if status_filter:
         query["status"] = status_filter
@@ -248,6 +260,7 @@ async def create_domain(
 
     result = await db.domains.insert_one(domain_dict)
     domain_dict["_id"] = str(result.inserted_id)
+    await record_entity_insert("domains", domain_dict)
 
     return DomainInDB(**domain_dict)
 
@@ -283,6 +296,8 @@ async def update_domain(
         {"_id": existing["_id"]},
         {"$set": update_data}
     )
+    if "status" in update_data:
+        await record_entity_change("domains", existing.get("status"), update_data["status"])
 
     updated = await db.domains.find_one({"_id": existing["_id"]})
     updated["_id"] = str(updated["_id"])
@@ -310,6 +325,7 @@ async def delete_domain(
     domain_key = domain["key"]
 
     await db.domains.delete_one({"_id": domain["_id"]})
+    await record_entity_delete("domains", domain)
 
     # Remove domain from all roles
     await db.roles.update_many(
@@ -331,6 +347,7 @@ async def delete_domain(
 
     # Delete associated scenarios
     await db.domain_scenarios.delete_many({"domainKey": domain_key})
+    await mark_entity_counts_stale("domain_scenarios")
 
     return {"message": "Domain deleted successfully"}
 
@@ -358,6 +375,7 @@ async def toggle_domain_status(
         {"_id": domain["_id"]},
         {"$set": {"status": new_status, "updated_at": datetime.now(timezone.utc)}}
     )
+    await record_entity_change("domains", domain.get("status"), new_status)
 
     return {"message": f"Domain status changed to {new_status}", "status": new_status}
 
@@ -13,11 +13,18 @@ from easylifeauth.api.models import (
     SubDomain, PaginationMeta
 )
 from easylifeauth.db.db_manager import DatabaseManager
-from easylifeauth.api.dependencies import get_db, get_user_service
+from easylifeauth.api.dependencies import get_db, get_user_service, invalidate_read_caches_on_write
 from easylifeauth.security.access_control import CurrentUser, require_super_admin, get_current_user
 from easylifeauth.services.user_service import UserService
+from easylifeauth.services.entity_counters import (
+    entity_counters_for, mark_entity_counts_stale,
+    record_entity_change, record_entity_delete, record_entity_insert,
+)
 
-router = APIRouter(prefix="/domain-scenarios", tags=["Domain Scenarios"])
+router = APIRouter(
+    prefix="/domain-scenarios", tags=["Domain Scenarios"],
+    dependencies=[Depends(invalidate_read_caches_on_write)]
+)
 
 
 async def get_user_accessible_domains(
@@ -142,16 +149,28 @@ async def count_scenarios(
     if not user_domains:
         return {"count": 0}
 
+    if status_filter:
+        statuses = [status_filter]
+    elif "super-administrator" not in current_user.roles:
+        statuses = ["A", "active"]
+    else:
+        statuses = []
+
+    # Unrestricted counts are served from the maintained counters
+    counters = entity_counters_for(db)
+    if counters and "all" in user_domains and not domain_key:
+        return {"count": await counters.count("domain_scenarios", *statuses)}
+
     query = {}
 
     # Filter by user's accessible domains
     if "all" not in user_domains:
         query["domainKey"] = {"$in": user_domains}
 
-    if status_filter:
-        query["status"] = status_filter
-    elif "super-administrator" not in current_user.roles:
-        query["status"] = {"$in": ["A", "active"]}
+    if len(statuses) == 1:
+        query["status"] = statuses[0]
+    elif statuses:
+        query["status"] = {"$in": statuses}
 
     if domain_key:
         if not check_domain_access(user_domains, domain_key):
@@ -223,6 +242,7 @@ async def create_scenario(
 
     result = await db.domain_scenarios.insert_one(scenario_dict)
     scenario_dict["_id"] = str(result.inserted_id)
+    await record_entity_insert("domain_scenarios", scenario_dict)
 
     return DomainScenarioInDB(**scenario_dict)
 
@@ -268,6 +288,8 @@ async def update_scenario(
         {"_id": existing["_id"]},
         {"$set": update_data}
     )
+    if "status" in update_data:
+        await record_entity_change("domain_scenarios", existing.get("status"), update_data["status"])
 
     updated = await db.domain_scenarios.find_one({"_id": existing["_id"]})
     updated["_id"] = str(updated["_id"])
@@ -295,9 +317,11 @@ async def delete_scenario(
     scenario_key = scenario["key"]
 
     await db.domain_scenarios.delete_one({"_id": scenario["_id"]})
+    await record_entity_delete("domain_scenarios", scenario)
 
     # Delete associated playboards
     await db.playboards.delete_many({"scenarioKey": scenario_key})
+    await mark_entity_counts_stale("playboards")
 
     return {"message": "Domain scenario deleted successfully"}
 
@@ -325,6 +349,7 @@ async def toggle_scenario_status(
         {"_id": scenario["_id"]},
         {"$set": {"status": new_status, "updated_at": datetime.now(timezone.utc)}}
     )
+    await record_entity_change("domain_scenarios", scenario.get("status"), new_status)
 
     return {"message": f"Scenario status changed to {new_status}", "status": new_status}
 
@@ -5,26 +5,25 @@ Admin-viewable error logging with file storage and GCS archival.
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from typing import Optional, Dict, Any, List
 from datetime import datetime, timedelta
-import math
 
 from .dependencies import get_error_log_service
+from .pagination import create_pagination_meta as shared_pagination_meta
+from ..db.pagination import InvalidCursor
 from ..services.error_log_service import ErrorLogService
 from ..security.access_control import CurrentUser, require_super_admin
 
 router = APIRouter(prefix="/error-logs", tags=["Error Logs"])
 
 
-def create_pagination_meta(total: int, page: int, limit: int) -> Dict[str, Any]:
+def create_pagination_meta(
+    total: Optional[int],
+    page: int,
+    limit: int,
+    next_cursor: Optional[str] = None,
+    keyset: bool = False
+) -> Dict[str, Any]:
     """Create pagination metadata."""
-    pages = math.ceil(total / limit) if limit > 0 else 0
-    return {
-        "total": total,
-        "page": page,
-        "limit": limit,
-        "pages": pages,
-        "has_next": page < pages - 1,
-        "has_prev": page > 0
-    }
+    return shared_pagination_meta(total, page, limit, next_cursor, keyset).model_dump()
 
 
 @router.get("")
@@ -35,6 +34,9 @@ async def list_error_logs(
     error_type: Optional[str] = Query(None, description="Filter by error type"),
     search: Optional[str] = Query(None, description="Search in message and stack trace"),
     days: Optional[int] = Query(None, ge=1, le=365, description="Filter logs from last N days"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page (keyset pagination)"),
+    include_total: Optional[bool] = Query(None, description="Count the total (default: only without cursor)"),
+    total: Optional[int] = Query(None, ge=0, description="Total returned by a previous page, reused instead of recounting"),
     current_user: CurrentUser = Depends(require_super_admin),
     error_log_service: ErrorLogService = Depends(get_error_log_service)
 ) -> Dict[str, Any]:
@@ -47,6 +49,9 @@ async def list_error_logs(
     - **error_type**: Filter by exception type
     - **search**: Search in message and stack trace
     - **days**: Filter logs from last N days
+    - **cursor**: ``next_cursor`` of the previous page, for keyset pagination
+    - **include_total**: Count the total (by default only without a cursor)
+    - **total**: Total returned by a previous page, reused instead of recounting
     """
     if error_log_service is None:
         raise HTTPException(
@@ -65,15 +70,23 @@ async def list_error_logs(
         filters["days"] = days
 
     offset = page * limit
-    result = await error_log_service.get_current_logs(
-        limit=limit,
-        offset=offset,
-        filters=filters
-    )
+    try:
+        result = await error_log_service.get_current_logs(
+            limit=limit,
+            offset=offset,
+            filters=filters,
+            cursor=cursor,
+            include_total=include_total,
+            total=total
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
     return {
         "data": result.get("logs", []),
-        "pagination": create_pagination_meta(result.get("total", 0), page, limit)
+        "pagination": create_pagination_meta(
+            result.get("total", 0), page, limit, result.get("next_cursor"), keyset=cursor is not None
+        )
     }
 
 
@@ -4,9 +4,13 @@ from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from typing import Optional, List
 
+from easylifeauth.api.dependencies import invalidate_read_caches_on_write
 from easylifeauth.security.access_control import get_current_user, CurrentUser
 
-router = APIRouter(prefix="/explorer", tags=["Explorer Publish"])
+router = APIRouter(
+    prefix="/explorer", tags=["Explorer Publish"],
+    dependencies=[Depends(invalidate_read_caches_on_write)]
+)
 
 
 class PublishRequest(BaseModel):
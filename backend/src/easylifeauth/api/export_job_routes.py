@@ -0,0 +1,144 @@
+"""
+Background export job API routes.
+
+Large exports run as jobs (see ``services.export_job_service``): create a job,
+poll its progress, then download the compressed artifact. Downloads support
+HTTP Range requests, so interrupted transfers can be resumed and the artifact
+can be fetched again without re-running the export.
+"""
+import os
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import FileResponse, RedirectResponse
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, Any
+
+from .dependencies import get_export_job_service
+from .export_routes import FIELDS_DESCRIPTION, build_export_filters
+from ..services.export_job_service import ExportJobService, STORAGE_GCS
+from ..security.access_control import CurrentUser, require_super_admin
+
+router = APIRouter(prefix="/export/jobs", tags=["Export"])
+
+
+class ExportJobRequest(BaseModel):
+    """Export job parameters; filters apply to the entities that support them."""
+    entity: str = Field(..., description="users, roles, groups, domains, scenarios or activity_logs")
+    format: str = Field("csv", description="csv, json or ndjson")
+    compression: str = Field("gzip", description="gzip, or zstd when available")
+    fields: Optional[str] = Field(None, description=FIELDS_DESCRIPTION)
+    is_active: Optional[bool] = None
+    status: Optional[str] = None
+    domain_key: Optional[str] = None
+    days: Optional[int] = Field(30, ge=1)
+
+
+def _require_service(service: Optional[ExportJobService]) -> ExportJobService:
+    if service is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Export job service not initialized"
+        )
+    return service
+
+
+@router.post("", status_code=status.HTTP_202_ACCEPTED)
+async def create_export_job(
+    request: ExportJobRequest,
+    current_user: CurrentUser = Depends(require_super_admin),
+    export_job_service: ExportJobService = Depends(get_export_job_service)
+) -> Dict[str, Any]:
+    """Start a background export; poll the returned job for progress."""
+    service = _require_service(export_job_service)
+    filters = build_export_filters(
+        request.entity,
+        is_active=request.is_active,
+        status=request.status,
+        domain_key=request.domain_key,
+        days=request.days
+    )
+    try:
+        return await service.create_job(
+            request.entity,
+            request.format,
+            filters=filters,
+            fields=request.fields,
+            compression=request.compression,
+            created_by=current_user.email
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+
+
+@router.get("")
+async def list_export_jobs(
+    mine: bool = Query(False, description="Only jobs created by the current user"),
+    limit: int = Query(50, ge=1, le=200),
+    current_user: CurrentUser = Depends(require_super_admin),
+    export_job_service: ExportJobService = Depends(get_export_job_service)
+) -> Dict[str, Any]:
+    """List recent export jobs, newest first."""
+    service = _require_service(export_job_service)
+    jobs = await service.list_jobs(created_by=current_user.email if mine else None, limit=limit)
+    return {"data": jobs}
+
+
+@router.get("/{job_id}")
+async def get_export_job(
+    job_id: str,
+    current_user: CurrentUser = Depends(require_super_admin),
+    export_job_service: ExportJobService = Depends(get_export_job_service)
+) -> Dict[str, Any]:
+    """Status and progress of an export job."""
+    service = _require_service(export_job_service)
+    job = await service.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Export job not found")
+    return job
+
+
+@router.get("/{job_id}/download")
+async def download_export_job(
+    job_id: str,
+    current_user: CurrentUser = Depends(require_super_admin),
+    export_job_service: ExportJobService = Depends(get_export_job_service)
+):
+    """Download a completed export (supports Range requests)."""
+    service = _require_service(export_job_service)
+    job = await service.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Export job not found")
+
+    artifact = await service.get_artifact(job_id)
+    if not artifact:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Export job is {job['status']}"
+        )
+
+    if artifact["storage"] == STORAGE_GCS:
+        url = await service.get_download_url(artifact)
+        if not url:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Export storage unavailable"
+            )
+        return RedirectResponse(url, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+
+    if not os.path.exists(artifact["path"]):
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Export file is no longer available")
+    return FileResponse(artifact["path"], media_type=artifact["media_type"], filename=artifact["file_name"])
+
+
+@router.delete("/{job_id}")
+async def delete_export_job(
+    job_id: str,
+    current_user: CurrentUser = Depends(require_super_admin),
+    export_job_service: ExportJobService = Depends(get_export_job_service)
+) -> Dict[str, Any]:
+    """Cancel a running export, or delete a finished one and its file."""
+    service = _require_service(export_job_service)
+    if not await service.delete_job(job_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Export job not found")
+    return {"message": "Export job deleted"}
@@ -1,323 +1,361 @@
 """
-Data export API routes for various formats (CSV, Excel, JSON).
+Data export API routes for various formats (CSV, JSON, NDJSON).
+
+Exports stream from the database cursor in batches (see
+``services.data_export``); NDJSON is the cheapest format for very large
+collections such as activity logs.
 """
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import StreamingResponse
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Union
 from datetime import datetime, timezone, timedelta
-import json
-import csv
-import io
 
 from .dependencies import get_db
 from ..db.db_manager import DatabaseManager
 from ..security.access_control import CurrentUser, require_super_admin
+from ..services.data_export import (
+    EXPORT_ENTITIES,
+    EXPORT_FORMATS,
+    DocumentBatches,
+    build_projection,
+    csv_chunks,
+    flatten_dict,  # noqa: F401 - re-exported
+    json_chunks,
+    ndjson_chunks,
+    open_document_batches,
+    parse_fields,
+    serialize_document,  # noqa: F401 - re-exported
+)
 
 router = APIRouter(prefix="/export", tags=["Export"])
 
-
-def serialize_document(doc: Any) -> Any:
-    """Convert MongoDB document to JSON-serializable format."""
-    if isinstance(doc, dict):
-        return {k: serialize_document(v) for k, v in doc.items()}
-    elif isinstance(doc, list):
-        return [serialize_document(item) for item in doc]
-    elif isinstance(doc, datetime):
-        return doc.isoformat()
-    elif hasattr(doc, '__dict__'):
-        return str(doc)
-    else:
-        return doc
+FIELDS_DESCRIPTION = (
+    "Comma-separated fields to export (dotted paths allowed). "
+    "Defaults to the entity's standard fields."
+)
 
 
-def flatten_dict(d: Dict[str, Any], parent_key: str = '', sep: str = '_') -> Dict[str, Any]:
-    """Flatten nested dictionary for CSV export."""
-    items = []
-    for k, v in d.items():
-        new_key = f"{parent_key}{sep}{k}" if parent_key else k
-        if isinstance(v, dict):
-            items.extend(flatten_dict(v, new_key, sep=sep).items())
-        elif isinstance(v, list):
-            items.append((new_key, ', '.join(str(item) for item in v)))
-        else:
-            items.append((new_key, v))
-    return dict(items)
+def build_export_filters(
+    entity_name: str,
+    is_active: Optional[bool] = None,
+    status: Optional[str] = None,
+    domain_key: Optional[str] = None,
+    days: Optional[int] = None
+) -> Dict[str, Any]:
+    """Query filters supported by an export entity."""
+    filters: Dict[str, Any] = {}
+    if entity_name == "users":
+        if is_active is not None:
+            filters['is_active'] = is_active
+    elif entity_name == "activity_logs":
+        if days:
+            cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
+            filters['timestamp'] = {'$gte': cutoff_date}
+    else:
+        if status:
+            filters['status'] = status
+        if entity_name == "scenarios" and domain_key:
+            filters['domainKey'] = domain_key
+    return filters
 
 
 async def get_collection_data(
     db: DatabaseManager,
     collection_name: str,
-    filters: Dict[str, Any] = None
-) -> List[Dict[str, Any]]:
-    """Retrieve data from collection with optional filters."""
+    filters: Dict[str, Any] = None,
+    projection: Optional[Dict[str, Any]] = None
+) -> Optional[DocumentBatches]:
+    """Open a batched stream over a collection with optional filters.
+
+    Returns None when the database is unavailable. The first batch is read
+    up front so an empty result can be reported before streaming starts.
+    """
     collection = db.db[collection_name] if hasattr(db, 'db') else None
 
     if collection is None:
-        return []
+        return None
 
     query = filters or {}
-    cursor = collection.find(query)
+    cursor = collection.find(query, projection)
+    return await open_document_batches(cursor)
 
-    documents = []
-    async for doc in cursor:
-        # Convert ObjectId to string
-        doc['_id'] = str(doc['_id'])
-        # Serialize datetime objects
-        doc = serialize_document(doc)
-        documents.append(doc)
 
-    return documents
+def _as_batches(documents: Union[DocumentBatches, List[Dict[str, Any]], None]) -> DocumentBatches:
+    if isinstance(documents, DocumentBatches):
+        batches = documents
+    else:
+        batches = DocumentBatches.from_documents(documents or [])
+    if batches.is_empty:
+        raise HTTPException(status_code=404, detail="No data to export")
+    return batches
 
 
-def create_csv_response(documents: List[Dict[str, Any]], filename: str) -> StreamingResponse:
-    """Create CSV streaming response from documents."""
-    if not documents:
-        raise HTTPException(status_code=404, detail="No data to export")
+def _attachment(filename: str) -> Dict[str, str]:
+    return {"Content-Disposition": f"attachment; filename={filename}"}
 
-    # Flatten nested structures
-    flattened_docs = [flatten_dict(doc) for doc in documents]
 
-    # Create CSV
-    output = io.StringIO()
-    if flattened_docs:
-        # Get all unique keys across all documents
-        all_keys = set()
-        for doc in flattened_docs:
-            all_keys.update(doc.keys())
-        fieldnames = sorted(all_keys)
+def create_csv_response(documents: Union[DocumentBatches, List[Dict[str, Any]]], filename: str) -> StreamingResponse:
+    """Create CSV streaming response from documents."""
+    batches = _as_batches(documents)
+    return StreamingResponse(csv_chunks(batches), media_type="text/csv", headers=_attachment(filename))
 
-        writer = csv.DictWriter(output, fieldnames=fieldnames, extrasaction='ignore')
-        writer.writeheader()
-        writer.writerows(flattened_docs)
 
-    output.seek(0)
+def create_json_response(documents: Union[DocumentBatches, List[Dict[str, Any]]], filename: str) -> StreamingResponse:
+    """Create JSON streaming response from documents."""
+    batches = _as_batches(documents)
+    return StreamingResponse(json_chunks(batches), media_type="application/json", headers=_attachment(filename))
 
-    return StreamingResponse(
-        iter([output.getvalue()]),
-        media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
 
+def create_ndjson_response(documents: Union[DocumentBatches, List[Dict[str, Any]]], filename: str) -> StreamingResponse:
+    """Create newline-delimited JSON streaming response from documents."""
+    batches = _as_batches(documents)
+    return StreamingResponse(ndjson_chunks(batches), media_type="application/x-ndjson", headers=_attachment(filename))
 
-def create_json_response(documents: List[Dict[str, Any]], filename: str) -> StreamingResponse:
-    """Create JSON streaming response from documents."""
-    if not documents:
-        raise HTTPException(status_code=404, detail="No data to export")
 
-    json_str = json.dumps(documents, indent=2, default=str)
+RESPONSE_BUILDERS = {
+    "csv": create_csv_response,
+    "json": create_json_response,
+    "ndjson": create_ndjson_response,
+}
 
-    return StreamingResponse(
-        iter([json_str]),
-        media_type="application/json",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
+
+async def export_collection(
+    db: DatabaseManager,
+    entity_name: str,
+    filters: Dict[str, Any],
+    export_format: str,
+    fields: Optional[str] = None
+) -> StreamingResponse:
+    """Stream an export entity as ``export_format`` (csv, json or ndjson).
+
+    ``fields`` is pushed down to the database as a projection.
+    """
+    entity = EXPORT_ENTITIES[entity_name]
+    try:
+        projection = build_projection(entity, parse_fields(fields))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    documents = await get_collection_data(db, entity.collection, filters, projection)
+    _, extension = EXPORT_FORMATS[export_format]
+    filename = f"{entity.filename_prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    return RESPONSE_BUILDERS[export_format](documents, filename)
 
 
 @router.get("/users/csv")
 async def export_users_csv(
     is_active: Optional[bool] = None,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     current_user: CurrentUser = Depends(require_super_admin),
     db: DatabaseManager = Depends(get_db)
 ):
     """Export users data to CSV format."""
-    filters = {}
-    if is_active is not None:
-        filters['is_active'] = is_active
-
-    documents = await get_collection_data(db, "users", filters)
-
-    # Remove password_hash from export
-    for doc in documents:
-        doc.pop('password_hash', None)
-
-    filename = f"users_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-    return create_csv_response(documents, filename)
+    filters = build_export_filters("users", is_active=is_active)
+    return await export_collection(db, "users", filters, "csv", fields)
 
 
 @router.get("/users/json")
 async def export_users_json(
     is_active: Optional[bool] = None,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     current_user: CurrentUser = Depends(require_super_admin),
     db: DatabaseManager = Depends(get_db)
 ):
     """Export users data to JSON format."""
-    filters = {}
-    if is_active is not None:
-        filters['is_active'] = is_active
-
-    documents = await get_collection_data(db, "users", filters)
+    filters = build_export_filters("users", is_active=is_active)
+    return await export_collection(db, "users", filters, "json", fields)
 
-    # Remove password_hash from export
-    for doc in documents:
-        doc.pop('password_hash', None)
 
-    filename = f"users_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-    return create_json_response(documents, filename)
+@router.get("/users/ndjson")
+async def export_users_ndjson(
+    is_active: Optional[bool] = None,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    current_user: CurrentUser = Depends(require_super_admin),
+    db: DatabaseManager = Depends(get_db)
+):
+    """Export users data to newline-delimited JSON format."""
+    filters = build_export_filters("users", is_active=is_active)
+    return await export_collection(db, "users", filters, "ndjson", fields)
 
 
 @router.get("/roles/csv")
 async def export_roles_csv(
     status: Optional[str] = None,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     current_user: CurrentUser = Depends(require_super_admin),
     db: DatabaseManager = Depends(get_db)
 ):
     """Export roles data to CSV format."""
-    filters = {}
-    if status:
-        filters['status'] = status
-
-    documents = await get_collection_data(db, "roles", filters)
-    filename = f"roles_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-    return create_csv_response(documents, filename)
+    filters = build_export_filters("roles", status=status)
+    return await export_collection(db, "roles", filters, "csv", fields)
 
 
 @router.get("/roles/json")
 async def export_roles_json(
     status: Optional[str] = None,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     current_user: CurrentUser = Depends(require_super_admin),
     db: DatabaseManager = Depends(get_db)
 ):
     """Export roles data to JSON format."""
-    filters = {}
-    if status:
-        filters['status'] = status
+    filters = build_export_filters("roles", status=status)
+    return await export_collection(db, "roles", filters, "json", fields)
 
-    documents = await get_collection_data(db, "roles", filters)
-    filename = f"roles_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-    return create_json_response(documents, filename)
+
+@router.get("/roles/ndjson")
+async def export_roles_ndjson(
+    status: Optional[str] = None,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    current_user: CurrentUser = Depends(require_super_admin),
+    db: DatabaseManager = Depends(get_db)
+):
+    """Export roles data to newline-delimited JSON format."""
+    filters = build_export_filters("roles", status=status)
+    return await export_collection(db, "roles", filters, "ndjson", fields)
 
 
 @router.get("/groups/csv")
 async def export_groups_csv(
     status: Optional[str] = None,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     current_user: CurrentUser = Depends(require_super_admin),
     db: DatabaseManager = Depends(get_db)
 ):
     """Export groups data to CSV format."""
-    filters = {}
-    if status:
-        filters['status'] = status
-
-    documents = await get_collection_data(db, "groups", filters)
-    filename = f"groups_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-    return create_csv_response(documents, filename)
+    filters = build_export_filters("groups", status=status)
+    return await export_collection(db, "groups", filters, "csv", fields)
 
 
 @router.get("/groups/json")
 async def export_groups_json(
     status: Optional[str] = None,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     current_user: CurrentUser = Depends(require_super_admin),
     db: DatabaseManager = Depends(get_db)
 ):
     """Export groups data to JSON format."""
-    filters = {}
-    if status:
-        filters['status'] = status
+    filters = build_export_filters("groups", status=status)
+    return await export_collection(db, "groups", filters, "json", fields)
+
 
-    documents = await get_collection_data(db, "groups", filters)
-    filename = f"groups_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-    return create_json_response(documents, filename)
+@router.get("/groups/ndjson")
+async def export_groups_ndjson(
+    status: Optional[str] = None,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    current_user: CurrentUser = Depends(require_super_admin),
+    db: DatabaseManager = Depends(get_db)
+):
+    """Export groups data to newline-delimited JSON format."""
+    filters = build_export_filters("groups", status=status)
+    return await export_collection(db, "groups", filters, "ndjson", fields)
 
 
 @router.get("/domains/csv")
 async def export_domains_csv(
     status: Optional[str] = None,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     current_user: CurrentUser = Depends(require_super_admin),
     db: DatabaseManager = Depends(get_db)
 ):
     """Export domains data to CSV format."""
-    filters = {}
-    if status:
-        filters['status'] = status
-
-    documents = await get_collection_data(db, "domains", filters)
-    filename = f"domains_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-    return create_csv_response(documents, filename)
+    filters = build_export_filters("domains", status=status)
+    return await export_collection(db, "domains", filters, "csv", fields)
 
 
 @router.get("/domains/json")
 async def export_domains_json(
     status: Optional[str] = None,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     current_user: CurrentUser = Depends(require_super_admin),
     db: DatabaseManager = Depends(get_db)
 ):
     """Export domains data to JSON format."""
-    filters = {}
-    if status:
-        filters['status'] = status
+    filters = build_export_filters("domains", status=status)
+    return await export_collection(db, "domains", filters, "json", fields)
 
-    documents = await get_collection_data(db, "domains", filters)
-    filename = f"domains_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-    return create_json_response(documents, filename)
+
+@router.get("/domains/ndjson")
+async def export_domains_ndjson(
+    status: Optional[str] = None,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    current_user: CurrentUser = Depends(require_super_admin),
+    db: DatabaseManager = Depends(get_db)
+):
+    """Export domains data to newline-delimited JSON format."""
+    filters = build_export_filters("domains", status=status)
+    return await export_collection(db, "domains", filters, "ndjson", fields)
 
 
 @router.get("/scenarios/csv")
 async def export_scenarios_csv(
     status: Optional[str] = None,
     domain_key: Optional[str] = None,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     current_user: CurrentUser = Depends(require_super_admin),
     db: DatabaseManager = Depends(get_db)
 ):
     """Export scenarios data to CSV format."""
-    filters = {}
-    if status:
-        filters['status'] = status
-    if domain_key:
-        filters['domainKey'] = domain_key
-
-    documents = await get_collection_data(db, "domain_scenarios", filters)
-    filename = f"scenarios_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-    return create_csv_response(documents, filename)
+    filters = build_export_filters("scenarios", status=status, domain_key=domain_key)
+    return await export_collection(db, "scenarios", filters, "csv", fields)
 
 
 @router.get("/scenarios/json")
 async def export_scenarios_json(
     status: Optional[str] = None,
     domain_key: Optional[str] = None,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     current_user: CurrentUser = Depends(require_super_admin),
     db: DatabaseManager = Depends(get_db)
 ):
     """Export scenarios data to JSON format."""
-    filters = {}
-    if status:
-        filters['status'] = status
-    if domain_key:
-        filters['domainKey'] = domain_key
+    filters = build_export_filters("scenarios", status=status, domain_key=domain_key)
+    return await export_collection(db, "scenarios", filters, "json", fields)
+
 
-    documents = await get_collection_data(db, "domain_scenarios", filters)
-    filename = f"scenarios_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-    return create_json_response(documents, filename)
+@router.get("/scenarios/ndjson")
+async def export_scenarios_ndjson(
+    status: Optional[str] = None,
+    domain_key: Optional[str] = None,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    current_user: CurrentUser = Depends(require_super_admin),
+    db: DatabaseManager = Depends(get_db)
+):
+    """Export scenarios data to newline-delimited JSON format."""
+    filters = build_export_filters("scenarios", status=status, domain_key=domain_key)
+    return await export_collection(db, "scenarios", filters, "ndjson", fields)
 
 
 @router.get("/activity-logs/csv")
 async def export_activity_logs_csv(
     days: Optional[int] = 30,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     current_user: CurrentUser = Depends(require_super_admin),
     db: DatabaseManager = Depends(get_db)
 ):
     """Export activity logs to CSV format."""
-    filters = {}
-    if days:
-        cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
-        filters['timestamp'] = {'$gte': cutoff_date}
-
-    documents = await get_collection_data(db, "activity_logs", filters)
-    filename = f"activity_logs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-    return create_csv_response(documents, filename)
+    filters = build_export_filters("activity_logs", days=days)
+    return await export_collection(db, "activity_logs", filters, "csv", fields)
 
 
 @router.get("/activity-logs/json")
 async def export_activity_logs_json(
     days: Optional[int] = 30,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     current_user: CurrentUser = Depends(require_super_admin),
     db: DatabaseManager = Depends(get_db)
 ):
     """Export activity logs to JSON format."""
-    filters = {}
-    if days:
-        cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
-        filters['timestamp'] = {'$gte': cutoff_date}
-
-    documents = await get_collection_data(db, "activity_logs", filters)
-    filename = f"activity_logs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-    return create_json_response(documents, filename)
+    filters = build_export_filters("activity_logs", days=days)
+    return await export_collection(db, "activity_logs", filters, "json", fields)
+
+
+@router.get("/activity-logs/ndjson")
+async def export_activity_logs_ndjson(
+    days: Optional[int] = 30,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    current_user: CurrentUser = Depends(require_super_admin),
+    db: DatabaseManager = Depends(get_db)
+):
+    """Export activity logs to newline-delimited JSON format."""
+    filters = build_export_filters("activity_logs", days=days)
+    return await export_collection(db, "activity_logs", filters, "ndjson", fields)
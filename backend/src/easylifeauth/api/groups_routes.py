@@ -1,21 +1,27 @@
 """
 Group management API routes - Full CRUD from admin-panel-scratch-3.
 """
-import re
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from typing import List, Optional
 from datetime import datetime, timezone
 from bson import ObjectId
-import math
 
-from easylifeauth.api.models import GroupCreate, GroupUpdate, GroupInDB, PaginationMeta
+from easylifeauth.api.models import GroupCreate, GroupUpdate, GroupInDB
 from easylifeauth.db.db_manager import DatabaseManager
 from easylifeauth.db.lookup import GroupTypes
-from easylifeauth.api.dependencies import get_db, get_email_service
+from easylifeauth.api.pagination import list_page, page_pagination_meta
+from easylifeauth.api.dependencies import get_db, get_email_service, invalidate_read_caches_on_write
 from easylifeauth.security.access_control import CurrentUser, require_super_admin, require_group_admin
 from easylifeauth.services.email_service import EmailService
+from easylifeauth.services.entity_counters import (
+    entity_counters_for, record_entity_change, record_entity_delete, record_entity_insert,
+)
+from easylifeauth.services.search_index import index_search_document, search_filter
 
-router = APIRouter(prefix="/groups", tags=["Groups"])
+router = APIRouter(
+    prefix="/groups", tags=["Groups"],
+    dependencies=[Depends(invalidate_read_caches_on_write)]
+)
 
 
 async def resolve_permissions(db: DatabaseManager, permission_refs: List[str]) -> List[str]:
@@ -104,19 +110,6 @@ async def resolve_customers(db: DatabaseManager, customer_refs: List[str]) -> Li
     return resolved_keys
 
 
-def create_pagination_meta(total: int, page: int, limit: int) -> PaginationMeta:
-    """Create pagination metadata."""
-    pages = math.ceil(total / limit) if limit > 0 else 0
-    return PaginationMeta(
-        total=total,
-        page=page,
-        limit=limit,
-        pages=pages,
-        has_next=page < pages - 1,
-        has_prev=page > 0
-    )
-
-
 async def notify_users_of_group_change(db: DatabaseManager, group_id: str, changes: dict, email_service: Optional[EmailService] = None):
     """Notify all users with this group about changes."""
     if not email_service:
@@ -142,6 +135,9 @@ async def list_groups(
     search: Optional[str] = None,
     domain: Optional[str] = None,
     permission: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page (keyset pagination)"),
+    include_total: Optional[bool] = Query(None, description="Count the total (default: only without cursor)"),
+    total: Optional[int] = Query(None, ge=0, description="Total returned by a previous page, reused instead of recounting"),
     current_user: CurrentUser = Depends(require_group_admin),
     db: DatabaseManager = Depends(get_db)
 ):
@@ -150,30 +146,21 @@ async def list_groups(
     if status_filter:
         query["status"] = status_filter
     if search:
-        safe_search = re.escape(search)
-        query["$or"] = [
-            {"name": {"$regex": safe_search, "$options": "i"}},
-            {"groupId": {"$regex": safe_search, "$options": "i"}}
-        ]
+        query.update(await search_filter(db, "groups", search))
     if domain:
         query["domains"] = domain
     if permission:
         query["permissions"] = permission
 
-    # Get total count
-    total = await db.groups.count_documents(query)
-
-    # Get paginated data
-    skip = page * limit
-    cursor = db.groups.find(query).skip(skip).limit(limit).sort("priority", 1)
+    result = await list_page(db.groups, query, "priority", 1, page, limit, cursor, include_total, total)
     groups = []
-    async for group in cursor:
+    for group in result.docs:
         group["_id"] = str(group["_id"])
         groups.append(GroupInDB(**group))
 
     return {
         "data": groups,
-        "pagination": create_pagination_meta(total, page, limit)
+        "pagination": page_pagination_meta(result, page, limit)
     }
 
 
@@ -184,6 +171,11 @@ async def count_groups(
     db: DatabaseManager = Depends(get_db)
 ):
     """Get total count of groups."""
+    counters = entity_counters_for(db)
+    if counters:
+        values = [status_filter] if status_filter else []
+        return {"count": await counters.count("groups", *values)}
+
     query = {}
     if status_filter:
         query["status"] = status_filter
@@ -251,6 +243,8 @@ async def create_group(
 
     result = await db.groups.insert_one(group_dict)
     group_dict["_id"] = str(result.inserted_id)
+    await record_entity_insert("groups", group_dict)
+    await index_search_document("groups", result.inserted_id)
 
     return GroupInDB(**group_dict)
 
@@ -297,6 +291,9 @@ async def update_group(
         {"_id": existing["_id"]},
         {"$set": update_data}
     )
+    if "status" in update_data:
+        await record_entity_change("groups", existing.get("status"), update_data["status"])
+    await index_search_document("groups", existing["_id"])
 
     # Notify users if there were significant changes
     if changes and ("permissions" in changes or "domains" in changes or "status" in changes):
@@ -336,6 +333,8 @@ async def delete_group(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Group not found"
         )
+    await record_entity_delete("groups", group)
+    await index_search_document("groups", group["_id"])
 
     # Remove group from all users
     await db.users.update_many(
@@ -370,6 +369,7 @@ async def toggle_group_status(
         {"_id": group["_id"]},
         {"$set": {"status": new_status, "updated_at": datetime.now(timezone.utc)}}
     )
+    await record_entity_change("groups", group.get("status"), new_status)
 
     # Notify users
     await notify_users_of_group_change(
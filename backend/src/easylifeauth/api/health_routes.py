@@ -5,13 +5,17 @@ import time
 import threading
 from datetime import datetime, timezone
 from typing import Dict, Any, Optional
-from fastapi import APIRouter, Query, Request, Depends
+from fastapi import APIRouter, HTTPException, Query, Request, Depends
 
 import psutil
 
 from easylifeauth.api.dependencies import get_db
 from easylifeauth.security.access_control import CurrentUser, require_admin
 from easylifeauth.db.db_manager import DatabaseManager
+from easylifeauth.db.query_profiler import get_query_profiler
+from easylifeauth.services.password_hash_pool import get_password_hash_pool
+from easylifeauth.services.hash_policy import get_hash_policy
+from easylifeauth.services.list_totals import get_list_totals_cache
 
 router = APIRouter(tags=["Health"])
 
@@ -23,6 +27,8 @@ HEALTH_CHECK_CONFIG = {
     'cpu_usage_threshold': 90,
 }
 
+QUERY_SORT_FIELDS = ('total_ms', 'max_ms', 'avg_ms', 'count', 'slow_count')
+
 # Global variables
 _start_time = time.time()
 _health_cache: Dict[str, Any] = {}
@@ -228,13 +234,47 @@ async def readiness_check(db: DatabaseManager = Depends(get_db)):
 @router.get("/health/metrics")
 async def metrics_endpoint(current_user: CurrentUser = Depends(require_admin)):
     """Detailed metrics endpoint (admin only)"""
+    query_profiler = get_query_profiler()
     return {
         'system': get_system_metrics(),
+        'password_hashing': get_password_hash_pool().stats(),
+        'password_hash_policy': get_hash_policy().stats(),
+        'query_profiler': query_profiler.stats() if query_profiler else None,
+        'list_totals': get_list_totals_cache().stats(),
         'timestamp': datetime.now(timezone.utc).isoformat(),
         'uptime_seconds': round(time.time() - _start_time, 2)
     }
 
 
+@router.get("/health/queries")
+async def slow_queries(
+    limit: int = Query(20, ge=1, le=200, description="Number of query shapes to return"),
+    sort: str = Query("total_ms", description="Rank by total_ms, max_ms, avg_ms, count or slow_count"),
+    current_user: CurrentUser = Depends(require_admin)
+):
+    """Slowest MongoDB query shapes with their sampled explain plans (admin only)"""
+    if sort not in QUERY_SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(QUERY_SORT_FIELDS)}")
+    query_profiler = get_query_profiler()
+    if not query_profiler:
+        return {'enabled': False, 'queries': []}
+    return {
+        'enabled': True,
+        'stats': query_profiler.stats(),
+        'queries': query_profiler.top(limit=limit, sort=sort),
+        'timestamp': datetime.now(timezone.utc).isoformat()
+    }
+
+
+@router.delete("/health/queries")
+async def reset_slow_queries(current_user: CurrentUser = Depends(require_admin)):
+    """Clear the recorded query shapes (admin only)"""
+    query_profiler = get_query_profiler()
+    if query_profiler:
+        query_profiler.reset()
+    return {'enabled': query_profiler is not None, 'reset': query_profiler is not None}
+
+
 @router.get("/info")
 async def app_info():
     """Application information endpoint"""
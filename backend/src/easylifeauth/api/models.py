@@ -448,12 +448,13 @@ class TypeEnum(str, Enum):
 
 # ============ Pagination Models ============
 class PaginationMeta(BaseModel):
-    total: int
+    total: Optional[int] = None
     page: int
     limit: int
-    pages: int
+    pages: Optional[int] = None
     has_next: bool
     has_prev: bool
+    next_cursor: Optional[str] = None
 
 
 # ============ Permission Models ============
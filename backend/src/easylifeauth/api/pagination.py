@@ -0,0 +1,77 @@
+"""
+Pagination helpers shared by the admin list routes.
+
+List routes take ``page``/``limit`` and, optionally, ``cursor`` (the
+``next_cursor`` of the previous page, which switches to keyset pagination),
+``include_total`` and ``total`` (a total returned by a previous page, reused
+instead of recounting). See ``db.pagination`` for how pages are read and
+``services.list_totals`` for how totals are counted.
+"""
+import math
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException, status
+
+from ..db.pagination import InvalidCursor, Page, fetch_page
+from ..services.list_totals import count_list_total
+from .models import PaginationMeta
+
+
+def create_pagination_meta(
+    total: Optional[int],
+    page: int,
+    limit: int,
+    next_cursor: Optional[str] = None,
+    keyset: bool = False
+) -> PaginationMeta:
+    """Create pagination metadata; ``total`` and ``pages`` are None when not counted."""
+    pages = None
+    if total is not None:
+        pages = math.ceil(total / limit) if limit > 0 else 0
+    if keyset or pages is None:
+        has_next = next_cursor is not None
+    else:
+        has_next = page < pages - 1
+    return PaginationMeta(
+        total=total,
+        page=page,
+        limit=limit,
+        pages=pages,
+        has_next=has_next,
+        has_prev=keyset or page > 0,
+        next_cursor=next_cursor
+    )
+
+
+def page_pagination_meta(result: Page, page: int, limit: int) -> PaginationMeta:
+    """Pagination metadata of a page read with ``list_page``."""
+    return create_pagination_meta(result.total, page, limit, result.next_cursor, result.keyset)
+
+
+async def list_page(
+    collection,
+    query: Dict[str, Any],
+    sort_field: str,
+    direction: int,
+    page: int,
+    limit: int,
+    cursor: Optional[str] = None,
+    include_total: Optional[bool] = None,
+    total: Optional[int] = None
+) -> Page:
+    """Read one page of a list route; a cursor not issued for it is a 400.
+
+    A client-supplied ``total`` is reported back instead of counting.
+    """
+    def count(coll, q):
+        return count_list_total(coll, q, known_total=total)
+
+    if total is not None and include_total is None:
+        include_total = True
+    try:
+        return await fetch_page(
+            collection, query, sort_field, direction,
+            skip=page * limit, limit=limit, cursor=cursor, include_total=include_total, count=count
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
@@ -10,10 +10,16 @@ import math
 
 from easylifeauth.api.models import PermissionCreate, PermissionUpdate, PermissionInDB, PaginationMeta
 from easylifeauth.db.db_manager import DatabaseManager
-from easylifeauth.api.dependencies import get_db
+from easylifeauth.api.dependencies import get_db, invalidate_read_caches_on_write
 from easylifeauth.security.access_control import CurrentUser, require_super_admin
+from easylifeauth.services.entity_counters import (
+    entity_counters_for, record_entity_change, record_entity_delete, record_entity_insert,
+)
 
-router = APIRouter(prefix="/permissions", tags=["Permissions"])
+router = APIRouter(
+    prefix="/permissions", tags=["Permissions"],
+    dependencies=[Depends(invalidate_read_caches_on_write)]
+)
 
 
 def create_pagination_meta(total: int, page: int, limit: int) -> PaginationMeta:
@@ -83,6 +89,11 @@ async def count_permissions(
     db: DatabaseManager = Depends(get_db)
 ):
     """Get total count of permissions."""
+    counters = entity_counters_for(db)
+    if counters:
+        values = [module] if module else []
+        return {"count": await counters.count("permissions", *values)}
+
     query = {}
     if module:
         query["module"] = module
@@ -133,6 +144,7 @@ async def create_permission(
 
     result = await db.permissions.insert_one(perm_dict)
     perm_dict["_id"] = str(result.inserted_id)
+    await record_entity_insert("permissions", perm_dict)
 
     return PermissionInDB(**perm_dict)
 
@@ -163,6 +175,8 @@ async def update_permission(
         {"_id": existing["_id"]},
         {"$set": update_data}
     )
+    if "module" in update_data:
+        await record_entity_change("permissions", existing.get("module"), update_data["module"])
 
     updated = await db.permissions.find_one({"_id": existing["_id"]})
     updated["_id"] = str(updated["_id"])
@@ -190,6 +204,7 @@ async def delete_permission(
     perm_key = perm["key"]
 
     await db.permissions.delete_one({"_id": perm["_id"]})
+    await record_entity_delete("permissions", perm)
 
     # Remove permission from all roles
     await db.roles.update_many(
@@ -1,23 +1,29 @@
 """
 Playboard management API routes - Full CRUD with JSON file upload from admin-panel-scratch-3.
 """
-import re
 from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
 from typing import List, Optional
 from datetime import datetime, timezone
 from bson import ObjectId
 import json
-import math
 
 from easylifeauth.api.models import (
-    PlayboardCreate, PlayboardUpdate, PlayboardInDB, PaginationMeta
+    PlayboardCreate, PlayboardUpdate, PlayboardInDB
 )
 from easylifeauth.db.db_manager import DatabaseManager
-from easylifeauth.api.dependencies import get_db, get_user_service
+from easylifeauth.api.pagination import create_pagination_meta, list_page, page_pagination_meta
+from easylifeauth.api.dependencies import get_db, get_user_service, invalidate_read_caches_on_write
 from easylifeauth.security.access_control import CurrentUser, require_super_admin, get_current_user
 from easylifeauth.services.user_service import UserService
+from easylifeauth.services.entity_counters import (
+    entity_counters_for, record_entity_change, record_entity_delete, record_entity_insert,
+)
+from easylifeauth.services.search_index import index_search_document, search_filter
 
-router = APIRouter(prefix="/playboards", tags=["Playboards"])
+router = APIRouter(
+    prefix="/playboards", tags=["Playboards"],
+    dependencies=[Depends(invalidate_read_caches_on_write)]
+)
 
 
 async def get_user_accessible_domains(
@@ -90,19 +96,6 @@ def check_group_access(playboard: dict, current_user: CurrentUser) -> None:
             )
 
 
-def create_pagination_meta(total: int, page: int, limit: int) -> PaginationMeta:
-    """Create pagination metadata."""
-    pages = math.ceil(total / limit) if limit > 0 else 0
-    return PaginationMeta(
-        total=total,
-        page=page,
-        limit=limit,
-        pages=pages,
-        has_next=page < pages - 1,
-        has_prev=page > 0
-    )
-
-
 @router.get("")
 async def list_playboards(
     page: int = Query(0, ge=0, description="Page number (0-indexed)"),
@@ -110,6 +103,9 @@ async def list_playboards(
     status_filter: Optional[str] = Query(None, alias="status"),
     scenario_key: Optional[str] = None,
     search: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page (keyset pagination)"),
+    include_total: Optional[bool] = Query(None, description="Count the total (default: only without cursor)"),
+    total: Optional[int] = Query(None, ge=0, description="Total returned by a previous page, reused instead of recounting"),
     current_user: CurrentUser = Depends(get_current_user),
     db: DatabaseManager = Depends(get_db),
     user_service: UserService = Depends(get_user_service)
@@ -161,7 +157,7 @@ async def list_playboards(
         query["scenarioKey"] = scenario_key
 
     if search:
-        query["name"] = {"$regex": re.escape(search), "$options": "i"}
+        query.update(await search_filter(db, "playboards", search))
 
     # Apply group-level access filter for non-super-admins
     group_filter = build_group_filter(current_user)
@@ -172,21 +168,16 @@ async def list_playboards(
             existing = {k: v for k, v in query.items()}
             query = {"$and": [existing, group_filter]} if existing else group_filter
 
-    # Get total count
-    total = await db.playboards.count_documents(query)
-
-    # Get paginated data
-    skip = page * limit
-    cursor = db.playboards.find(query).skip(skip).limit(limit).sort("created_at", -1)
+    result = await list_page(db.playboards, query, "created_at", -1, page, limit, cursor, include_total, total)
     playboards = []
-    async for pb in cursor:
+    for pb in result.docs:
         pb["_id"] = str(pb["_id"])
         # Return raw dict — existing data may not match strict PlayboardInDB model
         playboards.append(pb)
 
     return {
         "data": playboards,
-        "pagination": create_pagination_meta(total, page, limit)
+        "pagination": page_pagination_meta(result, page, limit)
     }
 
 
@@ -204,6 +195,12 @@ async def count_playboards(
     if not user_domains:
         return {"count": 0}
 
+    # Unrestricted counts (super-admins) are served from the maintained counters
+    counters = entity_counters_for(db)
+    if counters and "all" in user_domains and not scenario_key and build_group_filter(current_user) is None:
+        values = [status_filter] if status_filter else []
+        return {"count": await counters.count("playboards", *values)}
+
     # Get accessible scenario keys
     scenario_query = {}
     if "all" not in user_domains:
@@ -378,6 +375,8 @@ async def create_playboard(
 
     result = await db.playboards.insert_one(playboard_dict)
     playboard_dict["_id"] = str(result.inserted_id)
+    await record_entity_insert("playboards", playboard_dict)
+    await index_search_document("playboards", result.inserted_id)
 
     return PlayboardInDB(**playboard_dict)
 
@@ -478,6 +477,8 @@ async def upload_playboard_json(
 
     result = await db.playboards.insert_one(playboard_dict)
     playboard_dict["_id"] = str(result.inserted_id)
+    await record_entity_insert("playboards", playboard_dict)
+    await index_search_document("playboards", result.inserted_id)
 
     return PlayboardInDB(**playboard_dict)
 
@@ -535,6 +536,9 @@ async def update_playboard(
         {"_id": existing["_id"]},
         {"$set": update_data}
     )
+    if "status" in update_data:
+        await record_entity_change("playboards", existing.get("status"), update_data["status"])
+    await index_search_document("playboards", existing["_id"])
 
     updated = await db.playboards.find_one({"_id": existing["_id"]})
     updated["_id"] = str(updated["_id"])
@@ -615,6 +619,7 @@ async def update_playboard_json(
         {"_id": existing["_id"]},
         {"$set": update_fields}
     )
+    await index_search_document("playboards", existing["_id"])
 
     updated = await db.playboards.find_one({"_id": existing["_id"]})
     updated["_id"] = str(updated["_id"])
@@ -641,6 +646,8 @@ async def delete_playboard(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Playboard not found"
         )
+    await record_entity_delete("playboards")
+    await index_search_document("playboards", ObjectId(playboard_id))
 
     return {"message": "Playboard deleted successfully"}
 
@@ -671,6 +678,7 @@ async def toggle_playboard_status(
         {"_id": playboard["_id"]},
         {"$set": {"status": new_status, "updated_at": datetime.now(timezone.utc)}}
     )
+    await record_entity_change("playboards", playboard.get("status"), new_status)
 
     return {"message": f"Playboard status changed to {new_status}", "status": new_status}
 
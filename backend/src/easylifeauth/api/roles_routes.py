@@ -1,20 +1,26 @@
 """
 Role management API routes - Full CRUD from admin-panel-scratch-3.
 """
-import re
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from typing import List, Optional
 from datetime import datetime, timezone
 from bson import ObjectId
-import math
 
-from easylifeauth.api.models import RoleCreate, RoleUpdate, RoleInDB, PaginationMeta
+from easylifeauth.api.models import RoleCreate, RoleUpdate, RoleInDB
 from easylifeauth.db.db_manager import DatabaseManager
-from easylifeauth.api.dependencies import get_db, get_email_service
+from easylifeauth.api.pagination import list_page, page_pagination_meta
+from easylifeauth.api.dependencies import get_db, get_email_service, invalidate_read_caches_on_write
 from easylifeauth.security.access_control import CurrentUser, require_super_admin, require_group_admin
 from easylifeauth.services.email_service import EmailService
+from easylifeauth.services.entity_counters import (
+    entity_counters_for, record_entity_change, record_entity_delete, record_entity_insert,
+)
+from easylifeauth.services.search_index import index_search_document, search_filter
 
-router = APIRouter(prefix="/roles", tags=["Roles"])
+router = APIRouter(
+    prefix="/roles", tags=["Roles"],
+    dependencies=[Depends(invalidate_read_caches_on_write)]
+)
 
 
 async def resolve_permissions(db: DatabaseManager, permission_refs: List[str]) -> List[str]:
@@ -75,19 +81,6 @@ async def resolve_domains(db: DatabaseManager, domain_refs: List[str]) -> List[s
     return resolved_keys
 
 
-def create_pagination_meta(total: int, page: int, limit: int) -> PaginationMeta:
-    """Create pagination metadata."""
-    pages = math.ceil(total / limit) if limit > 0 else 0
-    return PaginationMeta(
-        total=total,
-        page=page,
-        limit=limit,
-        pages=pages,
-        has_next=page < pages - 1,
-        has_prev=page > 0
-    )
-
-
 async def notify_users_of_role_change(db: DatabaseManager, role_id: str, changes: dict, email_service: Optional[EmailService] = None):
     """Notify all users with this role about changes."""
     if not email_service:
@@ -113,6 +106,9 @@ async def list_roles(
     search: Optional[str] = None,
     domain: Optional[str] = None,
     permission: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page (keyset pagination)"),
+    include_total: Optional[bool] = Query(None, description="Count the total (default: only without cursor)"),
+    total: Optional[int] = Query(None, ge=0, description="Total returned by a previous page, reused instead of recounting"),
     current_user: CurrentUser = Depends(require_group_admin),
     db: DatabaseManager = Depends(get_db)
 ):
@@ -121,30 +117,21 @@ async def list_roles(
     if status_filter:
         query["status"] = status_filter
     if search:
-        safe_search = re.escape(search)
-        query["$or"] = [
-            {"name": {"$regex": safe_search, "$options": "i"}},
-            {"roleId": {"$regex": safe_search, "$options": "i"}}
-        ]
+        query.update(await search_filter(db, "roles", search))
     if domain:
         query["domains"] = domain
     if permission:
         query["permissions"] = permission
 
-    # Get total count
-    total = await db.roles.count_documents(query)
-
-    # Get paginated data
-    skip = page * limit
-    cursor = db.roles.find(query).skip(skip).limit(limit).sort("priority", 1)
+    result = await list_page(db.roles, query, "priority", 1, page, limit, cursor, include_total, total)
     roles = []
-    async for role in cursor:
+    for role in result.docs:
         role["_id"] = str(role["_id"])
         roles.append(RoleInDB(**role))
 
     return {
         "data": roles,
-        "pagination": create_pagination_meta(total, page, limit)
+        "pagination": page_pagination_meta(result, page, limit)
     }
 
 
@@ -155,6 +142,11 @@ async def count_roles(
     db: DatabaseManager = Depends(get_db)
 ):
     """Get total count of roles. Accessible by super-admins and administrators."""
+    counters = entity_counters_for(db)
+    if counters:
+        values = [status_filter] if status_filter else []
+        return {"count": await counters.count("roles", *values)}
+
     query = {}
     if status_filter:
         query["status"] = status_filter
@@ -212,6 +204,8 @@ async def create_role(
 
     result = await db.roles.insert_one(role_dict)
     role_dict["_id"] = str(result.inserted_id)
+    await record_entity_insert("roles", role_dict)
+    await index_search_document("roles", result.inserted_id)
 
     return RoleInDB(**role_dict)
 
@@ -256,6 +250,9 @@ async def update_role(
         {"_id": existing["_id"]},
         {"$set": update_data}
     )
+    if "status" in update_data:
+        await record_entity_change("roles", existing.get("status"), update_data["status"])
+    await index_search_document("roles", existing["_id"])
 
     # Notify users if there were significant changes
     if changes and ("permissions" in changes or "domains" in changes or "status" in changes):
@@ -273,6 +270,7 @@ async def delete_role(
     db: DatabaseManager = Depends(get_db)
 ):
     """Delete a role."""
+    role = None
     try:
         result = await db.roles.delete_one({"_id": ObjectId(role_id)})
         role_id_str = role_id
@@ -290,6 +288,8 @@ async def delete_role(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Role not found"
         )
+    await record_entity_delete("roles", role)
+    await index_search_document("roles", role["_id"] if role else ObjectId(role_id))
 
     # Remove role from all users
     await db.users.update_many(
@@ -324,6 +324,7 @@ async def toggle_role_status(
         {"_id": role["_id"]},
         {"$set": {"status": new_status, "updated_at": datetime.now(timezone.utc)}}
     )
+    await record_entity_change("roles", role.get("status"), new_status)
 
     # Notify users
     await notify_users_of_role_change(
@@ -3,14 +3,18 @@ from typing import Annotated, List, Dict, Any
 from fastapi import APIRouter, Depends, HTTPException, status
 
 from .models import ScenarioCreate, ScenarioUpdate, ScenarioResponse, MessageResponse
-from .dependencies import get_current_user, get_scenario_service, get_db, get_user_service
+from .dependencies import get_current_user, get_scenario_service, get_db, get_user_service, invalidate_read_caches_on_write
 from ..services.scenario_service import ScenarioService
 from ..services.user_service import UserService
+from ..services.entity_counters import record_entity_change
 from ..db.db_manager import DatabaseManager
 from ..security.access_control import CurrentUser, require_admin_or_editor
 from ..errors.scenario_error import ScenarioError, ScenarioNotFoundError, ScenarioBadError
 
-router = APIRouter(prefix="/scenarios", tags=["Scenarios"])
+router = APIRouter(
+    prefix="/scenarios", tags=["Scenarios"],
+    dependencies=[Depends(invalidate_read_caches_on_write)]
+)
 
 
 async def get_user_accessible_domains(
@@ -198,5 +202,6 @@ async def toggle_scenario_status(
     current_status = scenario.get("status", "A")
     new_status = "I" if current_status in ["A", "active"] else "A"
     await db.domain_scenarios.update_one({"key": key}, {"$set": {"status": new_status}})
+    await record_entity_change("domain_scenarios", scenario.get("status"), new_status)
     label = "activated" if new_status == "A" else "deactivated"
     return {"message": f"Scenario {label} successfully", "status": new_status}
@@ -1,24 +1,33 @@
 """
 User management API routes - Full CRUD from admin-panel-scratch-3.
 """
-import re
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from typing import List, Optional
 from datetime import datetime, timezone
 from bson import ObjectId
-import math
 
 from easylifeauth.api.models import (
-    UserCreate, UserUpdate, UserResponseFull, PaginationMeta
+    UserCreate, UserUpdate, UserResponseFull
 )
 from easylifeauth.db.db_manager import DatabaseManager
-from werkzeug.security import generate_password_hash
+from easylifeauth.services.password_hash_pool import PasswordHashPoolBusy, run_password_hash
+from easylifeauth.services.hash_policy import get_hash_policy
 import secrets
 import string
 
 def get_password_hash(password: str) -> str:
-    """Hash a password using werkzeug."""
-    return generate_password_hash(password)
+    """Hash a password using the active hash policy."""
+    return get_hash_policy().hash(password)
+
+async def hash_password_in_pool(password: str) -> str:
+    """Hash a password on the bounded hashing pool so the event loop stays free."""
+    try:
+        return await run_password_hash(get_password_hash, password)
+    except PasswordHashPoolBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please try again shortly"
+        )
 
 def generate_temp_password(length: int = 12) -> str:
     """Generate a temporary password."""
@@ -28,12 +37,20 @@ def generate_temp_password(length: int = 12) -> str:
 def create_password_reset_token(email: str) -> str:
     """Create a password reset token."""
     return secrets.token_urlsafe(32)
-from easylifeauth.api.dependencies import get_db, get_email_service, get_activity_log_service
+from easylifeauth.api.pagination import list_page, page_pagination_meta
+from easylifeauth.api.dependencies import get_db, get_email_service, get_activity_log_service, invalidate_read_caches_on_write
 from easylifeauth.security.access_control import CurrentUser, get_current_user, require_super_admin, require_admin, require_group_admin
 from easylifeauth.services.email_service import EmailService
 from easylifeauth.services.activity_log_service import ActivityLogService
+from easylifeauth.services.entity_counters import (
+    entity_counters_for, record_entity_change, record_entity_delete, record_entity_insert,
+)
+from easylifeauth.services.search_index import index_search_document, search_filter
 
-router = APIRouter(prefix="/users", tags=["Users"])
+router = APIRouter(
+    prefix="/users", tags=["Users"],
+    dependencies=[Depends(invalidate_read_caches_on_write)]
+)
 
 
 async def resolve_roles(db: DatabaseManager, role_refs: List[str]) -> List[str]:
@@ -94,19 +111,6 @@ async def resolve_groups(db: DatabaseManager, group_refs: List[str]) -> List[str
     return resolved_keys
 
 
-def create_pagination_meta(total: int, page: int, limit: int) -> PaginationMeta:
-    """Create pagination metadata."""
-    pages = math.ceil(total / limit) if limit > 0 else 0
-    return PaginationMeta(
-        total=total,
-        page=page,
-        limit=limit,
-        pages=pages,
-        has_next=page < pages - 1,
-        has_prev=page > 0
-    )
-
-
 @router.get("")
 async def list_users(
     page: int = Query(0, ge=0, description="Page number (0-indexed)"),
@@ -115,6 +119,9 @@ async def list_users(
     search: Optional[str] = None,
     role: Optional[str] = None,
     group: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page (keyset pagination)"),
+    include_total: Optional[bool] = Query(None, description="Count the total (default: only without cursor)"),
+    total: Optional[int] = Query(None, ge=0, description="Total returned by a previous page, reused instead of recounting"),
     current_user: CurrentUser = Depends(require_group_admin),
     db: DatabaseManager = Depends(get_db)
 ):
@@ -126,32 +133,22 @@ async def list_users(
     if is_active is not None:
         query["is_active"] = is_active
     if search:
-        safe_search = re.escape(search)
-        query["$or"] = [
-            {"email": {"$regex": safe_search, "$options": "i"}},
-            {"username": {"$regex": safe_search, "$options": "i"}},
-            {"full_name": {"$regex": safe_search, "$options": "i"}}
-        ]
+        query.update(await search_filter(db, "users", search))
     if role:
         query["roles"] = role
     if group:
         query["groups"] = group
 
-    # Get total count
-    total = await db.users.count_documents(query)
-
-    # Get paginated data
-    skip = page * limit
-    cursor = db.users.find(query).skip(skip).limit(limit).sort("created_at", -1)
+    result = await list_page(db.users, query, "created_at", -1, page, limit, cursor, include_total, total)
     users = []
-    async for user in cursor:
+    for user in result.docs:
         user["_id"] = str(user["_id"])
         user.pop("password_hash", None)
         users.append(UserResponseFull(**user))
 
     return {
         "data": users,
-        "pagination": create_pagination_meta(total, page, limit)
+        "pagination": page_pagination_meta(result, page, limit)
     }
 
 
@@ -162,6 +159,11 @@ async def count_users(
     db: DatabaseManager = Depends(get_db)
 ):
     """Get total count of users. Accessible by super-admins and administrators."""
+    counters = entity_counters_for(db)
+    if counters:
+        values = [is_active] if is_active is not None else []
+        return {"count": await counters.count("users", *values)}
+
     query = {}
     if is_active is not None:
         query["is_active"] = is_active
@@ -210,16 +212,12 @@ async def get_assigned_customers(
     base_filter = {"customerId": {"$in": customer_ids}, "status": {"$in": ["A", "active"]}}
 
     if search:
-        search_regex = {"$regex": re.escape(search), "$options": "i"}
         # Must match assigned customer ids AND search term
         base_filter = {
             "$and": [
                 {"customerId": {"$in": customer_ids}},
                 {"status": {"$in": ["A", "active"]}},
-                {"$or": [
-                    {"customerId": search_regex},
-                    {"name": search_regex}
-                ]}
+                await search_filter(db, "customers", search, fields=("customerId", "name"))
             ]
         }
 
@@ -338,7 +336,7 @@ async def create_user(
     if user_dict.get("groups"):
         user_dict["groups"] = await resolve_groups(db, user_dict["groups"])
 
-    user_dict["password_hash"] = get_password_hash(user_data.password)
+    user_dict["password_hash"] = await hash_password_in_pool(user_data.password)
     user_dict["created_at"] = datetime.now(timezone.utc)
     user_dict["updated_at"] = datetime.now(timezone.utc)
     user_dict["last_login"] = None
@@ -346,6 +344,8 @@ async def create_user(
 
     result = await db.users.insert_one(user_dict)
     user_dict["_id"] = str(result.inserted_id)
+    await record_entity_insert("users", user_dict)
+    await index_search_document("users", result.inserted_id)
 
     # Send welcome email if requested
     if user_data.send_password_email and email_service:
@@ -416,6 +416,9 @@ async def update_user(
         {"_id": existing["_id"]},
         {"$set": update_data}
     )
+    if "is_active" in update_data:
+        await record_entity_change("users", existing.get("is_active"), update_data["is_active"])
+    await index_search_document("users", existing["_id"])
 
     updated = await db.users.find_one({"_id": existing["_id"]})
     updated["_id"] = str(updated["_id"])
@@ -460,6 +463,9 @@ async def delete_user(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
+    await record_entity_delete("users", user)
+    if user:
+        await index_search_document("users", user["_id"])
 
     # Log activity
     if activity_log:
@@ -498,6 +504,7 @@ async def toggle_user_status(
         {"_id": user["_id"]},
         {"$set": {"is_active": new_status, "updated_at": datetime.now(timezone.utc)}}
     )
+    await record_entity_change("users", user.get("is_active"), new_status)
 
     # Log activity
     if activity_log:
@@ -570,7 +577,7 @@ async def admin_reset_password(
         )
 
     temp_password = generate_temp_password()
-    new_hash = get_password_hash(temp_password)
+    new_hash = await hash_password_in_pool(temp_password)
 
     await db.users.update_one(
         {"_id": user["_id"]},
@@ -2,6 +2,7 @@
 EasyLife Auth - FastAPI Application (Async with Motor)
 Main application entry point
 """
+import os
 from typing import Optional, Dict, Any
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
@@ -26,6 +27,7 @@ from .api import (
     bulk_upload_router,
     activity_log_router,
     export_router,
+    export_job_router,
     dashboard_router,
     users_router,
     roles_router,
@@ -45,15 +47,31 @@ from .api import (
 )
 from .api.system_log_routes import router as system_log_router
 from .api.dependencies import init_dependencies
+from .api.bulk_upload_routes import max_upload_request_size
 from .db.db_manager import DatabaseManager
+from .db.query_profiler import get_query_profiler, query_profiling_enabled
 from .services.token_manager import TokenManager
+from .services.token_revocation import create_revocation_bus
 from .services.email_service import EmailService
+from .services.password_hash_pool import get_password_hash_pool, run_password_hash
+from .services.hash_policy import get_hash_policy
+from .services.export_job_service import get_export_job_service
+from .services.bulk_upload_job_service import get_bulk_upload_job_service
+from .services.email_outbox import get_email_outbox
+from .services.entity_counters import get_entity_counter_service
+from .services.search_index import get_search_index_service
+from .services.analytics_snapshot import get_analytics_snapshot_service
+from .services.activity_rollups import get_activity_rollup_service
+from .services.activity_log_service import get_activity_log_service
 from .errors.auth_error import AuthError
 from .middleware.csrf import CSRFProtectMiddleware
 from .middleware.rate_limit import RateLimitMiddleware
 from .middleware.security import SecurityHeadersMiddleware, RequestValidationMiddleware
 from .middleware.db_health import DatabaseHealthMiddleware
 from .middleware.apigee_identity import ApigeeIdentityMiddleware
+from .middleware.system_log import SystemLogMiddleware
+from .middleware.query_route import QueryRouteMiddleware
+from .middleware.route_classes import RouteClassifier
 
 
 def create_app(
@@ -95,10 +113,11 @@ def create_app(
     # Store references for cleanup
     db_manager: Optional[DatabaseManager] = None
     ui_templates_db_manager: Optional[DatabaseManager] = None
+    token_manager: Optional[TokenManager] = None
 
     @asynccontextmanager
     async def lifespan(app: FastAPI):
-        nonlocal db_manager, ui_templates_db_manager
+        nonlocal db_manager, ui_templates_db_manager, token_manager
 
         # Startup
         if db_config and token_secret:
@@ -106,6 +125,7 @@ def create_app(
             db_manager = DatabaseManager(config=db_config)
 
             # Test connection
+            is_connected = False
             try:
                 is_connected = await db_manager.ping()
                 if is_connected:
@@ -115,6 +135,18 @@ def create_app(
             except Exception as e:
                 print(f"✗ MongoDB connection error (auth): {e}")
 
+            # Create missing declared indexes and report drift from the registry
+            if is_connected and os.environ.get("DB_ENSURE_INDEXES", "true").lower() == "true":
+                try:
+                    report = await db_manager.ensure_indexes()
+                    drift = len(report["mismatched"]) + len(report["undeclared"])
+                    print(
+                        f"✓ Indexes ensured ({len(report['created'])} created, "
+                        f"{drift} drifted, {len(report['failed'])} failed)"
+                    )
+                except Exception as e:
+                    print(f"✗ Index check failed: {e}")
+
             # Initialize separate UI templates database
             if ui_templates_db_config:
                 ui_templates_db_manager = DatabaseManager(config=ui_templates_db_config)
@@ -135,7 +167,21 @@ def create_app(
                 audience=jwt_audience,
                 access_token_expiry_minutes=access_token_expiry_minutes,
                 refresh_token_expiry_minutes=refresh_token_expiry_minutes,
+                revocation_bus=create_revocation_bus(),
             )
+            try:
+                await token_manager.start_revocation_listener()
+                print("✓ Token revocation listener started")
+            except Exception as e:
+                print(f"✗ Token revocation listener failed to start: {e}")
+
+            # Calibrate the password hash cost to the login latency budget
+            if os.environ.get("PASSWORD_HASH_CALIBRATE", "true").lower() == "true":
+                try:
+                    method = await run_password_hash(get_hash_policy().calibrate)
+                    print(f"✓ Password hash policy calibrated ({method})")
+                except Exception as e:
+                    print(f"✗ Password hash calibration failed, using defaults: {e}")
 
             # Initialize email service (optional)
             email_service = None
@@ -159,10 +205,64 @@ def create_app(
             )
             print("✓ Services initialized")
 
+            # Recount the entity counters now and then every reconcile interval
+            entity_counters = get_entity_counter_service()
+            if entity_counters:
+                entity_counters.start()
+                print("✓ Entity counter reconcile job started")
+            search_index = get_search_index_service()
+            if search_index:
+                search_index.start()
+                print("✓ Search index reconcile job started")
+            analytics_snapshot = get_analytics_snapshot_service()
+            if analytics_snapshot:
+                analytics_snapshot.start()
+                print("✓ Analytics snapshot refresh job started")
+            activity_rollups = get_activity_rollup_service()
+            if activity_rollups:
+                activity_rollups.start()
+            activity_log_service = get_activity_log_service()
+            if activity_log_service and activity_log_service.buffer:
+                activity_log_service.buffer.start()
+
         yield
 
         # Shutdown - close database connections gracefully
         print("Shutting down application...")
+        if token_manager:
+            try:
+                await token_manager.stop_revocation_listener()
+            except Exception as e:
+                print(f"Warning: Error stopping token revocation listener: {e}")
+        export_job_service = get_export_job_service()
+        if export_job_service:
+            await export_job_service.shutdown()
+        bulk_upload_job_service = get_bulk_upload_job_service()
+        if bulk_upload_job_service:
+            await bulk_upload_job_service.shutdown()
+        email_outbox = get_email_outbox()
+        if email_outbox:
+            await email_outbox.shutdown()
+        entity_counters = get_entity_counter_service()
+        if entity_counters:
+            await entity_counters.shutdown()
+        search_index = get_search_index_service()
+        if search_index:
+            await search_index.shutdown()
+        analytics_snapshot = get_analytics_snapshot_service()
+        if analytics_snapshot:
+            await analytics_snapshot.shutdown()
+        activity_rollups = get_activity_rollup_service()
+        if activity_rollups:
+            await activity_rollups.shutdown()
+        # Last, so activity logged while the other services stopped is written
+        activity_log_service = get_activity_log_service()
+        if activity_log_service:
+            await activity_log_service.shutdown()
+        get_password_hash_pool().shutdown()
+        query_profiler = get_query_profiler()
+        if query_profiler:
+            query_profiler.shutdown()
         if ui_templates_db_manager:
             try:
                 ui_templates_db_manager.close()
@@ -218,6 +318,10 @@ def create_app(
     import os
     is_dev = os.environ.get("ENV", "production") == "development"
 
+    # Route classes (health, docs, auth, exemptions) shared by the middlewares;
+    # loaded with the app's routes once they are all registered below
+    route_classifier = RouteClassifier()
+
     # CSRF Protection middleware
     if token_secret:
         app.add_middleware(
@@ -234,16 +338,20 @@ def create_app(
                 f"{API_BASE_ROUTE}/auth/csrf-token",
                 f"{API_BASE_ROUTE}/auth/forgot_password",
                 f"{API_BASE_ROUTE}/auth/reset_password",
-            }
+            },
+            route_classifier=route_classifier
         )
 
-    # Rate limiting middleware
+    # Rate limiting middleware. Off unless RATE_LIMIT_ENABLED=true: the old
+    # "/" exemption made it a no-op, so enabling it is an explicit choice.
     app.add_middleware(
         RateLimitMiddleware,
         requests_per_minute=120 if is_dev else 60,  # More lenient in dev
         requests_per_hour=2000 if is_dev else 1000,
-        auth_requests_per_minute=10 if is_dev else 5,  # Stricter for auth endpoints
-        enabled=not is_dev  # Disabled in dev mode for easier testing
+        auth_requests_per_minute=10 if is_dev else 5,  # Stricter for credential endpoints
+        # Disabled in dev mode for easier testing
+        enabled=not is_dev and os.environ.get("RATE_LIMIT_ENABLED", "false").lower() == "true",
+        route_classifier=route_classifier
     )
 
     # Security headers middleware (enabled in production only)
@@ -254,8 +362,15 @@ def create_app(
             enable_csp=True
         )
         # Add request validation
+        # Bulk uploads may be up to BULK_UPLOAD_MAX_FILE_MB (plus multipart framing)
         app.add_middleware(RequestValidationMiddleware,
-                            max_body_size=10 * 1024 * 1024)
+                            max_body_size=10 * 1024 * 1024,
+                            upload_paths={
+                                f"{API_BASE_ROUTE}/bulk/upload/*",
+                                f"{API_BASE_ROUTE}/bulk/jobs/upload/*",
+                            },
+                            max_upload_body_size=max_upload_request_size(),
+                            route_classifier=route_classifier)
 
     # Database health middleware - checks connectivity and auto-reconnects
     # after system sleep/resume cycles
@@ -264,34 +379,19 @@ def create_app(
         DatabaseHealthMiddleware,
         db_getter=lambda: get_db_dep() if db_config else None,
         check_interval=60,  # Check every 60 seconds of inactivity
-        enabled=True
+        enabled=True,
+        route_classifier=route_classifier
     )
 
     # Apigee identity headers (app name + hostname for proxy verification)
     app.add_middleware(ApigeeIdentityMiddleware, app_name=app_name)
 
-    import time as _time
-
-    @app.middleware("http")
-    async def system_log_middleware(request: Request, call_next):
-        """Log all HTTP requests to system log (file-based)."""
-        route_logger = logging.getLogger("easylife.http")
-        start = _time.perf_counter()
-        response = await call_next(request)
-        duration_ms = round((_time.perf_counter() - start) * 1000, 2)
-        route_logger.info(
-            "%s %s → %d (%.1fms)",
-            request.method, request.url.path, response.status_code, duration_ms,
-            extra={
-                "request_method": request.method,
-                "request_path": str(request.url.path),
-                "request_ip": request.client.host if request.client else None,
-                "response_status": response.status_code,
-                "duration_ms": duration_ms,
-                "user_email": getattr(request.state, "user_email", None) if hasattr(request, "state") else None,
-            },
-        )
-        return response
+    # Tag database calls with their route for the slow-query profiler
+    if query_profiling_enabled(db_config):
+        app.add_middleware(QueryRouteMiddleware, route_classifier=route_classifier)
+
+    # Log all HTTP requests to system log (file-based)
+    app.add_middleware(SystemLogMiddleware)
 
     # Exception handlers
     @app.exception_handler(AuthError)
@@ -397,6 +497,7 @@ def create_app(
     app.include_router(bulk_upload_router, prefix=API_BASE_ROUTE)
     app.include_router(activity_log_router, prefix=API_BASE_ROUTE)
     app.include_router(export_router, prefix=API_BASE_ROUTE)
+    app.include_router(export_job_router, prefix=API_BASE_ROUTE)
     app.include_router(dashboard_router, prefix=API_BASE_ROUTE)
     app.include_router(users_router, prefix=API_BASE_ROUTE)
     app.include_router(roles_router, prefix=API_BASE_ROUTE)
@@ -438,7 +539,10 @@ def create_app(
             "version": API_VERSION,
             "docs": "/docs"
         }
-    
+
+    route_classifier.load_routes(app.routes)
+    app.state.route_classifier = route_classifier
+
     return app
 
 
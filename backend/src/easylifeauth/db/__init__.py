@@ -1,5 +1,7 @@
 """Database module"""
 from .db_manager import DatabaseManager, is_valid_objectid, distribute_limit
+from .indexes import COLLECTION_INDEXES, ensure_indexes
+from .query_profiler import QueryProfiler, get_query_profiler
 from .constants import Roles, Groups, ROLES, GROUPS, EDITORS, ADMIN_ROLES, GROUP_ADMIN_ROLES
 from .lookup import (
     GroupTypes, StatusTypes, SharingTypes, ScenarioRequestStatusTypes,
@@ -10,6 +12,10 @@ __all__ = [
     "DatabaseManager",
     "is_valid_objectid", 
     "distribute_limit",
+    "COLLECTION_INDEXES",
+    "ensure_indexes",
+    "QueryProfiler",
+    "get_query_profiler",
     "Roles",
     "Groups",
     "ROLES",
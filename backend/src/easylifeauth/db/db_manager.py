@@ -7,6 +7,9 @@ from bson.objectid import ObjectId
 from bson.errors import InvalidId
 from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError, AutoReconnect
 
+from .indexes import ensure_indexes
+from .query_profiler import QueryProfiler, get_query_profiler, init_query_profiler, query_profiling_enabled
+
 logger = logging.getLogger(__name__)
 
 DEFAULT_FETCH_SIZE = 25
@@ -46,6 +49,8 @@ class DatabaseManager:
         self.client: Optional[AsyncIOMotorClient] = None
         self.db: Optional[AsyncIOMotorDatabase] = None
         self._config: Optional[Dict[str, Any]] = None
+        self._collections: List[str] = []
+        self.query_profiler: Optional[QueryProfiler] = None
 
         # Collection references
         self.users: Optional[AsyncIOMotorCollection] = None
@@ -68,6 +73,11 @@ class DatabaseManager:
         self.distribution_lists: Optional[AsyncIOMotorCollection] = None
         self.error_logs: Optional[AsyncIOMotorCollection] = None
         self.error_log_archives: Optional[AsyncIOMotorCollection] = None
+        self.export_jobs: Optional[AsyncIOMotorCollection] = None
+        self.bulk_upload_jobs: Optional[AsyncIOMotorCollection] = None
+        self.entity_counters: Optional[AsyncIOMotorCollection] = None
+        self.activity_log_rollups: Optional[AsyncIOMotorCollection] = None
+        self.search_tokens: Optional[AsyncIOMotorCollection] = None
 
         if config is not None:
             self._initialize(config)
@@ -103,6 +113,12 @@ class DatabaseManager:
         heartbeat_frequency_ms = int(str(config.get('heartbeatFrequencyMS', 5000)))  # 5 seconds - check more frequently
         wait_queue_timeout_ms = int(str(config.get('waitQueueTimeoutMS', 5000)))  # 5 seconds
 
+        # Opt-in slow-query profiler, shared by every DatabaseManager of the process
+        client_options: Dict[str, Any] = {}
+        if query_profiling_enabled(config):
+            self.query_profiler = get_query_profiler() or init_query_profiler(config.get("query_profiler"))
+            client_options["event_listeners"] = [self.query_profiler]
+
         # Motor async client with connection pool and reconnect settings
         # These settings help maintain connections and auto-reconnect after idle periods
         self.client = AsyncIOMotorClient(
@@ -129,8 +145,11 @@ class DatabaseManager:
 
             # Direct connection option for single server setups (common in dev)
             # directConnection=True,  # Uncomment if using single MongoDB server
+            **client_options,
         )
         self.db = self.client[config["database"]]
+        if self.query_profiler:
+            self.query_profiler.attach(self.client, config["database"])
 
         logger.info(
             f"MongoDB connection initialized with pool "
@@ -161,7 +180,12 @@ class DatabaseManager:
             "api_configs": "api_configs",
             "distribution_lists": "distribution_lists",
             "error_logs": "error_logs",
-            "error_log_archives": "error_log_archives"
+            "error_log_archives": "error_log_archives",
+            "export_jobs": "export_jobs",
+            "bulk_upload_jobs": "bulk_upload_jobs",
+            "entity_counters": "entity_counters",
+            "activity_log_rollups": "activity_log_rollups",
+            "search_tokens": "search_tokens"
         }
 
         collections = config.get("collections", [])
@@ -176,12 +200,17 @@ class DatabaseManager:
         if not collections:
             collections = list(collection_mapping.keys())
 
+        self._collections = list(collections)
         for key in collections:
             if key in collection_mapping:
                 setattr(self, collection_mapping[key], self.db[key])
             else:
                 setattr(self, key, self.db[key])
 
+    async def ensure_indexes(self) -> Dict[str, List[Any]]:
+        """Create the missing declared indexes of the set up collections and report drift"""
+        return await ensure_indexes(self.db, self._collections)
+
     def reconnect(self) -> None:
         """
         Force reconnection by closing and recreating the client.
@@ -0,0 +1,244 @@
+"""
+Declared indexes of the application collections.
+
+Indexes used to come from ``mongo-init.js`` (which still targets the legacy
+``easylife_*`` collection names) and the development seed script, so the
+query plans of a deployed database depended on which of them had been run.
+``COLLECTION_INDEXES`` now declares the indexes of every collection set up by
+``DatabaseManager._setup_collections`` and ``ensure_indexes`` brings a
+database in line at startup:
+
+- declared indexes that do not exist yet are created (idempotent, so several
+  instances starting together are fine)
+- existing indexes with the declared keys but other options (unique, TTL,
+  sparse, partial filter) and indexes nobody declared are reported as drift;
+  they are never dropped or rebuilt automatically
+"""
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+logger = logging.getLogger(__name__)
+
+# Index options whose difference counts as drift
+COMPARED_OPTIONS = ("unique", "sparse", "expireAfterSeconds", "partialFilterExpression")
+
+
+def _index(*keys: Tuple[str, int], **options: Any) -> IndexModel:
+    return IndexModel(list(keys), **options)
+
+
+def _asc(field: str) -> Tuple[str, int]:
+    return (field, ASCENDING)
+
+
+def _desc(field: str) -> Tuple[str, int]:
+    return (field, DESCENDING)
+
+
+COLLECTION_INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        _index(_asc("email"), unique=True),
+        _index(_asc("username")),
+        _index(_asc("roles")),
+        _index(_asc("groups")),
+        _index(_asc("domains")),
+        _index(_asc("customers")),
+        _index(_asc("is_active")),
+        _index(_desc("created_at")),
+        _index(_desc("last_login")),
+    ],
+    "tokens": [
+        _index(_asc("user_id"), _asc("email")),
+        _index(_asc("token_hash")),
+        _index(_asc("refresh_token_hash")),
+        _index(_asc("expires_at"), expireAfterSeconds=0),
+    ],
+    "reset_tokens": [
+        _index(_asc("token_hash")),
+        _index(_asc("user_id")),
+        _index(_asc("expires_at"), expireAfterSeconds=0),
+    ],
+    "roles": [
+        _index(_asc("roleId"), unique=True),
+        _index(_asc("status")),
+    ],
+    "groups": [
+        _index(_asc("groupId"), unique=True),
+        _index(_asc("status")),
+    ],
+    "permissions": [
+        _index(_asc("key"), unique=True),
+        _index(_asc("module")),
+    ],
+    "customers": [
+        _index(_asc("customerId"), unique=True),
+        _index(_asc("status")),
+        _index(_desc("created_at")),
+    ],
+    "scenario_requests": [
+        _index(_asc("requestId"), unique=True),
+        _index(_desc("row_update_stp"), _desc("requestId")),
+        _index(_asc("user_id")),
+        _index(_asc("status")),
+        _index(_asc("dataDomain")),
+    ],
+    "feedbacks": [
+        _index(_asc("email")),
+        _index(_desc("createdAt")),
+    ],
+    "domains": [
+        _index(_asc("key"), unique=True),
+        _index(_asc("status")),
+    ],
+    "domain_scenarios": [
+        _index(_asc("key"), unique=True),
+        _index(_asc("domainKey")),
+        _index(_asc("status")),
+    ],
+    "playboards": [
+        _index(_asc("key"), unique=True),
+        _index(_asc("scenarioKey")),
+        _index(_asc("status")),
+        _index(_desc("created_at")),
+    ],
+    "configurations": [
+        _index(_asc("config_id"), unique=True),
+        _index(_asc("key")),
+        _index(_asc("type")),
+        _index(_desc("row_update_stp")),
+    ],
+    "activity_logs": [
+        _index(_desc("timestamp")),
+        _index(_asc("entity_type"), _asc("entity_id")),
+        _index(_asc("action")),
+        _index(_asc("user_email")),
+    ],
+    "api_configs": [
+        _index(_asc("key"), unique=True),
+        _index(_asc("status")),
+        _index(_desc("created_at")),
+    ],
+    "distribution_lists": [
+        _index(_asc("key"), unique=True),
+        _index(_asc("name")),
+    ],
+    "error_logs": [
+        _index(_desc("timestamp")),
+        _index(_asc("level"), _desc("timestamp")),
+        _index(_asc("error_type")),
+    ],
+    "error_log_archives": [
+        _index(_asc("archive_id"), unique=True),
+        _index(_desc("created_at")),
+    ],
+    "export_jobs": [
+        _index(_asc("job_id"), unique=True),
+        _index(_asc("created_by"), _desc("created_at")),
+        _index(_asc("expires_at")),
+    ],
+    "bulk_upload_jobs": [
+        _index(_asc("job_id"), unique=True),
+        _index(_asc("created_by"), _desc("created_at")),
+        _index(_asc("expires_at")),
+    ],
+    "activity_log_rollups": [
+        _index(_asc("granularity"), _asc("bucket")),
+    ],
+    "search_tokens": [
+        _index(_asc("entity"), _asc("tokens")),
+        _index(_asc("entity"), _asc("doc_id")),
+    ],
+}
+
+
+def _key(spec: Any) -> Tuple[Tuple[str, Any], ...]:
+    # index_information() returns key lists; shell-created indexes use doubles (1.0)
+    items = spec.items() if hasattr(spec, "items") else spec
+    return tuple((field, int(direction) if isinstance(direction, float) else direction)
+                 for field, direction in items)
+
+
+def _options(spec: Dict[str, Any]) -> Dict[str, Any]:
+    options = {option: spec.get(option) for option in COMPARED_OPTIONS}
+    options["unique"] = bool(options["unique"])
+    options["sparse"] = bool(options["sparse"])
+    return options
+
+
+def _empty_report() -> Dict[str, List[Any]]:
+    return {"created": [], "mismatched": [], "undeclared": [], "failed": []}
+
+
+async def ensure_collection_indexes(
+    collection: AsyncIOMotorCollection,
+    declared: List[IndexModel],
+    report: Optional[Dict[str, List[Any]]] = None
+) -> Dict[str, List[Any]]:
+    """Create the missing ``declared`` indexes of ``collection`` and report drift."""
+    report = report if report is not None else _empty_report()
+    existing = {
+        _key(info["key"]): (name, info)
+        for name, info in (await collection.index_information()).items()
+        if name != "_id_"
+    }
+
+    for model in declared:
+        spec = model.document
+        found = existing.pop(_key(spec["key"]), None)
+        if found is None:
+            try:
+                await collection.create_indexes([model])
+                report["created"].append(f"{collection.name}.{spec['name']}")
+            except Exception as e:
+                # e.g. duplicate values for a unique index; the others are still created
+                report["failed"].append({"index": f"{collection.name}.{spec['name']}", "error": str(e)})
+            continue
+        name, info = found
+        declared_options, actual_options = _options(spec), _options(info)
+        if declared_options != actual_options:
+            report["mismatched"].append({
+                "index": f"{collection.name}.{name}",
+                "declared": {k: v for k, v in declared_options.items() if v != actual_options[k]},
+                "actual": {k: v for k, v in actual_options.items() if v != declared_options[k]},
+            })
+
+    report["undeclared"].extend(f"{collection.name}.{name}" for name, _ in existing.values())
+    return report
+
+
+async def ensure_indexes(
+    database: AsyncIOMotorDatabase,
+    collections: Optional[List[str]] = None
+) -> Dict[str, List[Any]]:
+    """
+    Bring the declared indexes of ``collections`` (default: all) in line.
+
+    Returns:
+        ``created`` index names, ``mismatched`` indexes (declared keys with other
+        options), ``undeclared`` index names and ``failed`` creations
+    """
+    report = _empty_report()
+    names = collections if collections is not None else list(COLLECTION_INDEXES)
+    for name in names:
+        declared = COLLECTION_INDEXES.get(name)
+        if not declared:
+            continue
+        try:
+            await ensure_collection_indexes(database[name], declared, report)
+        except Exception as e:
+            report["failed"].append({"index": f"{name}.*", "error": str(e)})
+
+    if report["created"]:
+        logger.info(f"Created indexes: {', '.join(report['created'])}")
+    for mismatch in report["mismatched"]:
+        logger.warning(
+            f"Index drift: {mismatch['index']} is {mismatch['actual']}, declared {mismatch['declared']}"
+        )
+    if report["undeclared"]:
+        logger.warning(f"Undeclared indexes: {', '.join(report['undeclared'])}")
+    for failure in report["failed"]:
+        logger.error(f"Failed to create index {failure['index']}: {failure['error']}")
+    return report
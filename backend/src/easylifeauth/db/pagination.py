@@ -0,0 +1,109 @@
+"""
+Offset and keyset pagination for the admin list queries.
+
+Page-number requests keep using ``skip(page * limit)``. A request that passes
+back the ``next_cursor`` of a previous page switches to keyset pagination:
+the cursor is an opaque token holding the sort key and ``_id`` of the last
+row served, and the next page is read with a range filter on
+``(sort field, _id)``, so it costs the same at any depth. Both modes sort on
+the field with ``_id`` as tie-breaker so they walk rows in the same order,
+and page one of a listing can be followed with cursors.
+
+Totals are counted only when asked for; keyset requests skip the count by
+default. Callers pass ``count`` to choose how (see
+``services.list_totals``).
+"""
+import base64
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from bson import json_util
+
+
+class InvalidCursor(ValueError):
+    """Cursor token that was not issued for this listing."""
+
+
+@dataclass
+class Page:
+    """One page of raw documents."""
+    docs: List[Dict[str, Any]]
+    total: Optional[int]
+    next_cursor: Optional[str]
+    keyset: bool
+
+
+def encode_cursor(sort_field: str, document: Dict[str, Any]) -> str:
+    """Opaque token positioned after ``document``."""
+    payload = json_util.dumps({"f": sort_field, "v": document.get(sort_field), "id": document["_id"]})
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, sort_field: str) -> Tuple[Any, Any]:
+    """``(sort value, _id)`` of a token issued by ``encode_cursor`` for ``sort_field``."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json_util.loads(raw.decode("utf-8"))
+    except Exception as e:
+        raise InvalidCursor("Invalid pagination cursor") from e
+    if not isinstance(payload, dict) or payload.get("f") != sort_field or "id" not in payload:
+        raise InvalidCursor("Invalid pagination cursor")
+    return payload.get("v"), payload["id"]
+
+
+def keyset_filter(sort_field: str, direction: int, value: Any, doc_id: Any) -> Dict[str, Any]:
+    """Rows after ``(value, doc_id)`` in ``sort_field`` / ``_id`` order.
+
+    Missing and null sort values order before every other value, so they
+    come last when descending.
+    """
+    after = "$gt" if direction > 0 else "$lt"
+    same_value = {sort_field: value, "_id": {after: doc_id}}
+    if value is None:
+        if direction > 0:
+            return {"$or": [{sort_field: {"$ne": None}}, same_value]}
+        return same_value
+    branches = [{sort_field: {after: value}}, same_value]
+    if direction < 0:
+        branches.insert(1, {sort_field: None})
+    return {"$or": branches}
+
+
+async def fetch_page(
+    collection,
+    query: Dict[str, Any],
+    sort_field: str,
+    direction: int,
+    skip: int = 0,
+    limit: int = 25,
+    cursor: Optional[str] = None,
+    include_total: Optional[bool] = None,
+    count: Optional[Callable[[Any, Dict[str, Any]], Awaitable[int]]] = None,
+) -> Page:
+    """Read one page of ``query`` sorted on ``sort_field``.
+
+    With ``cursor`` the page starts after the cursor's row and ``skip`` is
+    ignored. ``include_total`` defaults to counting for page-number requests
+    only, with ``count(collection, query)`` or else ``count_documents``.
+    Raises ``InvalidCursor`` for a malformed or foreign cursor.
+    """
+    keyset = cursor is not None
+    if include_total is None:
+        include_total = not keyset
+    count = count or (lambda coll, q: coll.count_documents(q))
+    sort = [(sort_field, direction), ("_id", direction)]
+
+    if keyset:
+        after = keyset_filter(sort_field, direction, *decode_cursor(cursor, sort_field))
+        find_query = {"$and": [query, after]} if query else after
+        total = await count(collection, query) if include_total else None
+        docs = [doc async for doc in collection.find(find_query).limit(limit + 1).sort(sort)]
+        has_more = len(docs) > limit
+        docs = docs[:limit]
+    else:
+        total = await count(collection, query) if include_total else None
+        docs = [doc async for doc in collection.find(query).skip(skip).limit(limit).sort(sort)]
+        has_more = len(docs) == limit and (total is None or skip + limit < total)
+
+    next_cursor = encode_cursor(sort_field, docs[-1]) if has_more and docs else None
+    return Page(docs=docs, total=total, next_cursor=next_cursor, keyset=keyset)
@@ -0,0 +1,461 @@
+"""
+Slow-query profiler for the MongoDB clients of ``DatabaseManager``.
+
+Opt-in (``DB_QUERY_PROFILING=true`` or ``query_profiling`` in the database
+config). ``QueryProfiler`` is a pymongo command listener, so every
+``find``/``aggregate``/``count_documents``/... issued through Motor is seen
+without touching the services that issue them:
+
+- each call is reduced to a query shape (collection, command, filter/sort or
+  pipeline with the values replaced by ``?``) and accumulated per shape:
+  count, total/max latency, documents returned and the routes it came from.
+  ``getMore`` batches are attributed to the shape that opened the cursor.
+- statements slower than ``slow_ms`` are sampled for an ``explain`` with
+  ``executionStats`` (at most once per shape every ``explain_interval``
+  seconds) on a background thread; the plan summary records documents and
+  keys examined and whether the winning plan is a collection scan.
+- at most ``max_shapes`` shapes are kept; the one with the least total time
+  is dropped first. ``top()`` returns the slowest shapes.
+
+The route of a call comes from the ``current_route`` context variable, set
+per request by ``QueryRouteMiddleware`` (Motor runs pymongo in a thread pool
+with the caller's context copied).
+"""
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+current_route: ContextVar[Optional[str]] = ContextVar("easylife_query_route", default=None)
+
+# Commands that carry a query worth profiling (others, e.g. hello/ping, are ignored)
+PROFILED_COMMANDS = frozenset({
+    "find", "aggregate", "count", "distinct", "findAndModify", "update", "delete", "insert",
+})
+EXPLAINABLE_COMMANDS = frozenset({"find", "aggregate", "count", "distinct"})
+# Session/transport fields that must not be forwarded into an explain command
+_COMMAND_META_FIELDS = frozenset({
+    "lsid", "$db", "$clusterTime", "$readPreference", "txnNumber", "autocommit",
+    "startTransaction", "signature", "apiVersion", "apiStrict", "apiDeprecationErrors",
+})
+MAX_PENDING_COMMANDS = 10000
+MAX_ROUTES_PER_SHAPE = 10
+MAX_PENDING_EXPLAINS = 4
+
+
+def _is_scalar(value: Any) -> bool:
+    return not isinstance(value, (dict, list, tuple))
+
+
+def query_shape(value: Any) -> Any:
+    """Replace the values of a filter/sort/pipeline with ``?``, keeping its structure."""
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        # $in lists and other value arrays collapse, whatever their length
+        if all(_is_scalar(item) for item in value):
+            return "?"
+        return [query_shape(item) for item in value]
+    return "?"
+
+
+def _command_shape(command_name: str, command: Dict[str, Any]) -> Dict[str, Any]:
+    if command_name == "find":
+        return {"filter": query_shape(command.get("filter", {})), "sort": command.get("sort")}
+    if command_name == "aggregate":
+        return {"pipeline": query_shape(command.get("pipeline", []))}
+    if command_name == "count":
+        return {"query": query_shape(command.get("query", {}))}
+    if command_name == "distinct":
+        return {"key": command.get("key"), "query": query_shape(command.get("query", {}))}
+    if command_name == "findAndModify":
+        return {"query": query_shape(command.get("query", {})), "sort": command.get("sort")}
+    if command_name in ("update", "delete"):
+        statements = command.get(f"{command_name}s") or [{}]
+        return {"q": query_shape(statements[0].get("q", {}))}
+    return {}
+
+
+def _returned(command_name: str, reply: Dict[str, Any]) -> int:
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch") or cursor.get("nextBatch") or [])
+    if command_name == "distinct":
+        return len(reply.get("values") or [])
+    return int(reply.get("n") or 0)
+
+
+def _cursor_id(reply: Dict[str, Any]) -> int:
+    cursor = reply.get("cursor")
+    return int(cursor.get("id") or 0) if isinstance(cursor, dict) else 0
+
+
+def _find_key(document: Any, key: str) -> Optional[Any]:
+    """First value stored under ``key`` anywhere in a nested explain document."""
+    if isinstance(document, dict):
+        if key in document:
+            return document[key]
+        for value in document.values():
+            found = _find_key(value, key)
+            if found is not None:
+                return found
+    elif isinstance(document, list):
+        for value in document:
+            found = _find_key(value, key)
+            if found is not None:
+                return found
+    return None
+
+
+def _plan_stages(plan: Any, stages: List[str], indexes: List[str]) -> None:
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        if plan.get("indexName"):
+            indexes.append(plan["indexName"])
+        for value in plan.values():
+            _plan_stages(value, stages, indexes)
+    elif isinstance(plan, list):
+        for value in plan:
+            _plan_stages(value, stages, indexes)
+
+
+def summarize_explain(explain: Dict[str, Any]) -> Dict[str, Any]:
+    """Winning plan stages and execution counters of an ``executionStats`` explain."""
+    stages: List[str] = []
+    indexes: List[str] = []
+    _plan_stages(_find_key(explain, "winningPlan"), stages, indexes)
+    stats = _find_key(explain, "executionStats") or {}
+    return {
+        "stages": stages,
+        "indexes": sorted(set(indexes)),
+        "collection_scan": "COLLSCAN" in stages,
+        "docs_examined": stats.get("totalDocsExamined"),
+        "keys_examined": stats.get("totalKeysExamined"),
+        "n_returned": stats.get("nReturned"),
+        "execution_ms": stats.get("executionTimeMillis"),
+        "explained_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+class _ShapeStats:
+    __slots__ = (
+        "namespace", "command", "shape", "count", "failures", "total_ms", "max_ms",
+        "slow_count", "docs_returned", "routes", "last_seen", "last_explained", "plan",
+    )
+
+    def __init__(self, namespace: str, command: str, shape: Dict[str, Any]):
+        self.namespace = namespace
+        self.command = command
+        self.shape = shape
+        self.count = 0
+        self.failures = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.slow_count = 0
+        self.docs_returned = 0
+        self.routes: Dict[str, int] = {}
+        self.last_seen = 0.0
+        self.last_explained = 0.0
+        self.plan: Optional[Dict[str, Any]] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "namespace": self.namespace,
+            "command": self.command,
+            "shape": self.shape,
+            "count": self.count,
+            "failures": self.failures,
+            "slow_count": self.slow_count,
+            "total_ms": round(self.total_ms, 2),
+            "avg_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 2),
+            "docs_returned": self.docs_returned,
+            "routes": dict(sorted(self.routes.items(), key=lambda item: -item[1])),
+            "last_seen": datetime.fromtimestamp(self.last_seen, timezone.utc).isoformat(),
+            "plan": self.plan,
+        }
+
+
+class QueryProfiler(monitoring.CommandListener):
+    """Per-shape latency statistics and explain sampling for MongoDB commands."""
+
+    def __init__(
+        self,
+        slow_ms: Optional[float] = None,
+        explain_interval: Optional[float] = None,
+        explain_sample_rate: Optional[float] = None,
+        max_shapes: Optional[int] = None,
+    ):
+        self.slow_ms = slow_ms if slow_ms is not None else float(os.getenv("DB_SLOW_QUERY_MS", "100"))
+        self.explain_interval = explain_interval if explain_interval is not None else float(
+            os.getenv("DB_EXPLAIN_INTERVAL_SECONDS", "300")
+        )
+        self.explain_sample_rate = explain_sample_rate if explain_sample_rate is not None else float(
+            os.getenv("DB_EXPLAIN_SAMPLE_RATE", "1.0")
+        )
+        self.max_shapes = max_shapes or int(os.getenv("DB_QUERY_PROFILER_MAX_SHAPES", "500"))
+
+        self._lock = threading.Lock()
+        self._shapes: Dict[str, _ShapeStats] = {}
+        # (connection_id, request_id) -> (shape key, command to explain, route, getMore cursor id)
+        self._pending: Dict[Tuple[Any, int], Tuple[str, Optional[Dict[str, Any]], Optional[str], int]] = {}
+        # cursor id -> shape key, so getMore batches count towards the query that opened it
+        self._cursors: Dict[int, str] = {}
+        self._clients: Dict[str, Any] = {}
+        self._explain_executor: Optional[ThreadPoolExecutor] = None
+        self._explains_pending = 0
+        self.commands = 0
+        self.slow_commands = 0
+        self.explains = 0
+        self.explain_failures = 0
+        self.started_at = time.time()
+
+    def attach(self, client: Any, database: str) -> None:
+        """Run the explains of ``database`` on ``client`` (Motor or pymongo)."""
+        with self._lock:
+            self._clients[database] = getattr(client, "delegate", client)
+
+    # -- pymongo listener callbacks (run on whichever thread issued the command) --
+
+    def started(self, event: "monitoring.CommandStartedEvent") -> None:
+        try:
+            self._started(event)
+        except Exception as e:
+            logger.debug(f"Query profiler skipped {event.command_name}: {e}")
+
+    def _started(self, event: "monitoring.CommandStartedEvent") -> None:
+        command_name = event.command_name
+        key = (event.connection_id, event.request_id)
+        if command_name == "getMore":
+            cursor_id = int(event.command.get("getMore") or 0)
+            with self._lock:
+                shape_key = self._cursors.get(cursor_id)
+                if shape_key is not None and len(self._pending) < MAX_PENDING_COMMANDS:
+                    self._pending[key] = (shape_key, None, None, cursor_id)
+            return
+        if command_name == "killCursors":
+            with self._lock:
+                for cursor_id in event.command.get("cursors") or []:
+                    self._cursors.pop(int(cursor_id), None)
+            return
+        if command_name not in PROFILED_COMMANDS:
+            return
+
+        command = event.command
+        collection = command.get(command_name)
+        shape = _command_shape(command_name, command)
+        namespace = f"{event.database_name}.{collection}"
+        shape_key = f"{namespace} {command_name} {json.dumps(shape, default=str)}"
+        explainable = None
+        if command_name in EXPLAINABLE_COMMANDS and not self._writes_output(command):
+            explainable = {k: v for k, v in command.items() if k not in _COMMAND_META_FIELDS}
+            explainable["$db"] = event.database_name
+
+        with self._lock:
+            if shape_key not in self._shapes:
+                if len(self._shapes) >= self.max_shapes:
+                    self._evict()
+                self._shapes[shape_key] = _ShapeStats(namespace, command_name, shape)
+            if len(self._pending) < MAX_PENDING_COMMANDS:
+                self._pending[key] = (shape_key, explainable, current_route.get(), 0)
+
+    def succeeded(self, event: "monitoring.CommandSucceededEvent") -> None:
+        try:
+            self._finished(event, event.reply, failed=False)
+        except Exception as e:
+            logger.debug(f"Query profiler skipped {event.command_name}: {e}")
+
+    def failed(self, event: "monitoring.CommandFailedEvent") -> None:
+        try:
+            self._finished(event, {}, failed=True)
+        except Exception as e:
+            logger.debug(f"Query profiler skipped {event.command_name}: {e}")
+
+    def _finished(self, event: Any, reply: Dict[str, Any], failed: bool) -> None:
+        with self._lock:
+            pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+        shape_key, explainable, route, more_cursor_id = pending
+        duration_ms = event.duration_micros / 1000
+        command_name = event.command_name
+        explain = False
+
+        with self._lock:
+            stats = self._shapes.get(shape_key)
+            if stats is None:
+                return
+            cursor_id = 0 if failed else _cursor_id(reply)
+            if command_name == "getMore":
+                # Time and documents of later batches belong to the original query
+                stats.total_ms += duration_ms
+                stats.docs_returned += 0 if failed else _returned(command_name, reply)
+                if not cursor_id:
+                    self._cursors.pop(more_cursor_id, None)
+                return
+
+            self.commands += 1
+            stats.count += 1
+            stats.total_ms += duration_ms
+            stats.max_ms = max(stats.max_ms, duration_ms)
+            stats.last_seen = time.time()
+            if route:
+                if route in stats.routes or len(stats.routes) < MAX_ROUTES_PER_SHAPE:
+                    stats.routes[route] = stats.routes.get(route, 0) + 1
+            if failed:
+                stats.failures += 1
+                return
+            stats.docs_returned += _returned(command_name, reply)
+            if cursor_id and len(self._cursors) < MAX_PENDING_COMMANDS:
+                self._cursors[cursor_id] = shape_key
+
+            if duration_ms >= self.slow_ms:
+                self.slow_commands += 1
+                stats.slow_count += 1
+                now = time.monotonic()
+                explain = (
+                    explainable is not None
+                    and explainable["$db"] in self._clients
+                    and (not stats.last_explained or now - stats.last_explained >= self.explain_interval)
+                    and self._explains_pending < MAX_PENDING_EXPLAINS
+                    and random.random() < self.explain_sample_rate
+                )
+                if explain:
+                    stats.last_explained = now
+                    self._explains_pending += 1
+                logger.info(f"Slow query ({duration_ms:.1f}ms) {shape_key} route={route}")
+
+        if explain:
+            self._get_explain_executor().submit(self._explain, shape_key, explainable)
+
+    @staticmethod
+    def _writes_output(command: Dict[str, Any]) -> bool:
+        pipeline = command.get("pipeline") or []
+        return any(isinstance(stage, dict) and ("$out" in stage or "$merge" in stage) for stage in pipeline)
+
+    def _evict(self) -> None:
+        # Keep the shapes that cost the most; caller holds the lock
+        cheapest = min(self._shapes, key=lambda key: self._shapes[key].total_ms)
+        del self._shapes[cheapest]
+        for cursor_id in [cid for cid, key in self._cursors.items() if key == cheapest]:
+            del self._cursors[cursor_id]
+
+    # -- explain sampling --
+
+    def _get_explain_executor(self) -> ThreadPoolExecutor:
+        if self._explain_executor is None:
+            self._explain_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="query-explain")
+        return self._explain_executor
+
+    def _explain(self, shape_key: str, command: Dict[str, Any]) -> None:
+        command = dict(command)
+        database = command.pop("$db")
+        try:
+            client = self._clients[database]
+            result = client[database].command({"explain": command, "verbosity": "executionStats"})
+            plan = summarize_explain(result)
+            with self._lock:
+                self.explains += 1
+                stats = self._shapes.get(shape_key)
+                if stats is not None:
+                    stats.plan = plan
+            if plan["collection_scan"]:
+                logger.warning(
+                    f"Collection scan: {shape_key} examined {plan['docs_examined']} docs "
+                    f"to return {plan['n_returned']}"
+                )
+        except Exception as e:
+            with self._lock:
+                self.explain_failures += 1
+            logger.warning(f"Explain failed for {shape_key}: {e}")
+        finally:
+            with self._lock:
+                self._explains_pending -= 1
+
+    # -- reporting --
+
+    def top(self, limit: int = 20, sort: str = "total_ms") -> List[Dict[str, Any]]:
+        """The ``limit`` query shapes with the highest ``sort`` value."""
+        with self._lock:
+            shapes = [stats.to_dict() for stats in self._shapes.values()]
+        shapes.sort(key=lambda shape: shape.get(sort) or 0, reverse=True)
+        return shapes[:limit]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return profiler counters (without the shapes)."""
+        with self._lock:
+            return {
+                "slow_ms": self.slow_ms,
+                "explain_interval_seconds": self.explain_interval,
+                "explain_sample_rate": self.explain_sample_rate,
+                "commands": self.commands,
+                "slow_commands": self.slow_commands,
+                "shapes": len(self._shapes),
+                "max_shapes": self.max_shapes,
+                "collection_scans": sum(
+                    1 for stats in self._shapes.values() if stats.plan and stats.plan["collection_scan"]
+                ),
+                "explains": self.explains,
+                "explain_failures": self.explain_failures,
+                "since": datetime.fromtimestamp(self.started_at, timezone.utc).isoformat(),
+            }
+
+    def reset(self) -> None:
+        """Forget all recorded shapes and counters."""
+        with self._lock:
+            self._shapes.clear()
+            self._cursors.clear()
+            self.commands = 0
+            self.slow_commands = 0
+            self.explains = 0
+            self.explain_failures = 0
+            self.started_at = time.time()
+
+    def shutdown(self) -> None:
+        """Stop the explain thread."""
+        if self._explain_executor is not None:
+            self._explain_executor.shutdown(wait=False, cancel_futures=True)
+            self._explain_executor = None
+
+
+def query_profiling_enabled(config: Optional[Dict[str, Any]] = None) -> bool:
+    """Whether query profiling is switched on by ``config`` or ``DB_QUERY_PROFILING``."""
+    value = (config or {}).get("query_profiling")
+    if value is None:
+        value = os.getenv("DB_QUERY_PROFILING", "false")
+    return str(value).lower() in ("true", "1", "yes")
+
+
+# Singleton instance holder
+_query_profiler: Optional[QueryProfiler] = None
+
+
+def init_query_profiler(config: Optional[Dict[str, Any]] = None) -> QueryProfiler:
+    """Initialize the query profiler."""
+    global _query_profiler
+    config = config or {}
+    if _query_profiler is not None:
+        _query_profiler.shutdown()
+    _query_profiler = QueryProfiler(
+        slow_ms=config.get("slow_ms"),
+        explain_interval=config.get("explain_interval"),
+        explain_sample_rate=config.get("explain_sample_rate"),
+        max_shapes=config.get("max_shapes"),
+    )
+    return _query_profiler
+
+
+def get_query_profiler() -> Optional[QueryProfiler]:
+    """Get the query profiler (None unless profiling is enabled)."""
+    return _query_profiler
@@ -3,6 +3,10 @@ from .csrf import CSRFProtectMiddleware
 from .rate_limit import RateLimitMiddleware
 from .security import SecurityHeadersMiddleware, RequestValidationMiddleware
 from .apigee_identity import ApigeeIdentityMiddleware
+from .system_log import SystemLogMiddleware
+from .query_route import QueryRouteMiddleware
+from .request_context import RequestContext
+from .route_classes import RouteClass, RouteClassifier
 
 __all__ = [
     "CSRFProtectMiddleware",
@@ -10,4 +14,9 @@ __all__ = [
     "SecurityHeadersMiddleware",
     "RequestValidationMiddleware",
     "ApigeeIdentityMiddleware",
+    "SystemLogMiddleware",
+    "QueryRouteMiddleware",
+    "RequestContext",
+    "RouteClass",
+    "RouteClassifier",
 ]
@@ -7,12 +7,13 @@ correct backend instance.
 """
 import socket
 
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from .request_context import on_response_start
 
-class ApigeeIdentityMiddleware(BaseHTTPMiddleware):
+
+class ApigeeIdentityMiddleware:
     """Add identity headers to every response for Apigee verification.
 
     Headers set:
@@ -20,13 +21,18 @@ class ApigeeIdentityMiddleware(BaseHTTPMiddleware):
         X-Backend-Hostname    – machine hostname (``socket.gethostname()``)
     """
 
-    def __init__(self, app, *, app_name: str = "easylife-admin-panel"):
-        super().__init__(app)
+    def __init__(self, app: ASGIApp, *, app_name: str = "easylife-admin-panel"):
+        self.app = app
         self.app_name = app_name
         self.hostname = socket.gethostname()
 
-    async def dispatch(self, request: Request, call_next) -> Response:
-        response: Response = await call_next(request)
-        response.headers["X-App-Name"] = self.app_name
-        response.headers["X-Backend-Hostname"] = self.hostname
-        return response
+    def _set_headers(self, message: Message) -> None:
+        headers = MutableHeaders(scope=message)
+        headers["X-App-Name"] = self.app_name
+        headers["X-Backend-Hostname"] = self.hostname
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, on_response_start(send, self._set_headers))
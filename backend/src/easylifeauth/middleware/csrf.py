@@ -6,12 +6,16 @@ import secrets
 import hmac
 import hashlib
 from typing import Optional
-from fastapi import Request, Response, HTTPException
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
+from fastapi import Request, Response
+from starlette.datastructures import MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from .request_context import RequestContext, on_response_start
+from .route_classes import RouteClass, RouteClassifier
 
-class CSRFProtectMiddleware(BaseHTTPMiddleware):
+
+class CSRFProtectMiddleware:
     """
     CSRF Protection using Double Submit Cookie pattern
 
@@ -22,6 +26,8 @@ class CSRFProtectMiddleware(BaseHTTPMiddleware):
     4. Server verifies both tokens match
     """
 
+    EXEMPT_ROUTES = RouteClass.CSRF_EXEMPT | RouteClass.HEALTH | RouteClass.DOCS
+
     def __init__(
         self,
         app: ASGIApp,
@@ -33,18 +39,23 @@ class CSRFProtectMiddleware(BaseHTTPMiddleware):
         cookie_secure: bool = True,
         cookie_samesite: str = "lax",
         exempt_methods: set = None,
-        exempt_paths: set = None
+        exempt_paths: set = None,
+        route_classifier: Optional[RouteClassifier] = None
     ):
-        super().__init__(app)
+        self.app = app
         self.secret_key = secret_key.encode()
         self.cookie_name = cookie_name
         self.header_name = header_name
+        self._header_key = header_name.lower()
         self.cookie_path = cookie_path
         self.cookie_domain = cookie_domain
         self.cookie_secure = cookie_secure
         self.cookie_samesite = cookie_samesite
         self.exempt_methods = exempt_methods or {"GET", "HEAD", "OPTIONS", "TRACE"}
         self.exempt_paths = exempt_paths or set()
+        self.route_classifier = route_classifier if route_classifier is not None else RouteClassifier()
+        # Exact paths or "/prefix/*" patterns
+        self.route_classifier.tag(RouteClass.CSRF_EXEMPT, self.exempt_paths)
 
     def _generate_token(self) -> str:
         """Generate a cryptographically secure random token"""
@@ -72,32 +83,15 @@ class CSRFProtectMiddleware(BaseHTTPMiddleware):
         except (ValueError, AttributeError):
             return False
 
-    def _is_exempt(self, request: Request) -> bool:
+    def _is_exempt(self, context: RequestContext) -> bool:
         """Check if request is exempt from CSRF protection"""
         # Exempt safe methods
-        if request.method in self.exempt_methods:
-            return True
-
-        path = request.url.path
-
-        # Exempt specific paths (exact match)
-        if path in self.exempt_paths:
-            return True
-
-        # Exempt paths by prefix (for patterns like /api/v1/auth/*)
-        for exempt_path in self.exempt_paths:
-            if exempt_path.endswith("*") and path.startswith(exempt_path[:-1]):
-                return True
-
-        # Exempt health check endpoints
-        if "/health" in path:
+        if context.method in self.exempt_methods:
             return True
 
-        # Exempt docs endpoints
-        if any(doc_path in path for doc_path in ["/docs", "/redoc", "/openapi.json"]):
-            return True
-
-        return False
+        # Exempt configured paths, health check and docs endpoints
+        route_class = context.route(self.route_classifier).route_class
+        return bool(route_class & self.EXEMPT_ROUTES)
 
     def _set_csrf_cookie(self, response: Response) -> str:
         """Generate and set a new CSRF token cookie, return the signed token"""
@@ -116,52 +110,63 @@ class CSRFProtectMiddleware(BaseHTTPMiddleware):
         )
         return signed_token
 
-    async def dispatch(self, request: Request, call_next):
+    def _verify_request(self, context: RequestContext) -> Optional[str]:
+        """Check the double-submit tokens, return an error message or None"""
+        csrf_token_cookie = context.cookies.get(self.cookie_name)
+        csrf_token_header = context.headers.get(self._header_key)
+
+        # Check if tokens are present
+        if not csrf_token_cookie or not csrf_token_header:
+            return "CSRF token missing"
+
+        # Verify cookie token signature
+        if not self._verify_token(csrf_token_cookie):
+            return "Invalid CSRF token signature"
+
+        # Verify tokens match
+        if not hmac.compare_digest(csrf_token_cookie, csrf_token_header):
+            return "CSRF token mismatch"
+
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """Process request and apply CSRF protection"""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-        # Check if request is exempt
-        if self._is_exempt(request):
-            response = await call_next(request)
+        context = RequestContext.from_scope(scope)
 
+        # Check if request is exempt
+        if self._is_exempt(context):
             # Set CSRF token cookie on exempt requests (like GET)
             # This allows subsequent POST requests to have the token
-            if request.method in {"GET", "HEAD"}:
-                csrf_token_cookie = request.cookies.get(self.cookie_name)
+            if context.method in {"GET", "HEAD"}:
+                csrf_token_cookie = context.cookies.get(self.cookie_name)
 
                 # Generate new token if missing or invalid signature
                 if not csrf_token_cookie or not self._verify_token(csrf_token_cookie):
-                    self._set_csrf_cookie(response)
-
-            return response
+                    cookie_response = Response()
+                    self._set_csrf_cookie(cookie_response)
+                    set_cookie = cookie_response.headers["set-cookie"]
 
-        # For non-exempt requests (POST, PUT, DELETE, etc.), verify CSRF token
-        csrf_token_cookie = request.cookies.get(self.cookie_name)
-        csrf_token_header = request.headers.get(self.header_name)
+                    def add_cookie(message: Message) -> None:
+                        MutableHeaders(scope=message).append("set-cookie", set_cookie)
 
-        # Check if tokens are present
-        if not csrf_token_cookie or not csrf_token_header:
-            raise HTTPException(
-                status_code=403,
-                detail="CSRF token missing"
-            )
+                    send = on_response_start(send, add_cookie)
 
-        # Verify cookie token signature
-        if not self._verify_token(csrf_token_cookie):
-            raise HTTPException(
-                status_code=403,
-                detail="Invalid CSRF token signature"
-            )
+            await self.app(scope, receive, send)
+            return
 
-        # Verify tokens match
-        if not hmac.compare_digest(csrf_token_cookie, csrf_token_header):
-            raise HTTPException(
-                status_code=403,
-                detail="CSRF token mismatch"
-            )
+        # For non-exempt requests (POST, PUT, DELETE, etc.), verify CSRF token
+        error = self._verify_request(context)
+        if error:
+            response = JSONResponse(status_code=403, content={"error": error})
+            await response(scope, receive, send)
+            return
 
         # Token is valid, process request
-        response = await call_next(request)
-        return response
+        await self.app(scope, receive, send)
 
 
 def get_csrf_token(request: Request, cookie_name: str = "csrf_token") -> Optional[str]:
@@ -8,14 +8,17 @@ sleep/resume cycles).
 import time
 import asyncio
 import logging
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import JSONResponse
+from typing import Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .request_context import RequestContext
+from .route_classes import RouteClass, RouteClassifier
 
 logger = logging.getLogger(__name__)
 
 
-class DatabaseHealthMiddleware(BaseHTTPMiddleware):
+class DatabaseHealthMiddleware:
     """
     Middleware to check database connectivity and auto-reconnect on failures.
 
@@ -30,13 +33,14 @@ class DatabaseHealthMiddleware(BaseHTTPMiddleware):
 
     def __init__(
         self,
-        app,
+        app: ASGIApp,
         db_getter=None,
         check_interval: int = 60,  # Check if last success was > 60 seconds ago
         enabled: bool = True,
-        exempt_paths: set = None
+        exempt_paths: set = None,
+        route_classifier: Optional[RouteClassifier] = None
     ):
-        super().__init__(app)
+        self.app = app
         self.db_getter = db_getter
         self.check_interval = check_interval
         self.enabled = enabled
@@ -46,20 +50,27 @@ class DatabaseHealthMiddleware(BaseHTTPMiddleware):
             "/redoc",
             "/openapi.json",
         }
+        self.route_classifier = route_classifier if route_classifier is not None else RouteClassifier()
+        # Exact paths or "/prefix/*" patterns
+        self.route_classifier.tag(RouteClass.DB_HEALTH_EXEMPT, self.exempt_paths)
         self._last_check_time = time.time()
         self._last_check_success = True
 
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """Check database health before processing request."""
-        if not self.enabled or not self.db_getter:
-            return await call_next(request)
+        if not self.enabled or not self.db_getter or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
         # Skip health checks for exempt paths
-        path = request.url.path
-        if any(path.endswith(exempt) for exempt in self.exempt_paths):
-            return await call_next(request)
+        route = RequestContext.from_scope(scope).route(self.route_classifier)
+        if not route.route_class & RouteClass.DB_HEALTH_EXEMPT:
+            await self._check_health()
 
-        # Check if we should verify database connectivity
+        await self.app(scope, receive, send)
+
+    async def _check_health(self) -> None:
+        """Verify database connectivity if the last check is stale or failed."""
         current_time = time.time()
         time_since_last_check = current_time - self._last_check_time
 
@@ -87,5 +98,3 @@ class DatabaseHealthMiddleware(BaseHTTPMiddleware):
             except Exception as e:
                 logger.warning(f"Database health check error: {e}")
                 self._last_check_success = False
-
-        return await call_next(request)
@@ -0,0 +1,35 @@
+"""
+Query route middleware - tags database calls with the route that issued them.
+
+Sets ``current_route`` for the duration of each request so the query
+profiler can attribute every MongoDB command to ``"<METHOD> <route template>"``
+(e.g. ``GET /api/v1/users/{user_id}``) rather than to raw paths.
+"""
+from typing import Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from ..db.query_profiler import current_route
+from .request_context import RequestContext
+from .route_classes import RouteClassifier
+
+
+class QueryRouteMiddleware:
+    """Expose the request's route to the query profiler."""
+
+    def __init__(self, app: ASGIApp, route_classifier: Optional[RouteClassifier] = None):
+        self.app = app
+        self.route_classifier = route_classifier or RouteClassifier()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        context = RequestContext.from_scope(scope)
+        template = context.route(self.route_classifier).template
+        token = current_route.set(f"{context.method} {template or context.route_path}")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_route.reset(token)
@@ -1,183 +1,155 @@
 """
 Rate limiting middleware for API endpoints.
 """
-from fastapi import Request, HTTPException, status
+from fastapi import HTTPException, status
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
-from collections import defaultdict
-from datetime import datetime, timezone, timedelta
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 import asyncio
-from typing import Dict, Set
+import logging
+import math
+import time
+from typing import List, Optional, Set
 
+from .request_context import RequestContext, on_response_start
+from .route_classes import RouteClass, RouteClassifier
+from .rate_limit_backend import (
+    RateLimitBackend, RateLimitDecision, RateLimitRule, create_rate_limit_backend
+)
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
+logger = logging.getLogger(__name__)
+
+MINUTE = 60
+HOUR = 3600
+
+
+class RateLimitMiddleware:
     """
     Rate limiting middleware that tracks requests per IP address.
 
-    Implements a sliding window rate limiter with configurable limits
-    for different endpoint categories.
+    Each client IP gets fixed-size GCRA buckets (see ``rate_limit_backend``):
+    one per minute, one per hour and a stricter per-minute bucket for the auth
+    endpoints that check credentials (login, register, password reset and
+    update; not profile, csrf-token or refresh, which the UI calls on every
+    page load). The buckets live in ``backend`` - process-local by default,
+    or Redis (``RATE_LIMIT_REDIS_URL``) to share limits across workers.
     """
 
     def __init__(
         self,
-        app,
+        app: ASGIApp,
         requests_per_minute: int = 10000,
         requests_per_hour: int = 1000000,
-        auth_requests_per_minute: int = 5000,  # Stricter limit for auth endpoints
+        auth_requests_per_minute: int = 5000,  # Stricter limit for credential endpoints
         enabled: bool = True,
-        exempt_paths: Set[str] = None
+        exempt_paths: Set[str] = None,
+        backend: Optional[RateLimitBackend] = None,
+        route_classifier: Optional[RouteClassifier] = None
     ):
-        super().__init__(app)
+        self.app = app
         self.requests_per_minute = requests_per_minute
         self.requests_per_hour = requests_per_hour
         self.auth_requests_per_minute = auth_requests_per_minute
         self.enabled = enabled
-        self.exempt_paths = exempt_paths or {
-            "/health", "/", "/docs", "/redoc", "/openapi.json",
-        }
-
-        # Storage for request timestamps: {ip: [(timestamp, endpoint), ...]}
-        self.request_log: Dict[str, list] = defaultdict(list)
-
-        # Lock for thread-safe operations
-        self.lock = asyncio.Lock()
+        self.route_classifier = route_classifier if route_classifier is not None else RouteClassifier()
+        # Explicit exact/"/prefix/*" paths replace the default exemptions
+        # (root, health checks and docs)
+        self.exempt_paths = exempt_paths
+        if exempt_paths:
+            self.route_classifier.tag(RouteClass.RATE_LIMIT_EXEMPT, exempt_paths)
+            self.exempt_routes = RouteClass.RATE_LIMIT_EXEMPT
+        else:
+            self.exempt_routes = RouteClass.ROOT | RouteClass.HEALTH | RouteClass.DOCS
+        self.backend = backend if backend is not None else create_rate_limit_backend()
 
         # Track cleanup task
         self._cleanup_task = None
 
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """Process request and apply rate limiting."""
-        if not self.enabled:
-            return await call_next(request)
+        if not self.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-        # Get client IP
-        client_ip = self._get_client_ip(request)
+        context = RequestContext.from_scope(scope)
+        client_ip = context.client_ip
 
         # Skip rate limiting for exempt paths
-        path = request.url.path
-        if any(path.startswith(exempt) or path == exempt for exempt in self.exempt_paths):
-            return await call_next(request)
+        route_class = context.route(self.route_classifier).route_class
+        if route_class & self.exempt_routes:
+            await self.app(scope, receive, send)
+            return
+        path = context.route_path
 
-        # Check rate limits
+        # Check rate limits (and record this request when allowed)
         try:
-            await self._check_rate_limit(client_ip, path)
+            decision = await self._check_rate_limit(client_ip, path, route_class)
         except HTTPException as e:
-            return JSONResponse(
+            response = JSONResponse(
                 status_code=e.status_code,
                 content={"detail": e.detail},
-                headers={"Retry-After": "60"}
+                headers=e.headers
             )
-
-        # Record this request
-        async with self.lock:
-            now = datetime.now(timezone.utc)
-            # Guard against unbounded growth from many unique IPs
-            if len(self.request_log) > 10000:
-                oldest_ip = next(iter(self.request_log))
-                del self.request_log[oldest_ip]
-            self.request_log[client_ip].append((now, path))
-
-        # Process request
-        response = await call_next(request)
-
-        # Add rate limit headers
-        remaining = await self._get_remaining_requests(client_ip, path)
-        response.headers["X-RateLimit-Limit"] = str(self.requests_per_minute)
-        response.headers["X-RateLimit-Remaining"] = str(remaining)
-        response.headers["X-RateLimit-Reset"] = str(int((datetime.now(timezone.utc) + timedelta(minutes=1)).timestamp()))
-
-        return response
-
-    def _get_client_ip(self, request: Request) -> str:
-        """Extract client IP address from request."""
-        # Check for forwarded IP (when behind a proxy)
-        forwarded = request.headers.get("X-Forwarded-For")
-        if forwarded:
-            return forwarded.split(",")[0].strip()
-
-        real_ip = request.headers.get("X-Real-IP")
-        if real_ip:
-            return real_ip
-
-        # Fall back to direct client IP
-        if request.client:
-            return request.client.host
-
-        return "unknown"
-
-    async def _check_rate_limit(self, client_ip: str, path: str) -> None:
-        """Check if client has exceeded rate limits."""
-        async with self.lock:
-            now = datetime.now(timezone.utc)
-            requests = self.request_log.get(client_ip, [])
-
-            # Prune entries older than 1 hour (the max relevant window)
-            hour_ago = now - timedelta(hours=1)
-            self.request_log[client_ip] = [r for r in requests if r[0] > hour_ago]
-            requests = self.request_log[client_ip]
-
-            # Remove empty IP entries to prevent key accumulation
-            if not requests:
-                del self.request_log[client_ip]
-                return
-
-            # Filter requests within time windows
-            minute_ago = now - timedelta(minutes=1)
-            recent_minute = [r for r in requests if r[0] > minute_ago]
-
-            # Determine which limit to use based on endpoint
-            if "/auth/" in path:
-                limit_per_minute = self.auth_requests_per_minute
-            else:
-                limit_per_minute = self.requests_per_minute
-
-            # Check minute limit
-            if len(recent_minute) >= limit_per_minute:
-                raise HTTPException(
-                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                    detail=f"Rate limit exceeded: Maximum {limit_per_minute} requests per minute"
-                )
-
-            # Check hour limit
-            if len(requests) >= self.requests_per_hour:
-                raise HTTPException(
-                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                    detail=f"Rate limit exceeded: Maximum {self.requests_per_hour} requests per hour"
-                )
-
-    async def _get_remaining_requests(self, client_ip: str, path: str) -> int:
-        """Get remaining requests for client."""
-        async with self.lock:
-            now = datetime.now(timezone.utc)
-            minute_ago = now - timedelta(minutes=1)
-            requests = self.request_log.get(client_ip, [])
-            recent = [r for r in requests if r[0] > minute_ago]
-
-            if "/auth/" in path:
-                return max(0, self.auth_requests_per_minute - len(recent))
-            else:
-                return max(0, self.requests_per_minute - len(recent))
+            await response(scope, receive, send)
+            return
+
+        limit = self._minute_limit(route_class)
+
+        def add_rate_limit_headers(message: Message) -> None:
+            headers = MutableHeaders(scope=message)
+            headers["X-RateLimit-Limit"] = str(limit)
+            headers["X-RateLimit-Remaining"] = str(decision.remaining)
+            headers["X-RateLimit-Reset"] = str(int(time.time() + math.ceil(decision.reset_after)))
+
+        # Process request, adding rate limit headers to the response
+        await self.app(scope, receive, on_response_start(send, add_rate_limit_headers))
+
+    def _minute_limit(self, route_class: RouteClass) -> int:
+        """Per-minute limit for the endpoint category ``route_class``."""
+        if route_class & RouteClass.CREDENTIALS:
+            return self.auth_requests_per_minute
+        return self.requests_per_minute
+
+    def _rules(self, client_ip: str, route_class: RouteClass) -> List[RateLimitRule]:
+        """Buckets a request from ``client_ip`` to a ``route_class`` route draws from.
+
+        The first rule is the one reported in the X-RateLimit-* headers.
+        """
+        rules: List[RateLimitRule] = []
+        if route_class & RouteClass.CREDENTIALS:
+            rules.append((f"{client_ip}:auth", self.auth_requests_per_minute, MINUTE))
+        rules.append((f"{client_ip}:minute", self.requests_per_minute, MINUTE))
+        rules.append((f"{client_ip}:hour", self.requests_per_hour, HOUR))
+        return rules
+
+    async def _check_rate_limit(
+        self, client_ip: str, path: str, route_class: Optional[RouteClass] = None
+    ) -> RateLimitDecision:
+        """Record a request, raising 429 if the client has exceeded a limit."""
+        if route_class is None:
+            route_class = self.route_classifier.classify(path).route_class
+        rules = self._rules(client_ip, route_class)
+        decision = await self.backend.hit(rules)
+        if not decision.allowed:
+            _, limit, period = rules[decision.rule_index]
+            window = "hour" if period == HOUR else "minute"
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"Rate limit exceeded: Maximum {limit} requests per {window}",
+                headers={"Retry-After": str(max(math.ceil(decision.retry_after), 1))}
+            )
+        return decision
 
     async def cleanup_old_entries(self):
-        """Periodically clean up old request entries."""
+        """Periodically drop buckets of idle clients."""
         while True:
             await asyncio.sleep(300)  # Run every 5 minutes
-
-            async with self.lock:
-                now = datetime.now(timezone.utc)
-                cutoff = now - timedelta(hours=2)
-
-                for ip in list(self.request_log.keys()):
-                    # Remove requests older than 2 hours
-                    self.request_log[ip] = [
-                        (timestamp, path)
-                        for timestamp, path in self.request_log[ip]
-                        if timestamp > cutoff
-                    ]
-
-                    # Remove IP if no recent requests
-                    if not self.request_log[ip]:
-                        del self.request_log[ip]
+            try:
+                removed = await self.backend.prune()
+                if removed:
+                    logger.debug(f"Pruned {removed} idle rate limit buckets")
+            except Exception as e:
+                logger.warning(f"Rate limit cleanup failed: {e}")
 
     def start_cleanup_task(self):
         """Start the cleanup background task."""
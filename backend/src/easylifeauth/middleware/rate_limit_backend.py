@@ -0,0 +1,220 @@
+"""
+Rate limit storage backends.
+
+Limits are enforced with GCRA (generic cell rate algorithm). A rule
+"``limit`` requests per ``period``" is a token bucket that refills one request
+every ``period / limit``; instead of a list of timestamps the backend stores a
+single integer per bucket - the theoretical arrival time (TAT) of the next
+request on a monotonic clock. A request is allowed when ``TAT + interval`` is
+no more than ``period`` ahead of now, which permits bursts of up to ``limit``
+requests and then a steady ``limit`` per ``period``.
+
+Several rules (e.g. per-minute and per-hour) are checked together and a
+request only consumes from the buckets when every rule allows it.
+
+``InMemoryRateLimitBackend`` keeps the buckets in the worker process.
+``RedisRateLimitBackend`` keeps them in Redis (updated atomically by a Lua
+script using the Redis server clock) so limits hold across workers and pods.
+"""
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (bucket key, allowed requests, period in seconds)
+RateLimitRule = Tuple[str, int, int]
+
+DEFAULT_MAX_KEYS = 100_000
+DEFAULT_KEY_PREFIX = "easylife:ratelimit:"
+
+
+class RateLimitDecision(NamedTuple):
+    """Outcome of a rate limit check."""
+    allowed: bool
+    # Index of the rule that rejected the request (-1 when allowed)
+    rule_index: int
+    # Requests left in the first rule's bucket after this one
+    remaining: int
+    # Seconds until the rejected request would be allowed
+    retry_after: float
+    # Seconds until the first rule's bucket is full again
+    reset_after: float
+
+
+class RateLimitBackend(ABC):
+    """Interface for rate limit bucket storage."""
+
+    @abstractmethod
+    async def hit(self, rules: Sequence[RateLimitRule]) -> RateLimitDecision:
+        """Check all rules and consume one request from each if all allow it."""
+
+    async def prune(self) -> int:
+        """Drop buckets that are full again. Returns the number removed."""
+        return 0
+
+    async def close(self) -> None:
+        pass
+
+
+def _gcra(tats: Sequence[int], rules: Sequence[RateLimitRule], now: int, unit: int):
+    """Evaluate GCRA for every rule; ``unit`` is clock ticks per second.
+
+    Returns ``(decision, new_tats)``; ``new_tats`` is None when rejected.
+    """
+    new_tats = []
+    remaining = 0
+    reset_after = 0.0
+    for index, ((_, limit, period_seconds), tat) in enumerate(zip(rules, tats)):
+        period = period_seconds * unit
+        interval = max(period // limit, 1)
+        new_tat = max(tat, now) + interval
+        allow_at = new_tat - period
+        if now < allow_at:
+            return RateLimitDecision(False, index, 0, (allow_at - now) / unit, 0.0), None
+        if index == 0:
+            remaining = (period - (new_tat - now)) // interval
+            reset_after = (new_tat - now) / unit
+        new_tats.append(new_tat)
+    return RateLimitDecision(True, -1, remaining, 0.0, reset_after), new_tats
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """Process-local buckets: one integer per key, bounded LRU.
+
+    Buckets whose TAT is in the past are equivalent to empty ones, so evicting
+    the least recently used key when ``max_keys`` is reached only ever resets
+    an idle client.
+    """
+
+    def __init__(self, max_keys: Optional[int] = None):
+        self.max_keys = max_keys or int(os.getenv("RATE_LIMIT_MAX_KEYS", str(DEFAULT_MAX_KEYS)))
+        self._tats: "OrderedDict[str, int]" = OrderedDict()
+
+    @staticmethod
+    def _now() -> int:
+        return time.monotonic_ns()
+
+    async def hit(self, rules: Sequence[RateLimitRule]) -> RateLimitDecision:
+        # No awaits below: the check-and-set is atomic on the event loop
+        now = self._now()
+        tats = [self._tats.get(key, now) for key, _, _ in rules]
+        decision, new_tats = _gcra(tats, rules, now, 1_000_000_000)
+        if new_tats is not None:
+            for (key, _, _), new_tat in zip(rules, new_tats):
+                self._tats[key] = new_tat
+                self._tats.move_to_end(key)
+            while len(self._tats) > self.max_keys:
+                self._tats.popitem(last=False)
+        return decision
+
+    async def prune(self) -> int:
+        now = self._now()
+        expired = [key for key, tat in self._tats.items() if tat <= now]
+        for key in expired:
+            del self._tats[key]
+        return len(expired)
+
+    def __len__(self) -> int:
+        return len(self._tats)
+
+
+# KEYS: bucket keys. ARGV: limit and period (seconds) for each key, in order.
+# Returns {allowed, rule_index, remaining, retry_after_us, reset_after_us}.
+_GCRA_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000000 + tonumber(t[2])
+local new_tats = {}
+local remaining = 0
+local reset_after = 0
+for i = 1, #KEYS do
+    local limit = tonumber(ARGV[2 * i - 1])
+    local period = tonumber(ARGV[2 * i]) * 1000000
+    local interval = math.max(math.floor(period / limit), 1)
+    local tat = tonumber(redis.call('GET', KEYS[i]) or now)
+    if tat < now then tat = now end
+    local new_tat = tat + interval
+    local allow_at = new_tat - period
+    if now < allow_at then
+        return {0, i - 1, 0, allow_at - now, 0}
+    end
+    if i == 1 then
+        remaining = math.floor((period - (new_tat - now)) / interval)
+        reset_after = new_tat - now
+    end
+    new_tats[i] = new_tat
+end
+for i = 1, #KEYS do
+    local ttl = math.max(math.ceil((new_tats[i] - now) / 1000), 1)
+    redis.call('SET', KEYS[i], string.format('%d', new_tats[i]), 'PX', ttl)
+end
+return {1, -1, remaining, 0, reset_after}
+"""
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """Buckets shared by every worker through Redis.
+
+    Each bucket is one integer key with a TTL of its remaining refill time,
+    so Redis memory is bounded by the number of active clients. If Redis is
+    unreachable the check falls back to process-local buckets rather than
+    failing requests.
+    """
+
+    def __init__(self, redis_client, key_prefix: str = DEFAULT_KEY_PREFIX):
+        self.redis = redis_client
+        self.key_prefix = key_prefix
+        self._script = redis_client.register_script(_GCRA_SCRIPT)
+        self._fallback = InMemoryRateLimitBackend()
+        self._degraded = False
+
+    async def hit(self, rules: Sequence[RateLimitRule]) -> RateLimitDecision:
+        keys = [self.key_prefix + key for key, _, _ in rules]
+        args = []
+        for _, limit, period_seconds in rules:
+            args.extend((limit, period_seconds))
+        try:
+            allowed, rule_index, remaining, retry_after, reset_after = await self._script(keys=keys, args=args)
+        except Exception as e:
+            if not self._degraded:
+                logger.warning(f"Rate limit backend unavailable, using process-local limits: {e}")
+                self._degraded = True
+            return await self._fallback.hit(rules)
+        if self._degraded:
+            logger.info("Rate limit backend recovered")
+            self._degraded = False
+        return RateLimitDecision(
+            bool(allowed), int(rule_index), int(remaining),
+            int(retry_after) / 1_000_000, int(reset_after) / 1_000_000,
+        )
+
+    async def prune(self) -> int:
+        # Redis expires idle buckets itself
+        return await self._fallback.prune()
+
+    async def close(self) -> None:
+        try:
+            await self.redis.aclose()
+        except Exception as e:
+            logger.warning(f"Error closing rate limit Redis client: {e}")
+
+
+def create_rate_limit_backend(redis_url: Optional[str] = None) -> RateLimitBackend:
+    """Build the rate limit backend from ``RATE_LIMIT_REDIS_URL``.
+
+    Falls back to process-local buckets when no Redis URL is configured or the
+    redis package is unavailable.
+    """
+    redis_url = redis_url or os.getenv("RATE_LIMIT_REDIS_URL")
+    if not redis_url:
+        return InMemoryRateLimitBackend()
+    try:
+        import redis.asyncio as aioredis
+    except ImportError:
+        logger.warning("redis package not installed - rate limits are process-local only")
+        return InMemoryRateLimitBackend()
+    key_prefix = os.getenv("RATE_LIMIT_KEY_PREFIX", DEFAULT_KEY_PREFIX)
+    return RedisRateLimitBackend(aioredis.from_url(redis_url), key_prefix=key_prefix)
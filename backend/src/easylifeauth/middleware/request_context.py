@@ -0,0 +1,118 @@
+"""
+Per-request context shared by the ASGI middlewares.
+
+The middlewares are plain ASGI callables rather than ``BaseHTTPMiddleware``
+subclasses, so none of them builds its own ``Request`` or response queue.
+The first middleware that sees a request parses the bits of the ASGI scope
+the stack needs (method, path, headers, client IP, cookies) into a
+``RequestContext`` and stores it on the scope; every later middleware reuses
+that object.
+"""
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from starlette.requests import cookie_parser
+from starlette.types import Message, Scope, Send
+
+from .route_classes import RouteClassifier, RouteMatch
+
+SCOPE_KEY = "easylife.request_context"
+
+
+class RequestContext:
+    """Pre-parsed view of an HTTP request's ASGI scope."""
+
+    def __init__(self, scope: Scope):
+        self.scope = scope
+        self.method: str = scope.get("method", "GET")
+        self.path: str = scope.get("path", "")
+        self.route_path = self._strip_root_path(self.path, scope.get("root_path", ""))
+        self.scheme: str = scope.get("scheme", "http")
+        self.started_at = time.perf_counter()
+
+        # Lower-cased header names; the first occurrence wins like Headers.get()
+        headers: Dict[str, str] = {}
+        for key, value in scope.get("headers", []):
+            headers.setdefault(key.decode("latin-1").lower(), value.decode("latin-1"))
+        self.headers = headers
+
+        client = scope.get("client")
+        self.client_host: Optional[str] = client[0] if client else None
+        self.client_ip = self._resolve_client_ip()
+
+        content_length = headers.get("content-length")
+        try:
+            self.content_length: Optional[int] = int(content_length) if content_length else None
+        except ValueError:
+            self.content_length = None
+
+        self._cookies: Optional[Dict[str, str]] = None
+        self._route: Optional[RouteMatch] = None
+        self._route_classifier: Optional[RouteClassifier] = None
+
+    @classmethod
+    def from_scope(cls, scope: Scope) -> "RequestContext":
+        """Return the context stored on ``scope``, creating it on first use."""
+        context = scope.get(SCOPE_KEY)
+        if context is None:
+            context = cls(scope)
+            scope[SCOPE_KEY] = context
+        return context
+
+    @staticmethod
+    def _strip_root_path(path: str, root_path: str) -> str:
+        # Same rule Starlette's router uses to match routes behind a proxy prefix
+        if root_path and path.startswith(root_path) and path[len(root_path):len(root_path) + 1] in ("", "/"):
+            return path[len(root_path):] or "/"
+        return path
+
+    def _resolve_client_ip(self) -> str:
+        # Check for forwarded IP (when behind a proxy)
+        forwarded = self.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+
+        real_ip = self.headers.get("x-real-ip")
+        if real_ip:
+            return real_ip
+
+        # Fall back to direct client IP
+        return self.client_host or "unknown"
+
+    @property
+    def cookies(self) -> Dict[str, str]:
+        """Request cookies, parsed on first access."""
+        if self._cookies is None:
+            cookie_header = self.headers.get("cookie")
+            self._cookies = cookie_parser(cookie_header) if cookie_header else {}
+        return self._cookies
+
+    def route(self, classifier: RouteClassifier) -> RouteMatch:
+        """Route template and class of this request, resolved once per classifier."""
+        if self._route is None or self._route_classifier is not classifier:
+            self._route = classifier.classify(self.route_path)
+            self._route_classifier = classifier
+        return self._route
+
+    @property
+    def state(self) -> Dict[str, Any]:
+        """The dict behind ``request.state`` (set by routes, e.g. ``user_email``)."""
+        return self.scope.setdefault("state", {})
+
+
+def on_response_start(
+    send: Send, callback: Callable[[Message], Optional[Awaitable[None]]]
+) -> Send:
+    """Wrap ``send`` so ``callback`` can edit the ``http.response.start`` message.
+
+    The callback may be a plain function or a coroutine function; use
+    ``MutableHeaders(scope=message)`` inside it to change response headers.
+    """
+    async def wrapped_send(message: Message) -> None:
+        if message["type"] == "http.response.start":
+            result = callback(message)
+            if result is not None:
+                await result
+        await send(message)
+
+    return wrapped_send
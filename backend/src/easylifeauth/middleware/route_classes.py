@@ -0,0 +1,195 @@
+"""
+Route classification shared by the middlewares.
+
+Middlewares need to know whether a request targets a health check, the API
+docs, an auth endpoint or a path they are configured to skip. Instead of
+each middleware scanning the raw path with ``startswith``/``in`` loops on
+every request, a ``RouteClassifier`` tags every registered route template
+once (at startup) with ``RouteClass`` flags. A request path is then resolved
+to its template with a dict lookup for static routes, a segment trie for
+routes with path parameters, and a bounded cache for anything else.
+
+Paths that match no registered route are classified by applying the same
+rules to the raw path, so behaviour does not depend on whether the routes
+have been loaded (e.g. a middleware used outside ``create_app``).
+"""
+import enum
+from collections import OrderedDict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+DEFAULT_DOCS_PATHS = frozenset({"/docs", "/docs/oauth2-redirect", "/redoc", "/openapi.json"})
+# Auth endpoints that take a password or start a password reset
+CREDENTIAL_ENDPOINTS = frozenset({"login", "register", "forgot_password", "reset_password", "update_password"})
+DEFAULT_CACHE_SIZE = 4096
+
+
+class RouteClass(enum.IntFlag):
+    """Flags describing what a route is, as far as the middlewares care."""
+    NONE = 0
+    ROOT = enum.auto()
+    HEALTH = enum.auto()
+    DOCS = enum.auto()
+    AUTH = enum.auto()
+    # Auth endpoints that check credentials (brute-force targets)
+    CREDENTIALS = enum.auto()
+    # Per-middleware exemptions, registered through RouteClassifier.tag()
+    CSRF_EXEMPT = enum.auto()
+    RATE_LIMIT_EXEMPT = enum.auto()
+    DB_HEALTH_EXEMPT = enum.auto()
+    # File upload routes with their own request body limit
+    UPLOAD = enum.auto()
+
+
+class RouteMatch(NamedTuple):
+    """A request path resolved to its route template (None if unrouted)."""
+    template: Optional[str]
+    route_class: RouteClass
+
+
+class _Node:
+    __slots__ = ("static", "param", "catch_all", "match")
+
+    def __init__(self):
+        self.static: Dict[str, "_Node"] = {}
+        self.param: Optional["_Node"] = None
+        self.catch_all: Optional[RouteMatch] = None
+        self.match: Optional[RouteMatch] = None
+
+
+def _segments(path: str) -> List[str]:
+    return path.strip("/").split("/")
+
+
+def _is_param(segment: str) -> bool:
+    return segment.startswith("{") and segment.endswith("}")
+
+
+def _route_templates(routes: Iterable) -> List[str]:
+    """Path templates of Starlette/FastAPI routes; mounts match any subpath."""
+    templates = []
+    for route in routes:
+        if hasattr(route, "effective_route_contexts"):
+            # Newer FastAPI keeps included routers as one lazy branch
+            templates.extend(_route_templates(route.effective_route_contexts()))
+            continue
+        path = getattr(route, "path", None)
+        if path is None:
+            continue
+        if hasattr(route, "app") and not hasattr(route, "endpoint"):
+            # Mount (sub-application or static files)
+            templates.append(path.rstrip("/") + "/{path:path}")
+        else:
+            templates.append(path)
+    return templates
+
+
+class RouteClassifier:
+    """Resolve request paths to route templates and their ``RouteClass``."""
+
+    def __init__(
+        self,
+        routes: Iterable = (),
+        docs_paths: Iterable[str] = DEFAULT_DOCS_PATHS,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+    ):
+        self.docs_paths = frozenset(docs_paths)
+        self.cache_size = cache_size
+        self._tags: List[Tuple[RouteClass, frozenset, Tuple[str, ...]]] = []
+        self._templates: List[str] = []
+        self._static: Dict[str, RouteMatch] = {}
+        self._trie = _Node()
+        self._cache: "OrderedDict[str, RouteMatch]" = OrderedDict()
+        self.load_routes(routes)
+
+    def load_routes(self, routes: Iterable) -> None:
+        """(Re)build the lookup tables from the registered routes."""
+        self._templates = _route_templates(routes)
+        self._rebuild()
+
+    def tag(self, route_class: RouteClass, patterns: Iterable[str]) -> None:
+        """Add ``route_class`` to routes matching ``patterns``.
+
+        A pattern is an exact path, or a prefix ending in ``*``.
+        """
+        patterns = set(patterns)
+        exact = frozenset(p for p in patterns if not p.endswith("*"))
+        prefixes = tuple(p[:-1] for p in patterns if p.endswith("*"))
+        self._tags.append((route_class, exact, prefixes))
+        self._rebuild()
+
+    def classify_template(self, template: str) -> RouteClass:
+        """Flags for a route template (or an unrouted path)."""
+        route_class = RouteClass.NONE
+        if template == "/":
+            route_class |= RouteClass.ROOT
+        if template == "/health" or template.startswith("/health/"):
+            route_class |= RouteClass.HEALTH
+        if template in self.docs_paths:
+            route_class |= RouteClass.DOCS
+        if "/auth/" in template:
+            route_class |= RouteClass.AUTH
+            if template.rstrip("/").rsplit("/", 1)[-1] in CREDENTIAL_ENDPOINTS:
+                route_class |= RouteClass.CREDENTIALS
+        for tag_class, exact, prefixes in self._tags:
+            if template in exact or template.startswith(prefixes):
+                route_class |= tag_class
+        return route_class
+
+    def _rebuild(self) -> None:
+        self._static = {}
+        self._trie = _Node()
+        self._cache.clear()
+        for template in self._templates:
+            match = RouteMatch(template, self.classify_template(template))
+            if "{" not in template:
+                self._static.setdefault(template, match)
+                continue
+            node = self._trie
+            for segment in _segments(template):
+                if _is_param(segment) and segment.endswith(":path}"):
+                    node.catch_all = node.catch_all or match
+                    break
+                if _is_param(segment):
+                    node.param = node.param or _Node()
+                    node = node.param
+                else:
+                    node = node.static.setdefault(segment, _Node())
+            else:
+                node.match = node.match or match
+
+    def _walk(self, node: _Node, segments: List[str], index: int) -> Optional[RouteMatch]:
+        if index == len(segments):
+            return node.match or node.catch_all
+        segment = segments[index]
+        child = node.static.get(segment)
+        if child is not None:
+            found = self._walk(child, segments, index + 1)
+            if found:
+                return found
+        if node.param is not None and segment:
+            found = self._walk(node.param, segments, index + 1)
+            if found:
+                return found
+        return node.catch_all
+
+    def classify(self, path: str) -> RouteMatch:
+        """Resolve ``path`` (without root_path) to its template and flags."""
+        match = self._static.get(path)
+        if match is not None:
+            return match
+        match = self._cache.get(path)
+        if match is not None:
+            self._cache.move_to_end(path)
+            return match
+
+        match = self._walk(self._trie, _segments(path), 0)
+        if match is None:
+            match = RouteMatch(None, self.classify_template(path))
+        self._cache[path] = match
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return match
+
+    @property
+    def templates(self) -> List[str]:
+        return list(self._templates)
@@ -1,12 +1,17 @@
 """
 Security headers middleware for enhanced application security.
 """
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
+from typing import Optional, Set
+
+from starlette.datastructures import MutableHeaders
 from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .request_context import RequestContext, on_response_start
+from .route_classes import RouteClass, RouteClassifier
 
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
+class SecurityHeadersMiddleware:
     """
     Middleware to add security headers to all responses.
 
@@ -22,13 +27,13 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
 
     def __init__(
         self,
-        app,
+        app: ASGIApp,
         enable_hsts: bool = True,
         hsts_max_age: int = 31536000,  # 1 year
         enable_csp: bool = True,
         csp_directives: str = None
     ):
-        super().__init__(app)
+        self.app = app
         self.enable_hsts = enable_hsts
         self.hsts_max_age = hsts_max_age
         self.enable_csp = enable_csp
@@ -58,38 +63,18 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
         "form-action 'self';"
     )
 
-    async def dispatch(self, request: Request, call_next):
-        """Add security headers to response."""
-        response: Response = await call_next(request)
-
+    # Headers added to every response
+    STATIC_HEADERS = {
         # Prevent clickjacking attacks
-        response.headers["X-Frame-Options"] = "DENY"
-
+        "X-Frame-Options": "DENY",
         # Prevent MIME type sniffing
-        response.headers["X-Content-Type-Options"] = "nosniff"
-
+        "X-Content-Type-Options": "nosniff",
         # Enable XSS filter in browsers
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-
-        # Content Security Policy - relaxed for Swagger UI paths
-        if self.enable_csp:
-            path = request.scope.get("path", "")
-            if path in self.SWAGGER_PATHS:
-                response.headers["Content-Security-Policy"] = self.SWAGGER_CSP
-            else:
-                response.headers["Content-Security-Policy"] = self.csp_directives
-
-        # HTTP Strict Transport Security (HSTS) - only for HTTPS
-        if self.enable_hsts and request.url.scheme == "https":
-            response.headers["Strict-Transport-Security"] = (
-                f"max-age={self.hsts_max_age}; includeSubDomains; preload"
-            )
-
+        "X-XSS-Protection": "1; mode=block",
         # Control referrer information
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-
+        "Referrer-Policy": "strict-origin-when-cross-origin",
         # Permissions Policy (formerly Feature Policy)
-        response.headers["Permissions-Policy"] = (
+        "Permissions-Policy": (
             "geolocation=(), "
             "microphone=(), "
             "camera=(), "
@@ -98,16 +83,46 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
             "magnetometer=(), "
             "gyroscope=(), "
             "accelerometer=()"
-        )
+        ),
+    }
+
+    def _set_headers(self, context: RequestContext, message: Message) -> None:
+        """Add security headers to the response start message."""
+        headers = MutableHeaders(scope=message)
+        for name, value in self.STATIC_HEADERS.items():
+            headers[name] = value
+
+        # Content Security Policy - relaxed for Swagger UI paths
+        if self.enable_csp:
+            if context.path in self.SWAGGER_PATHS:
+                headers["Content-Security-Policy"] = self.SWAGGER_CSP
+            else:
+                headers["Content-Security-Policy"] = self.csp_directives
+
+        # HTTP Strict Transport Security (HSTS) - only for HTTPS
+        if self.enable_hsts and context.scheme == "https":
+            headers["Strict-Transport-Security"] = (
+                f"max-age={self.hsts_max_age}; includeSubDomains; preload"
+            )
 
         # Remove server header to avoid information disclosure
-        if "Server" in response.headers:
-            del response.headers["Server"]
+        if "Server" in headers:
+            del headers["Server"]
 
-        return response
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Add security headers to response."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        context = RequestContext.from_scope(scope)
+        await self.app(
+            scope, receive,
+            on_response_start(send, lambda message: self._set_headers(context, message))
+        )
 
 
-class RequestValidationMiddleware(BaseHTTPMiddleware):
+class RequestValidationMiddleware:
     """
     Middleware for validating and sanitizing incoming requests.
     """
@@ -115,34 +130,42 @@ class RequestValidationMiddleware(BaseHTTPMiddleware):
     # Maximum request body size (10MB)
     MAX_BODY_SIZE = 10 * 1024 * 1024
 
-    def __init__(self, app, max_body_size: int = MAX_BODY_SIZE):
-        super().__init__(app)
+    def __init__(
+        self,
+        app: ASGIApp,
+        max_body_size: int = MAX_BODY_SIZE,
+        upload_paths: Optional[Set[str]] = None,
+        max_upload_body_size: Optional[int] = None,
+        route_classifier: Optional[RouteClassifier] = None
+    ):
+        self.app = app
         self.max_body_size = max_body_size
-
-    async def dispatch(self, request: Request, call_next):
+        self.max_upload_body_size = max_upload_body_size if max_upload_body_size is not None else max_body_size
+        self.route_classifier = route_classifier if route_classifier is not None else RouteClassifier()
+        # Exact paths or "/prefix/*" patterns of file upload routes, capped at max_upload_body_size
+        if upload_paths:
+            self.route_classifier.tag(RouteClass.UPLOAD, upload_paths)
+
+    def _limit(self, context: RequestContext) -> int:
+        if context.route(self.route_classifier).route_class & RouteClass.UPLOAD:
+            return self.max_upload_body_size
+        return self.max_body_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """Validate request before processing."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
         # Check request body size
-        if request.headers.get("content-length"):
-            content_length = int(request.headers["content-length"])
-            if content_length > self.max_body_size:
-                return Response(
-                    content=f"Request body too large. Maximum size is {self.max_body_size} bytes",
-                    status_code=413
-                )
-
-        # Validate content type for POST/PUT requests
-        if request.method in ["POST", "PUT", "PATCH"]:
-            content_type = request.headers.get("content-type", "")
-            # Allow JSON, multipart form data, and form-urlencoded
-            allowed_types = [
-                "application/json",
-                "multipart/form-data",
-                "application/x-www-form-urlencoded"
-            ]
-            if not any(allowed in content_type for allowed in allowed_types):
-                # Skip validation for empty bodies
-                if request.headers.get("content-length", "0") != "0":
-                    pass  # Allow for now, as some endpoints might not set content-type
-
-        response = await call_next(request)
-        return response
+        context = RequestContext.from_scope(scope)
+        limit = self._limit(context) if context.content_length is not None else None
+        if limit is not None and context.content_length > limit:
+            response = Response(
+                content=f"Request body too large. Maximum size is {limit} bytes",
+                status_code=413
+            )
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
@@ -0,0 +1,54 @@
+"""
+System request log middleware - one log line per HTTP request.
+
+Records method, path, client IP, status and duration on the ``easylife.http``
+logger, which the system log service writes to file/GCS.
+"""
+import logging
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .request_context import RequestContext
+
+
+class SystemLogMiddleware:
+    """Log all HTTP requests to the system log.
+
+    The duration covers the whole response, including streamed bodies.
+    """
+
+    def __init__(self, app: ASGIApp, logger_name: str = "easylife.http"):
+        self.app = app
+        self.logger = logging.getLogger(logger_name)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        context = RequestContext.from_scope(scope)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+        duration_ms = round((time.perf_counter() - start) * 1000, 2)
+        self.logger.info(
+            "%s %s → %d (%.1fms)",
+            context.method, context.path, status_code, duration_ms,
+            extra={
+                "request_method": context.method,
+                "request_path": context.path,
+                "request_ip": context.client_host,
+                "response_status": status_code,
+                "duration_ms": duration_ms,
+                "user_email": context.state.get("user_email"),
+            },
+        )
@@ -0,0 +1,346 @@
+"""
+Buffered, batched writes of activity log entries.
+
+``ActivityLogService.log`` used to await an ``insert_one`` inline, adding a
+database round trip to every mutating request and login for audit data nobody
+reads synchronously. Entries are now put on a bounded in-process queue and a
+background flusher writes them with ``insert_many`` once
+``ACTIVITY_LOG_BATCH_SIZE`` entries are waiting or ``ACTIVITY_LOG_FLUSH_INTERVAL``
+seconds have passed. The hourly/daily rollups are updated per batch as well.
+
+When the queue (``ACTIVITY_LOG_QUEUE_SIZE``) is full, ``ACTIVITY_LOG_OVERFLOW``
+decides what happens to new entries:
+
+- ``block``: the caller waits for room (no loss, back-pressure on requests)
+- ``drop``: the entry is discarded and counted
+- ``spill``: the entry is appended to a JSON-lines file under
+  ``ACTIVITY_LOG_SPILL_DIR`` and inserted once the queue has drained
+
+Batches that fail to insert are spilled under the ``spill`` policy and dropped
+otherwise. Spilled entries from a previous run are replayed on start. Replay
+keeps whatever is left on disk when the database goes away mid-file, and
+entries the server rejects ``ACTIVITY_LOG_REPLAY_ATTEMPTS`` times are moved to
+a dead-letter file next to the spill file instead of blocking it.
+"""
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import json_util
+from pymongo.errors import BulkWriteError
+
+from ..db.db_manager import DatabaseManager
+from .activity_rollups import ActivityRollupService
+
+logger = logging.getLogger(__name__)
+
+# Spill file writes run off the event loop
+_file_executor = ThreadPoolExecutor(max_workers=1)
+
+OVERFLOW_BLOCK = "block"
+OVERFLOW_DROP = "drop"
+OVERFLOW_SPILL = "spill"
+OVERFLOW_POLICIES = (OVERFLOW_BLOCK, OVERFLOW_DROP, OVERFLOW_SPILL)
+
+SPILL_FILENAME = "activity_logs.jsonl"
+DEAD_LETTER_FILENAME = "activity_logs.dead.jsonl"
+DUPLICATE_KEY = 11000
+# Failed replays of an entry, stored on its spilled line
+REPLAY_ATTEMPTS_FIELD = "_replay_attempts"
+
+
+class ActivityLogBuffer:
+    """Bounded queue of activity log entries flushed in batches."""
+
+    def __init__(
+        self,
+        db: DatabaseManager,
+        rollups: Optional[ActivityRollupService] = None,
+        config: Optional[Dict[str, Any]] = None
+    ):
+        config = config or {}
+        self.db = db
+        self.rollups = rollups
+        self.queue_size = int(config.get("queue_size") or os.getenv("ACTIVITY_LOG_QUEUE_SIZE", "10000"))
+        self.batch_size = int(config.get("batch_size") or os.getenv("ACTIVITY_LOG_BATCH_SIZE", "200"))
+        self.flush_interval = float(
+            config.get("flush_interval") or os.getenv("ACTIVITY_LOG_FLUSH_INTERVAL", "1")
+        )
+        self.overflow = (config.get("overflow") or os.getenv("ACTIVITY_LOG_OVERFLOW", OVERFLOW_BLOCK)).lower()
+        if self.overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"ACTIVITY_LOG_OVERFLOW must be one of {', '.join(OVERFLOW_POLICIES)}")
+        self.spill_path = Path(
+            config.get("spill_dir") or os.getenv("ACTIVITY_LOG_SPILL_DIR", "./logs/activity_spill")
+        ) / SPILL_FILENAME
+        self.dead_letter_path = self.spill_path.with_name(DEAD_LETTER_FILENAME)
+        self.replay_attempts = int(
+            config.get("replay_attempts") or os.getenv("ACTIVITY_LOG_REPLAY_ATTEMPTS", "3")
+        )
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._spill_lock: Optional[asyncio.Lock] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._draining = 0
+        self._spilled = False
+
+        self.written = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.failed = 0
+        self.dead_lettered = 0
+
+    # ------------------------------------------------------------------ add
+
+    async def add(self, entry: Dict[str, Any]) -> None:
+        """Queue ``entry`` for writing, applying the overflow policy when full."""
+        self._start()
+        if self.overflow == OVERFLOW_BLOCK:
+            await self._queue.put(entry)
+        else:
+            try:
+                self._queue.put_nowait(entry)
+            except asyncio.QueueFull:
+                await self._overflow(entry)
+                return
+        # The flusher holds one entry while it waits for the rest of a batch
+        if self._queue.qsize() + 1 >= self.batch_size:
+            self._wake.set()
+
+    async def _overflow(self, entry: Dict[str, Any]) -> None:
+        if self.overflow == OVERFLOW_SPILL:
+            await self._spill([entry])
+        else:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                logger.warning(f"Activity log queue full: {self.dropped} entries dropped")
+
+
+    def _start(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._spill_lock = asyncio.Lock()
+            self._wake = asyncio.Event()
+            self._spilled = self.spill_path.exists() or self.spill_path.with_suffix(".replay").exists()
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    def start(self) -> None:
+        """Start the flusher now (replaying entries spilled by a previous run)."""
+        self._start()
+
+    # ---------------------------------------------------------------- flush
+
+    async def _next_batch(self) -> List[Dict[str, Any]]:
+        """Wait for a full batch or the flush interval, whichever comes first."""
+        batch = [await self._queue.get()]
+        self._wake.clear()
+        if self._queue.qsize() + 1 < self.batch_size and not self._draining:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _flush_loop(self) -> None:
+        while True:
+            if self._spilled and self._queue.empty():
+                await self._replay_spill()
+            batch = await self._next_batch()
+            try:
+                await self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _insert(
+        self, batch: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Insert ``batch``; returns the entries inserted and those the server rejected.
+
+        A duplicate key means the entry was written by an earlier attempt (a
+        replay after a partial insert), so it is in neither list and is not
+        counted or rolled up again.
+        """
+        try:
+            await self.db.activity_logs.insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            failed = {error["index"] for error in errors}
+            rejected = [batch[error["index"]] for error in errors if error.get("code") != DUPLICATE_KEY]
+            return [entry for index, entry in enumerate(batch) if index not in failed], rejected
+        return batch, []
+
+    async def _record(self, inserted: List[Dict[str, Any]]) -> None:
+        self.written += len(inserted)
+        if self.rollups and inserted:
+            await self.rollups.record_many(inserted)
+
+    async def _write(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            inserted, rejected = await self._insert(batch)
+        except Exception as e:
+            await self._write_failed(batch, e)
+            return
+        await self._record(inserted)
+        if rejected:
+            await self._write_failed(rejected, "rejected by the server")
+
+    async def _write_failed(self, entries: List[Dict[str, Any]], reason: Any) -> None:
+        if self.overflow == OVERFLOW_SPILL:
+            logger.warning(f"Failed to write {len(entries)} activity log entries, spilling to disk: {reason}")
+            await self._spill(entries)
+        else:
+            self.failed += len(entries)
+            logger.error(f"Failed to write {len(entries)} activity log entries: {reason}")
+
+    # ---------------------------------------------------------------- spill
+
+    def _sync_append(self, lines: str) -> None:
+        self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.spill_path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+    def _sync_take_spill(self) -> List[Tuple[Dict[str, Any], int]]:
+        """Spilled entries with the number of times each was rejected on replay."""
+        # Renamed first so entries spilled meanwhile go to a fresh file
+        replay_path = self.spill_path.with_suffix(".replay")
+        if not replay_path.exists():
+            if not self.spill_path.exists():
+                return []
+            self.spill_path.rename(replay_path)
+        with open(replay_path, encoding="utf-8") as f:
+            entries = [json_util.loads(line) for line in f if line.strip()]
+        return [(entry, entry.pop(REPLAY_ATTEMPTS_FIELD, 0)) for entry in entries]
+
+    def _sync_finish_replay(
+        self, remaining: List[Tuple[Dict[str, Any], int]], dead: List[Dict[str, Any]]
+    ) -> bool:
+        """Keep ``remaining`` for the next replay and append ``dead`` to the dead-letter file.
+
+        Returns whether anything is left to replay.
+        """
+        if dead:
+            with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+                f.write("".join(json_util.dumps(entry) + "\n" for entry in dead))
+        replay_path = self.spill_path.with_suffix(".replay")
+        if remaining:
+            partial_path = replay_path.with_suffix(".partial")
+            with open(partial_path, "w", encoding="utf-8") as f:
+                f.write("".join(
+                    json_util.dumps({**entry, REPLAY_ATTEMPTS_FIELD: attempts} if attempts else entry) + "\n"
+                    for entry, attempts in remaining
+                ))
+            os.replace(partial_path, replay_path)
+            return True
+        replay_path.unlink(missing_ok=True)
+        return self.spill_path.exists()
+
+    async def _spill(self, entries: List[Dict[str, Any]]) -> None:
+        lines = "".join(json_util.dumps(entry) + "\n" for entry in entries)
+        loop = asyncio.get_running_loop()
+        try:
+            async with self._spill_lock:
+                await loop.run_in_executor(_file_executor, self._sync_append, lines)
+            self.spilled += len(entries)
+            self._spilled = True
+        except Exception as e:
+            self.failed += len(entries)
+            logger.error(f"Failed to spill {len(entries)} activity log entries: {e}")
+
+    async def _replay_spill(self) -> None:
+        loop = asyncio.get_running_loop()
+        async with self._spill_lock:
+            self._spilled = False
+            try:
+                entries = await loop.run_in_executor(_file_executor, self._sync_take_spill)
+            except Exception as e:
+                self._spilled = True
+                logger.warning(f"Failed to read spilled activity log entries: {e}")
+                return
+            remaining: List[Tuple[Dict[str, Any], int]] = []
+            dead: List[Dict[str, Any]] = []
+            for start in range(0, len(entries), self.batch_size):
+                chunk = entries[start:start + self.batch_size]
+                try:
+                    inserted, rejected = await self._insert([entry for entry, _ in chunk])
+                except Exception as e:
+                    # This and the later batches stay on disk; retried after the next flush
+                    logger.warning(f"Failed to replay spilled activity log entries: {e}")
+                    remaining.extend(entries[start:])
+                    break
+                await self._record(inserted)
+                rejected_ids = {id(entry) for entry in rejected}
+                for entry, attempts in chunk:
+                    if id(entry) not in rejected_ids:
+                        continue
+                    if attempts + 1 >= self.replay_attempts:
+                        dead.append(entry)
+                    else:
+                        remaining.append((entry, attempts + 1))
+            try:
+                self._spilled = await loop.run_in_executor(
+                    _file_executor, self._sync_finish_replay, remaining, dead
+                )
+            except Exception as e:
+                # The replay file is still there, so finished entries are retried as duplicates
+                self._spilled = True
+                logger.warning(f"Failed to update spilled activity log entries: {e}")
+                return
+            self.dead_lettered += len(dead)
+            if dead:
+                logger.error(
+                    f"Moved {len(dead)} activity log entries rejected {self.replay_attempts} times "
+                    f"to {self.dead_letter_path}"
+                )
+            if len(remaining) < len(entries):
+                logger.info(f"Replayed {len(entries) - len(remaining)} spilled activity log entries")
+
+    # ------------------------------------------------------------ lifecycle
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": self._queue.qsize() if self._queue else 0,
+            "written": self.written,
+            "dropped": self.dropped,
+            "spilled": self.spilled,
+            "failed": self.failed,
+            "dead_lettered": self.dead_lettered,
+        }
+
+    async def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued entry has been written (or given up)."""
+        if self._queue is None:
+            return True
+        # Partial batches are written right away instead of after the interval
+        self._draining += 1
+        self._wake.set()
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._draining -= 1
+
+    async def shutdown(self, timeout: float = 10) -> None:
+        """Flush what is queued (up to ``timeout`` seconds), then stop the flusher."""
+        if not await self.flush(timeout):
+            remaining = []
+            while not self._queue.empty():
+                remaining.append(self._queue.get_nowait())
+                self._queue.task_done()
+            if self.overflow == OVERFLOW_SPILL:
+                await self._spill(remaining)
+            else:
+                self.failed += len(remaining)
+                logger.warning(f"Activity log stopped with {len(remaining)} entries unwritten")
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
@@ -3,14 +3,24 @@ Activity Logging Service - Records user actions for audit trail.
 """
 from datetime import datetime, timezone
 from typing import Optional, Dict, Any
+from bson import ObjectId
 from ..db.db_manager import DatabaseManager
+from .activity_rollups import ActivityRollupService
+from .activity_log_buffer import ActivityLogBuffer
 
 
 class ActivityLogService:
     """Service for logging user activities."""
 
-    def __init__(self, db: DatabaseManager):
+    def __init__(
+        self,
+        db: DatabaseManager,
+        rollups: Optional[ActivityRollupService] = None,
+        buffer: Optional[ActivityLogBuffer] = None
+    ):
         self.db = db
+        self.rollups = rollups
+        self.buffer = buffer
 
     async def log(
         self,
@@ -35,7 +45,8 @@ class ActivityLogService:
             new_values: New values (for creates/updates)
 
         Returns:
-            The inserted log ID or None if logging failed
+            The inserted log ID or None if logging failed. With a buffer the
+            entry is queued and written in a later batch under the returned ID.
         """
         if not hasattr(self.db, 'activity_logs') or self.db.activity_logs is None:
             return None
@@ -54,22 +65,38 @@ class ActivityLogService:
         if new_values:
             log_entry["new_values"] = new_values
 
+        if self.buffer:
+            log_entry["_id"] = ObjectId()
+            await self.buffer.add(log_entry)
+            return str(log_entry["_id"])
+
         try:
             result = await self.db.activity_logs.insert_one(log_entry)
+            if self.rollups:
+                await self.rollups.record(log_entry)
             return str(result.inserted_id)
         except Exception as e:
             print(f"Failed to log activity: {e}")
             return None
 
+    async def shutdown(self) -> None:
+        """Write any buffered entries."""
+        if self.buffer:
+            await self.buffer.shutdown()
+
 
 # Singleton instance holder
 _activity_log_service: Optional[ActivityLogService] = None
 
 
-def init_activity_log_service(db: DatabaseManager) -> ActivityLogService:
+def init_activity_log_service(
+    db: DatabaseManager,
+    rollups: Optional[ActivityRollupService] = None,
+    buffer: Optional[ActivityLogBuffer] = None
+) -> ActivityLogService:
     """Initialize the activity log service."""
     global _activity_log_service
-    _activity_log_service = ActivityLogService(db)
+    _activity_log_service = ActivityLogService(db, rollups, buffer)
     return _activity_log_service
 
 
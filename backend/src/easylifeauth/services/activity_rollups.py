@@ -0,0 +1,286 @@
+"""
+Hourly and daily rollups of the activity log.
+
+Activity statistics used to run several aggregations over the raw
+``activity_logs`` events in the requested window, so a 365-day window scanned
+every event. ``ActivityLogService.log`` now also increments one hourly and one
+daily rollup document per event::
+
+    {"_id": "day:2026-10-16", "granularity": "day", "bucket": <day start>,
+     "total": 120, "actions": {"login": 80, ...}, "entities": {...}, "users": {...}}
+
+and statistics are summed from at most ~24 hourly documents (the partial first
+day of the window) plus one daily document per remaining day.
+
+Rollups are complete from ``maintained_since`` (when maintenance started, kept
+in the ``state`` document). Events logged before that are backfilled once from
+the raw log in the background; until the backfill finishes, windows reaching
+further back than ``maintained_since`` are still answered from the raw log.
+
+Each rollup the backfill has been added to is marked, so a backfill that was
+cancelled or failed part way can simply be run again by the next start. A
+worker that dies while holding the backfill claim loses it after
+``BACKFILL_CLAIM_SECONDS``.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from ..db.db_manager import DatabaseManager
+from .entity_counters import NONE_BUCKET, bucket_key, decode_bucket_key
+
+logger = logging.getLogger(__name__)
+
+STATE_ID = "state"
+DUPLICATE_KEY = 11000
+
+# How long a backfill claim lasts before another worker may take it over
+BACKFILL_CLAIM_SECONDS = 3600
+# Set on rollups that include the backfilled events, so a retried backfill skips them
+BACKFILL_MARK = "backfill_applied"
+
+# Event field counted under each rollup breakdown
+BREAKDOWNS = {"actions": "action", "entities": "entity_type", "users": "user_email"}
+
+BUCKET_FORMATS = {"hour": "%Y-%m-%dT%H", "day": "%Y-%m-%d"}
+
+
+def _utc(value: datetime) -> datetime:
+    # Motor returns naive datetimes unless the client is tz-aware
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def _hour_start(value: datetime) -> datetime:
+    return _utc(value).replace(minute=0, second=0, microsecond=0)
+
+
+def _day_start(value: datetime) -> datetime:
+    return _hour_start(value).replace(hour=0)
+
+
+def _buckets(timestamp: datetime) -> List[Tuple[str, str, datetime]]:
+    """``(rollup id, granularity, bucket start)`` of the rollups an event at ``timestamp`` counts in."""
+    buckets = []
+    for granularity, start in (("hour", _hour_start(timestamp)), ("day", _day_start(timestamp))):
+        buckets.append((f"{granularity}:{start.strftime(BUCKET_FORMATS[granularity])}", granularity, start))
+    return buckets
+
+
+def ranked(counts: Dict[Optional[str], int], limit: Optional[int] = None) -> List[Tuple[Optional[str], int]]:
+    """``counts`` as ``(key, count)`` pairs, largest first."""
+    items = sorted(counts.items(), key=lambda item: (-item[1], str(item[0])))
+    return items[:limit] if limit else items
+
+
+class ActivityRollupService:
+    """Maintains and reads the activity log rollups."""
+
+    def __init__(self, db: DatabaseManager):
+        self.db = db
+        self._backfill_task: Optional[asyncio.Task] = None
+
+    @property
+    def collection(self):
+        return getattr(self.db, "activity_log_rollups", None)
+
+    # ------------------------------------------------------------- maintain
+
+    @staticmethod
+    def _deltas(events: Iterable[Tuple[Dict[str, Any], int]]) -> Dict[str, Dict[str, Any]]:
+        """Combined ``$inc`` per rollup for ``(event, count)`` pairs."""
+        deltas: Dict[str, Dict[str, Any]] = {}
+        for event, count in events:
+            timestamp = event.get("timestamp")
+            if timestamp is None:
+                continue
+            for rollup_id, granularity, start in _buckets(timestamp):
+                rollup = deltas.setdefault(rollup_id, {"granularity": granularity, "bucket": start, "inc": {}})
+                inc = rollup["inc"]
+                inc["total"] = inc.get("total", 0) + count
+                for breakdown, field in BREAKDOWNS.items():
+                    path = f"{breakdown}.{bucket_key(event.get(field))}"
+                    inc[path] = inc.get(path, 0) + count
+        return deltas
+
+    async def _apply(self, deltas: Dict[str, Dict[str, Any]], backfill: bool = False) -> None:
+        if not deltas:
+            return
+        operations = []
+        for rollup_id, rollup in deltas.items():
+            query: Dict[str, Any] = {"_id": rollup_id}
+            update = {
+                "$inc": rollup["inc"],
+                "$setOnInsert": {"granularity": rollup["granularity"], "bucket": rollup["bucket"]},
+            }
+            if backfill:
+                query[BACKFILL_MARK] = {"$ne": True}
+                update["$set"] = {BACKFILL_MARK: True}
+            operations.append(UpdateOne(query, update, upsert=True))
+        try:
+            await self.collection.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            # A rollup already backfilled no longer matches, so its upsert hits the existing _id
+            errors = e.details.get("writeErrors", [])
+            if not backfill or any(error.get("code") != DUPLICATE_KEY for error in errors):
+                raise
+
+    async def record_many(self, entries: List[Dict[str, Any]]) -> None:
+        """Count logged events in their hourly and daily rollups (one write per rollup)."""
+        if self.collection is None or not entries:
+            return
+        try:
+            await self._apply(self._deltas((entry, 1) for entry in entries))
+        except Exception as e:
+            logger.warning(f"Failed to update activity rollups: {e}")
+
+    async def record(self, entry: Dict[str, Any]) -> None:
+        await self.record_many([entry])
+
+    # ------------------------------------------------------------- backfill
+
+    async def _state(self) -> Optional[Dict[str, Any]]:
+        if self.collection is None:
+            return None
+        return await self.collection.find_one({"_id": STATE_ID})
+
+    async def backfill(self, until: datetime) -> int:
+        """Add the raw events logged before ``until`` to the rollups; returns how many."""
+        pipeline = [
+            {"$match": {"timestamp": {"$lt": until}}},
+            {"$group": {
+                "_id": {
+                    "hour": {"$dateToString": {"format": BUCKET_FORMATS["hour"], "date": "$timestamp"}},
+                    "action": "$action",
+                    "entity_type": "$entity_type",
+                    "user_email": "$user_email",
+                },
+                "count": {"$sum": 1}
+            }}
+        ]
+        groups = []
+        total = 0
+        async for group in self.db.activity_logs.aggregate(pipeline):
+            hour = datetime.strptime(group["_id"]["hour"], BUCKET_FORMATS["hour"]).replace(tzinfo=timezone.utc)
+            event = dict(group["_id"], timestamp=hour)
+            groups.append((event, group["count"]))
+            total += group["count"]
+        await self._apply(self._deltas(groups), backfill=True)
+        return total
+
+    async def _release_backfill(self) -> None:
+        try:
+            await self.collection.update_one({"_id": STATE_ID}, {"$set": {"backfilling": False}})
+        except Exception as e:
+            logger.warning(f"Failed to release the activity rollup backfill claim: {e}")
+
+    async def _run_backfill(self, until: datetime) -> None:
+        try:
+            count = await self.backfill(until)
+        except asyncio.CancelledError:
+            await self._release_backfill()
+            raise
+        except Exception as e:
+            # Released: rollups already backfilled are marked, so the next start redoes only the rest
+            logger.error(f"Activity rollup backfill failed: {e}")
+            await self._release_backfill()
+            return
+        await self.collection.update_one(
+            {"_id": STATE_ID},
+            {"$set": {"backfilled": True, "backfilling": False}}
+        )
+        logger.info(f"Activity rollups backfilled with {count} events")
+
+    def start(self) -> None:
+        """Record when maintenance started and backfill older events (once per database)."""
+        if self.collection is not None and self._backfill_task is None:
+            self._backfill_task = asyncio.create_task(self._start())
+
+    async def _start(self) -> None:
+        await self.collection.update_one(
+            {"_id": STATE_ID},
+            {"$setOnInsert": {"maintained_since": datetime.now(timezone.utc), "backfilled": False}},
+            upsert=True
+        )
+        now = datetime.now(timezone.utc)
+        claimed = await self.collection.update_one(
+            {
+                "_id": STATE_ID,
+                "backfilled": False,
+                "$or": [{"backfilling": {"$ne": True}}, {"backfill_claimed_until": {"$lt": now}}],
+            },
+            {"$set": {"backfilling": True, "backfill_claimed_until": now + timedelta(seconds=BACKFILL_CLAIM_SECONDS)}}
+        )
+        if claimed.modified_count:
+            state = await self._state()
+            await self._run_backfill(_utc(state["maintained_since"]))
+
+    async def shutdown(self) -> None:
+        if self._backfill_task is not None:
+            self._backfill_task.cancel()
+            await asyncio.gather(self._backfill_task, return_exceptions=True)
+            self._backfill_task = None
+
+    # ---------------------------------------------------------------- reads
+
+    async def covers(self, since: datetime) -> bool:
+        """Whether the rollups hold every event since ``since``."""
+        state = await self._state()
+        if not state:
+            return False
+        return bool(state.get("backfilled")) or _utc(state["maintained_since"]) <= _hour_start(since)
+
+    async def stats(self, since: datetime) -> Dict[str, Any]:
+        """Totals, breakdowns and a daily timeline of the events since ``since`` (to the hour)."""
+        hour = _hour_start(since)
+        first_day = _day_start(since)
+        if first_day < hour:
+            first_day += timedelta(days=1)
+        query = {"$or": [
+            {"granularity": "hour", "bucket": {"$gte": hour, "$lt": first_day}},
+            {"granularity": "day", "bucket": {"$gte": first_day}},
+        ]}
+
+        stats: Dict[str, Any] = {"total": 0, "timeline": {}, **{breakdown: {} for breakdown in BREAKDOWNS}}
+        async for rollup in self.collection.find(query):
+            stats["total"] += rollup.get("total", 0)
+            date = _utc(rollup["bucket"]).strftime(BUCKET_FORMATS["day"])
+            stats["timeline"][date] = stats["timeline"].get(date, 0) + rollup.get("total", 0)
+            for breakdown in BREAKDOWNS:
+                counts = stats[breakdown]
+                for key, count in (rollup.get(breakdown) or {}).items():
+                    value = None if key == NONE_BUCKET else decode_bucket_key(key)
+                    counts[value] = counts.get(value, 0) + count
+        stats["timeline"] = dict(sorted(stats["timeline"].items()))
+        return stats
+
+
+# Singleton instance holder
+_activity_rollup_service: Optional[ActivityRollupService] = None
+
+
+def init_activity_rollup_service(db: DatabaseManager) -> ActivityRollupService:
+    """Initialize the activity rollup service."""
+    global _activity_rollup_service
+    _activity_rollup_service = ActivityRollupService(db)
+    return _activity_rollup_service
+
+
+def get_activity_rollup_service() -> Optional[ActivityRollupService]:
+    """Get the activity rollup service instance."""
+    return _activity_rollup_service
+
+
+async def activity_rollups_covering(db: DatabaseManager, since: datetime) -> Optional[ActivityRollupService]:
+    """The rollup service, if it maintains ``db`` and holds every event since ``since``."""
+    service = _activity_rollup_service
+    if service is None or service.db is not db or service.collection is None:
+        return None
+    try:
+        return service if await service.covers(since) else None
+    except Exception as e:
+        logger.warning(f"Failed to read activity rollup state: {e}")
+        return None
@@ -6,13 +6,18 @@ from datetime import datetime, timezone
 from ..db.constants import ROLES, ADMIN_ROLES, GROUP_ADMIN_ROLES
 from ..db.db_manager import DatabaseManager, distribute_limit
 from ..errors.auth_error import AuthError
+from .entity_counters import record_entity_change, record_entity_delete
+from .list_totals import count_list_total
+from .search_index import index_search_document
+from .token_manager import TokenManager
 
 
 class AdminService:
     """Async Admin Management Service"""
 
-    def __init__(self, db: DatabaseManager):
+    def __init__(self, db: DatabaseManager, token_manager: Optional[TokenManager] = None):
         self.db = db
+        self.token_manager = token_manager
 
     async def get_all_users(
         self,
@@ -62,8 +67,7 @@ class AdminService:
                 # Regular users can't see other users
                 raise AuthError("Unauthorized access", 403)
 
-        if total is None:
-            total = await self.db.users.count_documents(query)
+        total = await count_list_total(self.db.users, query, known_total=total)
         
         pages = distribute_limit(limit=limit, size=total)
         next_pagination = {
@@ -112,6 +116,7 @@ class AdminService:
         
         if result.matched_count == 0:
             raise AuthError("User not found", 404)
+        await record_entity_change("users", target_user.get("is_active"), is_active)
         
         return {"message": f'User {"activated" if is_active else "deactivated"}'}
 
@@ -316,8 +321,12 @@ class AdminService:
         
         if result.deleted_count == 0:
             raise AuthError("User not found", 404)
+        await record_entity_delete("users", target_user)
+        await index_search_document("users", target_user["_id"])
         
         # Also delete user's tokens
         await self.db.tokens.delete_many({"user_id": user_id})
+        if self.token_manager:
+            await self.token_manager.revoke_user_tokens(user_id)
         
         return {"message": "User deleted successfully"}
@@ -0,0 +1,198 @@
+"""
+Dashboard analytics snapshot.
+
+The analytics endpoint used to load up to 1000 users and count their roles in
+Python, which was slow and silently undercounted larger user bases. Role, group
+and domain distributions are now computed server-side with ``$unwind`` /
+``$group`` pipelines, and every analytics query runs concurrently.
+
+The result is precomputed: a background task refreshes the snapshot every
+``ANALYTICS_SNAPSHOT_REFRESH_SECONDS`` and the endpoint serves the latest one,
+so dashboard loads never wait on the aggregations.
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from ..db.db_manager import DatabaseManager
+from .activity_rollups import activity_rollups_covering, ranked
+
+logger = logging.getLogger(__name__)
+
+
+def _daily_counts_pipeline(field: str, since: datetime) -> List[Dict[str, Any]]:
+    return [
+        {"$match": {field: {"$gte": since}}},
+        {"$group": {
+            "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": f"${field}"}},
+            "count": {"$sum": 1}
+        }},
+        {"$sort": {"_id": 1}}
+    ]
+
+
+def _distribution_pipeline(field: str) -> List[Dict[str, Any]]:
+    """Users per value of the array ``field`` (each user counted once per value)."""
+    return [
+        {"$project": {field: 1}},
+        {"$unwind": f"${field}"},
+        {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+        {"$sort": {"count": -1, "_id": 1}}
+    ]
+
+
+async def _aggregate(collection, pipeline: List[Dict[str, Any]], length: Optional[int] = None) -> List[Dict[str, Any]]:
+    if collection is None:
+        return []
+    return await collection.aggregate(pipeline).to_list(length)
+
+
+async def _recent_signups(db: DatabaseManager) -> List[Dict[str, Any]]:
+    cursor = db.users.find(
+        {},
+        {"email": 1, "full_name": 1, "created_at": 1}
+    ).sort("created_at", -1).limit(5)
+    recent_signups = []
+    async for user in cursor:
+        recent_signups.append({
+            "email": user.get("email"),
+            "full_name": user.get("full_name", "N/A"),
+            "created_at": user.get("created_at")
+        })
+    return recent_signups
+
+
+async def _activity(db: DatabaseManager, since: datetime) -> List[List[Dict[str, Any]]]:
+    """Daily activity counts and the five most active users since ``since``."""
+    rollups = await activity_rollups_covering(db, since)
+    if rollups:
+        stats = await rollups.stats(since)
+        return [
+            [{"_id": date, "count": count} for date, count in stats["timeline"].items()],
+            [{"_id": user, "count": count} for user, count in ranked(stats["users"], 5)],
+        ]
+
+    activity_logs = getattr(db, "activity_logs", None)
+    top_users_pipeline = [
+        {"$match": {"timestamp": {"$gte": since}}},
+        {"$group": {"_id": "$user_email", "count": {"$sum": 1}}},
+        {"$sort": {"count": -1}},
+        {"$limit": 5}
+    ]
+    return await asyncio.gather(
+        _aggregate(activity_logs, _daily_counts_pipeline("timestamp", since), 7),
+        _aggregate(activity_logs, top_users_pipeline, 5),
+    )
+
+
+async def compute_analytics(db: DatabaseManager) -> Dict[str, Any]:
+    """Dashboard analytics, with all aggregations run concurrently."""
+    now = datetime.now(timezone.utc)
+    thirty_days_ago = now - timedelta(days=30)
+    seven_days_ago = now - timedelta(days=7)
+
+    permissions_by_module_pipeline = [
+        {"$group": {"_id": "$module", "count": {"$sum": 1}}},
+        {"$sort": {"count": -1}}
+    ]
+
+    (user_growth, (activity_trend, top_active_users), roles, groups, domains,
+     permissions, recent_signups) = await asyncio.gather(
+        _aggregate(db.users, _daily_counts_pipeline("created_at", thirty_days_ago), 30),
+        _activity(db, seven_days_ago),
+        _aggregate(db.users, _distribution_pipeline("roles")),
+        _aggregate(db.users, _distribution_pipeline("groups")),
+        _aggregate(db.users, _distribution_pipeline("domains")),
+        _aggregate(getattr(db, "permissions", None), permissions_by_module_pipeline, 20),
+        _recent_signups(db),
+    )
+
+    return {
+        "user_growth": [{"date": item["_id"], "count": item["count"]} for item in user_growth],
+        "activity_trend": [{"date": item["_id"], "count": item["count"]} for item in activity_trend],
+        "role_distribution": [{"role": item["_id"], "count": item["count"]} for item in roles],
+        "group_distribution": [{"group": item["_id"], "count": item["count"]} for item in groups],
+        "domain_distribution": [{"domain": item["_id"], "count": item["count"]} for item in domains],
+        "top_active_users": [{"user_email": item["_id"], "activities": item["count"]} for item in top_active_users],
+        "permission_distribution": [{"module": item["_id"], "count": item["count"]} for item in permissions],
+        "recent_signups": recent_signups,
+        "generated_at": now,
+    }
+
+
+class AnalyticsSnapshotService:
+    """Keeps a periodically refreshed analytics snapshot."""
+
+    def __init__(self, db: DatabaseManager, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.db = db
+        self.refresh_seconds = int(
+            config.get("refresh_seconds") or os.getenv("ANALYTICS_SNAPSHOT_REFRESH_SECONDS", "300")
+        )
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    async def refresh(self) -> Dict[str, Any]:
+        """Recompute the snapshot now."""
+        self._snapshot = await compute_analytics(self.db)
+        return self._snapshot
+
+    async def get(self) -> Dict[str, Any]:
+        """The latest snapshot; computed on first use if the refresh job has not run yet."""
+        if self._snapshot is not None:
+            return self._snapshot
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._snapshot is None:
+                await self.refresh()
+            return self._snapshot
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"Failed to refresh analytics snapshot: {e}")
+            await asyncio.sleep(self.refresh_seconds)
+
+    def start(self) -> None:
+        """Start the periodic refresh job."""
+        if self._refresh_task is None and self.refresh_seconds > 0:
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def shutdown(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            await asyncio.gather(self._refresh_task, return_exceptions=True)
+            self._refresh_task = None
+
+
+# Singleton instance holder
+_analytics_snapshot_service: Optional[AnalyticsSnapshotService] = None
+
+
+def init_analytics_snapshot_service(
+    db: DatabaseManager,
+    config: Optional[Dict[str, Any]] = None
+) -> AnalyticsSnapshotService:
+    """Initialize the analytics snapshot service."""
+    global _analytics_snapshot_service
+    _analytics_snapshot_service = AnalyticsSnapshotService(db, config)
+    return _analytics_snapshot_service
+
+
+def get_analytics_snapshot_service() -> Optional[AnalyticsSnapshotService]:
+    """Get the analytics snapshot service instance."""
+    return _analytics_snapshot_service
+
+
+async def get_analytics(db: DatabaseManager) -> Dict[str, Any]:
+    """The snapshot for ``db`` if the service maintains one, else computed now."""
+    service = _analytics_snapshot_service
+    if service is not None and service.db is db:
+        return await service.get()
+    return await compute_analytics(db)
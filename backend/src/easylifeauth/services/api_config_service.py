@@ -13,6 +13,8 @@ import httpx
 from cryptography import x509
 from cryptography.hazmat.backends import default_backend
 
+from .search_index import index_search_document, search_filter
+
 logger = logging.getLogger(__name__)
 
 
@@ -61,11 +63,7 @@ class ApiConfigService:
         if tags:
             query["tags"] = {"$all": tags}
         if search:
-            query["$or"] = [
-                {"name": {"$regex": search, "$options": "i"}},
-                {"key": {"$regex": search, "$options": "i"}},
-                {"description": {"$regex": search, "$options": "i"}}
-            ]
+            query.update(await search_filter(self.db, self.COLLECTION_NAME, search))
 
         # Get total count
         total = await collection.count_documents(query)
@@ -132,6 +130,7 @@ class ApiConfigService:
 
         result = await collection.insert_one(config_data)
         config_data["_id"] = str(result.inserted_id)
+        await index_search_document(self.COLLECTION_NAME, result.inserted_id)
 
         return config_data
 
@@ -167,6 +166,7 @@ class ApiConfigService:
                 return_document=True
             )
             if result:
+                await index_search_document(self.COLLECTION_NAME, result["_id"])
                 result["_id"] = str(result["_id"])
             return result
         except Exception as e:
@@ -192,6 +192,7 @@ class ApiConfigService:
                             logger.warning(f"Failed to delete cert from GCS: {e}")
 
             result = await collection.delete_one({"_id": ObjectId(config_id)})
+            await index_search_document(self.COLLECTION_NAME, ObjectId(config_id))
             return result.deleted_count > 0
         except Exception as e:
             logger.error(f"Error deleting config: {e}")
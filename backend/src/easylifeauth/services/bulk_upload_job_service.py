@@ -0,0 +1,326 @@
+"""
+Background bulk upload jobs.
+
+Large uploads are processed as jobs instead of inside the API request: the
+file is spooled to disk, a job is recorded in the ``bulk_upload_jobs``
+collection, and ``BulkUploadService.process_entity_file`` runs in the
+background. After every chunk the job's progress counters and partial result
+are saved, so clients can poll a job while it runs.
+
+Jobs run as tasks in the worker that accepted them, at most
+``BULK_UPLOAD_JOB_MAX_CONCURRENT`` at a time per worker. Cancellation is
+cooperative: it is recorded on the job and honoured at the next chunk
+boundary, so it works from any worker and never leaves a chunk half counted.
+The running worker holds a lease on the job and renews it from a heartbeat
+(see ``job_lease``); a job whose lease expired (its worker was restarted) is
+reported as failed.
+"""
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from ..db.db_manager import DatabaseManager
+from .bulk_upload_service import BulkUploadResult, BulkUploadService
+from .gcs_service import GCSService
+from .job_lease import JobHeartbeat, expired_lease_filter, lease_expired, lease_fields
+from .upload_validation import KEY_FIELDS
+
+logger = logging.getLogger(__name__)
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+STATUS_CANCELLED = "cancelled"
+
+FINISHED_STATUSES = (STATUS_COMPLETED, STATUS_FAILED, STATUS_CANCELLED)
+
+# Row errors kept on the job document (the counters are always complete)
+MAX_STORED_ERRORS = 1000
+
+
+class _CancelRequested(Exception):
+    """Raised between chunks when a job's cancellation was requested."""
+
+
+class BulkUploadJobService:
+    """Runs bulk uploads in the background and tracks them in MongoDB."""
+
+    def __init__(
+        self,
+        db: DatabaseManager,
+        gcs_service: Optional[GCSService] = None,
+        config: Optional[Dict[str, Any]] = None
+    ):
+        config = config or {}
+        self.db = db
+        self.gcs_service = gcs_service
+        self.retention_hours = int(config.get("retention_hours") or os.getenv("BULK_UPLOAD_JOB_RETENTION_HOURS", "24"))
+        self.lease_seconds = float(config.get("lease_seconds") or os.getenv("BULK_UPLOAD_JOB_LEASE_SECONDS", "60"))
+        max_concurrent = int(config.get("max_concurrent") or os.getenv("BULK_UPLOAD_JOB_MAX_CONCURRENT", "2"))
+
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    @property
+    def collection(self):
+        return getattr(self.db, "bulk_upload_jobs", None)
+
+    # ------------------------------------------------------------------ jobs
+
+    async def create_job(
+        self,
+        bulk_service: BulkUploadService,
+        entity_type: str,
+        filename: str,
+        local_path: str,
+        send_password_emails: bool = True,
+        gcs_path: Optional[str] = None,
+        gcs_bucket: Optional[str] = None,
+        created_by: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Record a job for the file at ``local_path`` and start it in the background.
+
+        The job owns ``local_path`` and removes it when it finishes. With
+        ``gcs_path`` the file is first downloaded from GCS to ``local_path``
+        by the job itself.
+
+        Raises ValueError for an unknown entity type.
+        """
+        if self.collection is None:
+            raise RuntimeError("Bulk upload jobs collection not configured")
+        if entity_type not in KEY_FIELDS:
+            raise ValueError(f"Unknown entity type: {entity_type}")
+
+        await self.cleanup_expired()
+
+        now = datetime.now(timezone.utc)
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "entity_type": entity_type,
+            "filename": filename,
+            "source": "gcs" if gcs_path else "upload",
+            "send_password_emails": send_password_emails,
+            "status": STATUS_QUEUED,
+            "progress": {"chunks": 0, "rows": 0, "successful": 0, "failed": 0},
+            "result": None,
+            "error": None,
+            "cancel_requested": False,
+            "created_by": created_by,
+            "created_at": now,
+            "updated_at": now,
+            "started_at": None,
+            "completed_at": None,
+            "expires_at": now + timedelta(hours=self.retention_hours),
+            **lease_fields(self.lease_seconds),
+        }
+        await self.collection.insert_one(dict(job))
+
+        job_id = job["job_id"]
+        task = asyncio.create_task(self._run(job, bulk_service, local_path, gcs_path, gcs_bucket))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+        return self._public(job)
+
+    async def _update(self, job_id: str, fields: Dict[str, Any]) -> None:
+        fields["updated_at"] = datetime.now(timezone.utc)
+        await self.collection.update_one({"job_id": job_id}, {"$set": fields})
+
+    @staticmethod
+    def _result_fields(result: BulkUploadResult) -> Dict[str, Any]:
+        """Progress counters and the (capped) partial result of a job."""
+        stored = result.to_dict()
+        stored["errors"] = result.errors[:MAX_STORED_ERRORS]
+        stored["errors_truncated"] = len(result.errors) > MAX_STORED_ERRORS
+        return {
+            "progress": {
+                "rows": result.total,
+                "successful": result.successful,
+                "failed": result.failed,
+            },
+            "result": stored,
+        }
+
+    async def _cancel_requested(self, job_id: str) -> bool:
+        job = await self.collection.find_one({"job_id": job_id}, {"cancel_requested": 1})
+        return bool(job and job.get("cancel_requested"))
+
+    async def _run(
+        self,
+        job: Dict[str, Any],
+        bulk_service: BulkUploadService,
+        local_path: str,
+        gcs_path: Optional[str],
+        gcs_bucket: Optional[str]
+    ) -> None:
+        job_id = job["job_id"]
+        chunks = 0
+
+        async def on_chunk(result: BulkUploadResult) -> None:
+            nonlocal chunks
+            chunks += 1
+            fields = self._result_fields(result)
+            fields["progress"]["chunks"] = chunks
+            await self._update(job_id, fields)
+            if await self._cancel_requested(job_id):
+                raise _CancelRequested()
+
+        try:
+            async with JobHeartbeat(self.collection, job_id, self.lease_seconds):
+                async with self._semaphore:
+                    if await self._cancel_requested(job_id):
+                        raise _CancelRequested()
+                    await self._update(job_id, {"status": STATUS_RUNNING, "started_at": datetime.now(timezone.utc)})
+
+                    if gcs_path:
+                        await self._download(gcs_path, gcs_bucket, local_path)
+                    result = await bulk_service.process_entity_file(
+                        job["entity_type"],
+                        local_path,
+                        job["filename"],
+                        job["send_password_emails"],
+                        on_chunk=on_chunk
+                    )
+
+            fields = self._result_fields(result)
+            fields["progress"]["chunks"] = chunks
+            fields.update({"status": STATUS_COMPLETED, "completed_at": datetime.now(timezone.utc)})
+            await self._update(job_id, fields)
+            logger.info(
+                f"Bulk upload job {job_id} completed: {result.successful} successful, {result.failed} failed"
+            )
+        except _CancelRequested:
+            logger.info(f"Bulk upload job {job_id} cancelled after {chunks} chunks")
+            await self._update(job_id, {"status": STATUS_CANCELLED, "completed_at": datetime.now(timezone.utc)})
+        except asyncio.CancelledError:
+            # Worker shutdown: the partial result stays on the job
+            await self._update(job_id, {
+                "status": STATUS_FAILED,
+                "error": "Upload interrupted",
+                "completed_at": datetime.now(timezone.utc),
+            })
+            raise
+        except Exception as e:
+            logger.error(f"Bulk upload job {job_id} failed: {e}")
+            await self._update(job_id, {
+                "status": STATUS_FAILED,
+                "error": str(e),
+                "completed_at": datetime.now(timezone.utc),
+            })
+        finally:
+            self._remove_local(local_path)
+
+    async def _download(self, gcs_path: str, gcs_bucket: Optional[str], local_path: str) -> None:
+        if self.gcs_service is None or not self.gcs_service.is_configured():
+            raise RuntimeError("GCS service not configured")
+        if not await self.gcs_service.download_to_path(gcs_path, local_path, gcs_bucket):
+            raise ValueError(f"File not found in GCS: {gcs_path}")
+
+    @staticmethod
+    def _remove_local(local_path: str) -> None:
+        try:
+            if os.path.exists(local_path):
+                os.remove(local_path)
+        except Exception as e:
+            logger.warning(f"Failed to remove bulk upload file {local_path}: {e}")
+
+    # --------------------------------------------------------------- queries
+
+    def _public(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """API view of a job document."""
+        job = {k: v for k, v in job.items() if k not in ("_id", "owner", "lease_expires_at")}
+        for key in ("created_at", "updated_at", "started_at", "completed_at", "expires_at"):
+            if isinstance(job.get(key), datetime):
+                job[key] = job[key].isoformat()
+        return job
+
+    async def _find(self, job_id: str) -> Optional[Dict[str, Any]]:
+        if self.collection is None:
+            return None
+        job = await self.collection.find_one({"job_id": job_id})
+        if job and lease_expired(job):
+            fields = {
+                "status": STATUS_FAILED,
+                "error": "Upload interrupted",
+                "updated_at": datetime.now(timezone.utc),
+            }
+            result = await self.collection.update_one(expired_lease_filter(job), {"$set": fields})
+            if result.matched_count:
+                job.update(fields)
+            else:
+                # The owner renewed the lease or finished meanwhile
+                job = await self.collection.find_one({"job_id": job_id})
+        return job
+
+    async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Status, progress and (partial) result of a job."""
+        job = await self._find(job_id)
+        return self._public(job) if job else None
+
+    async def list_jobs(self, created_by: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent jobs without their row errors, optionally only those of one user."""
+        if self.collection is None:
+            return []
+        query = {"created_by": created_by} if created_by else {}
+        cursor = self.collection.find(query, {"result.errors": 0}).sort("created_at", -1).limit(limit)
+        return [self._public(job) async for job in cursor]
+
+    async def cancel_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Request cancellation; a running job stops at its next chunk boundary.
+
+        Returns the job, or None when it does not exist. Finished jobs are
+        returned unchanged.
+        """
+        job = await self._find(job_id)
+        if not job:
+            return None
+        if job.get("status") not in FINISHED_STATUSES:
+            await self._update(job_id, {"cancel_requested": True})
+            job["cancel_requested"] = True
+        return self._public(job)
+
+    # --------------------------------------------------------------- cleanup
+
+    async def cleanup_expired(self) -> int:
+        """Delete finished jobs past their retention period."""
+        if self.collection is None:
+            return 0
+        try:
+            result = await self.collection.delete_many({
+                "expires_at": {"$lt": datetime.now(timezone.utc)},
+                "status": {"$in": list(FINISHED_STATUSES)},
+            })
+            return result.deleted_count
+        except Exception as e:
+            logger.warning(f"Bulk upload job cleanup failed: {e}")
+            return 0
+
+    async def shutdown(self) -> None:
+        """Stop running jobs; they are recorded as interrupted."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# Singleton instance holder
+_bulk_upload_job_service: Optional[BulkUploadJobService] = None
+
+
+def init_bulk_upload_job_service(
+    db: DatabaseManager,
+    gcs_service: Optional[GCSService] = None,
+    config: Optional[Dict[str, Any]] = None
+) -> BulkUploadJobService:
+    """Initialize the bulk upload job service."""
+    global _bulk_upload_job_service
+    _bulk_upload_job_service = BulkUploadJobService(db, gcs_service, config)
+    return _bulk_upload_job_service
+
+
+def get_bulk_upload_job_service() -> Optional[BulkUploadJobService]:
+    """Get the bulk upload job service instance."""
+    return _bulk_upload_job_service
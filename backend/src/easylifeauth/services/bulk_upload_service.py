@@ -1,17 +1,39 @@
 """
 Bulk upload service for processing CSV/Excel files.
+
+Each upload (or each chunk of one) is validated column-wise first
+(``upload_validation``), then the valid rows are written in chunks of ``BULK_UPLOAD_BATCH_SIZE``: the keys of
+a chunk are looked up with a single ``$in`` query and the chunk is written with
+one unordered ``bulk_write`` of upserts. Rows that fail validation or the
+write are reported individually in ``BulkUploadResult.errors``.
+
+``process_entity_file`` is the streaming mode for large files: the upload is
+read from disk ``BULK_UPLOAD_CHUNK_ROWS`` rows at a time and every chunk is
+validated and written before the next one is read.
 """
+import asyncio
+import os
 import pandas as pd
 from io import BytesIO
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Awaitable, BinaryIO, Callable, Iterator, Tuple, Union
 from datetime import datetime, timezone
 import logging
-import re
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 
 from ..db.db_manager import DatabaseManager
+from .dashboard_stats import invalidate_dashboard_stats
+from .entity_counters import mark_entity_counts_stale
+from .search_index import mark_search_index_stale
+from .password_hash_pool import run_password_hash
+from .upload_validation import KEY_FIELDS, validate_frame
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_CHUNK_ROWS = 10000
+
 
 class BulkUploadResult:
     """Result of a bulk upload operation."""
@@ -20,14 +42,21 @@ class BulkUploadResult:
         self.successful = successful
         self.failed = failed
         self.errors = errors or []
+        # Welcome emails handed to the email outbox (delivery is tracked there)
+        self.email_batch_id: Optional[str] = None
+        self.emails_queued = 0
 
     def to_dict(self) -> dict:
-        return {
+        data = {
             "total": self.total,
             "successful": self.successful,
             "failed": self.failed,
             "errors": self.errors
         }
+        if self.email_batch_id:
+            data["email_batch_id"] = self.email_batch_id
+            data["emails_queued"] = self.emails_queued
+        return data
 
 
 class BulkUploadService:
@@ -68,10 +97,31 @@ class BulkUploadService:
         "domain_scenarios": "domain_scenarios",
     }
 
-    def __init__(self, db: DatabaseManager, password_hasher=None, email_service=None):
+    # Extra field reported with each failed row
+    ERROR_LABEL_FIELDS = {
+        "users": "email",
+        "customers": "customerId",
+        "permissions": "key",
+    }
+
+    def __init__(
+        self,
+        db: DatabaseManager,
+        password_hasher=None,
+        email_service=None,
+        batch_size: Optional[int] = None,
+        chunk_rows: Optional[int] = None,
+        email_outbox=None
+    ):
         self.db = db
         self.password_hasher = password_hasher
         self.email_service = email_service
+        # When set, welcome emails are queued instead of sent inline
+        self.email_outbox = email_outbox
+        # Rows per prefetch query and bulk_write call
+        self.batch_size = batch_size or int(os.getenv("BULK_UPLOAD_BATCH_SIZE", str(DEFAULT_BATCH_SIZE)))
+        # Rows parsed and validated at a time by process_entity_file
+        self.chunk_rows = chunk_rows or int(os.getenv("BULK_UPLOAD_CHUNK_ROWS", str(DEFAULT_CHUNK_ROWS)))
 
     def validate_columns(self, df: pd.DataFrame, entity_type: str) -> List[str]:
         """Validate that DataFrame has required columns."""
@@ -102,388 +152,231 @@ class BulkUploadService:
         except Exception as e:
             raise ValueError(f"Failed to parse file: {str(e)}")
 
-    def _parse_list_field(self, value: Any) -> List[str]:
-        """Parse a list field from string or list."""
-        if pd.isna(value) or value == "":
-            return []
-        if isinstance(value, list):
-            return value
-        if isinstance(value, str):
-            return [item.strip() for item in value.split(",") if item.strip()]
-        return []
-
-    def _parse_bool_field(self, value: Any) -> bool:
-        """Parse a boolean field."""
-        if pd.isna(value):
-            return True
-        if isinstance(value, bool):
-            return value
-        if isinstance(value, str):
-            return value.lower() in ["true", "1", "yes", "active"]
-        return bool(value)
-
-    def _parse_int_field(self, value: Any, default: int = 0) -> int:
-        """Parse an integer field."""
-        if pd.isna(value):
-            return default
-        try:
-            return int(value)
-        except (ValueError, TypeError):
-            return default
-
-    def _validate_email(self, email: str) -> bool:
-        """Validate email format."""
-        pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        return bool(re.match(pattern, email))
-
     def _generate_temp_password(self) -> str:
         """Generate a temporary password."""
         import secrets
         return secrets.token_urlsafe(12)
 
+    def _record_error(
+        self,
+        result: BulkUploadResult,
+        entity_type: str,
+        row_num: int,
+        error: Any,
+        label: Any = None
+    ) -> None:
+        """Add a failed row to ``result``."""
+        result.failed += 1
+        entry = {"row": row_num, "error": str(error)}
+        label_field = self.ERROR_LABEL_FIELDS.get(entity_type)
+        if label_field:
+            entry[label_field] = "N/A" if label is None or pd.isna(label) else label
+        result.errors.append(entry)
+
+    async def _upsert_rows(
+        self,
+        entity_type: str,
+        df: pd.DataFrame,
+        on_insert: Optional[Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]] = None,
+        after_insert: Optional[Callable[[Dict[str, Any], int], Awaitable[None]]] = None
+    ) -> BulkUploadResult:
+        """Validate ``df`` and upsert its valid rows in chunks of ``batch_size``.
+
+        ``on_insert`` returns extra fields for documents that do not exist
+        yet (written with ``$setOnInsert``); ``after_insert`` runs for every
+        document the bulk write actually inserted.
+        """
+        result = BulkUploadResult(total=0, successful=0, failed=0, errors=[])
+        await self._process_frame(entity_type, df, result, {}, on_insert, after_insert)
+        return result
+
+    async def _process_frame(
+        self,
+        entity_type: str,
+        df: pd.DataFrame,
+        result: BulkUploadResult,
+        seen_keys: Dict[Any, int],
+        on_insert: Optional[Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]] = None,
+        after_insert: Optional[Callable[[Dict[str, Any], int], Awaitable[None]]] = None
+    ) -> None:
+        """Validate one frame of an upload and write its valid rows into ``result``."""
+        result.total += len(df)
+        failed_before = result.failed
+
+        validation = validate_frame(entity_type, df, seen_keys)
+        label_field = self.ERROR_LABEL_FIELDS.get(entity_type)
+        labels = df[label_field].astype(object) if label_field in df.columns else pd.Series(None, index=df.index)
+        for idx, message in validation.errors[validation.error_mask].items():
+            self._record_error(result, entity_type, idx + 2, message, labels[idx])
+        if result.failed > failed_before:
+            logger.warning(
+                f"Bulk upload {entity_type}: {result.failed - failed_before} of {len(df)} rows failed validation"
+            )
+
+        rows = list(zip(validation.row_numbers, validation.documents()))
+        for start in range(0, len(rows), self.batch_size):
+            await self._upsert_chunk(entity_type, rows[start:start + self.batch_size], result, on_insert, after_insert)
+        result.errors.sort(key=lambda error: error["row"])
+
+    async def _upsert_chunk(
+        self,
+        entity_type: str,
+        rows: List[Tuple[int, Dict[str, Any]]],
+        result: BulkUploadResult,
+        on_insert: Optional[Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]],
+        after_insert: Optional[Callable[[Dict[str, Any], int], Awaitable[None]]]
+    ) -> None:
+        """Upsert validated ``(row number, document)`` pairs with one bulk write."""
+        key_field = KEY_FIELDS[entity_type]
+        label_field = self.ERROR_LABEL_FIELDS.get(entity_type)
+        collection = getattr(self.db, self.COLLECTION_MAP[entity_type])
+
+        # One query for the keys of the whole chunk instead of a find_one per row
+        existing = set()
+        keys = [document[key_field] for _, document in rows]
+        async for doc in collection.find({key_field: {"$in": keys}}, {key_field: 1, "_id": 0}):
+            existing.add(doc.get(key_field))
+
+        now = datetime.now(timezone.utc)
+        operations: List[UpdateOne] = []
+        written: List[Tuple[int, Dict[str, Any]]] = []
+        for row_num, document in rows:
+            document["updated_at"] = now
+            update: Dict[str, Any] = {"$set": document}
+            if document[key_field] not in existing:
+                try:
+                    insert_fields = {"created_at": now}
+                    if on_insert:
+                        insert_fields.update(await on_insert(document))
+                except Exception as e:
+                    self._record_error(result, entity_type, row_num, e, document.get(label_field))
+                    logger.error(f"Failed to process {entity_type} at row {row_num}: {e}")
+                    continue
+                update["$setOnInsert"] = insert_fields
+            operations.append(UpdateOne({key_field: document[key_field]}, update, upsert=True))
+            written.append((row_num, document))
+
+        if not operations:
+            return
+
+        write_errors: Dict[int, str] = {}
+        try:
+            write_result = await collection.bulk_write(operations, ordered=False)
+            upserted = set(write_result.upserted_ids or {})
+        except BulkWriteError as e:
+            # Unordered: the other operations were still applied
+            write_errors = {err["index"]: err.get("errmsg", "Write failed") for err in e.details.get("writeErrors", [])}
+            upserted = {item["index"] for item in e.details.get("upserted", [])}
+        except Exception as e:
+            write_errors = {index: str(e) for index in range(len(operations))}
+            upserted = set()
+        invalidate_dashboard_stats()
+        await mark_entity_counts_stale(entity_type)
+        await mark_search_index_stale(entity_type)
+
+        for index, (row_num, document) in enumerate(written):
+            if index in write_errors:
+                self._record_error(result, entity_type, row_num, write_errors[index], document.get(label_field))
+                logger.error(f"Failed to process {entity_type} at row {row_num}: {write_errors[index]}")
+                continue
+            result.successful += 1
+            if index in upserted and after_insert:
+                await after_insert(document, row_num)
+
+        logger.info(
+            f"Bulk upload {entity_type}: wrote {len(operations) - len(write_errors)} "
+            f"of {len(operations)} documents"
+        )
+
+    def _insert_hooks(
+        self,
+        entity_type: str,
+        send_password_emails: bool = True,
+        result: Optional[BulkUploadResult] = None
+    ) -> Tuple[Optional[Callable[..., Awaitable[Any]]], Optional[Callable[..., Awaitable[Any]]]]:
+        """``(on_insert, after_insert)`` callbacks for new documents of ``entity_type``.
+
+        With an email outbox, welcome emails are queued under one batch per
+        upload, recorded on ``result``.
+        """
+        if entity_type != "users":
+            return None, None
+
+        temp_passwords: Dict[str, str] = {}
+        if result is None:
+            result = BulkUploadResult()
+
+        async def on_insert(user_data: Dict[str, Any]) -> Dict[str, Any]:
+            temp_password = self._generate_temp_password()
+            temp_passwords[user_data["email"]] = temp_password
+            if self.password_hasher:
+                password_hash = await run_password_hash(self.password_hasher, temp_password)
+            else:
+                # Fallback - should not happen in production
+                import hashlib
+                password_hash = hashlib.sha256(temp_password.encode()).hexdigest()
+            return {"password_hash": password_hash, "is_super_admin": False, "last_login": None}
+
+        async def after_insert(user_data: Dict[str, Any], row_num: int) -> None:
+            email = user_data["email"]
+            temp_password = temp_passwords.pop(email)
+            if send_password_emails and self.email_service and self.email_outbox:
+                if result.email_batch_id is None:
+                    result.email_batch_id = self.email_outbox.new_batch()
+                self.email_outbox.enqueue(
+                    self.email_service.welcome_message(email, user_data["full_name"], temp_password),
+                    result.email_batch_id
+                )
+                result.emails_queued += 1
+                logger.info(f"Row {row_num}: Created user {email} and queued welcome email")
+            # Send welcome email
+            elif send_password_emails and self.email_service:
+                try:
+                    await self.email_service.send_welcome_email(
+                        email, user_data["full_name"], temp_password
+                    )
+                    logger.info(f"Row {row_num}: Created user {email} and sent welcome email")
+                except Exception as email_error:
+                    logger.warning(f"Row {row_num}: Created user {email} but failed to send email: {email_error}")
+            else:
+                logger.info(f"Row {row_num}: Created user {email} without sending email")
+
+        return on_insert, after_insert
+
     async def process_users(
         self,
         df: pd.DataFrame,
         send_password_emails: bool = True
     ) -> BulkUploadResult:
         """Process bulk user upload."""
-        result = BulkUploadResult(total=len(df), successful=0, failed=0, errors=[])
-
-        for idx, row in df.iterrows():
-            row_num = idx + 2  # Excel row number (1-indexed + header)
-            try:
-                # Validate required fields
-                email = str(row.get("email", "")).strip()
-                if not email:
-                    raise ValueError("Email is required")
-
-                if not self._validate_email(email):
-                    raise ValueError(f"Invalid email format: {email}")
-
-                # Check if user exists
-                existing = await self.db.users.find_one({"email": email})
-
-                temp_password = self._generate_temp_password()
-                user_data = {
-                    "email": email,
-                    "username": str(row.get("username", email.split("@")[0])).strip(),
-                    "full_name": str(row.get("full_name", "")).strip(),
-                    "roles": self._parse_list_field(row.get("roles")),
-                    "groups": self._parse_list_field(row.get("groups")),
-                    "customers": self._parse_list_field(row.get("customers")),
-                    "is_active": self._parse_bool_field(row.get("is_active", True)),
-                    "updated_at": datetime.now(timezone.utc),
-                }
-
-                # Validate username doesn't contain special characters
-                if user_data["username"] and not user_data["username"].replace("_", "").replace("-", "").isalnum():
-                    raise ValueError("Username can only contain letters, numbers, hyphens, and underscores")
-
-                if existing:
-                    # Update existing user
-                    await self.db.users.update_one(
-                        {"email": email},
-                        {"$set": user_data}
-                    )
-                    logger.info(f"Row {row_num}: Updated existing user {email}")
-                else:
-                    # Create new user
-                    if self.password_hasher:
-                        user_data["password_hash"] = self.password_hasher(temp_password)
-                    else:
-                        # Fallback - should not happen in production
-                        import hashlib
-                        user_data["password_hash"] = hashlib.sha256(temp_password.encode()).hexdigest()
-
-                    user_data["created_at"] = datetime.now(timezone.utc)
-                    user_data["is_super_admin"] = False
-                    user_data["last_login"] = None
-                    await self.db.users.insert_one(user_data)
-
-                    # Send welcome email
-                    if send_password_emails and self.email_service:
-                        try:
-                            await self.email_service.send_welcome_email(
-                                email, user_data["full_name"], temp_password
-                            )
-                            logger.info(f"Row {row_num}: Created user {email} and sent welcome email")
-                        except Exception as email_error:
-                            logger.warning(f"Row {row_num}: Created user {email} but failed to send email: {email_error}")
-                    else:
-                        logger.info(f"Row {row_num}: Created user {email} without sending email")
-
-                result.successful += 1
-            except Exception as e:
-                result.failed += 1
-                error_msg = f"Row {row_num}: {str(e)}"
-                result.errors.append({"row": row_num, "error": str(e), "email": row.get("email", "N/A")})
-                logger.error(f"Failed to process user at {error_msg}")
-
+        result = BulkUploadResult(total=0, successful=0, failed=0, errors=[])
+        on_insert, after_insert = self._insert_hooks("users", send_password_emails, result)
+        await self._process_frame("users", df, result, {}, on_insert, after_insert)
         return result
 
     async def process_roles(self, df: pd.DataFrame) -> BulkUploadResult:
         """Process bulk role upload."""
-        result = BulkUploadResult(total=len(df), successful=0, failed=0, errors=[])
-
-        for idx, row in df.iterrows():
-            try:
-                role_id = str(row.get("roleId", "")).strip()
-                if not role_id:
-                    raise ValueError("roleId is required")
-
-                existing = await self.db.roles.find_one({"roleId": role_id})
-
-                role_data = {
-                    "roleId": role_id,
-                    "name": str(row.get("name", "")).strip(),
-                    "description": str(row.get("description", "")).strip() if pd.notna(row.get("description")) else None,
-                    "permissions": self._parse_list_field(row.get("permissions")),
-                    "domains": self._parse_list_field(row.get("domains")),
-                    "status": str(row.get("status", "active")).lower(),
-                    "priority": self._parse_int_field(row.get("priority")),
-                    "type": str(row.get("type", "custom")).lower(),
-                    "updated_at": datetime.now(timezone.utc),
-                }
-
-                if existing:
-                    await self.db.roles.update_one(
-                        {"roleId": role_id},
-                        {"$set": role_data}
-                    )
-                else:
-                    role_data["created_at"] = datetime.now(timezone.utc)
-                    await self.db.roles.insert_one(role_data)
-
-                result.successful += 1
-            except Exception as e:
-                result.failed += 1
-                result.errors.append({"row": idx + 2, "error": str(e)})
-                logger.error(f"Failed to process role at row {idx + 2}: {e}")
-
-        return result
+        return await self._upsert_rows("roles", df)
 
     async def process_groups(self, df: pd.DataFrame) -> BulkUploadResult:
         """Process bulk group upload."""
-        result = BulkUploadResult(total=len(df), successful=0, failed=0, errors=[])
-
-        for idx, row in df.iterrows():
-            try:
-                group_id = str(row.get("groupId", "")).strip()
-                if not group_id:
-                    raise ValueError("groupId is required")
-
-                existing = await self.db.groups.find_one({"groupId": group_id})
-
-                group_data = {
-                    "groupId": group_id,
-                    "name": str(row.get("name", "")).strip(),
-                    "description": str(row.get("description", "")).strip() if pd.notna(row.get("description")) else None,
-                    "permissions": self._parse_list_field(row.get("permissions")),
-                    "domains": self._parse_list_field(row.get("domains")),
-                    "status": str(row.get("status", "active")).lower(),
-                    "priority": self._parse_int_field(row.get("priority")),
-                    "type": str(row.get("type", "custom")).lower(),
-                    "updated_at": datetime.now(timezone.utc),
-                }
-
-                if existing:
-                    await self.db.groups.update_one(
-                        {"groupId": group_id},
-                        {"$set": group_data}
-                    )
-                else:
-                    group_data["created_at"] = datetime.now(timezone.utc)
-                    await self.db.groups.insert_one(group_data)
-
-                result.successful += 1
-            except Exception as e:
-                result.failed += 1
-                result.errors.append({"row": idx + 2, "error": str(e)})
-                logger.error(f"Failed to process group at row {idx + 2}: {e}")
-
-        return result
+        return await self._upsert_rows("groups", df)
 
     async def process_domains(self, df: pd.DataFrame) -> BulkUploadResult:
         """Process bulk domain upload."""
-        result = BulkUploadResult(total=len(df), successful=0, failed=0, errors=[])
-
-        for idx, row in df.iterrows():
-            try:
-                key = str(row.get("key", "")).strip()
-                if not key:
-                    raise ValueError("key is required")
-
-                existing = await self.db.domains.find_one({"key": key})
-
-                domain_data = {
-                    "key": key,
-                    "name": str(row.get("name", "")).strip(),
-                    "description": str(row.get("description", "")).strip() if pd.notna(row.get("description")) else None,
-                    "path": str(row.get("path", "")).strip(),
-                    "dataDomain": str(row.get("dataDomain", "")).strip() if pd.notna(row.get("dataDomain")) else None,
-                    "status": str(row.get("status", "active")).lower(),
-                    "defaultSelected": self._parse_bool_field(row.get("defaultSelected", False)),
-                    "order": self._parse_int_field(row.get("order")),
-                    "icon": str(row.get("icon", "")).strip() if pd.notna(row.get("icon")) else None,
-                    "type": str(row.get("type", "custom")).lower(),
-                    "subDomains": [],
-                    "updated_at": datetime.now(timezone.utc),
-                }
-
-                if existing:
-                    await self.db.domains.update_one(
-                        {"key": key},
-                        {"$set": domain_data}
-                    )
-                else:
-                    domain_data["created_at"] = datetime.now(timezone.utc)
-                    await self.db.domains.insert_one(domain_data)
-
-                result.successful += 1
-            except Exception as e:
-                result.failed += 1
-                result.errors.append({"row": idx + 2, "error": str(e)})
-                logger.error(f"Failed to process domain at row {idx + 2}: {e}")
-
-        return result
+        return await self._upsert_rows("domains", df)
 
     async def process_domain_scenarios(self, df: pd.DataFrame) -> BulkUploadResult:
         """Process bulk domain scenario upload."""
-        result = BulkUploadResult(total=len(df), successful=0, failed=0, errors=[])
-
-        for idx, row in df.iterrows():
-            try:
-                key = str(row.get("key", "")).strip()
-                if not key:
-                    raise ValueError("key is required")
-
-                existing = await self.db.domain_scenarios.find_one({"key": key})
-
-                scenario_data = {
-                    "key": key,
-                    "name": str(row.get("name", "")).strip(),
-                    "description": str(row.get("description", "")).strip() if pd.notna(row.get("description")) else None,
-                    "path": str(row.get("path", "")).strip(),
-                    "dataDomain": str(row.get("dataDomain", "")).strip() if pd.notna(row.get("dataDomain")) else None,
-                    "status": str(row.get("status", "active")).lower(),
-                    "defaultSelected": self._parse_bool_field(row.get("defaultSelected", False)),
-                    "order": self._parse_int_field(row.get("order")),
-                    "icon": str(row.get("icon", "")).strip() if pd.notna(row.get("icon")) else None,
-                    "type": str(row.get("type", "custom")).lower(),
-                    "domainKey": str(row.get("domainKey", "")).strip(),
-                    "subDomains": [],
-                    "updated_at": datetime.now(timezone.utc),
-                }
-
-                if existing:
-                    await self.db.domain_scenarios.update_one(
-                        {"key": key},
-                        {"$set": scenario_data}
-                    )
-                else:
-                    scenario_data["created_at"] = datetime.now(timezone.utc)
-                    await self.db.domain_scenarios.insert_one(scenario_data)
-
-                result.successful += 1
-            except Exception as e:
-                result.failed += 1
-                result.errors.append({"row": idx + 2, "error": str(e)})
-                logger.error(f"Failed to process domain scenario at row {idx + 2}: {e}")
-
-        return result
+        return await self._upsert_rows("domain_scenarios", df)
 
     async def process_customers(self, df: pd.DataFrame) -> BulkUploadResult:
         """Process bulk customer upload."""
-        result = BulkUploadResult(total=len(df), successful=0, failed=0, errors=[])
-
-        for idx, row in df.iterrows():
-            try:
-                customer_id = str(row.get("customerId", "")).strip()
-                if not customer_id:
-                    raise ValueError("customerId is required")
-
-                name = str(row.get("name", "")).strip()
-                if not name:
-                    raise ValueError("name is required")
-
-                existing = await self.db.customers.find_one({"customerId": customer_id})
-
-                customer_data = {
-                    "customerId": customer_id,
-                    "name": name,
-                    "description": str(row.get("description", "")).strip() if pd.notna(row.get("description")) else None,
-                    "status": str(row.get("status", "active")).lower(),
-                    "tags": self._parse_list_field(row.get("tags")),
-                    "unit": str(row.get("unit", "")).strip() if pd.notna(row.get("unit")) else None,
-                    "sales": str(row.get("sales", "")).strip() if pd.notna(row.get("sales")) else None,
-                    "division": str(row.get("division", "")).strip() if pd.notna(row.get("division")) else None,
-                    "channel": str(row.get("channel", "")).strip() if pd.notna(row.get("channel")) else None,
-                    "location": str(row.get("location", "")).strip() if pd.notna(row.get("location")) else None,
-                    "updated_at": datetime.now(timezone.utc),
-                }
-
-                if existing:
-                    await self.db.customers.update_one(
-                        {"customerId": customer_id},
-                        {"$set": customer_data}
-                    )
-                else:
-                    customer_data["created_at"] = datetime.now(timezone.utc)
-                    await self.db.customers.insert_one(customer_data)
-
-                result.successful += 1
-            except Exception as e:
-                result.failed += 1
-                result.errors.append({"row": idx + 2, "error": str(e), "customerId": row.get("customerId", "N/A")})
-                logger.error(f"Failed to process customer at row {idx + 2}: {e}")
-
-        return result
+        return await self._upsert_rows("customers", df)
 
     async def process_permissions(self, df: pd.DataFrame) -> BulkUploadResult:
         """Process bulk permission upload."""
-        result = BulkUploadResult(total=len(df), successful=0, failed=0, errors=[])
-
-        for idx, row in df.iterrows():
-            try:
-                key = str(row.get("key", "")).strip()
-                if not key:
-                    raise ValueError("key is required")
-
-                name = str(row.get("name", "")).strip()
-                if not name:
-                    raise ValueError("name is required")
-
-                module = str(row.get("module", "")).strip()
-                if not module:
-                    raise ValueError("module is required")
-
-                existing = await self.db.permissions.find_one({"key": key})
-
-                permission_data = {
-                    "key": key,
-                    "name": name,
-                    "description": str(row.get("description", "")).strip() if pd.notna(row.get("description")) else None,
-                    "module": module,
-                    "actions": self._parse_list_field(row.get("actions")),
-                    "updated_at": datetime.now(timezone.utc),
-                }
-
-                if existing:
-                    await self.db.permissions.update_one(
-                        {"key": key},
-                        {"$set": permission_data}
-                    )
-                else:
-                    permission_data["created_at"] = datetime.now(timezone.utc)
-                    await self.db.permissions.insert_one(permission_data)
-
-                result.successful += 1
-            except Exception as e:
-                result.failed += 1
-                result.errors.append({"row": idx + 2, "error": str(e), "key": row.get("key", "N/A")})
-                logger.error(f"Failed to process permission at row {idx + 2}: {e}")
-
-        return result
+        return await self._upsert_rows("permissions", df)
 
     async def process_entity(
         self,
@@ -528,9 +421,122 @@ class BulkUploadService:
 
         return result
 
+    def iter_file_chunks(
+        self,
+        source: Union[str, BinaryIO],
+        filename: str,
+        chunk_rows: Optional[int] = None
+    ) -> Iterator[pd.DataFrame]:
+        """Read an upload in DataFrames of at most ``chunk_rows`` rows.
+
+        CSV is read with pandas' chunked reader and XLSX with openpyxl's
+        read-only row iterator, so only one chunk is in memory at a time.
+        Legacy XLS has no streaming reader and is loaded whole. The index
+        continues across chunks, so ``index + 2`` is still the file row. The
+        first chunk is always yielded (possibly empty) to expose the columns.
+        """
+        file_ext = "." + filename.split(".")[-1].lower()
+        if file_ext not in self.SUPPORTED_FORMATS:
+            raise ValueError(f"Unsupported file format: {file_ext}")
+        chunk_rows = chunk_rows or self.chunk_rows
+
+        try:
+            if file_ext == ".csv":
+                frames = pd.read_csv(source, chunksize=chunk_rows)
+            elif file_ext == ".xlsx":
+                frames = _iter_xlsx_frames(source, chunk_rows)
+            else:
+                df = pd.read_excel(source)
+                frames = (df.iloc[start:start + chunk_rows] for start in range(0, max(len(df), 1), chunk_rows))
+
+            for df in frames:
+                # Remove completely empty rows
+                df = df.dropna(how='all')
+                # Strip whitespace from column names
+                df.columns = df.columns.astype(str).str.strip()
+                yield df
+        except Exception as e:
+            raise ValueError(f"Failed to parse file: {str(e)}")
+
+    async def process_entity_file(
+        self,
+        entity_type: str,
+        source: Union[str, BinaryIO],
+        filename: str,
+        send_password_emails: bool = True,
+        on_chunk: Optional[Callable[[BulkUploadResult], Awaitable[None]]] = None
+    ) -> BulkUploadResult:
+        """Process a bulk upload chunk by chunk (validate, then upsert each chunk).
+
+        ``source`` is a path or binary file object; parsing runs in a worker
+        thread so the event loop is not blocked while a chunk is read.
+        ``on_chunk`` is awaited with the running result after every chunk;
+        an exception it raises stops the upload.
+        """
+        if entity_type not in KEY_FIELDS:
+            raise ValueError(f"Unknown entity type: {entity_type}")
+
+        frames = self.iter_file_chunks(source, filename)
+        result = BulkUploadResult(total=0, successful=0, failed=0, errors=[])
+        on_insert, after_insert = self._insert_hooks(entity_type, send_password_emails, result)
+        seen_keys: Dict[Any, int] = {}
+        loop = asyncio.get_running_loop()
+
+        logger.info(f"Starting chunked bulk upload for {entity_type}: {filename}")
+        first = True
+        while True:
+            df = await loop.run_in_executor(None, next, frames, None)
+            if df is None:
+                break
+            if first:
+                # Validate required columns before anything is written
+                missing_fields = self.validate_columns(df, entity_type)
+                if missing_fields:
+                    raise ValueError(f"Missing required columns: {', '.join(missing_fields)}")
+                first = False
+            await self._process_frame(entity_type, df, result, seen_keys, on_insert, after_insert)
+            if on_chunk:
+                await on_chunk(result)
+
+        # Validate file is not empty
+        if result.total == 0:
+            raise ValueError("File is empty or contains no valid data rows")
+
+        logger.info(f"Bulk upload completed for {entity_type}: {result.successful} successful, {result.failed} failed")
+        return result
+
     def get_template(self, entity_type: str) -> pd.DataFrame:
         """Get template DataFrame for an entity type."""
         if entity_type not in self.ENTITY_FIELDS:
             raise ValueError(f"Unknown entity type: {entity_type}")
 
         return pd.DataFrame(columns=self.ENTITY_FIELDS[entity_type])
+
+
+def _iter_xlsx_frames(source: Union[str, BinaryIO], chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """Stream the first worksheet of an XLSX file as DataFrames."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            yield pd.DataFrame()
+            return
+        columns = ["" if value is None else str(value) for value in header]
+
+        start = 0
+        chunk: List[tuple] = []
+        yielded = False
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_rows:
+                yield pd.DataFrame(chunk, columns=columns, index=range(start, start + len(chunk)))
+                start += len(chunk)
+                chunk = []
+                yielded = True
+        if chunk or not yielded:
+            yield pd.DataFrame(chunk, columns=columns, index=range(start, start + len(chunk)))
+    finally:
+        workbook.close()
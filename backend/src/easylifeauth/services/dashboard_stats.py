@@ -0,0 +1,217 @@
+"""
+Entity counts for the dashboard.
+
+Every dashboard load used to issue about thirty sequential ``count_documents``
+calls. The counts are now computed with one aggregation per collection (a
+``$facet`` of the status counts, or a ``$group`` for per-type/per-module
+breakdowns), and all collections are aggregated concurrently. When the entity
+counters are enabled (see ``entity_counters``) they are read instead, which
+replaces the aggregations with a single read of the counters collection.
+
+The result is kept in a short-lived cache (``DASHBOARD_CACHE_TTL_SECONDS``)
+shared by the dashboard endpoints. Write endpoints of the counted entities
+invalidate it (see ``api.dependencies.invalidate_read_caches_on_write``). The
+cache is per process, so other workers may serve stale counts for up to the
+TTL, as they do for writes made outside those routes.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from ..db.db_manager import DatabaseManager
+from .entity_counters import NONE_BUCKET, entity_counters_for
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ["A", "active"]
+INACTIVE_STATUSES = ["I", "inactive"]
+CONFIGURATION_TYPES = ["process-config", "lookup-data", "gcs-data", "snapshot-data"]
+
+# Collections whose documents carry a status field
+STATUS_COLLECTIONS = ["roles", "groups", "customers", "domains", "domain_scenarios", "playboards"]
+OPTIONAL_COLLECTIONS = {"customers", "configurations", "permissions"}
+
+
+def _count_facet(query: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"$match": query}, {"$count": "count"}]
+
+
+def _facet_count(facet: List[Dict[str, Any]]) -> int:
+    return facet[0]["count"] if facet else 0
+
+
+def _group_counts(groups: List[Dict[str, Any]]) -> Dict[str, int]:
+    return {group["_id"]: group["count"] for group in groups if group.get("_id") is not None}
+
+
+def _status_pipeline(active: Dict[str, Any], inactive: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"$facet": {
+        "total": [{"$count": "count"}],
+        "active": _count_facet(active),
+        "inactive": _count_facet(inactive),
+    }}]
+
+
+def _breakdown_pipeline(field: str) -> List[Dict[str, Any]]:
+    return [{"$facet": {
+        "total": [{"$count": "count"}],
+        "by_value": [{"$group": {"_id": f"${field}", "count": {"$sum": 1}}}],
+    }}]
+
+
+def _collection(db: DatabaseManager, name: str):
+    collection = getattr(db, name, None)
+    if collection is None and name not in OPTIONAL_COLLECTIONS:
+        raise RuntimeError(f"Collection {name} not configured")
+    return collection
+
+
+async def _aggregate_one(collection, pipeline: List[Dict[str, Any]]) -> Dict[str, Any]:
+    results = await collection.aggregate(pipeline).to_list(1)
+    return results[0] if results else {}
+
+
+async def _status_counts(db: DatabaseManager, name: str) -> Dict[str, int]:
+    collection = _collection(db, name)
+    if collection is None:
+        return {"total": 0, "active": 0, "inactive": 0}
+    if name == "users":
+        pipeline = _status_pipeline({"is_active": True}, {"is_active": False})
+    else:
+        pipeline = _status_pipeline(
+            {"status": {"$in": ACTIVE_STATUSES}},
+            {"status": {"$in": INACTIVE_STATUSES}}
+        )
+    facets = await _aggregate_one(collection, pipeline)
+    return {key: _facet_count(facets.get(key, [])) for key in ("total", "active", "inactive")}
+
+
+async def _breakdown_counts(db: DatabaseManager, name: str, field: str) -> Dict[str, Any]:
+    collection = _collection(db, name)
+    if collection is None:
+        return {"total": 0, "by_value": {}}
+    facets = await _aggregate_one(collection, _breakdown_pipeline(field))
+    return {
+        "total": _facet_count(facets.get("total", [])),
+        "by_value": _group_counts(facets.get("by_value", [])),
+    }
+
+
+def _sum_buckets(by: Dict[str, int], values: List[str]) -> int:
+    return sum(by.get(value, 0) for value in values)
+
+
+async def _counts_from_counters(counters) -> Dict[str, Any]:
+    all_counts = await counters.get_all_counts(["users"] + STATUS_COLLECTIONS + ["configurations", "permissions"])
+    users = all_counts.pop("users")
+    counts = {"users": {
+        "total": users["total"],
+        "active": users["by"].get("true", 0),
+        "inactive": users["by"].get("false", 0),
+    }}
+    for name in STATUS_COLLECTIONS:
+        entity = all_counts[name]
+        counts[name] = {
+            "total": entity["total"],
+            "active": _sum_buckets(entity["by"], ACTIVE_STATUSES),
+            "inactive": _sum_buckets(entity["by"], INACTIVE_STATUSES),
+        }
+    configurations, permissions = all_counts["configurations"], all_counts["permissions"]
+    counts["configurations"] = {
+        "total": configurations["total"],
+        "by_type": {t: configurations["by"].get(t, 0) for t in CONFIGURATION_TYPES},
+    }
+    by_module = {module: n for module, n in permissions["by"].items() if module != NONE_BUCKET}
+    counts["permissions"] = {"total": permissions["total"], "by_module": by_module}
+    return counts
+
+
+async def compute_dashboard_counts(db: DatabaseManager) -> Dict[str, Any]:
+    """Counts per collection, from the entity counters or one aggregation per collection.
+
+    Returns ``{"users": {"total", "active", "inactive"}, ...}`` for users and
+    the status collections, plus ``configurations`` by type and
+    ``permissions`` by module.
+    """
+    counters = entity_counters_for(db)
+    if counters is not None:
+        return await _counts_from_counters(counters)
+
+    names = ["users"] + STATUS_COLLECTIONS
+    results = await asyncio.gather(
+        *(_status_counts(db, name) for name in names),
+        _breakdown_counts(db, "configurations", "type"),
+        _breakdown_counts(db, "permissions", "module"),
+    )
+    counts = dict(zip(names, results))
+    configurations, permissions = results[len(names):]
+    counts["configurations"] = {
+        "total": configurations["total"],
+        "by_type": {t: configurations["by_value"].get(t, 0) for t in CONFIGURATION_TYPES},
+    }
+    counts["permissions"] = {"total": permissions["total"], "by_module": permissions["by_value"]}
+    return counts
+
+
+class DashboardStatsCache:
+    """Short-lived cache of the dashboard counts, shared by all dashboard endpoints."""
+
+    def __init__(self, ttl_seconds: Optional[float] = None):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(
+            os.getenv("DASHBOARD_CACHE_TTL_SECONDS", "30")
+        )
+        self._db: Optional[DatabaseManager] = None
+        self._value: Optional[Dict[str, Any]] = None
+        self._expires_at = 0.0
+        # Bumped by invalidate(), so a computation that started before a write is not stored
+        self._generation = 0
+        self._lock: Optional[asyncio.Lock] = None
+
+        self.hits = 0
+        self.misses = 0
+
+    def _fresh(self, db: DatabaseManager) -> bool:
+        return self._value is not None and self._db is db and time.monotonic() < self._expires_at
+
+    async def get(self, db: DatabaseManager) -> Dict[str, Any]:
+        """Cached counts for ``db``; concurrent misses share one computation."""
+        if self._fresh(db):
+            self.hits += 1
+            return self._value
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._fresh(db):
+                self.hits += 1
+                return self._value
+            self.misses += 1
+            generation = self._generation
+            value = await compute_dashboard_counts(db)
+            if self.ttl_seconds > 0 and generation == self._generation:
+                self._db, self._value = db, value
+                self._expires_at = time.monotonic() + self.ttl_seconds
+            return value
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._value = None
+
+
+# Singleton instance holder
+_dashboard_stats_cache: Optional[DashboardStatsCache] = None
+
+
+def get_dashboard_stats_cache() -> DashboardStatsCache:
+    """Get the dashboard stats cache, creating it from env defaults if needed."""
+    global _dashboard_stats_cache
+    if _dashboard_stats_cache is None:
+        _dashboard_stats_cache = DashboardStatsCache()
+    return _dashboard_stats_cache
+
+
+def invalidate_dashboard_stats() -> None:
+    """Drop the cached dashboard counts after a write to a counted collection."""
+    if _dashboard_stats_cache is not None:
+        _dashboard_stats_cache.invalidate()
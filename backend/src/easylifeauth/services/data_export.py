@@ -0,0 +1,309 @@
+"""Streaming export of MongoDB documents to CSV, JSON and NDJSON.
+
+Documents are read from the Motor cursor in batches of ``EXPORT_BATCH_SIZE``
+and every batch is encoded and yielded as one chunk, so memory is bounded by
+the batch size instead of the size of the collection.
+
+Each exportable entity is described once in ``EXPORT_ENTITIES``. Field
+selection is pushed down to MongoDB as a projection: by default the entity's
+``excluded_fields`` (never exported) and ``optional_fields`` (large values
+only sent when asked for) are projected out; a caller-supplied field list
+becomes an inclusion projection.
+
+CSV needs its header before the first row. The columns come from a sample pass
+over the first ``EXPORT_CSV_SAMPLE_SIZE`` documents (the union of their
+flattened keys). When the export is larger than the sample, the header also
+gets a ``CSV_OVERFLOW_COLUMN``: keys that only appear after the sample are
+written there as a JSON object, so no value is dropped.
+"""
+import csv
+import io
+import json
+import os
+import re
+from collections import deque
+from datetime import datetime
+from typing import Any, AsyncIterator, Deque, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_CSV_SAMPLE_SIZE = 1000
+# CSV column holding the keys missing from the sampled header
+CSV_OVERFLOW_COLUMN = "_extra_fields"
+
+# format -> (media type, file extension)
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "json": ("application/json", "json"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+}
+
+
+# Dotted document paths; rejects operators ("$...") and empty segments
+_FIELD_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z0-9_]+)*$")
+
+
+class ExportEntity(NamedTuple):
+    """An exportable collection and its field policy."""
+    collection: str
+    filename_prefix: str
+    # Never exported, even when requested
+    excluded_fields: Tuple[str, ...] = ()
+    # Left out unless requested with ``fields``
+    optional_fields: Tuple[str, ...] = ()
+
+
+EXPORT_ENTITIES: Dict[str, ExportEntity] = {
+    "users": ExportEntity("users", "users", excluded_fields=("password_hash",)),
+    "roles": ExportEntity("roles", "roles"),
+    "groups": ExportEntity("groups", "groups"),
+    "domains": ExportEntity("domains", "domains"),
+    "scenarios": ExportEntity("domain_scenarios", "scenarios"),
+    "activity_logs": ExportEntity(
+        "activity_logs", "activity_logs",
+        optional_fields=("details", "old_values", "new_values"),
+    ),
+}
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Split a comma-separated field list; None when no fields are given."""
+    if not fields:
+        return None
+    parsed = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    return parsed or None
+
+
+def _covers(parent: str, field: str) -> bool:
+    return field == parent or field.startswith(parent + ".")
+
+
+def build_projection(
+    entity: ExportEntity, fields: Optional[Sequence[str]] = None
+) -> Optional[Dict[str, int]]:
+    """MongoDB projection for exporting ``fields`` of ``entity``.
+
+    Raises ValueError for malformed or excluded fields.
+    """
+    if not fields:
+        hidden = entity.excluded_fields + entity.optional_fields
+        return {field: 0 for field in hidden} or None
+
+    for field in fields:
+        if not _FIELD_PATTERN.match(field):
+            raise ValueError(f"Invalid field name: {field}")
+        if any(_covers(excluded, field) or _covers(field, excluded) for excluded in entity.excluded_fields):
+            raise ValueError(f"Field cannot be exported: {field}")
+
+    # A parent path already includes its children (and MongoDB rejects both)
+    selected = [f for f in fields if not any(f != p and _covers(p, f) for p in fields)]
+    projection = {field: 1 for field in selected}
+    if "_id" not in projection:
+        projection["_id"] = 0
+    return projection
+
+
+def export_batch_size() -> int:
+    return int(os.getenv("EXPORT_BATCH_SIZE", str(DEFAULT_BATCH_SIZE)))
+
+
+def serialize_document(doc: Any) -> Any:
+    """Convert MongoDB document to JSON-serializable format."""
+    if isinstance(doc, dict):
+        return {k: serialize_document(v) for k, v in doc.items()}
+    elif isinstance(doc, list):
+        return [serialize_document(item) for item in doc]
+    elif isinstance(doc, datetime):
+        return doc.isoformat()
+    elif hasattr(doc, '__dict__'):
+        return str(doc)
+    else:
+        return doc
+
+
+def flatten_dict(d: Dict[str, Any], parent_key: str = '', sep: str = '_') -> Dict[str, Any]:
+    """Flatten nested dictionary for CSV export."""
+    items = []
+    for k, v in d.items():
+        new_key = f"{parent_key}{sep}{k}" if parent_key else k
+        if isinstance(v, dict):
+            items.extend(flatten_dict(v, new_key, sep=sep).items())
+        elif isinstance(v, list):
+            items.append((new_key, ', '.join(str(item) for item in v)))
+        else:
+            items.append((new_key, v))
+    return dict(items)
+
+
+def prepare_document(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Stringify ``_id`` and serialize a raw MongoDB document for export."""
+    if "_id" in doc:
+        doc["_id"] = str(doc["_id"])
+    return serialize_document(doc)
+
+
+async def iter_document_batches(
+    cursor: Any, batch_size: Optional[int] = None
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Yield lists of prepared documents from an async cursor."""
+    batch_size = batch_size or export_batch_size()
+    batch: List[Dict[str, Any]] = []
+    async for doc in cursor:
+        batch.append(prepare_document(doc))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class DocumentBatches:
+    """Single-use stream of document batches with a prefetch buffer.
+
+    ``prefetch`` reads ahead (to detect an empty result or sample CSV columns)
+    without losing the documents it read: iterating replays the buffered
+    batches before continuing with the source.
+    """
+
+    def __init__(self, source: Optional[AsyncIterator[List[Dict[str, Any]]]]):
+        self._source = source
+        self._buffer: Deque[List[Dict[str, Any]]] = deque()
+        self._buffered = 0
+        self._exhausted = source is None
+        # Documents handed to the consumer so far (export progress)
+        self.documents_emitted = 0
+
+    @classmethod
+    def from_cursor(cls, cursor: Any, batch_size: Optional[int] = None) -> "DocumentBatches":
+        batch_size = batch_size or export_batch_size()
+        if hasattr(cursor, "batch_size"):
+            # Fetch from the server in the same batches we encode in
+            cursor = cursor.batch_size(batch_size)
+        return cls(iter_document_batches(cursor, batch_size))
+
+    @classmethod
+    def from_documents(
+        cls, documents: Sequence[Dict[str, Any]], batch_size: Optional[int] = None
+    ) -> "DocumentBatches":
+        """Wrap already serialized, in-memory documents."""
+        batch_size = batch_size or export_batch_size()
+        batches = cls(None)
+        for start in range(0, len(documents), batch_size):
+            batches._buffer.append(list(documents[start:start + batch_size]))
+        batches._buffered = len(documents)
+        return batches
+
+    async def prefetch(self, count: int) -> List[Dict[str, Any]]:
+        """Buffer batches until at least ``count`` documents are read; return them."""
+        while self._buffered < count and not self._exhausted:
+            try:
+                batch = await self._source.__anext__()
+            except StopAsyncIteration:
+                self._exhausted = True
+                break
+            self._buffer.append(batch)
+            self._buffered += len(batch)
+        return [doc for batch in self._buffer for doc in batch]
+
+    @property
+    def fully_buffered(self) -> bool:
+        """True when every document has been read into the buffer (after ``prefetch``)."""
+        return self._exhausted
+
+    @property
+    def is_empty(self) -> bool:
+        """True when the source is known to have no documents (after ``prefetch``)."""
+        return self._exhausted and not self._buffered
+
+    async def __aiter__(self) -> AsyncIterator[List[Dict[str, Any]]]:
+        while self._buffer:
+            batch = self._buffer.popleft()
+            self._buffered -= len(batch)
+            self.documents_emitted += len(batch)
+            yield batch
+        if self._exhausted:
+            return
+        async for batch in self._source:
+            self.documents_emitted += len(batch)
+            yield batch
+        self._exhausted = True
+
+
+async def open_document_batches(cursor: Any, batch_size: Optional[int] = None) -> DocumentBatches:
+    """Wrap ``cursor`` and read its first batch, so callers can check ``is_empty``."""
+    batches = DocumentBatches.from_cursor(cursor, batch_size)
+    await batches.prefetch(1)
+    return batches
+
+
+def csv_columns(documents: Iterable[Dict[str, Any]]) -> List[str]:
+    """Sorted union of the flattened keys of ``documents``."""
+    columns = set()
+    for doc in documents:
+        columns.update(flatten_dict(doc).keys())
+    return sorted(columns)
+
+
+def _csv_row(doc: Dict[str, Any], columns: frozenset, overflow: bool) -> Dict[str, Any]:
+    row = flatten_dict(doc)
+    if overflow:
+        extra = {key: row[key] for key in row if key not in columns}
+        if extra:
+            row[CSV_OVERFLOW_COLUMN] = json.dumps(extra, default=str, sort_keys=True)
+    return row
+
+
+async def csv_chunks(
+    batches: DocumentBatches, fields: Optional[Sequence[str]] = None
+) -> AsyncIterator[str]:
+    """Encode batches as CSV: the header chunk, then one chunk per batch.
+
+    ``fields`` fixes the columns (other keys are left out); by default they are
+    sampled, with an overflow column when the sample does not cover the export.
+    """
+    overflow = False
+    if fields is None:
+        sample_size = int(os.getenv("EXPORT_CSV_SAMPLE_SIZE", str(DEFAULT_CSV_SAMPLE_SIZE)))
+        fields = csv_columns(await batches.prefetch(sample_size))
+        overflow = not batches.fully_buffered
+        if overflow:
+            fields.append(CSV_OVERFLOW_COLUMN)
+    columns = frozenset(fields)
+
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=list(fields), extrasaction='ignore')
+    writer.writeheader()
+    yield output.getvalue()
+
+    async for batch in batches:
+        output.seek(0)
+        output.truncate(0)
+        writer.writerows(_csv_row(doc, columns, overflow) for doc in batch)
+        yield output.getvalue()
+
+
+async def json_chunks(batches: DocumentBatches) -> AsyncIterator[str]:
+    """Encode batches as a JSON array, one document per line."""
+    yield "["
+    separator = "\n"
+    async for batch in batches:
+        lines = [json.dumps(doc, default=str) for doc in batch]
+        yield separator + ",\n".join(lines)
+        separator = ",\n"
+    yield "\n]\n"
+
+
+async def ndjson_chunks(batches: DocumentBatches) -> AsyncIterator[str]:
+    """Encode batches as newline-delimited JSON."""
+    async for batch in batches:
+        yield "".join(json.dumps(doc, default=str) + "\n" for doc in batch)
+
+
+def encode_batches(batches: DocumentBatches, export_format: str) -> AsyncIterator[str]:
+    """Chunks of ``batches`` encoded as ``export_format`` (csv, json or ndjson)."""
+    if export_format == "csv":
+        return csv_chunks(batches)
+    if export_format == "json":
+        return json_chunks(batches)
+    if export_format == "ndjson":
+        return ndjson_chunks(batches)
+    raise ValueError(f"Unsupported export format: {export_format}")
@@ -5,6 +5,7 @@ from bson import ObjectId
 
 from ..db.db_manager import DatabaseManager, is_valid_objectid
 from ..errors.domain_error import DomainNotFoundError, DomainBadError
+from .entity_counters import mark_entity_counts_stale, record_entity_insert
 
 
 UPDATE_ATTRS = [
@@ -70,6 +71,8 @@ class DataDomainService:
 
         if result.matched_count == 0:
             raise DomainNotFoundError("Domain not found")
+        if "status" in update_attributes:
+            await mark_entity_counts_stale("domains")
         
         return await self.get(docid)
 
@@ -89,6 +92,7 @@ class DataDomainService:
 
         if result.matched_count == 0:
             raise DomainNotFoundError("Domain not found")
+        await mark_entity_counts_stale("domains")
         
         return await self.get(docid)
 
@@ -110,6 +114,7 @@ class DataDomainService:
 
         result = await self.db.domains.insert_one(insertable)
         new_doc_id = str(result.inserted_id)
+        await record_entity_insert("domains", insertable)
 
         out_result = await self.db.domains.find_one({"_id": ObjectId(new_doc_id)})
         out_result["_id"] = str(out_result["_id"])
@@ -129,5 +134,6 @@ class DataDomainService:
 
         if result.matched_count == 0:
             raise DomainNotFoundError("Domain not found")
+        await mark_entity_counts_stale("domains")
         
         return {"message": "Domain deleted successfully"}
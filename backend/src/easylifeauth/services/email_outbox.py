@@ -0,0 +1,241 @@
+"""
+Email outbox: queued, rate-limited delivery of bulk email.
+
+Sending one email per request awaits a full SMTP handshake each time, so a bulk
+upload creating thousands of users spent most of its time waiting on SMTP.
+Messages are instead put on an in-memory queue and delivered by a small pool of
+workers. Each worker drains up to ``EMAIL_OUTBOX_BATCH_SIZE`` messages at a time
+over one SMTP connection (kept open while the queue is busy), all workers share
+an ``EMAIL_OUTBOX_RATE_PER_SECOND`` send rate, and failed sends are retried with
+exponential backoff. Delivery is tracked per batch id, so callers can return as
+soon as messages are queued and report delivery separately.
+"""
+import asyncio
+import logging
+import os
+import uuid
+from collections import OrderedDict
+from email.message import Message
+from typing import Any, Dict, List, Optional, Set
+
+from .email_service import EmailService
+
+logger = logging.getLogger(__name__)
+
+# Batches whose delivery counters are kept (oldest are dropped first)
+MAX_TRACKED_BATCHES = 1000
+
+
+class _OutboxItem:
+    __slots__ = ("message", "batch_id", "attempts")
+
+    def __init__(self, message: Message, batch_id: Optional[str]):
+        self.message = message
+        self.batch_id = batch_id
+        self.attempts = 0
+
+
+class _RateLimiter:
+    """Spaces calls at least ``1 / rate`` seconds apart across all callers."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if not self.interval:
+            return
+        async with self._lock:
+            now = asyncio.get_running_loop().time()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class EmailOutbox:
+    """Queue of outgoing messages delivered by a pool of SMTP workers."""
+
+    def __init__(self, email_service: EmailService, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.email_service = email_service
+        self.workers = int(config.get("workers") or os.getenv("EMAIL_OUTBOX_WORKERS", "4"))
+        self.batch_size = int(config.get("batch_size") or os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "50"))
+        self.rate_per_second = float(
+            config.get("rate_per_second") if config.get("rate_per_second") is not None
+            else os.getenv("EMAIL_OUTBOX_RATE_PER_SECOND", "10")
+        )
+        self.max_retries = int(
+            config.get("max_retries") if config.get("max_retries") is not None
+            else os.getenv("EMAIL_OUTBOX_MAX_RETRIES", "3")
+        )
+        self.retry_delay = float(
+            config.get("retry_delay") if config.get("retry_delay") is not None
+            else os.getenv("EMAIL_OUTBOX_RETRY_DELAY", "2")
+        )
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._retries: Set[asyncio.Task] = set()
+        self._rate_limiter: Optional[_RateLimiter] = None
+        self._batches: "OrderedDict[str, Dict[str, int]]" = OrderedDict()
+
+        self.queued = 0
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+
+    # --------------------------------------------------------------- enqueue
+
+    def new_batch(self) -> str:
+        """Start tracking a new batch of messages; returns its id."""
+        batch_id = uuid.uuid4().hex
+        self._batches[batch_id] = {"queued": 0, "sent": 0, "failed": 0}
+        while len(self._batches) > MAX_TRACKED_BATCHES:
+            self._batches.popitem(last=False)
+        return batch_id
+
+    def enqueue(self, message: Message, batch_id: Optional[str] = None) -> None:
+        """Queue ``message`` for delivery; returns immediately."""
+        self._start()
+        self._queue.put_nowait(_OutboxItem(message, batch_id))
+        self.queued += 1
+        self._count(batch_id, "queued")
+
+    def _start(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._rate_limiter = _RateLimiter(self.rate_per_second)
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def _count(self, batch_id: Optional[str], key: str) -> None:
+        if batch_id in self._batches:
+            self._batches[batch_id][key] += 1
+
+    # --------------------------------------------------------------- workers
+
+    async def _worker(self) -> None:
+        smtp = None
+        try:
+            while True:
+                batch = [await self._queue.get()]
+                while len(batch) < self.batch_size and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                try:
+                    smtp = await self._send_batch(smtp, batch)
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+                # Only hold a connection while there is more to send
+                if self._queue.empty():
+                    smtp = await self._close(smtp)
+        finally:
+            await self._close(smtp)
+
+    async def _send_batch(self, smtp, batch: List[_OutboxItem]):
+        for item in batch:
+            await self._rate_limiter.acquire()
+            try:
+                if smtp is None or not smtp.is_connected:
+                    smtp = await self.email_service.connect()
+                await smtp.send_message(item.message)
+            except Exception as e:
+                smtp = await self._close(smtp)
+                self._failed_attempt(item, e)
+                continue
+            self.sent += 1
+            self._count(item.batch_id, "sent")
+        return smtp
+
+    def _failed_attempt(self, item: _OutboxItem, error: Exception) -> None:
+        item.attempts += 1
+        if item.attempts > self.max_retries:
+            self.failed += 1
+            self._count(item.batch_id, "failed")
+            logger.warning(f"Giving up on email to {item.message['To']} after {item.attempts} attempts: {error}")
+            return
+        self.retried += 1
+        delay = self.retry_delay * 2 ** (item.attempts - 1)
+        task = asyncio.create_task(self._requeue(item, delay))
+        self._retries.add(task)
+        task.add_done_callback(self._retries.discard)
+
+    async def _requeue(self, item: _OutboxItem, delay: float) -> None:
+        await asyncio.sleep(delay)
+        self._queue.put_nowait(item)
+
+    @staticmethod
+    async def _close(smtp) -> None:
+        if smtp is not None:
+            try:
+                await smtp.quit()
+            except Exception:
+                smtp.close()
+        return None
+
+    # ---------------------------------------------------------------- status
+
+    def batch_status(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """Delivery counters of a batch, or None if it is unknown."""
+        counts = self._batches.get(batch_id)
+        if counts is None:
+            return None
+        pending = counts["queued"] - counts["sent"] - counts["failed"]
+        return {"batch_id": batch_id, **counts, "pending": pending}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self._workers),
+            "pending": self._queue.qsize() + len(self._retries) if self._queue else 0,
+            "queued": self.queued,
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+        }
+
+    # ------------------------------------------------------------- lifecycle
+
+    async def drain(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued message (including retries) is delivered or given up."""
+        if self._queue is None:
+            return True
+
+        async def _wait() -> None:
+            while True:
+                await self._queue.join()
+                if not self._retries:
+                    return
+                await asyncio.gather(*list(self._retries), return_exceptions=True)
+
+        try:
+            await asyncio.wait_for(_wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def shutdown(self, timeout: float = 10) -> None:
+        """Deliver what is queued (up to ``timeout`` seconds), then stop the workers."""
+        if not await self.drain(timeout):
+            logger.warning(f"Email outbox stopped with {self.stats()['pending']} messages undelivered")
+        for task in list(self._retries) + self._workers:
+            task.cancel()
+        await asyncio.gather(*self._retries, *self._workers, return_exceptions=True)
+        self._workers = []
+
+
+# Singleton instance holder
+_email_outbox: Optional[EmailOutbox] = None
+
+
+def init_email_outbox(email_service: EmailService, config: Optional[Dict[str, Any]] = None) -> EmailOutbox:
+    """Initialize the email outbox."""
+    global _email_outbox
+    _email_outbox = EmailOutbox(email_service, config)
+    return _email_outbox
+
+
+def get_email_outbox() -> Optional[EmailOutbox]:
+    """Get the email outbox instance."""
+    return _email_outbox
@@ -17,6 +17,21 @@ class EmailService:
         self.email = config.get("email", "noreply@easylife.local")
         self.password = config.get("password")
         self.use_tls = config.get("use_tls", False)
+
+    async def connect(self) -> aiosmtplib.SMTP:
+        """Open an SMTP connection for sending several messages"""
+        if self.use_tls and self.password:
+            smtp = aiosmtplib.SMTP(
+                hostname=self.smtp_server,
+                port=self.smtp_port,
+                username=self.email,
+                password=self.password,
+                start_tls=True
+            )
+        else:
+            smtp = aiosmtplib.SMTP(hostname=self.smtp_server, port=self.smtp_port)
+        await smtp.connect()
+        return smtp
     
     def _prepare_email_template(
         self,
@@ -123,6 +138,10 @@ class EmailService:
 
         return msg
 
+    def welcome_message(self, to_email: str, full_name: str, password: str) -> MIMEMultipart:
+        """Welcome email with login credentials, for queued delivery"""
+        return self._prepare_welcome_email_template(to_email, full_name, password)
+
     async def send_welcome_email(
         self,
         to_email: str,
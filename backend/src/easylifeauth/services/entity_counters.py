@@ -0,0 +1,255 @@
+"""
+Incrementally maintained entity counters.
+
+The ``entity_counters`` collection holds one document per counted collection::
+
+    {"_id": "roles", "total": 42, "by": {"A": 30, "I": 12}, "stale": False, "reconciled_at": ...}
+
+``by`` breaks the total down by the collection's counted field (``status``,
+``is_active``, ``type`` or ``module``, see ``COUNTED_FIELDS``). Count endpoints
+and the dashboard read these documents instead of recounting collections.
+
+The create, update, delete and toggle-status routes apply ``$inc`` deltas as
+they write. Write paths that do not know what they changed (bulk uploads,
+service-level writes) mark the counter stale instead, and a stale or missing
+counter is recounted with one ``$group`` aggregation the next time it is read.
+A periodic reconcile job (``ENTITY_COUNTERS_RECONCILE_SECONDS``) recounts every
+collection, correcting any drift from writes made outside these paths.
+
+The module-level ``record_*`` helpers do nothing until the service is
+initialized, so routes can call them unconditionally.
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from ..db.db_manager import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+# Field each collection's counts are broken down by
+COUNTED_FIELDS = {
+    "users": "is_active",
+    "roles": "status",
+    "groups": "status",
+    "domains": "status",
+    "domain_scenarios": "status",
+    "playboards": "status",
+    "customers": "status",
+    "configurations": "type",
+    "permissions": "module",
+}
+
+NONE_BUCKET = "none"
+
+
+def bucket_key(value: Any) -> str:
+    """Counter key for a field value (safe to use in a Mongo field path)."""
+    if value is None:
+        return NONE_BUCKET
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value).replace("$", "＄").replace(".", "．")
+
+
+def decode_bucket_key(key: str) -> str:
+    """Field value of a counter key (the inverse of ``bucket_key`` for strings)."""
+    return key.replace("＄", "$").replace("．", ".")
+
+
+class EntityCounterService:
+    """Reads, adjusts and reconciles the per-collection counters."""
+
+    def __init__(self, db: DatabaseManager, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.db = db
+        self.reconcile_seconds = int(
+            config.get("reconcile_seconds") or os.getenv("ENTITY_COUNTERS_RECONCILE_SECONDS", "900")
+        )
+        self._reconcile_task: Optional[asyncio.Task] = None
+
+    @property
+    def collection(self):
+        return getattr(self.db, "entity_counters", None)
+
+    # ----------------------------------------------------------- increments
+
+    async def _increment(self, entity: str, deltas: Dict[str, int]) -> None:
+        if self.collection is None or entity not in COUNTED_FIELDS:
+            return
+        deltas = {path: delta for path, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        try:
+            # A missing or stale counter is recounted on its next read
+            await self.collection.update_one(
+                {"_id": entity, "stale": {"$ne": True}},
+                {"$inc": deltas}
+            )
+        except Exception as e:
+            logger.warning(f"Failed to update {entity} counters: {e}")
+            await self.mark_stale(entity)
+
+    async def record_insert(self, entity: str, document: Dict[str, Any]) -> None:
+        """Count a newly inserted document."""
+        field = COUNTED_FIELDS.get(entity)
+        if field:
+            await self._increment(entity, {"total": 1, f"by.{bucket_key(document.get(field))}": 1})
+
+    async def record_delete(self, entity: str, document: Optional[Dict[str, Any]]) -> None:
+        """Uncount a deleted document; without it the counter is marked stale."""
+        field = COUNTED_FIELDS.get(entity)
+        if not field:
+            return
+        if document is None:
+            await self.mark_stale(entity)
+            return
+        await self._increment(entity, {"total": -1, f"by.{bucket_key(document.get(field))}": -1})
+
+    async def record_change(self, entity: str, old_value: Any, new_value: Any) -> None:
+        """Move a document between buckets after its counted field changed."""
+        old_key, new_key = bucket_key(old_value), bucket_key(new_value)
+        if old_key != new_key:
+            await self._increment(entity, {f"by.{old_key}": -1, f"by.{new_key}": 1})
+
+    async def mark_stale(self, entity: str) -> None:
+        """Force a recount of ``entity`` on the next read."""
+        if self.collection is None or entity not in COUNTED_FIELDS:
+            return
+        try:
+            await self.collection.update_one({"_id": entity}, {"$set": {"stale": True}})
+        except Exception as e:
+            logger.warning(f"Failed to mark {entity} counters stale: {e}")
+
+    # ---------------------------------------------------------------- reads
+
+    @staticmethod
+    def _public(counter: Dict[str, Any]) -> Dict[str, Any]:
+        by = {decode_bucket_key(key): value for key, value in (counter.get("by") or {}).items() if value}
+        return {"total": counter.get("total", 0), "by": by}
+
+    async def get_counts(self, entity: str) -> Dict[str, Any]:
+        """``{"total": n, "by": {value: n}}`` for ``entity`` (one indexed read when fresh)."""
+        counter = await self.collection.find_one({"_id": entity}) if self.collection is not None else None
+        if counter is None or counter.get("stale"):
+            counter = await self.reconcile_one(entity)
+        return self._public(counter)
+
+    async def get_all_counts(self, entities: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """Counts of several collections with a single read of the counters collection."""
+        entities = entities or list(COUNTED_FIELDS)
+        counters = {}
+        if self.collection is not None:
+            async for counter in self.collection.find({"_id": {"$in": entities}}):
+                counters[counter["_id"]] = counter
+        for entity in entities:
+            if entity not in counters or counters[entity].get("stale"):
+                counters[entity] = await self.reconcile_one(entity)
+        return {entity: self._public(counters[entity]) for entity in entities}
+
+    async def count(self, entity: str, *values: Any) -> int:
+        """Documents of ``entity`` whose counted field is one of ``values`` (all without values)."""
+        counts = await self.get_counts(entity)
+        if not values:
+            return counts["total"]
+        return sum(counts["by"].get(decode_bucket_key(bucket_key(value)), 0) for value in values)
+
+    # ------------------------------------------------------------ reconcile
+
+    async def reconcile_one(self, entity: str) -> Dict[str, Any]:
+        """Recount ``entity`` with one aggregation and store the result."""
+        source = getattr(self.db, entity, None)
+        counter = {"_id": entity, "total": 0, "by": {}, "stale": False, "reconciled_at": datetime.now(timezone.utc)}
+        if source is None:
+            return counter
+        pipeline = [{"$group": {"_id": f"${COUNTED_FIELDS[entity]}", "count": {"$sum": 1}}}]
+        async for group in source.aggregate(pipeline):
+            key = bucket_key(group["_id"])
+            counter["by"][key] = counter["by"].get(key, 0) + group["count"]
+            counter["total"] += group["count"]
+        if self.collection is not None:
+            await self.collection.replace_one({"_id": entity}, counter, upsert=True)
+        return counter
+
+    async def reconcile(self) -> int:
+        """Recount every collection; returns how many counters changed."""
+        changed = 0
+        for entity in COUNTED_FIELDS:
+            try:
+                before = await self.collection.find_one({"_id": entity}) if self.collection is not None else None
+                after = await self.reconcile_one(entity)
+                if before is None or self._public(before) != self._public(after):
+                    changed += 1
+            except Exception as e:
+                logger.warning(f"Failed to reconcile {entity} counters: {e}")
+        return changed
+
+    async def _reconcile_loop(self) -> None:
+        while True:
+            changed = await self.reconcile()
+            if changed:
+                logger.info(f"Entity counters reconciled: {changed} corrected")
+            await asyncio.sleep(self.reconcile_seconds)
+
+    def start(self) -> None:
+        """Start the periodic reconcile job."""
+        if self._reconcile_task is None and self.reconcile_seconds > 0:
+            self._reconcile_task = asyncio.create_task(self._reconcile_loop())
+
+    async def shutdown(self) -> None:
+        if self._reconcile_task is not None:
+            self._reconcile_task.cancel()
+            await asyncio.gather(self._reconcile_task, return_exceptions=True)
+            self._reconcile_task = None
+
+
+# Singleton instance holder
+_entity_counter_service: Optional[EntityCounterService] = None
+
+
+def init_entity_counter_service(
+    db: DatabaseManager,
+    config: Optional[Dict[str, Any]] = None
+) -> EntityCounterService:
+    """Initialize the entity counter service."""
+    global _entity_counter_service
+    _entity_counter_service = EntityCounterService(db, config)
+    return _entity_counter_service
+
+
+def get_entity_counter_service() -> Optional[EntityCounterService]:
+    """Get the entity counter service instance."""
+    return _entity_counter_service
+
+
+def entity_counters_for(db: DatabaseManager) -> Optional[EntityCounterService]:
+    """The entity counter service, if it counts the collections of ``db``."""
+    if _entity_counter_service is not None and _entity_counter_service.db is db:
+        return _entity_counter_service
+    return None
+
+
+async def record_entity_insert(entity: str, document: Dict[str, Any]) -> None:
+    """Count an inserted document, if counters are enabled."""
+    if _entity_counter_service:
+        await _entity_counter_service.record_insert(entity, document)
+
+
+async def record_entity_delete(entity: str, document: Optional[Dict[str, Any]] = None) -> None:
+    """Uncount a deleted document, if counters are enabled."""
+    if _entity_counter_service:
+        await _entity_counter_service.record_delete(entity, document)
+
+
+async def record_entity_change(entity: str, old_value: Any, new_value: Any) -> None:
+    """Move a document between counter buckets, if counters are enabled."""
+    if _entity_counter_service:
+        await _entity_counter_service.record_change(entity, old_value, new_value)
+
+
+async def mark_entity_counts_stale(entity: str) -> None:
+    """Have ``entity`` recounted on its next read, if counters are enabled."""
+    if _entity_counter_service:
+        await _entity_counter_service.mark_stale(entity)
@@ -20,7 +20,9 @@ from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor
 
 from ..db.db_manager import DatabaseManager
+from ..db.pagination import InvalidCursor, fetch_page
 from .gcs_service import GCSService
+from .list_totals import count_list_total
 
 logger = logging.getLogger(__name__)
 
@@ -420,9 +422,18 @@ class ErrorLogService:
         self,
         limit: int = 100,
         offset: int = 0,
-        filters: Optional[Dict[str, Any]] = None
+        filters: Optional[Dict[str, Any]] = None,
+        cursor: Optional[str] = None,
+        include_total: Optional[bool] = None,
+        total: Optional[int] = None
     ) -> Dict[str, Any]:
-        """Get error logs from MongoDB with pagination and filtering."""
+        """Get error logs from MongoDB with pagination and filtering.
+
+        ``cursor`` continues after a previous page's ``next_cursor`` (keyset
+        pagination) instead of skipping ``offset`` rows; an invalid cursor
+        raises ``InvalidCursor``. ``total`` is a total the client got from a
+        previous page, reported back instead of counting.
+        """
         if not hasattr(self.db, 'error_logs') or self.db.error_logs is None:
             return {"logs": [], "total": 0, "page": 0, "limit": limit}
 
@@ -451,14 +462,17 @@ class ErrorLogService:
                 cutoff = datetime.now(timezone.utc) - timedelta(days=int(filters["days"]))
                 query["timestamp"] = {"$gte": cutoff}
 
+        if total is not None and include_total is None:
+            include_total = True
         try:
-            # Get total count
-            total = await self.db.error_logs.count_documents(query)
-
-            # Get paginated results
-            cursor = self.db.error_logs.find(query).sort("timestamp", -1).skip(offset).limit(limit)
+            result = await fetch_page(
+                self.db.error_logs, query, "timestamp", -1,
+                skip=offset, limit=limit,
+                cursor=cursor, include_total=include_total,
+                count=lambda collection, q: count_list_total(collection, q, known_total=total)
+            )
             logs = []
-            async for doc in cursor:
+            for doc in result.docs:
                 doc["_id"] = str(doc["_id"])
                 if "timestamp" in doc and isinstance(doc["timestamp"], datetime):
                     doc["timestamp"] = doc["timestamp"].isoformat()
@@ -468,10 +482,13 @@ class ErrorLogService:
 
             return {
                 "logs": logs,
-                "total": total,
+                "total": result.total,
                 "page": offset // limit if limit > 0 else 0,
-                "limit": limit
+                "limit": limit,
+                "next_cursor": result.next_cursor
             }
+        except InvalidCursor:
+            raise
         except Exception as e:
             logger.error(f"Failed to get error logs: {e}")
             return {"logs": [], "total": 0, "page": 0, "limit": limit, "error": str(e)}
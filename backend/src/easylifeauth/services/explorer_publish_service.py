@@ -4,6 +4,9 @@ import re
 import logging
 from datetime import datetime, timezone
 
+from .entity_counters import record_entity_insert
+from .search_index import index_search_document
+
 logger = logging.getLogger(__name__)
 
 PARAM_TYPE_MAP = {
@@ -141,7 +144,10 @@ class ExplorerPublishService:
                 )
         else:
             await self.db.domain_scenarios.insert_one(scenario_doc)
-            await self.db.playboards.insert_one(playboard_doc)
+            playboard_result = await self.db.playboards.insert_one(playboard_doc)
+            await record_entity_insert("domain_scenarios", scenario_doc)
+            await record_entity_insert("playboards", playboard_doc)
+            await index_search_document("playboards", playboard_result.inserted_id)
 
         return {
             "scenario_key": scenario_key, "playboard_key": scenario_key,
@@ -0,0 +1,401 @@
+"""
+Background export jobs.
+
+A job streams an export (see ``data_export``) into a compressed file instead
+of holding an API request open. Jobs and their progress are recorded in the
+``export_jobs`` collection. The artifact is written to the local export
+directory and, when GCS is configured, uploaded to the bucket so any worker
+can serve it. A finished artifact can be downloaded any number of times
+(with HTTP Range support) until it expires.
+
+Jobs run as tasks in the worker that accepted them, at most
+``EXPORT_JOB_MAX_CONCURRENT`` at a time per worker. The running worker holds
+a lease on the job and renews it from a heartbeat (see ``job_lease``); a job
+whose lease expired (its worker was restarted) is reported as failed.
+"""
+import asyncio
+import gzip
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+from ..db.db_manager import DatabaseManager
+from .data_export import (
+    EXPORT_ENTITIES,
+    EXPORT_FORMATS,
+    build_projection,
+    encode_batches,
+    open_document_batches,
+    parse_fields,
+)
+from .gcs_service import GCSService
+from .job_lease import JobHeartbeat, expired_lease_filter, lease_expired, lease_fields
+
+logger = logging.getLogger(__name__)
+
+# Compression and file writes run off the event loop
+_file_executor = ThreadPoolExecutor(max_workers=2)
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+STATUS_CANCELLED = "cancelled"
+
+# compression -> (file extension, media type)
+COMPRESSIONS = {
+    "gzip": ("gz", "application/gzip"),
+    "zstd": ("zst", "application/zstd"),
+}
+
+STORAGE_LOCAL = "local"
+STORAGE_GCS = "gcs"
+
+
+def available_compressions() -> List[str]:
+    """Compressions usable in this environment (zstd needs ``zstandard``)."""
+    try:
+        import zstandard  # noqa: F401
+        return ["gzip", "zstd"]
+    except ImportError:
+        return ["gzip"]
+
+
+def _open_compressed(path: str, compression: str) -> BinaryIO:
+    if compression == "zstd":
+        import zstandard
+        return zstandard.ZstdCompressor(level=3).stream_writer(open(path, "wb"), closefd=True)
+    return gzip.open(path, "wb", compresslevel=6)
+
+
+class ExportJobService:
+    """Runs export jobs in the background and tracks them in MongoDB."""
+
+    def __init__(
+        self,
+        db: DatabaseManager,
+        gcs_service: Optional[GCSService] = None,
+        config: Optional[Dict[str, Any]] = None
+    ):
+        config = config or {}
+        self.db = db
+        self.gcs_service = gcs_service
+        self.export_dir = config.get("export_dir") or os.getenv("EXPORT_JOB_DIR", "/tmp/easylife_exports")
+        self.gcs_prefix = config.get("gcs_prefix", "exports")
+        self.retention_hours = int(config.get("retention_hours") or os.getenv("EXPORT_JOB_RETENTION_HOURS", "24"))
+        self.lease_seconds = float(config.get("lease_seconds") or os.getenv("EXPORT_JOB_LEASE_SECONDS", "60"))
+        self.progress_interval = float(config.get("progress_interval", 2.0))
+        max_concurrent = int(config.get("max_concurrent") or os.getenv("EXPORT_JOB_MAX_CONCURRENT", "2"))
+
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._cancel_requested: set = set()
+
+    @property
+    def collection(self):
+        return getattr(self.db, "export_jobs", None)
+
+    def _local_path(self, file_name: str) -> str:
+        return os.path.join(self.export_dir, file_name)
+
+    def _use_gcs(self) -> bool:
+        return self.gcs_service is not None and self.gcs_service.is_configured()
+
+    # ------------------------------------------------------------------ jobs
+
+    async def create_job(
+        self,
+        entity_name: str,
+        export_format: str,
+        filters: Optional[Dict[str, Any]] = None,
+        fields: Optional[str] = None,
+        compression: str = "gzip",
+        created_by: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Record a job and start it in the background.
+
+        Raises ValueError for an unknown entity, format, compression or field.
+        """
+        if self.collection is None:
+            raise RuntimeError("Export jobs collection not configured")
+        if entity_name not in EXPORT_ENTITIES:
+            raise ValueError(f"Unknown export entity: {entity_name}")
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {export_format}")
+        if compression not in available_compressions():
+            raise ValueError(f"Unsupported compression: {compression}")
+        projection = build_projection(EXPORT_ENTITIES[entity_name], parse_fields(fields))
+
+        await self.cleanup_expired()
+
+        now = datetime.now(timezone.utc)
+        job_id = uuid.uuid4().hex
+        entity = EXPORT_ENTITIES[entity_name]
+        extension = EXPORT_FORMATS[export_format][1]
+        file_name = (
+            f"{entity.filename_prefix}_{now.strftime('%Y%m%d_%H%M%S')}_{job_id[:8]}"
+            f".{extension}.{COMPRESSIONS[compression][0]}"
+        )
+        job = {
+            "job_id": job_id,
+            "entity": entity_name,
+            "format": export_format,
+            "compression": compression,
+            "fields": fields,
+            "filters": filters or {},
+            "status": STATUS_QUEUED,
+            "progress": {"documents": 0, "total": None},
+            "file_name": file_name,
+            "storage": None,
+            "storage_path": None,
+            "file_size": None,
+            "error": None,
+            "created_by": created_by,
+            "created_at": now,
+            "updated_at": now,
+            "started_at": None,
+            "completed_at": None,
+            "expires_at": now + timedelta(hours=self.retention_hours),
+            **lease_fields(self.lease_seconds),
+        }
+        await self.collection.insert_one(dict(job))
+
+        task = asyncio.create_task(self._run(job, projection))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+        return self._public(job)
+
+    async def _update(self, job_id: str, fields: Dict[str, Any]) -> None:
+        fields["updated_at"] = datetime.now(timezone.utc)
+        await self.collection.update_one({"job_id": job_id}, {"$set": fields})
+
+    async def _run(self, job: Dict[str, Any], projection: Optional[Dict[str, int]]) -> None:
+        job_id = job["job_id"]
+        local_path = self._local_path(job["file_name"])
+        try:
+            async with JobHeartbeat(self.collection, job_id, self.lease_seconds):
+                async with self._semaphore:
+                    await self._update(job_id, {"status": STATUS_RUNNING, "started_at": datetime.now(timezone.utc)})
+                    fields = await self._export(job, projection, local_path)
+
+            # Written once the heartbeat has stopped: a renewal arriving after it
+            # would find the job finished and cancel this task as if the lease were lost
+            fields.update({"status": STATUS_COMPLETED, "completed_at": datetime.now(timezone.utc)})
+            await self._update(job_id, fields)
+            logger.info(f"Export job {job_id} completed ({fields['progress']['documents']} documents)")
+        except asyncio.CancelledError:
+            cancelled = job_id in self._cancel_requested
+            self._cancel_requested.discard(job_id)
+            self._remove_local(local_path)
+            await self._update(job_id, {
+                "status": STATUS_CANCELLED if cancelled else STATUS_FAILED,
+                "error": None if cancelled else "Export interrupted",
+                "completed_at": datetime.now(timezone.utc),
+            })
+            if not cancelled:
+                raise
+        except Exception as e:
+            logger.error(f"Export job {job_id} failed: {e}")
+            self._remove_local(local_path)
+            await self._update(job_id, {
+                "status": STATUS_FAILED,
+                "error": str(e),
+                "completed_at": datetime.now(timezone.utc),
+            })
+
+    async def _export(
+        self, job: Dict[str, Any], projection: Optional[Dict[str, int]], local_path: str
+    ) -> Dict[str, Any]:
+        """Stream the export into ``local_path`` and store it; returns the job's result fields."""
+        job_id = job["job_id"]
+        collection = self.db.db[EXPORT_ENTITIES[job["entity"]].collection]
+        try:
+            total = await collection.count_documents(job["filters"])
+        except Exception:
+            total = None
+
+        loop = asyncio.get_event_loop()
+        os.makedirs(self.export_dir, exist_ok=True)
+        writer = await loop.run_in_executor(_file_executor, _open_compressed, local_path, job["compression"])
+        try:
+            batches = await open_document_batches(collection.find(job["filters"], projection))
+            last_report = time.monotonic()
+            async for chunk in encode_batches(batches, job["format"]):
+                await loop.run_in_executor(_file_executor, writer.write, chunk.encode("utf-8"))
+                if time.monotonic() - last_report >= self.progress_interval:
+                    last_report = time.monotonic()
+                    await self._update(job_id, {"progress": {"documents": batches.documents_emitted, "total": total}})
+        finally:
+            await loop.run_in_executor(_file_executor, writer.close)
+
+        file_size = os.path.getsize(local_path)
+        storage, storage_path = await self._store(job, local_path)
+        return {
+            "progress": {"documents": batches.documents_emitted, "total": total},
+            "storage": storage,
+            "storage_path": storage_path,
+            "file_size": file_size,
+        }
+
+    @staticmethod
+    def _remove_local(local_path: str) -> None:
+        try:
+            if os.path.exists(local_path):
+                os.remove(local_path)
+        except Exception as e:
+            logger.warning(f"Failed to remove partial export {local_path}: {e}")
+
+    async def _store(self, job: Dict[str, Any], local_path: str) -> Tuple[str, str]:
+        """Move the artifact to GCS when configured; returns (storage, path)."""
+        if self._use_gcs():
+            gcs_path = f"{self.gcs_prefix}/{job['file_name']}"
+            uploaded = await self.gcs_service.upload_from_path(
+                local_path, gcs_path, content_type=COMPRESSIONS[job["compression"]][1]
+            )
+            if uploaded:
+                os.remove(local_path)
+                return STORAGE_GCS, gcs_path
+            logger.warning(f"Export job {job['job_id']}: GCS upload failed, keeping local artifact")
+        return STORAGE_LOCAL, local_path
+
+    # --------------------------------------------------------------- queries
+
+    def _public(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """API view of a job document."""
+        hidden = ("_id", "filters", "storage_path", "owner", "lease_expires_at")
+        job = {k: v for k, v in job.items() if k not in hidden}
+        for key in ("created_at", "updated_at", "started_at", "completed_at", "expires_at"):
+            if isinstance(job.get(key), datetime):
+                job[key] = job[key].isoformat()
+        return job
+
+    async def _find(self, job_id: str) -> Optional[Dict[str, Any]]:
+        if self.collection is None:
+            return None
+        job = await self.collection.find_one({"job_id": job_id})
+        if job and lease_expired(job):
+            fields = {
+                "status": STATUS_FAILED,
+                "error": "Export interrupted",
+                "updated_at": datetime.now(timezone.utc),
+            }
+            result = await self.collection.update_one(expired_lease_filter(job), {"$set": fields})
+            if result.matched_count:
+                job.update(fields)
+            else:
+                # The owner renewed the lease or finished meanwhile
+                job = await self.collection.find_one({"job_id": job_id})
+        return job
+
+    async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Status and progress of a job."""
+        job = await self._find(job_id)
+        return self._public(job) if job else None
+
+    async def list_jobs(self, created_by: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent jobs, optionally only those of one user."""
+        if self.collection is None:
+            return []
+        query = {"created_by": created_by} if created_by else {}
+        cursor = self.collection.find(query).sort("created_at", -1).limit(limit)
+        return [self._public(job) async for job in cursor]
+
+    async def get_artifact(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Storage location of a completed job's artifact."""
+        job = await self._find(job_id)
+        if not job or job.get("status") != STATUS_COMPLETED:
+            return None
+        return {
+            "file_name": job["file_name"],
+            "storage": job["storage"],
+            "path": job["storage_path"],
+            "media_type": COMPRESSIONS[job["compression"]][1],
+        }
+
+    async def get_download_url(self, artifact: Dict[str, Any], expiration_minutes: int = 15) -> Optional[str]:
+        """Signed URL for a GCS artifact (GCS serves Range requests itself)."""
+        if not self._use_gcs():
+            return None
+        return await self.gcs_service.get_signed_url(artifact["path"], expiration_minutes=expiration_minutes)
+
+    # --------------------------------------------------------------- cleanup
+
+    async def delete_job(self, job_id: str) -> bool:
+        """Cancel a job if it is still running, then delete it and its artifact."""
+        job = await self._find(job_id)
+        if not job:
+            return False
+
+        task = self._tasks.get(job_id)
+        if task is not None:
+            self._cancel_requested.add(job_id)
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+        await self._delete_artifact(job)
+        await self.collection.delete_one({"job_id": job_id})
+        return True
+
+    async def _delete_artifact(self, job: Dict[str, Any]) -> None:
+        path = job.get("storage_path")
+        if not path:
+            return
+        try:
+            if job.get("storage") == STORAGE_GCS:
+                if self._use_gcs():
+                    await self.gcs_service.delete_file(path)
+            elif os.path.exists(path):
+                os.remove(path)
+        except Exception as e:
+            logger.warning(f"Failed to delete export artifact {path}: {e}")
+
+    async def cleanup_expired(self) -> int:
+        """Delete jobs (and artifacts) past their retention period."""
+        if self.collection is None:
+            return 0
+        removed = 0
+        try:
+            cursor = self.collection.find({"expires_at": {"$lt": datetime.now(timezone.utc)}})
+            async for job in cursor:
+                if job.get("job_id") in self._tasks:
+                    continue
+                await self._delete_artifact(job)
+                await self.collection.delete_one({"job_id": job["job_id"]})
+                removed += 1
+        except Exception as e:
+            logger.warning(f"Export job cleanup failed: {e}")
+        return removed
+
+    async def shutdown(self) -> None:
+        """Stop running jobs; they are recorded as interrupted."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# Singleton instance holder
+_export_job_service: Optional[ExportJobService] = None
+
+
+def init_export_job_service(
+    db: DatabaseManager,
+    gcs_service: Optional[GCSService] = None,
+    config: Optional[Dict[str, Any]] = None
+) -> ExportJobService:
+    """Initialize the export job service."""
+    global _export_job_service
+    _export_job_service = ExportJobService(db, gcs_service, config)
+    return _export_job_service
+
+
+def get_export_job_service() -> Optional[ExportJobService]:
+    """Get the export job service instance."""
+    return _export_job_service
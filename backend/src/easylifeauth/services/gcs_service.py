@@ -116,6 +116,44 @@ class GCSService:
             bucket_name
         )
 
+    def _sync_download_to_path(self, file_path: str, local_path: str, bucket_name: str) -> bool:
+        """Synchronous download to a local file (streamed by the client library)."""
+        try:
+            bucket = self.client.bucket(bucket_name)
+            blob = bucket.blob(file_path)
+
+            if not blob.exists():
+                logger.error(f"File not found in GCS: {file_path}")
+                return False
+
+            blob.download_to_filename(local_path)
+            logger.info(f"Downloaded file from GCS: {file_path}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to download file from GCS: {e}")
+            return False
+
+    async def download_to_path(
+        self,
+        file_path: str,
+        local_path: str,
+        bucket_name: Optional[str] = None
+    ) -> bool:
+        """Download a file from GCS bucket to ``local_path`` without reading it into memory."""
+        if not self.is_configured():
+            logger.error(f"GCS client not configured. Error: {self._init_error}")
+            return False
+
+        bucket_name = bucket_name or self.bucket_name
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            _executor,
+            self._sync_download_to_path,
+            file_path,
+            local_path,
+            bucket_name
+        )
+
     def _sync_upload_file(
         self,
         file_content: bytes,
@@ -160,6 +198,48 @@ class GCSService:
             bucket_name
         )
 
+    def _sync_upload_from_path(
+        self,
+        local_path: str,
+        destination_path: str,
+        content_type: str,
+        bucket_name: str
+    ) -> Optional[str]:
+        """Synchronous upload of a local file (streamed by the client library)."""
+        try:
+            bucket = self.client.bucket(bucket_name)
+            blob = bucket.blob(destination_path)
+
+            blob.upload_from_filename(local_path, content_type=content_type)
+            logger.info(f"Uploaded file to GCS: {destination_path}")
+            return f"gs://{bucket_name}/{destination_path}"
+        except Exception as e:
+            logger.error(f"Failed to upload file to GCS: {e}")
+            return None
+
+    async def upload_from_path(
+        self,
+        local_path: str,
+        destination_path: str,
+        content_type: str = "application/octet-stream",
+        bucket_name: Optional[str] = None
+    ) -> Optional[str]:
+        """Upload a local file to GCS bucket without reading it into memory."""
+        if not self.is_configured():
+            logger.error(f"GCS client not configured. Error: {self._init_error}")
+            return None
+
+        bucket_name = bucket_name or self.bucket_name
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            _executor,
+            self._sync_upload_from_path,
+            local_path,
+            destination_path,
+            content_type,
+            bucket_name
+        )
+
     def _sync_list_files(self, prefix: str, bucket_name: str) -> List[Dict[str, Any]]:
         """Synchronous list files implementation."""
         try:
@@ -0,0 +1,211 @@
+"""Password hash policy: target algorithm/cost and transparent upgrades.
+
+Stored hashes come in several formats (legacy pbkdf2, scrypt, bcrypt) with
+whatever cost they were created with, so login CPU varies wildly between
+users. The policy defines one target (algorithm + cost), calibrated at
+startup so that a single hash fits a latency budget, and tells the login
+flow when a stored hash should be re-created with the target parameters.
+
+Calibration results can differ slightly between pods, so a stored hash is
+only considered out of policy when its cost is more than ``COST_TOLERANCE``
+times away from the target (or it uses another algorithm). That keeps users
+from being rehashed back and forth between pods.
+"""
+import hashlib
+import logging
+import os
+import secrets
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from werkzeug.security import generate_password_hash
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_ALGORITHMS = ("scrypt", "pbkdf2")
+
+DEFAULT_BUDGET_MS = 50
+COST_TOLERANCE = 2
+
+# scrypt: r=8, p=1 and N a power of two between these bounds
+SCRYPT_BLOCK_SIZE = 8
+SCRYPT_PARALLELISM = 1
+SCRYPT_MIN_N = 2 ** 14
+SCRYPT_DEFAULT_N = 2 ** 15
+SCRYPT_MAX_N = 2 ** 20
+
+# pbkdf2-sha256 iteration bounds
+PBKDF2_MIN_ITERATIONS = 100_000
+PBKDF2_DEFAULT_ITERATIONS = 600_000
+PBKDF2_MAX_ITERATIONS = 2_000_000
+PBKDF2_PROBE_ITERATIONS = 100_000
+
+
+def parse_hash_cost(hashed_password: Optional[str]) -> Tuple[str, Optional[int]]:
+    """Return ``(algorithm, cost)`` for a stored hash.
+
+    Cost is N*r*p for scrypt, the iteration count for pbkdf2 and the log2
+    rounds for bcrypt. Unknown formats return ``("unknown", None)``.
+    """
+    if not hashed_password:
+        return "unknown", None
+    try:
+        if hashed_password.startswith("scrypt:"):
+            method = hashed_password.split("$", 1)[0]
+            _, n, r, p = method.split(":")
+            return "scrypt", int(n) * int(r) * int(p)
+        if hashed_password.startswith("pbkdf2:"):
+            method = hashed_password.split("$", 1)[0]
+            parts = method.split(":")
+            if len(parts) < 3:
+                return "pbkdf2", None
+            return "pbkdf2", int(parts[2])
+        if hashed_password.startswith("$2"):
+            return "bcrypt", int(hashed_password.split("$")[2])
+    except (ValueError, IndexError):
+        pass
+    return "unknown", None
+
+
+def _time_call(func, repeats: int = 3) -> float:
+    """Best-of-N wall time of ``func()`` in milliseconds."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, (time.perf_counter() - start) * 1000)
+    return best
+
+
+class HashPolicy:
+    """Target password hashing parameters and rehash decisions."""
+
+    def __init__(
+        self,
+        algorithm: Optional[str] = None,
+        method: Optional[str] = None,
+        budget_ms: Optional[float] = None,
+    ):
+        self.algorithm = (algorithm or os.getenv("PASSWORD_HASH_ALGORITHM", "scrypt")).lower()
+        if self.algorithm not in SUPPORTED_ALGORITHMS:
+            raise ValueError(f"Unsupported password hash algorithm: {self.algorithm}")
+        self.budget_ms = float(budget_ms if budget_ms is not None else os.getenv("PASSWORD_HASH_BUDGET_MS", DEFAULT_BUDGET_MS))
+
+        self.calibrated = False
+        self.measured_ms: Optional[float] = None
+        self.rehashed = 0
+
+        explicit = method or os.getenv("PASSWORD_HASH_METHOD")
+        if explicit:
+            algorithm, cost = parse_hash_cost(f"{explicit}$")
+            if algorithm not in SUPPORTED_ALGORITHMS or cost is None:
+                raise ValueError(f"Unsupported password hash method: {explicit}")
+            self.algorithm = algorithm
+            self.method = explicit
+            self.explicit = True
+        else:
+            # Used until calibrate() runs
+            self.method = self._method_for(self._default_cost())
+            self.explicit = False
+
+    @property
+    def target_cost(self) -> int:
+        return parse_hash_cost(f"{self.method}$")[1]
+
+    def _default_cost(self) -> int:
+        if self.algorithm == "scrypt":
+            return SCRYPT_DEFAULT_N
+        return PBKDF2_DEFAULT_ITERATIONS
+
+    def _method_for(self, cost: int) -> str:
+        if self.algorithm == "scrypt":
+            return f"scrypt:{cost}:{SCRYPT_BLOCK_SIZE}:{SCRYPT_PARALLELISM}"
+        return f"pbkdf2:sha256:{cost}"
+
+    def calibrate(self) -> str:
+        """Pick the highest cost whose hash time fits ``budget_ms``.
+
+        Blocking (runs real hashes) - call it from a worker thread. Has no
+        effect when an explicit ``PASSWORD_HASH_METHOD`` is configured.
+        """
+        if self.explicit:
+            return self.method
+        password = b"calibration-password"
+        salt = secrets.token_bytes(16)
+
+        if self.algorithm == "scrypt":
+            n = SCRYPT_MIN_N
+            elapsed = self._time_scrypt(password, salt, n)
+            # Cost doubles with N, so stop before the next step would exceed the budget
+            while n < SCRYPT_MAX_N and elapsed * 2 <= self.budget_ms:
+                n *= 2
+                elapsed = self._time_scrypt(password, salt, n)
+            cost = n
+        else:
+            probe_ms = _time_call(lambda: hashlib.pbkdf2_hmac("sha256", password, salt, PBKDF2_PROBE_ITERATIONS))
+            # pbkdf2 time is linear in iterations
+            iterations = int(PBKDF2_PROBE_ITERATIONS * self.budget_ms / max(probe_ms, 0.001))
+            iterations = max(PBKDF2_MIN_ITERATIONS, min(PBKDF2_MAX_ITERATIONS, iterations // 10_000 * 10_000))
+            cost = iterations
+            elapsed = probe_ms * iterations / PBKDF2_PROBE_ITERATIONS
+
+        self.method = self._method_for(cost)
+        self.measured_ms = round(elapsed, 2)
+        self.calibrated = True
+        logger.info(f"Password hash policy calibrated: {self.method} (~{self.measured_ms}ms, budget {self.budget_ms}ms)")
+        return self.method
+
+    @staticmethod
+    def _time_scrypt(password: bytes, salt: bytes, n: int) -> float:
+        maxmem = 128 * n * SCRYPT_BLOCK_SIZE * SCRYPT_PARALLELISM + 1024 * 1024
+        return _time_call(lambda: hashlib.scrypt(
+            password, salt=salt, n=n, r=SCRYPT_BLOCK_SIZE, p=SCRYPT_PARALLELISM, maxmem=maxmem
+        ), repeats=2)
+
+    def hash(self, password: str) -> str:
+        """Hash a password with the target parameters."""
+        return generate_password_hash(password, method=self.method)
+
+    def needs_rehash(self, hashed_password: Optional[str]) -> bool:
+        """True when the stored hash uses another algorithm or a cost outside tolerance."""
+        algorithm, cost = parse_hash_cost(hashed_password)
+        if algorithm != self.algorithm or cost is None:
+            return True
+        target = self.target_cost
+        return cost * COST_TOLERANCE < target or cost > target * COST_TOLERANCE
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the active policy for health/metrics reporting."""
+        return {
+            "algorithm": self.algorithm,
+            "method": self.method,
+            "budget_ms": self.budget_ms,
+            "calibrated": self.calibrated,
+            "explicit": self.explicit,
+            "measured_ms": self.measured_ms,
+            "rehashed": self.rehashed,
+        }
+
+
+# Singleton instance holder
+_hash_policy: Optional[HashPolicy] = None
+
+
+def init_hash_policy(config: Optional[Dict[str, Any]] = None) -> HashPolicy:
+    """Initialize the password hash policy (not calibrated yet)."""
+    global _hash_policy
+    config = config or {}
+    _hash_policy = HashPolicy(
+        algorithm=config.get("algorithm"),
+        method=config.get("method"),
+        budget_ms=config.get("budget_ms"),
+    )
+    return _hash_policy
+
+
+def get_hash_policy() -> HashPolicy:
+    """Get the password hash policy, creating it from env defaults if needed."""
+    global _hash_policy
+    if _hash_policy is None:
+        _hash_policy = HashPolicy()
+    return _hash_policy
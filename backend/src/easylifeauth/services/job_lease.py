@@ -0,0 +1,112 @@
+"""
+Leases for background jobs.
+
+Bulk upload and export jobs run as tasks in the worker that accepted them,
+while any worker (or pod) may serve requests about them. Each job document
+records its ``owner`` (the ``INSTANCE_ID`` of the worker running it) and a
+``lease_expires_at``. The owner renews the lease from a heartbeat task every
+third of the lease period, independently of how long a chunk or batch takes.
+
+A queued or running job is only reported as interrupted once its lease has
+expired - its worker stopped heartbeating because it crashed or restarted.
+Whether the job is in the serving worker's own task table is irrelevant.
+"""
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Owner id of the jobs started by this worker process
+INSTANCE_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+def _aware(value: datetime) -> datetime:
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+def lease_fields(lease_seconds: float) -> Dict[str, Any]:
+    """Fields giving this worker the lease on a job for ``lease_seconds``."""
+    return {
+        "owner": INSTANCE_ID,
+        "lease_expires_at": datetime.now(timezone.utc) + timedelta(seconds=lease_seconds),
+    }
+
+
+def lease_expired(job: Dict[str, Any]) -> bool:
+    """True when ``job`` is queued or running and nobody holds its lease any more."""
+    if job.get("status") not in ACTIVE_STATUSES:
+        return False
+    expires_at = job.get("lease_expires_at")
+    if not isinstance(expires_at, datetime):
+        return False
+    return _aware(expires_at) < datetime.now(timezone.utc)
+
+
+def expired_lease_filter(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Query matching ``job`` only while it still holds the expired lease that was read.
+
+    A heartbeat that renews the lease in the meantime makes it match nothing,
+    so a job is never failed over a lease its owner just extended.
+    """
+    return {
+        "job_id": job["job_id"],
+        "status": {"$in": list(ACTIVE_STATUSES)},
+        "owner": job.get("owner"),
+        "lease_expires_at": job.get("lease_expires_at"),
+    }
+
+
+class JobHeartbeat:
+    """Async context manager renewing a job's lease while the block runs.
+
+    When the lease turns out to be lost (another worker failed the job after a
+    long stall, or the job was deleted), the task running the block is
+    cancelled so it stops working on a job nobody is tracking.
+    """
+
+    def __init__(self, collection, job_id: str, lease_seconds: float):
+        self.collection = collection
+        self.job_id = job_id
+        self.lease_seconds = lease_seconds
+        self._owner_task: Optional[asyncio.Task] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def __aenter__(self) -> "JobHeartbeat":
+        self._owner_task = asyncio.current_task()
+        self._task = asyncio.create_task(self._beat())
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    async def renew(self) -> bool:
+        """Extend the lease; False when this worker no longer holds it."""
+        result = await self.collection.update_one(
+            {"job_id": self.job_id, "owner": INSTANCE_ID, "status": {"$in": list(ACTIVE_STATUSES)}},
+            {"$set": lease_fields(self.lease_seconds)}
+        )
+        return result.matched_count > 0
+
+    async def _beat(self) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                held = await self.renew()
+            except Exception as e:
+                logger.warning(f"Failed to renew the lease of job {self.job_id}: {e}")
+                continue
+            if not held:
+                logger.warning(f"Job {self.job_id} lost its lease, stopping it")
+                self._owner_task.cancel()
+                return
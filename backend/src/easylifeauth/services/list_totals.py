@@ -0,0 +1,115 @@
+"""
+Totals for the paginated list responses.
+
+Every page of a listing used to run an exact ``count_documents`` of its query,
+which dominates the cost of paging through large collections. Totals now go
+through ``ListTotalsCache.count``, which picks the cheapest source:
+
+- a total the client passes back from a previous page is reused as is;
+- unfiltered listings use ``estimated_document_count`` (collection metadata);
+- filtered totals are counted exactly and cached per normalised query for
+  ``LIST_TOTALS_CACHE_TTL_SECONDS``.
+
+Write requests to the admin routers drop the cache (see
+``api.dependencies.invalidate_read_caches_on_write``). The cache is per
+process, though: only the worker that served the write drops it, so other
+workers may return stale totals for up to the TTL, as they do for writes made
+outside those routes.
+"""
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from bson import json_util
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query: Dict[str, Any]) -> str:
+    """Canonical form of a query, independent of key order."""
+    return json_util.dumps(query, sort_keys=True)
+
+
+class ListTotalsCache:
+    """Short-lived cache of filtered list totals, keyed by namespace and query."""
+
+    def __init__(self, ttl_seconds: Optional[float] = None, max_entries: Optional[int] = None):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(
+            os.getenv("LIST_TOTALS_CACHE_TTL_SECONDS", "15")
+        )
+        self.max_entries = max_entries if max_entries is not None else int(
+            os.getenv("LIST_TOTALS_CACHE_MAX_ENTRIES", "1000")
+        )
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[int, float]]" = OrderedDict()
+        # Bumped by invalidate(), so a count that started before a write is not stored
+        self._generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.estimated = 0
+
+    async def count(self, collection, query: Dict[str, Any], known_total: Optional[int] = None) -> int:
+        """Total of ``query`` in ``collection``."""
+        if known_total is not None and known_total >= 0:
+            return known_total
+        if not query:
+            self.estimated += 1
+            return await collection.estimated_document_count()
+
+        namespace = getattr(collection, "full_name", None)
+        if self.ttl_seconds <= 0 or not isinstance(namespace, str):
+            self.misses += 1
+            return await collection.count_documents(query)
+
+        key = (namespace, normalize_query(query))
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() < entry[1]:
+            self.hits += 1
+            return entry[0]
+
+        self.misses += 1
+        generation = self._generation
+        total = await collection.count_documents(query)
+        if generation == self._generation:
+            self._entries[key] = (total, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return total
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "estimated": self.estimated,
+        }
+
+
+# Singleton instance holder
+_list_totals_cache: Optional[ListTotalsCache] = None
+
+
+def get_list_totals_cache() -> ListTotalsCache:
+    """Get the list totals cache, creating it from env defaults if needed."""
+    global _list_totals_cache
+    if _list_totals_cache is None:
+        _list_totals_cache = ListTotalsCache()
+    return _list_totals_cache
+
+
+async def count_list_total(collection, query: Dict[str, Any], known_total: Optional[int] = None) -> int:
+    """Total for a paginated listing of ``query``."""
+    return await get_list_totals_cache().count(collection, query, known_total)
+
+
+def invalidate_list_totals() -> None:
+    """Drop the cached list totals after a write."""
+    if _list_totals_cache is not None:
+        _list_totals_cache.invalidate()
@@ -19,6 +19,7 @@ from .token_manager import TokenManager
 from .email_service import EmailService
 from .jira_service import JiraService
 from .file_storage_service import FileStorageService
+from .search_index import search_filter
 from ..errors.auth_error import AuthError
 
 
@@ -90,11 +91,7 @@ class NewScenarioService:
         """Get users for autocomplete (assigned_to field)"""
         cursor = self.db.users.find(
             {
-                "$or": [
-                    {"email": {"$regex": search_term, "$options": "i"}},
-                    {"full_name": {"$regex": search_term, "$options": "i"}},
-                    {"username": {"$regex": search_term, "$options": "i"}}
-                ],
+                **await search_filter(self.db, "users", search_term),
                 "is_active": True
             },
             {"_id": 1, "email": 1, "full_name": 1, "username": 1}
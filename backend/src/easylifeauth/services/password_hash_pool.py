@@ -0,0 +1,170 @@
+"""Bounded worker pool for password hashing and verification.
+
+scrypt/bcrypt/pbkdf2 are deliberately slow (tens of milliseconds each). Running
+them inline in an async route blocks the event loop, so a burst of logins
+stalls every other request on the worker. This pool runs them in a small
+thread pool (hashlib and bcrypt release the GIL while hashing) and caps the
+number of waiting jobs: once the cap is reached new jobs are rejected with
+``PasswordHashPoolBusy`` instead of piling up.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHashPoolBusy(Exception):
+    """Raised when the hashing pool is saturated or a job waited too long."""
+
+
+class PasswordHashPool:
+    """Size-limited executor for CPU-heavy password hashing."""
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        queue_timeout: Optional[float] = None,
+    ):
+        self.max_workers = max_workers or int(
+            os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1)))
+        )
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+        self.queue_timeout = queue_timeout if queue_timeout is not None else float(
+            os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT", "10")
+        )
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+        self._pending = 0  # submitted and not finished (queued + running)
+        self._running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._total_wait = 0.0
+        self._total_run = 0.0
+        self._max_pending_seen = 0
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    @property
+    def queued(self) -> int:
+        return max(self._pending - self._running, 0)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="password-hash"
+            )
+        return self._executor
+
+    def _execute(self, submitted_at: float, func: Callable[..., Any], args: tuple) -> Any:
+        started_at = time.perf_counter()
+        with self._lock:
+            self._running += 1
+            self._total_wait += started_at - submitted_at
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._total_run += time.perf_counter() - started_at
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run ``func(*args)`` on the pool and return its result.
+
+        Raises:
+            PasswordHashPoolBusy: when ``max_queue`` jobs are already waiting
+                or the job does not finish within ``queue_timeout`` seconds.
+        """
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise PasswordHashPoolBusy("Password hashing queue is full")
+            self._pending += 1
+            self._max_pending_seen = max(self._max_pending_seen, self._pending)
+
+        try:
+            job = self._get_executor().submit(self._execute, time.perf_counter(), func, args)
+        except BaseException:
+            self._job_done(None)
+            raise
+        # A timed-out job keeps its thread busy, so it counts against the queue
+        # bound until it really finishes (or is cancelled before starting)
+        job.add_done_callback(self._job_done)
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(job), timeout=self.queue_timeout)
+            with self._lock:
+                self.completed += 1
+            return result
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timed_out += 1
+            logger.warning(f"Password hashing job timed out after {self.queue_timeout}s")
+            raise PasswordHashPoolBusy("Password hashing timed out")
+
+    def _job_done(self, _job) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue-depth and latency metrics."""
+        with self._lock:
+            started = self.completed + self._running
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queue_timeout_seconds": self.queue_timeout,
+                "running": self._running,
+                "queued": max(self._pending - self._running, 0),
+                "max_pending_seen": self._max_pending_seen,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+                "avg_wait_ms": round(self._total_wait / started * 1000, 2) if started else 0.0,
+                "avg_run_ms": round(self._total_run / self.completed * 1000, 2) if self.completed else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        """Stop the worker threads."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Singleton instance holder
+_password_hash_pool: Optional[PasswordHashPool] = None
+
+
+def init_password_hash_pool(config: Optional[Dict[str, Any]] = None) -> PasswordHashPool:
+    """Initialize the password hashing pool."""
+    global _password_hash_pool
+    config = config or {}
+    if _password_hash_pool is not None:
+        _password_hash_pool.shutdown()
+    _password_hash_pool = PasswordHashPool(
+        max_workers=config.get("max_workers"),
+        max_queue=config.get("max_queue"),
+        queue_timeout=config.get("queue_timeout"),
+    )
+    return _password_hash_pool
+
+
+def get_password_hash_pool() -> PasswordHashPool:
+    """Get the password hashing pool, creating it from env defaults if needed."""
+    global _password_hash_pool
+    if _password_hash_pool is None:
+        _password_hash_pool = PasswordHashPool()
+    return _password_hash_pool
+
+
+async def run_password_hash(func: Callable[..., Any], *args: Any) -> Any:
+    """Convenience wrapper: run a hashing function on the shared pool."""
+    return await get_password_hash_pool().run(func, *args)
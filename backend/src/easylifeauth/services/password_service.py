@@ -3,11 +3,13 @@ from typing import Dict, Any, Optional
 import secrets
 import hashlib
 from datetime import datetime, timezone, timedelta
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import check_password_hash
 
 from ..db.db_manager import DatabaseManager
 from .token_manager import TokenManager
 from .email_service import EmailService
+from .password_hash_pool import PasswordHashPoolBusy, run_password_hash
+from .user_service import hash_password_async
 from ..errors.auth_error import AuthError
 
 
@@ -81,7 +83,7 @@ class PasswordResetService:
             raise AuthError("Invalid or expired token", 400)
         
         # Update password
-        password_hash = generate_password_hash(new_password)
+        password_hash = await hash_password_async(new_password)
 
         result = await self.db.users.update_one(
             {"_id": reset_record["user_id"]},
@@ -93,6 +95,8 @@ class PasswordResetService:
         
         if result.matched_count == 0:
             raise AuthError("User not found", 400)
+
+        await self.token_manager.revoke_user_tokens(str(reset_record["user_id"]))
         
         # Delete all reset tokens for this user (invalidate any outstanding tokens)
         await self.db.reset_tokens.delete_many({"user_id": reset_record["user_id"]})
@@ -118,16 +122,22 @@ class PasswordResetService:
             raise AuthError("Invalid email or password", 401)
         
         # Check current password
-        if not check_password_hash(user["password_hash"], password):
+        try:
+            password_ok = await run_password_hash(check_password_hash, user["password_hash"], password)
+        except PasswordHashPoolBusy:
+            raise AuthError("Server is busy, please try again shortly", 503)
+        if not password_ok:
             raise AuthError("Invalid email or password", 401)
-        
+
+        new_password_hash = await hash_password_async(new_password)
+
         # Update password
         await self.db.users.update_one(
             {"_id": user["_id"]},
             {"$set": {
                 "last_login": datetime.now(timezone.utc),
                 "updated_at": datetime.now(timezone.utc),
-                "password_hash": generate_password_hash(new_password)
+                "password_hash": new_password_hash
             }}
         )
 
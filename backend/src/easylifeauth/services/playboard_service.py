@@ -5,6 +5,8 @@ from bson import ObjectId
 
 from ..db.db_manager import DatabaseManager, is_valid_objectid
 from ..errors.playboard_error import PlayboardNotFoundError, PlayboardBadError
+from .entity_counters import mark_entity_counts_stale, record_entity_insert
+from .search_index import index_search_document
 
 
 UPDATE_ATTRS = [
@@ -102,6 +104,9 @@ class PlayboardService:
 
         if result.matched_count == 0:
             raise PlayboardNotFoundError("Playboard not found")
+        if "status" in update_attributes:
+            await mark_entity_counts_stale("playboards")
+        await index_search_document("playboards", ObjectId(docid))
         
         return await self.get(docid)
 
@@ -121,6 +126,7 @@ class PlayboardService:
 
         if result.matched_count == 0:
             raise PlayboardBadError("Playboard not found")
+        await mark_entity_counts_stale("playboards")
         
         return await self.get(docid)
 
@@ -142,6 +148,8 @@ class PlayboardService:
 
         result = await self.db.playboards.insert_one(insertable)
         new_doc_id = str(result.inserted_id)
+        await record_entity_insert("playboards", insertable)
+        await index_search_document("playboards", result.inserted_id)
 
         out_result = await self.db.playboards.find_one(
             {"_id": ObjectId(new_doc_id)}
@@ -163,5 +171,6 @@ class PlayboardService:
 
         if result.matched_count == 0:
             raise PlayboardNotFoundError("Playboard not found")
+        await mark_entity_counts_stale("playboards")
         
         return {"message": "Playboard deleted successfully"}
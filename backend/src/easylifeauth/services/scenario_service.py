@@ -5,6 +5,7 @@ from bson import ObjectId
 
 from ..db.db_manager import DatabaseManager, is_valid_objectid
 from ..errors.scenario_error import ScenarioNotFoundError, ScenarioBadError
+from .entity_counters import mark_entity_counts_stale, record_entity_insert
 
 
 UPDATE_ATTRS = [
@@ -88,6 +89,8 @@ class ScenarioService:
 
         if result.matched_count == 0:
             raise ScenarioNotFoundError("Scenario not found")
+        if "status" in update_attributes:
+            await mark_entity_counts_stale("domain_scenarios")
         
         return await self.get_scenario(docid)
 
@@ -107,6 +110,7 @@ class ScenarioService:
 
         if result.matched_count == 0:
             raise ScenarioBadError("Scenario not found")
+        await mark_entity_counts_stale("domain_scenarios")
         
         return await self.get_scenario(docid)
 
@@ -128,6 +132,7 @@ class ScenarioService:
 
         result = await self.db.domain_scenarios.insert_one(insertable)
         new_doc_id = str(result.inserted_id)
+        await record_entity_insert("domain_scenarios", insertable)
 
         out_result = await self.db.domain_scenarios.find_one({"_id": ObjectId(new_doc_id)})
         out_result["_id"] = str(out_result["_id"])
@@ -147,5 +152,6 @@ class ScenarioService:
 
         if result.matched_count == 0:
             raise ScenarioNotFoundError("Scenario not found")
+        await mark_entity_counts_stale("domain_scenarios")
         
         return {"message": "Scenario deleted successfully"}
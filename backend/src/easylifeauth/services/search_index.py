@@ -0,0 +1,298 @@
+"""
+Trigram search index for the admin listing endpoints.
+
+Listing searches used to be case-insensitive, unanchored ``$regex`` filters
+over several fields, which no index can serve. The ``search_tokens``
+collection now holds one entry per searchable document::
+
+    {"_id": "users:<doc id>", "entity": "users", "doc_id": <doc id>,
+     "tokens": ["adm", "dmi", ...], "key": "<hash of the searched values>"}
+
+``tokens`` are the lower-cased trigrams of the fields in ``SEARCH_FIELDS``,
+indexed with ``entity``. A search for a term of three or more characters
+first looks up the ids whose entries contain the term's trigrams, then
+filters those ids with the original (escaped) regex, so results are exactly
+the same as before while the candidate set comes from an index. Shorter
+terms, terms matching more than ``max_candidates`` documents and entities
+whose index is stale fall back to the plain regex.
+
+Entries are kept current like the entity counters: the create/update/delete
+paths call ``index_search_document`` with the id they wrote, bulk writes
+call ``mark_search_index_stale``, and a reconcile job
+(``SEARCH_INDEX_RECONCILE_SECONDS``) rebuilds the entries that drifted and
+clears the stale flag of each entity.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+from pymongo import DeleteOne, ReplaceOne
+from pymongo.errors import DuplicateKeyError
+
+from ..db.db_manager import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+# Fields each listing endpoint searches
+SEARCH_FIELDS = {
+    "users": ("email", "username", "full_name"),
+    "customers": ("customerId", "name", "description"),
+    "roles": ("name", "roleId"),
+    "groups": ("name", "groupId"),
+    "configurations": ("key", "config_id"),
+    "api_configs": ("name", "key", "description"),
+    "playboards": ("name",),
+}
+
+GRAM_SIZE = 3
+MAX_QUERY_GRAMS = 8
+RECONCILE_BATCH_SIZE = 500
+
+
+def _normalize(value: Any) -> str:
+    return str(value).lower() if value is not None else ""
+
+
+def grams(value: Any) -> List[str]:
+    """Distinct trigrams of a field value or search term."""
+    text = _normalize(value)
+    return list(dict.fromkeys(text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)))
+
+
+def query_grams(term: str) -> List[str]:
+    """Trigrams to look a term up by, spread over the term and capped."""
+    term_grams = grams(term)
+    if len(term_grams) <= MAX_QUERY_GRAMS:
+        return term_grams
+    step = (len(term_grams) - 1) / (MAX_QUERY_GRAMS - 1)
+    return [term_grams[round(i * step)] for i in range(MAX_QUERY_GRAMS)]
+
+
+def regex_search_filter(entity: str, term: str, fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """Case-insensitive substring match of ``term`` on the entity's search fields (or ``fields``)."""
+    pattern = re.escape(term)
+    return {"$or": [{field: {"$regex": pattern, "$options": "i"}} for field in fields or SEARCH_FIELDS[entity]]}
+
+
+def _entry_id(entity: str, doc_id: Any) -> str:
+    return f"{entity}:{doc_id}"
+
+
+def _meta_id(entity: str) -> str:
+    return f"meta:{entity}"
+
+
+def build_entry(entity: str, document: Dict[str, Any]) -> Dict[str, Any]:
+    """Search index entry of a source document."""
+    values = [_normalize(document.get(field)) for field in SEARCH_FIELDS[entity]]
+    tokens: Dict[str, None] = {}
+    for value in values:
+        tokens.update(dict.fromkeys(grams(value)))
+    return {
+        "_id": _entry_id(entity, document["_id"]),
+        "entity": entity,
+        "doc_id": document["_id"],
+        "tokens": list(tokens),
+        "key": hashlib.sha1("\x1f".join(values).encode("utf-8")).hexdigest()[:16],
+    }
+
+
+class SearchIndexService:
+    """Maintains and queries the ``search_tokens`` collection."""
+
+    def __init__(self, db: DatabaseManager, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.db = db
+        self.reconcile_seconds = int(
+            config.get("reconcile_seconds") or os.getenv("SEARCH_INDEX_RECONCILE_SECONDS", "300")
+        )
+        self.max_candidates = int(
+            config.get("max_candidates") or os.getenv("SEARCH_INDEX_MAX_CANDIDATES", "5000")
+        )
+        self._reconcile_task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+
+    @property
+    def collection(self):
+        return getattr(self.db, "search_tokens", None)
+
+    # ---------------------------------------------------------------- query
+
+    async def search_filter(
+        self, entity: str, term: str, fields: Optional[Sequence[str]] = None
+    ) -> Dict[str, Any]:
+        """Mongo filter matching ``term`` in ``entity``, narrowed through the index when usable.
+
+        ``fields`` restricts the match to some of the indexed fields.
+        """
+        regex_filter = regex_search_filter(entity, term, fields)
+        term_grams = query_grams(term)
+        if not term_grams or self.collection is None:
+            return regex_filter
+        try:
+            meta = await self.collection.find_one({"_id": _meta_id(entity)})
+            if meta is None or meta.get("stale"):
+                return regex_filter
+            doc_ids = []
+            cursor = self.collection.find(
+                {"entity": entity, "tokens": {"$all": term_grams}}, {"doc_id": 1}
+            ).limit(self.max_candidates + 1)
+            async for entry in cursor:
+                doc_ids.append(entry["doc_id"])
+        except Exception as e:
+            logger.warning(f"Search index lookup failed for {entity}: {e}")
+            return regex_filter
+        if len(doc_ids) > self.max_candidates:
+            # Too unselective to beat a scan with the regex alone
+            return regex_filter
+        return {"$and": [{"_id": {"$in": doc_ids}}, regex_filter]}
+
+    # --------------------------------------------------------------- writes
+
+    async def index_document(self, entity: str, doc_id: Any) -> None:
+        """Rebuild the entry of one document (removing it if the document is gone)."""
+        source = getattr(self.db, entity, None)
+        if self.collection is None or source is None or entity not in SEARCH_FIELDS:
+            return
+        try:
+            projection = {field: 1 for field in SEARCH_FIELDS[entity]}
+            document = await source.find_one({"_id": doc_id}, projection)
+            if document is None:
+                await self.collection.delete_one({"_id": _entry_id(entity, doc_id)})
+            else:
+                entry = build_entry(entity, document)
+                await self.collection.replace_one({"_id": entry["_id"]}, entry, upsert=True)
+        except Exception as e:
+            logger.warning(f"Failed to index {entity} {doc_id} for search: {e}")
+            await self.mark_stale(entity)
+
+    async def mark_stale(self, entity: str) -> None:
+        """Search ``entity`` with the plain regex until its entries are reconciled."""
+        if self.collection is None or entity not in SEARCH_FIELDS:
+            return
+        try:
+            await self.collection.update_one(
+                {"_id": _meta_id(entity)},
+                {"$set": {"stale": True}, "$inc": {"generation": 1}},
+                upsert=True
+            )
+        except Exception as e:
+            logger.warning(f"Failed to mark {entity} search index stale: {e}")
+        self._wakeup.set()
+
+    # ------------------------------------------------------------ reconcile
+
+    async def reconcile_one(self, entity: str) -> int:
+        """Rebuild the drifted entries of ``entity``; returns how many changed."""
+        source = getattr(self.db, entity, None)
+        if self.collection is None or source is None:
+            return 0
+        meta = await self.collection.find_one({"_id": _meta_id(entity)})
+        generation = (meta or {}).get("generation", 0)
+
+        existing: Dict[Any, Optional[str]] = {}
+        async for entry in self.collection.find({"entity": entity}, {"doc_id": 1, "key": 1}):
+            existing[entry["doc_id"]] = entry.get("key")
+
+        changed = 0
+        operations: List[Any] = []
+        projection = {field: 1 for field in SEARCH_FIELDS[entity]}
+        async for document in source.find({}, projection):
+            entry = build_entry(entity, document)
+            if existing.pop(document["_id"], None) != entry["key"]:
+                operations.append(ReplaceOne({"_id": entry["_id"]}, entry, upsert=True))
+            if len(operations) >= RECONCILE_BATCH_SIZE:
+                await self.collection.bulk_write(operations, ordered=False)
+                changed += len(operations)
+                operations = []
+        operations.extend(DeleteOne({"_id": _entry_id(entity, doc_id)}) for doc_id in existing)
+        if operations:
+            await self.collection.bulk_write(operations, ordered=False)
+            changed += len(operations)
+
+        try:
+            # Stays stale if it was marked again while rebuilding
+            await self.collection.update_one(
+                {"_id": _meta_id(entity), "generation": generation},
+                {"$set": {"stale": False, "reconciled_at": datetime.now(timezone.utc)}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            pass
+        return changed
+
+    async def reconcile(self) -> int:
+        """Reconcile every searchable collection; returns how many entries changed."""
+        changed = 0
+        for entity in SEARCH_FIELDS:
+            try:
+                changed += await self.reconcile_one(entity)
+            except Exception as e:
+                logger.warning(f"Failed to reconcile {entity} search index: {e}")
+        return changed
+
+    async def _reconcile_loop(self) -> None:
+        while True:
+            self._wakeup.clear()
+            changed = await self.reconcile()
+            if changed:
+                logger.info(f"Search index reconciled: {changed} entries rebuilt")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.reconcile_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        """Build the index now and start the periodic reconcile job."""
+        if self._reconcile_task is None and self.reconcile_seconds > 0:
+            self._reconcile_task = asyncio.create_task(self._reconcile_loop())
+
+    async def shutdown(self) -> None:
+        if self._reconcile_task is not None:
+            self._reconcile_task.cancel()
+            await asyncio.gather(self._reconcile_task, return_exceptions=True)
+            self._reconcile_task = None
+
+
+# Singleton instance holder
+_search_index_service: Optional[SearchIndexService] = None
+
+
+def init_search_index_service(
+    db: DatabaseManager,
+    config: Optional[Dict[str, Any]] = None
+) -> SearchIndexService:
+    """Initialize the search index service."""
+    global _search_index_service
+    _search_index_service = SearchIndexService(db, config)
+    return _search_index_service
+
+
+def get_search_index_service() -> Optional[SearchIndexService]:
+    """Get the search index service instance."""
+    return _search_index_service
+
+
+async def search_filter(
+    db: DatabaseManager, entity: str, term: str, fields: Optional[Sequence[str]] = None
+) -> Dict[str, Any]:
+    """Filter for a listing search; uses the index when it covers the collections of ``db``."""
+    if _search_index_service is not None and _search_index_service.db is db:
+        return await _search_index_service.search_filter(entity, term, fields)
+    return regex_search_filter(entity, term, fields)
+
+
+async def index_search_document(entity: str, doc_id: Any) -> None:
+    """Refresh the search entry of a written document, if the index is enabled."""
+    if _search_index_service:
+        await _search_index_service.index_document(entity, doc_id)
+
+
+async def mark_search_index_stale(entity: str) -> None:
+    """Fall back to regex search for ``entity`` until reconciled, if the index is enabled."""
+    if _search_index_service:
+        await _search_index_service.mark_stale(entity)
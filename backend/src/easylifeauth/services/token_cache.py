@@ -0,0 +1,135 @@
+"""In-process cache of verified JWT payloads.
+
+Keeps validated access-token payloads keyed by the SHA-256 digest of the raw
+token so that steady-state authentication does not need a ``tokens``
+round trip. Entries live until the token's ``exp`` (capped by ``ttl_seconds``)
+or until they are invalidated by logout, token rotation or a password change.
+
+A cached token stays valid on a worker until that worker hears of its
+revocation, so ``TokenManager`` only enables the cache by default when a
+shared revocation bus (``TOKEN_REVOCATION_REDIS_URL``) is configured, and
+disables it on a worker whose revocations stop getting through.
+"""
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+
+
+def token_digest(token: str) -> str:
+    """Return the cache key for a raw token."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class TokenCache:
+    """Bounded, TTL-evicting LRU cache of verified token payloads."""
+
+    def __init__(
+        self,
+        max_size: Optional[int] = None,
+        ttl_seconds: Optional[int] = None,
+        enabled: Optional[bool] = None,
+    ):
+        self.max_size = max_size if max_size is not None else int(os.getenv("TOKEN_CACHE_MAX_SIZE", "10000"))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else int(os.getenv("TOKEN_CACHE_TTL_SECONDS", "300"))
+        if enabled is None:
+            enabled = os.getenv("TOKEN_CACHE_ENABLED", "false").lower() == "true"
+        self.enabled = enabled and self.max_size > 0
+
+        # digest -> (monotonic expiry, user_id, payload)
+        self._entries: "OrderedDict[str, Tuple[float, str, Dict[str, Any]]]" = OrderedDict()
+        # user_id -> digests, so that logout/rotation can drop every session of a user
+        self._by_user: Dict[str, Set[str]] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """Return the cached payload for ``token`` or None on miss/expiry."""
+        if not self.enabled:
+            return None
+        digest = token_digest(token)
+        entry = self._entries.get(digest)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, _, payload = entry
+        if expires_at <= time.monotonic():
+            self._remove(digest)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(digest)
+        self.hits += 1
+        return dict(payload)
+
+    def set(self, token: str, payload: Dict[str, Any]) -> None:
+        """Cache a verified payload until its ``exp`` claim (capped by the TTL)."""
+        if not self.enabled:
+            return
+        ttl = float(self.ttl_seconds)
+        exp = payload.get("exp")
+        if isinstance(exp, (int, float)):
+            ttl = min(ttl, exp - time.time())
+        if ttl <= 0:
+            return
+
+        digest = token_digest(token)
+        user_id = str(payload.get("user_id", ""))
+        if digest in self._entries:
+            self._remove(digest)
+        self._entries[digest] = (time.monotonic() + ttl, user_id, dict(payload))
+        self._by_user.setdefault(user_id, set()).add(digest)
+
+        while len(self._entries) > self.max_size:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def invalidate(self, token: str) -> None:
+        """Drop a single token from the cache."""
+        self._remove(token_digest(token))
+
+    def invalidate_user(self, user_id: str) -> int:
+        """Drop every cached token for a user. Returns the number removed."""
+        digests = self._by_user.pop(str(user_id), set())
+        for digest in digests:
+            self._entries.pop(digest, None)
+        return len(digests)
+
+    def clear(self) -> None:
+        """Drop all cached entries."""
+        self._entries.clear()
+        self._by_user.clear()
+
+    def disable(self) -> None:
+        """Drop all cached entries and stop caching."""
+        self.enabled = False
+        self.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache counters for health/metrics reporting."""
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _remove(self, digest: str) -> None:
+        entry = self._entries.pop(digest, None)
+        if entry is None:
+            return
+        user_id = entry[1]
+        digests = self._by_user.get(user_id)
+        if digests is not None:
+            digests.discard(digest)
+            if not digests:
+                del self._by_user[user_id]
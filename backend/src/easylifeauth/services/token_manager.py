@@ -1,5 +1,6 @@
 """Async JWT Token Management Service"""
 import os
+import logging
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta, timezone
 import jwt
@@ -7,6 +8,25 @@ from bson import ObjectId
 
 from ..errors.auth_error import AuthError
 from ..db.db_manager import DatabaseManager
+from .token_cache import TokenCache
+from .token_revocation import RevocationBus
+
+logger = logging.getLogger(__name__)
+
+
+def token_cache_enabled(revocation_bus: Optional[RevocationBus]) -> bool:
+    """``TOKEN_CACHE_ENABLED``, defaulting to on only with a shared revocation bus"""
+    shared = revocation_bus is not None and revocation_bus.shared
+    setting = os.getenv("TOKEN_CACHE_ENABLED", "").strip().lower()
+    if not setting:
+        return shared
+    enabled = setting == "true"
+    if enabled and not shared:
+        logger.warning(
+            "TOKEN_CACHE_ENABLED without TOKEN_REVOCATION_REDIS_URL: revoked tokens stay "
+            "valid on other workers for up to TOKEN_CACHE_TTL_SECONDS; run a single worker"
+        )
+    return enabled
 
 
 class TokenManager:
@@ -21,6 +41,8 @@ class TokenManager:
         audience: str = "easylife-api",
         access_token_expiry_minutes: Optional[int] = None,
         refresh_token_expiry_minutes: Optional[int] = None,
+        token_cache: Optional[TokenCache] = None,
+        revocation_bus: Optional[RevocationBus] = None,
     ):
         self.secret_key = secret_key
         self.algorithm = algorithm
@@ -42,6 +64,56 @@ class TokenManager:
         self.access_token_expires = timedelta(minutes=timeout)
         self.refresh_token_expires = timedelta(minutes=refresh_timeout)
 
+        # Verified access-token payloads, so steady-state auth skips the tokens lookup
+        if token_cache is None:
+            token_cache = TokenCache(enabled=token_cache_enabled(revocation_bus))
+        self.token_cache = token_cache
+        # Propagates revocations to the token caches of the other workers
+        self.revocation_bus = revocation_bus
+
+    def invalidate_user_tokens(self, user_id: Optional[str]) -> None:
+        """Drop this worker's cached verifications for a user (None drops all)"""
+        if user_id is None:
+            self.token_cache.clear()
+        else:
+            self.token_cache.invalidate_user(str(user_id))
+
+    def disable_token_cache(self, reason: str) -> None:
+        """Stop caching verifications on this worker, so every request checks the tokens collection"""
+        if self.token_cache.enabled:
+            logger.error(f"Token cache disabled: {reason}")
+        self.token_cache.disable()
+
+    async def revoke_user_tokens(self, user_id: str) -> None:
+        """Drop cached verifications for a user on every worker (logout, token rotation, password change)"""
+        self.invalidate_user_tokens(user_id)
+        if self.revocation_bus is None:
+            return
+        try:
+            await self.revocation_bus.publish(str(user_id))
+        except Exception as e:
+            # The bus is unreliable, so this worker may be missing revocations as well
+            self.disable_token_cache(f"failed to publish token revocation for {user_id}: {e}")
+
+    async def start_revocation_listener(self) -> None:
+        """Subscribe this worker's token cache to the revocation bus.
+
+        If subscribing fails the cache is disabled, since this worker would never
+        hear revocations published by the others.
+        """
+        if self.revocation_bus is None:
+            return
+        try:
+            await self.revocation_bus.start(self.invalidate_user_tokens)
+        except Exception as e:
+            self.disable_token_cache(f"token revocation listener failed to start: {e}")
+            raise
+
+    async def stop_revocation_listener(self) -> None:
+        """Unsubscribe from the revocation bus"""
+        if self.revocation_bus is not None:
+            await self.revocation_bus.stop()
+
     async def sync_access_token(
         self,
         user_id: str,
@@ -53,7 +125,7 @@ class TokenManager:
         """Sync Token in DB"""
         if db is None:
             db = self.db
-        
+
         result = await db.tokens.find_one({"user_id": user_id, "email": email})
         now = datetime.now(timezone.utc)
         
@@ -85,6 +157,10 @@ class TokenManager:
                     "active": "Y"
                 }}
             )
+
+        # Revoke only after the write, so a concurrent request cannot re-cache
+        # the superseded token pair between the revocation and the update
+        await self.revoke_user_tokens(user_id)
         return out
 
     async def validate_backend_token(
@@ -169,6 +245,11 @@ class TokenManager:
 
     async def verify_token(self, token: str, token_type: str = "access") -> Dict[str, Any]:
         """Verify and decode token"""
+        if token_type == "access":
+            cached = self.token_cache.get(token)
+            if cached is not None:
+                return cached
+
         try:
             payload = jwt.decode(
                 token, self.secret_key, algorithms=[self.algorithm],
@@ -198,6 +279,8 @@ class TokenManager:
                     valid = True
             
             if valid:
+                if token_type == "access":
+                    self.token_cache.set(token, payload)
                 return payload
             else:
                 raise AuthError("Invalid token type", 401)
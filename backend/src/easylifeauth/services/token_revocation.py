@@ -0,0 +1,161 @@
+"""Cross-worker token revocation channel.
+
+Each worker keeps its own ``TokenCache``. When a worker revokes a user's
+tokens (logout, token rotation, password change) it publishes the user id on
+a revocation bus; every subscribed worker drops its cached entries for that
+user. A ``None`` user id means "flush everything" and is emitted when a
+subscriber may have missed messages (e.g. after a Redis reconnect).
+"""
+import asyncio
+import json
+import logging
+import os
+import uuid
+from abc import ABC, abstractmethod
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+RevocationHandler = Callable[[Optional[str]], None]
+
+DEFAULT_REVOCATION_CHANNEL = "easylife:token-revocations"
+
+
+class RevocationBus(ABC):
+    """Interface for a token revocation channel."""
+
+    # True when revocations reach the other workers and pods
+    shared = False
+
+    @abstractmethod
+    async def publish(self, user_id: Optional[str]) -> None:
+        """Revoke a user's cached tokens everywhere (None flushes all)."""
+
+    @abstractmethod
+    async def start(self, handler: RevocationHandler) -> None:
+        """Call ``handler`` for every revocation published on the bus."""
+
+    @abstractmethod
+    async def stop(self) -> None:
+        """Stop delivering revocations."""
+
+
+class InMemoryRevocationBus(RevocationBus):
+    """Process-local bus. Used for single-worker deployments and tests.
+
+    Several TokenManagers sharing one instance behave like several workers
+    sharing one Redis channel.
+    """
+
+    def __init__(self):
+        self._handlers: List[RevocationHandler] = []
+
+    async def publish(self, user_id: Optional[str]) -> None:
+        for handler in list(self._handlers):
+            try:
+                handler(user_id)
+            except Exception as e:
+                logger.warning(f"Token revocation handler failed: {e}")
+
+    async def start(self, handler: RevocationHandler) -> None:
+        self._handlers.append(handler)
+
+    async def stop(self) -> None:
+        self._handlers.clear()
+
+
+class RedisRevocationBus(RevocationBus):
+    """Redis pub/sub bus shared by all workers and pods."""
+
+    shared = True
+
+    def __init__(self, redis_client, channel: str = DEFAULT_REVOCATION_CHANNEL, poll_timeout: float = 1.0):
+        self.redis = redis_client
+        self.channel = channel
+        self.poll_timeout = poll_timeout
+        self.origin = uuid.uuid4().hex
+        self._pubsub = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def publish(self, user_id: Optional[str]) -> None:
+        message = json.dumps({"user_id": user_id, "origin": self.origin})
+        await self.redis.publish(self.channel, message)
+
+    async def start(self, handler: RevocationHandler) -> None:
+        if self._task is not None:
+            return
+        self._pubsub = self.redis.pubsub()
+        await self._pubsub.subscribe(self.channel)
+        self._task = asyncio.create_task(self._listen(handler))
+        logger.info(f"Token revocation listener subscribed to {self.channel}")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._pubsub is not None:
+            try:
+                await self._pubsub.unsubscribe(self.channel)
+                await self._pubsub.close()
+            except Exception as e:
+                logger.warning(f"Error closing token revocation subscription: {e}")
+            self._pubsub = None
+
+    async def _listen(self, handler: RevocationHandler) -> None:
+        disconnected = False
+        while True:
+            try:
+                message = await self._pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=self.poll_timeout
+                )
+                if disconnected:
+                    # Entries cached while disconnected may have missed revocations
+                    logger.info("Token revocation listener reconnected, flushing token cache")
+                    handler(None)
+                    disconnected = False
+                if message is None:
+                    continue
+                self._dispatch(handler, message.get("data"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Messages may have been lost while the connection was down
+                logger.warning(f"Token revocation listener error, flushing token cache: {e}")
+                handler(None)
+                disconnected = True
+                await asyncio.sleep(self.poll_timeout)
+
+    def _dispatch(self, handler: RevocationHandler, data) -> None:
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+        try:
+            body = json.loads(data)
+        except (TypeError, ValueError):
+            logger.warning(f"Ignoring malformed token revocation message: {data!r}")
+            return
+        if body.get("origin") == self.origin:
+            # Already applied locally by the publishing worker
+            return
+        handler(body.get("user_id"))
+
+
+def create_revocation_bus(redis_url: Optional[str] = None) -> RevocationBus:
+    """Build the revocation bus from ``TOKEN_REVOCATION_REDIS_URL``.
+
+    Falls back to the process-local bus when no Redis URL is configured or the
+    redis package is unavailable.
+    """
+    redis_url = redis_url or os.getenv("TOKEN_REVOCATION_REDIS_URL")
+    if not redis_url:
+        return InMemoryRevocationBus()
+    try:
+        import redis.asyncio as aioredis
+    except ImportError:
+        logger.warning("redis package not installed - token revocation is process-local only")
+        return InMemoryRevocationBus()
+    channel = os.getenv("TOKEN_REVOCATION_CHANNEL", DEFAULT_REVOCATION_CHANNEL)
+    return RedisRevocationBus(aioredis.from_url(redis_url), channel=channel)
@@ -0,0 +1,296 @@
+"""Column-wise validation and normalisation of bulk upload files.
+
+The whole DataFrame is validated with pandas string/regex operations instead
+of row by row: every check produces a boolean Series, and the first failing
+check of a row becomes its error message. Rows that repeat the key of an
+earlier row (or, when a file is read in chunks, of an earlier chunk) are
+reported as duplicates. Only valid rows are converted to documents, so bad
+rows are reported without ever reaching the database.
+"""
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import pandas as pd
+
+EMAIL_PATTERN = r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}"
+TRUE_VALUES = ["true", "1", "yes", "active"]
+INT64_LIMIT = 2 ** 63
+
+# Unique key each entity is identified (and upserted) by
+KEY_FIELDS = {
+    "users": "email",
+    "roles": "roleId",
+    "groups": "groupId",
+    "permissions": "key",
+    "customers": "customerId",
+    "domains": "key",
+    "domain_scenarios": "key",
+}
+
+
+class ValidationResult(NamedTuple):
+    """Outcome of validating an upload DataFrame."""
+    # Normalised field values, one row per input row (same index)
+    fields: pd.DataFrame
+    # Error message per input row, "" for valid rows
+    errors: pd.Series
+
+    @property
+    def error_mask(self) -> pd.Series:
+        return self.errors != ""
+
+    def documents(self) -> List[Dict[str, Any]]:
+        """Documents for the valid rows, in file order."""
+        valid = self.fields[~self.error_mask]
+        columns = {name: valid[name].tolist() for name in valid.columns}
+        return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+    @property
+    def row_numbers(self) -> List[int]:
+        """Spreadsheet row numbers of the valid rows (1-indexed + header)."""
+        return [idx + 2 for idx in self.fields.index[~self.error_mask]]
+
+
+def _constant(df: pd.DataFrame, value: Any) -> pd.Series:
+    return pd.Series([value] * len(df), index=df.index, dtype=object)
+
+
+def text_column(df: pd.DataFrame, column: str, default: Any = "") -> pd.Series:
+    """Stripped strings; missing values become ``default``."""
+    if column not in df.columns:
+        return _constant(df, default)
+    values = df[column].astype("string").str.strip()
+    return values.astype(object).where(values.notna(), default)
+
+
+def lower_column(df: pd.DataFrame, column: str, default: str) -> pd.Series:
+    """Lower-cased strings; missing values become ``default``."""
+    return text_column(df, column, default).str.lower()
+
+
+def optional_text_column(df: pd.DataFrame, column: str) -> pd.Series:
+    """Stripped strings; missing values become None."""
+    return text_column(df, column, None)
+
+
+def list_column(df: pd.DataFrame, column: str) -> pd.Series:
+    """Comma-separated values split into lists of stripped, non-empty items."""
+    values = text_column(df, column)
+    lists = pd.Series([[] for _ in range(len(values))], index=values.index, dtype=object)
+    # Most list columns are sparse: only split the cells that have a value
+    present = values != ""
+    if present.any():
+        split = values[present].str.split(",")
+        lists[present] = split.map(lambda items: [item.strip() for item in items if item.strip()])
+    return lists
+
+
+def bool_column(df: pd.DataFrame, column: str, default: bool) -> pd.Series:
+    """Booleans from bool, numeric or "true"/"1"/"yes"/"active" values."""
+    if column not in df.columns:
+        return _constant(df, default).astype(bool)
+    raw = df[column]
+    if pd.api.types.is_bool_dtype(raw):
+        values = raw.astype(bool)
+    elif pd.api.types.is_numeric_dtype(raw):
+        values = raw != 0
+    else:
+        values = raw.astype("string").str.strip().str.lower().isin(TRUE_VALUES)
+    return values.astype(object).where(raw.notna(), default).astype(bool)
+
+
+def int_column(
+    df: pd.DataFrame, column: str, checks: Optional["_Checks"] = None, default: int = 0
+) -> pd.Series:
+    """Integers; missing or non-numeric values become ``default``.
+
+    Infinite or out-of-range numbers cannot be converted: they are reported
+    as row errors on ``checks``.
+    """
+    if column not in df.columns:
+        return _constant(df, default)
+    values = pd.to_numeric(df[column], errors="coerce")
+    out_of_range = values.notna() & ~(values.abs() < INT64_LIMIT)
+    if checks is not None:
+        checks.fail(out_of_range, lambda rows: f"Invalid {column}: " + df[column][rows].astype(str))
+    return values.mask(out_of_range).fillna(default).astype("int64").astype(object)
+
+
+class _Checks:
+    """Accumulates the first error message of each row."""
+
+    def __init__(self, index: pd.Index):
+        self.errors = pd.Series("", index=index, dtype=object)
+
+    def fail(self, condition: pd.Series, message: Any) -> None:
+        """Set ``message`` where ``condition`` holds on a row without an error yet.
+
+        ``message`` is a string, or a function building per-row messages from
+        the mask of failing rows (so they are only formatted for those rows).
+        """
+        open_rows = condition & (self.errors == "")
+        if open_rows.any():
+            self.errors[open_rows] = message(open_rows) if callable(message) else message
+
+    def require(self, values: pd.Series, message: str) -> None:
+        self.fail(values == "", message)
+
+
+def duplicate_mask(keys: pd.Series, valid: pd.Series) -> pd.Series:
+    """Valid rows whose key already appeared on an earlier valid row."""
+    return keys.where(valid).duplicated(keep="first") & valid
+
+
+def _user_fields(df: pd.DataFrame, checks: _Checks) -> Dict[str, pd.Series]:
+    email = text_column(df, "email")
+    checks.require(email, "Email is required")
+    checks.fail(~email.str.fullmatch(EMAIL_PATTERN), lambda rows: "Invalid email format: " + email[rows])
+
+    # Username defaults to the local part of the email
+    username = text_column(df, "username", None)
+    username = username.where(username.notna(), email.str.split("@").str[0])
+    valid_username = (username == "") | username.str.replace(r"[_-]", "", regex=True).str.isalnum()
+    checks.fail(~valid_username, "Username can only contain letters, numbers, hyphens, and underscores")
+
+    return {
+        "email": email,
+        "username": username,
+        "full_name": text_column(df, "full_name"),
+        "roles": list_column(df, "roles"),
+        "groups": list_column(df, "groups"),
+        "customers": list_column(df, "customers"),
+        "is_active": bool_column(df, "is_active", True),
+    }
+
+
+def _role_fields(df: pd.DataFrame, checks: _Checks, key_field: str) -> Dict[str, pd.Series]:
+    key = text_column(df, key_field)
+    checks.require(key, f"{key_field} is required")
+    return {
+        key_field: key,
+        "name": text_column(df, "name"),
+        "description": optional_text_column(df, "description"),
+        "permissions": list_column(df, "permissions"),
+        "domains": list_column(df, "domains"),
+        "status": lower_column(df, "status", "active"),
+        "priority": int_column(df, "priority", checks),
+        "type": lower_column(df, "type", "custom"),
+    }
+
+
+def _domain_fields(df: pd.DataFrame, checks: _Checks) -> Dict[str, pd.Series]:
+    key = text_column(df, "key")
+    checks.require(key, "key is required")
+    return {
+        "key": key,
+        "name": text_column(df, "name"),
+        "description": optional_text_column(df, "description"),
+        "path": text_column(df, "path"),
+        "dataDomain": optional_text_column(df, "dataDomain"),
+        "status": lower_column(df, "status", "active"),
+        "defaultSelected": bool_column(df, "defaultSelected", False),
+        "order": int_column(df, "order", checks),
+        "icon": optional_text_column(df, "icon"),
+        "type": lower_column(df, "type", "custom"),
+        "subDomains": pd.Series([[] for _ in range(len(df))], index=df.index, dtype=object),
+    }
+
+
+def _domain_scenario_fields(df: pd.DataFrame, checks: _Checks) -> Dict[str, pd.Series]:
+    fields = _domain_fields(df, checks)
+    fields["domainKey"] = text_column(df, "domainKey")
+    return fields
+
+
+def _customer_fields(df: pd.DataFrame, checks: _Checks) -> Dict[str, pd.Series]:
+    customer_id = text_column(df, "customerId")
+    name = text_column(df, "name")
+    checks.require(customer_id, "customerId is required")
+    checks.require(name, "name is required")
+    return {
+        "customerId": customer_id,
+        "name": name,
+        "description": optional_text_column(df, "description"),
+        "status": lower_column(df, "status", "active"),
+        "tags": list_column(df, "tags"),
+        "unit": optional_text_column(df, "unit"),
+        "sales": optional_text_column(df, "sales"),
+        "division": optional_text_column(df, "division"),
+        "channel": optional_text_column(df, "channel"),
+        "location": optional_text_column(df, "location"),
+    }
+
+
+def _permission_fields(df: pd.DataFrame, checks: _Checks) -> Dict[str, pd.Series]:
+    key = text_column(df, "key")
+    name = text_column(df, "name")
+    module = text_column(df, "module")
+    checks.require(key, "key is required")
+    checks.require(name, "name is required")
+    checks.require(module, "module is required")
+    return {
+        "key": key,
+        "name": name,
+        "description": optional_text_column(df, "description"),
+        "module": module,
+        "actions": list_column(df, "actions"),
+    }
+
+
+_FIELD_BUILDERS = {
+    "users": _user_fields,
+    "roles": lambda df, checks: _role_fields(df, checks, "roleId"),
+    "groups": lambda df, checks: _role_fields(df, checks, "groupId"),
+    "permissions": _permission_fields,
+    "customers": _customer_fields,
+    "domains": _domain_fields,
+    "domain_scenarios": _domain_scenario_fields,
+}
+
+
+def validate_frame(
+    entity_type: str,
+    df: pd.DataFrame,
+    seen_keys: Optional[Dict[Any, int]] = None
+) -> ValidationResult:
+    """Validate and normalise every row of ``df`` for ``entity_type``.
+
+    ``seen_keys`` maps keys accepted from earlier chunks of the same file to
+    their row numbers; rows repeating one are duplicates, and the keys
+    accepted here are added to it.
+    """
+    if entity_type not in _FIELD_BUILDERS:
+        raise ValueError(f"Unknown entity type: {entity_type}")
+
+    checks = _Checks(df.index)
+    fields = _FIELD_BUILDERS[entity_type](df, checks)
+
+    key_field = KEY_FIELDS[entity_type]
+    keys = fields[key_field]
+    row_numbers = pd.Series(df.index + 2, index=df.index)
+
+    # Repeats of a key point at the row where it first appeared
+    if seen_keys:
+        earlier = keys.map(seen_keys)
+        checks.fail(
+            earlier.notna() & (checks.errors == ""),
+            lambda rows: _duplicate_messages(key_field, keys[rows], earlier[rows])
+        )
+    valid = checks.errors == ""
+    first_rows = row_numbers[valid].groupby(keys[valid]).transform("min").reindex(df.index)
+    checks.fail(
+        duplicate_mask(keys, valid),
+        lambda rows: _duplicate_messages(key_field, keys[rows], first_rows[rows])
+    )
+
+    if seen_keys is not None:
+        accepted = checks.errors == ""
+        seen_keys.update(zip(keys[accepted], row_numbers[accepted]))
+
+    return ValidationResult(pd.DataFrame(fields, index=df.index), checks.errors)
+
+
+def _duplicate_messages(key_field: str, keys: pd.Series, first_rows: pd.Series) -> pd.Series:
+    return (
+        f"Duplicate {key_field} " + keys.astype(str)
+        + " (first seen at row " + first_rows.astype(int).astype(str) + ")"
+    )
@@ -1,6 +1,6 @@
 """Async User Management Service"""
 from typing import Dict, Any, List, Optional
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import check_password_hash
 from bson import ObjectId
 from datetime import datetime, timezone
 import hashlib
@@ -8,6 +8,10 @@ import secrets
 
 from ..db.db_manager import DatabaseManager
 from .token_manager import TokenManager
+from .password_hash_pool import PasswordHashPoolBusy, run_password_hash
+from .hash_policy import get_hash_policy
+from .entity_counters import record_entity_insert
+from .search_index import index_search_document
 from ..errors.auth_error import AuthError
 
 
@@ -101,6 +105,22 @@ def verify_password_multi(plain_password: str, hashed_password: str) -> bool:
         return False
 
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Run verify_password_multi on the password hashing pool"""
+    try:
+        return await run_password_hash(verify_password_multi, plain_password, hashed_password)
+    except PasswordHashPoolBusy:
+        raise AuthError("Server is busy, please try again shortly", 503)
+
+
+async def hash_password_async(password: str) -> str:
+    """Hash a password with the active hash policy on the password hashing pool"""
+    try:
+        return await run_password_hash(get_hash_policy().hash, password)
+    except PasswordHashPoolBusy:
+        raise AuthError("Server is busy, please try again shortly", 503)
+
+
 class UserService:
     """Async User Management Service"""
 
@@ -261,7 +281,7 @@ class UserService:
         user_data = {
             "email": email.lower(),
             "username": username,
-            "password_hash": generate_password_hash(password),
+            "password_hash": await hash_password_async(password),
             "full_name": full_name,
             "roles": roles,
             "groups": groups,
@@ -274,6 +294,8 @@ class UserService:
 
         result = await self.db.users.insert_one(user_data)
         user_id = str(result.inserted_id)
+        await record_entity_insert("users", user_data)
+        await index_search_document("users", result.inserted_id)
 
         # Resolve domains from groups/roles before generating token
         resolved_domains = await self.resolve_user_domains(user_data)
@@ -312,12 +334,17 @@ class UserService:
             raise AuthError("Account is Deactivated", 403)
 
         # Check password (supports bcrypt, pbkdf2, scrypt)
-        if not verify_password_multi(password, user["password_hash"]):
+        if not await verify_password_async(password, user["password_hash"]):
             raise AuthError("Invalid email or password", 401)
 
+        login_update = {"last_login": datetime.now(timezone.utc)}
+        upgraded_hash = await self._upgrade_password_hash(password, user["password_hash"])
+        if upgraded_hash:
+            login_update["password_hash"] = upgraded_hash
+
         await self.db.users.update_one(
             {"_id": user["_id"]},
-            {"$set": {"last_login": datetime.now(timezone.utc)}}
+            {"$set": login_update}
         )
 
         # Resolve all domains from roles and groups
@@ -346,6 +373,21 @@ class UserService:
             **tokens
         }
 
+    async def _upgrade_password_hash(self, password: str, stored_hash: str) -> Optional[str]:
+        """Rehash a just-verified password when the stored hash is outside the hash policy.
+
+        Best effort: a busy hashing pool skips the upgrade until the next login.
+        """
+        policy = get_hash_policy()
+        if not policy.needs_rehash(stored_hash):
+            return None
+        try:
+            new_hash = await run_password_hash(policy.hash, password)
+        except PasswordHashPoolBusy:
+            return None
+        policy.rehashed += 1
+        return new_hash
+
     async def get_user_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Get user by user id"""
         try:
@@ -412,6 +454,7 @@ class UserService:
 
         if result.matched_count == 0:
             raise AuthError("User not found", 404)
+        await index_search_document("users", ObjectId(user_id))
         
         user_data = await self.get_user_by_id(user_id)
         if not user_data:
@@ -421,4 +464,5 @@ class UserService:
     async def logout_user(self, user_id: str, email: str) -> Dict[str, str]:
         """Logout user by invalidating tokens"""
         await self.db.tokens.delete_many({"user_id": user_id, "email": email})
+        await self.token_manager.revoke_user_tokens(user_id)
         return {"message": "Logged out successfully"}
@@ -53,6 +53,90 @@ def mock_db():
     return db
 
 
+def _sort_key(value):
+    # Missing/null values order first, like MongoDB
+    return (value is not None, value)
+
+
+def _compare(compare):
+    # Range operators never match a missing/null value
+    return lambda value, operand: value is not None and operand is not None and compare(value, operand)
+
+
+_QUERY_OPERATORS = {
+    "$ne": lambda value, operand: value != operand,
+    "$in": lambda value, operand: value in operand,
+    "$all": lambda value, operand: set(operand) <= set(value or []),
+    "$lt": _compare(lambda value, operand: value < operand),
+    "$lte": _compare(lambda value, operand: value <= operand),
+    "$gt": _compare(lambda value, operand: value > operand),
+    "$gte": _compare(lambda value, operand: value >= operand),
+}
+
+
+def matches_query(doc: Dict[str, Any], query: Dict[str, Any]) -> bool:
+    """Whether ``doc`` matches a MongoDB query, for the in-memory fake collections"""
+    for key, cond in query.items():
+        if key == "$or":
+            if not any(matches_query(doc, clause) for clause in cond):
+                return False
+        elif key == "$and":
+            if not all(matches_query(doc, clause) for clause in cond):
+                return False
+        elif isinstance(cond, dict):
+            value = doc.get(key)
+            if not all(_QUERY_OPERATORS[op](value, operand) for op, operand in cond.items()):
+                return False
+        elif doc.get(key) != cond:
+            return False
+    return True
+
+
+class FakeCursor:
+    """Async cursor over a list of documents, as returned by the fake collections' ``find``"""
+
+    def __init__(self, docs=(), delay: float = 0):
+        self.docs = list(docs)
+        self.delay = delay
+        self.pulled = 0
+        self.server_batch_size = None
+        self._skip = 0
+        self._limit = 0
+
+    def batch_size(self, size):
+        self.server_batch_size = size
+        return self
+
+    def sort(self, key_or_list, direction=1):
+        spec = [(key_or_list, direction)] if isinstance(key_or_list, str) else key_or_list
+        for field, order in reversed(spec):
+            self.docs.sort(key=lambda doc: _sort_key(doc.get(field)), reverse=order < 0)
+        return self
+
+    def skip(self, count):
+        self._skip = count
+        return self
+
+    def limit(self, count):
+        self._limit = count
+        return self
+
+    def __aiter__(self):
+        end = self._skip + self._limit if self._limit else None
+        self._iter = iter(self.docs[self._skip:end])
+        return self
+
+    async def __anext__(self):
+        try:
+            doc = next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.pulled += 1
+        return dict(doc)
+
+
 @pytest.fixture
 def sample_user_data() -> Dict[str, Any]:
     """Sample user data for testing"""
@@ -192,6 +276,7 @@ def mock_token_manager():
         "refresh_token": "test_refresh_token",
         "expires_in": 900
     })
+    tm.revoke_user_tokens = AsyncMock()
     tm.verify_token = MagicMock(return_value={
         "user_id": "507f1f77bcf86cd799439011",
         "email": MOCK_EMAIL,
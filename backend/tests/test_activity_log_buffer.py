@@ -0,0 +1,263 @@
+"""Tests for the buffered activity log writer"""
+import asyncio
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock
+from bson import ObjectId, json_util
+from pymongo.errors import BulkWriteError
+
+from easylifeauth.services.activity_log_buffer import ActivityLogBuffer
+from easylifeauth.services.activity_log_service import ActivityLogService
+
+
+def _db(insert_many=None):
+    db = MagicMock()
+    db.activity_logs.insert_many = insert_many or AsyncMock()
+    db.activity_logs.insert_one = AsyncMock()
+    return db
+
+
+def _entry(n=0):
+    return {"_id": ObjectId(), "action": "login", "entity_type": "user", "entity_id": str(n),
+            "user_email": "a@example.com", "timestamp": datetime.now(timezone.utc)}
+
+
+def _buffer(db, tmp_path, **config):
+    config = {"batch_size": 3, "flush_interval": 0.05, "spill_dir": str(tmp_path), **config}
+    return ActivityLogBuffer(db, config=config)
+
+
+def _inserted(db):
+    return [entry for call in db.activity_logs.insert_many.call_args_list for entry in call.args[0]]
+
+
+class TestBatching:
+    @pytest.mark.asyncio
+    async def test_flushes_full_batches(self, tmp_path):
+        db = _db()
+        buffer = _buffer(db, tmp_path, flush_interval=60)
+        for n in range(6):
+            await buffer.add(_entry(n))
+        assert await buffer.flush(timeout=1)
+        assert [len(call.args[0]) for call in db.activity_logs.insert_many.call_args_list] == [3, 3]
+        await buffer.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_flushes_partial_batch_after_interval(self, tmp_path):
+        db = _db()
+        buffer = _buffer(db, tmp_path)
+        await buffer.add(_entry())
+        assert await buffer.flush(timeout=1)
+        assert len(_inserted(db)) == 1
+        assert buffer.stats()["written"] == 1
+        await buffer.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_updates_rollups_per_batch(self, tmp_path):
+        db = _db()
+        rollups = MagicMock(record_many=AsyncMock())
+        buffer = ActivityLogBuffer(db, rollups, {"batch_size": 2, "flush_interval": 60, "spill_dir": str(tmp_path)})
+        await buffer.add(_entry(1))
+        await buffer.add(_entry(2))
+        await buffer.flush(timeout=1)
+        rollups.record_many.assert_awaited_once()
+        assert len(rollups.record_many.call_args.args[0]) == 2
+        await buffer.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_shutdown_writes_queued_entries(self, tmp_path):
+        db = _db()
+        buffer = _buffer(db, tmp_path, flush_interval=60, batch_size=100)
+        for n in range(5):
+            await buffer.add(_entry(n))
+        await buffer.shutdown()
+        assert len(_inserted(db)) == 5
+
+    def test_invalid_overflow_policy(self, tmp_path):
+        with pytest.raises(ValueError):
+            _buffer(_db(), tmp_path, overflow="ignore")
+
+
+class TestOverflow:
+    @pytest.mark.asyncio
+    async def test_drop(self, tmp_path):
+        release = asyncio.Event()
+
+        async def slow_insert(batch, ordered=False):
+            await release.wait()
+
+        db = _db(AsyncMock(side_effect=slow_insert))
+        buffer = _buffer(db, tmp_path, overflow="drop", queue_size=2, batch_size=1)
+        await buffer.add(_entry(0))
+        await asyncio.sleep(0)  # flusher takes the first entry and blocks on insert
+        for n in range(1, 5):
+            await buffer.add(_entry(n))
+        assert buffer.dropped == 2
+
+        release.set()
+        await buffer.shutdown()
+        assert len(_inserted(db)) == 3
+
+    @pytest.mark.asyncio
+    async def test_spill_and_replay(self, tmp_path):
+        release = asyncio.Event()
+
+        async def slow_insert(batch, ordered=False):
+            await release.wait()
+
+        db = _db(AsyncMock(side_effect=slow_insert))
+        buffer = _buffer(db, tmp_path, overflow="spill", queue_size=1, batch_size=1)
+        await buffer.add(_entry(0))
+        await asyncio.sleep(0)
+        for n in range(1, 4):
+            await buffer.add(_entry(n))
+        assert buffer.spilled == 2
+        assert (tmp_path / "activity_logs.jsonl").exists()
+
+        release.set()
+        await buffer.flush(timeout=1)
+        # The queue drained, so the flusher replays the spill file on its next pass
+        await buffer.add(_entry(4))
+        await buffer.flush(timeout=1)
+        await buffer.shutdown()
+
+        written = sorted(entry["entity_id"] for entry in _inserted(db))
+        assert written == ["0", "1", "2", "3", "4"]
+        assert not (tmp_path / "activity_logs.jsonl").exists()
+        assert not (tmp_path / "activity_logs.replay").exists()
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_is_spilled_and_replayed_by_next_run(self, tmp_path):
+        db = _db(AsyncMock(side_effect=Exception("primary stepped down")))
+        buffer = _buffer(db, tmp_path, overflow="spill")
+        await buffer.add(_entry(7))
+        await buffer.shutdown()
+        assert buffer.spilled == 1
+
+        db = _db()
+        restarted = _buffer(db, tmp_path, overflow="spill")
+        restarted.start()
+        await asyncio.sleep(0.01)
+        await restarted.shutdown()
+        [entry] = _inserted(db)
+        assert entry["entity_id"] == "7"
+        assert isinstance(entry["_id"], ObjectId)
+
+    @pytest.mark.asyncio
+    async def test_duplicates_are_not_counted_again(self, tmp_path):
+        duplicate = BulkWriteError({"writeErrors": [{"index": 0, "code": 11000, "errmsg": "duplicate key"}]})
+        db = _db(AsyncMock(side_effect=duplicate))
+        rollups = MagicMock(record_many=AsyncMock())
+        buffer = ActivityLogBuffer(db, rollups, {"batch_size": 3, "flush_interval": 0.05, "spill_dir": str(tmp_path)})
+        await buffer.add(_entry(0))
+        await buffer.add(_entry(1))
+        await buffer.shutdown()
+        assert buffer.written == 1
+        assert buffer.failed == 0
+        [recorded] = rollups.record_many.call_args.args[0]
+        assert recorded["entity_id"] == "1"
+
+
+def _write_spill(tmp_path, entries):
+    (tmp_path / "activity_logs.jsonl").write_text("".join(json_util.dumps(entry) + "\n" for entry in entries))
+
+
+def _read_lines(path):
+    return [json_util.loads(line) for line in path.read_text().splitlines()]
+
+
+async def _run_replay(db, tmp_path, rollups=None, **config):
+    config = {"batch_size": 3, "flush_interval": 0.05, "spill_dir": str(tmp_path), **config}
+    buffer = ActivityLogBuffer(db, rollups, config)
+    buffer.start()
+    await asyncio.sleep(0.01)
+    await buffer.shutdown()
+    return buffer
+
+
+class TestReplay:
+    @pytest.mark.asyncio
+    async def test_failed_batch_keeps_only_unwritten_entries(self, tmp_path):
+        _write_spill(tmp_path, [_entry(n) for n in range(7)])
+        db = _db(AsyncMock(side_effect=[None, Exception("primary stepped down")]))
+        rollups = MagicMock(record_many=AsyncMock())
+
+        buffer = await _run_replay(db, tmp_path, rollups)
+        assert buffer.written == 3
+        assert len(rollups.record_many.call_args.args[0]) == 3
+        left = _read_lines(tmp_path / "activity_logs.replay")
+        assert [entry["entity_id"] for entry in left] == ["3", "4", "5", "6"]
+
+        db = _db()
+        buffer = await _run_replay(db, tmp_path)
+        assert sorted(entry["entity_id"] for entry in _inserted(db)) == ["3", "4", "5", "6"]
+        assert not (tmp_path / "activity_logs.replay").exists()
+
+    @pytest.mark.asyncio
+    async def test_rollups_skip_entries_already_written(self, tmp_path):
+        _write_spill(tmp_path, [_entry(n) for n in range(3)])
+        duplicate = BulkWriteError({"writeErrors": [
+            {"index": 0, "code": 11000, "errmsg": "duplicate key"},
+            {"index": 2, "code": 11000, "errmsg": "duplicate key"},
+        ]})
+        rollups = MagicMock(record_many=AsyncMock())
+
+        buffer = await _run_replay(_db(AsyncMock(side_effect=duplicate)), tmp_path, rollups)
+        assert buffer.written == 1
+        [recorded] = rollups.record_many.call_args.args[0]
+        assert recorded["entity_id"] == "1"
+        assert not (tmp_path / "activity_logs.replay").exists()
+
+    @pytest.mark.asyncio
+    async def test_rejected_entry_moves_to_dead_letter_file(self, tmp_path):
+        poison = _entry(0)
+        _write_spill(tmp_path, [poison, _entry(1)])
+        invalid = BulkWriteError({"writeErrors": [{"index": 0, "code": 121, "errmsg": "validation failed"}]})
+
+        for attempt in range(2):
+            buffer = await _run_replay(_db(AsyncMock(side_effect=invalid)), tmp_path, replay_attempts=3)
+            [left] = _read_lines(tmp_path / "activity_logs.replay")
+            assert left["_id"] == poison["_id"]
+            assert left["_replay_attempts"] == attempt + 1
+
+        db = _db(AsyncMock(side_effect=invalid))
+        buffer = await _run_replay(db, tmp_path, replay_attempts=3)
+        assert buffer.stats()["dead_lettered"] == 1
+        assert "_replay_attempts" not in _inserted(db)[0]
+        assert not (tmp_path / "activity_logs.replay").exists()
+        [dead] = _read_lines(tmp_path / "activity_logs.dead.jsonl")
+        assert dead == {**poison, "timestamp": dead["timestamp"]}
+        assert "_replay_attempts" not in dead
+
+        # The dead-letter file is not replayed
+        db = _db()
+        await _run_replay(db, tmp_path)
+        db.activity_logs.insert_many.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_rejected_live_entries_are_spilled(self, tmp_path):
+        invalid = BulkWriteError({"writeErrors": [{"index": 1, "code": 121, "errmsg": "validation failed"}]})
+        db = _db(AsyncMock(side_effect=invalid))
+        buffer = _buffer(db, tmp_path, overflow="spill", flush_interval=60)
+        await buffer.add(_entry(0))
+        await buffer.add(_entry(1))
+        await buffer.shutdown()
+        assert buffer.written == 1
+        assert buffer.spilled == 1
+        assert buffer.failed == 0
+
+
+class TestActivityLogServiceBuffered:
+    @pytest.mark.asyncio
+    async def test_log_queues_instead_of_inserting(self, tmp_path):
+        db = _db()
+        buffer = _buffer(db, tmp_path, flush_interval=60)
+        service = ActivityLogService(db, buffer=buffer)
+
+        log_id = await service.log(action="update", entity_type="role", entity_id="r1", user_email="a@example.com")
+        db.activity_logs.insert_one.assert_not_called()
+        assert buffer.stats()["pending"] == 1
+
+        await service.shutdown()
+        [entry] = _inserted(db)
+        assert str(entry["_id"]) == log_id
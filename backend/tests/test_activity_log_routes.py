@@ -1,6 +1,6 @@
 """Tests for Activity Log Routes"""
 import pytest
-from unittest.mock import AsyncMock, MagicMock
+from unittest.mock import AsyncMock, MagicMock, patch
 from fastapi.testclient import TestClient
 from fastapi import FastAPI
 from bson import ObjectId
@@ -96,6 +96,7 @@ class TestActivityLogRoutes:
 
         mock_collection = MagicMock()
         mock_collection.count_documents = AsyncMock(return_value=1)
+        mock_collection.estimated_document_count = AsyncMock(return_value=1)
         mock_collection.find = MagicMock(return_value=self._create_mock_cursor(logs))
         mock_db.db.__getitem__ = MagicMock(return_value=mock_collection)
 
@@ -170,6 +171,31 @@ class TestActivityLogRoutes:
         assert "top_users" in data
         assert "timeline" in data
 
+    def test_get_activity_stats_from_rollups(self, client, mock_db):
+        """Stats are summed from rollups when they cover the window"""
+        service = MagicMock()
+        service.stats = AsyncMock(return_value={
+            "total": 4,
+            "actions": {"login": 3, "update": 1},
+            "entities": {"user": 4},
+            "users": {MOCK_EMAIL_ADMIN_TEST: 4},
+            "timeline": {"2024-01-01": 1, "2024-01-02": 3},
+        })
+        mock_collection = MagicMock()
+        mock_db.db.__getitem__ = MagicMock(return_value=mock_collection)
+
+        with patch(
+            "easylifeauth.api.activity_log_routes.activity_rollups_covering",
+            AsyncMock(return_value=service)
+        ):
+            response = client.get("/activity-logs/stats?days=365")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total_activities"] == 4
+        assert data["actions"] == [{"action": "login", "count": 3}, {"action": "update", "count": 1}]
+        assert data["timeline"] == [{"date": "2024-01-01", "count": 1}, {"date": "2024-01-02", "count": 3}]
+        mock_collection.aggregate.assert_not_called()
+
     def test_get_activity_stats_with_days(self, client, mock_db):
         """Test get activity stats with days parameter"""
         mock_aggregate = MagicMock()
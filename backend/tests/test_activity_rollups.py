@@ -0,0 +1,259 @@
+"""Tests for the activity log rollups"""
+import asyncio
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock
+from bson import ObjectId
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+import easylifeauth.services.activity_rollups as activity_rollups
+from easylifeauth.services.activity_log_service import ActivityLogService
+from easylifeauth.services.activity_rollups import (
+    STATE_ID,
+    ActivityRollupService,
+    activity_rollups_covering,
+    init_activity_rollup_service,
+    ranked,
+)
+from conftest import FakeCursor, matches_query
+
+
+class FakeRollups:
+    """In-memory stand-in for the activity_log_rollups collection"""
+
+    def __init__(self):
+        self.docs = {}
+
+    def _update(self, query, update, upsert=False):
+        doc = self.docs.get(query["_id"])
+        if doc is None:
+            if not upsert:
+                return 0
+            doc = self.docs[query["_id"]] = {"_id": query["_id"], **update.get("$setOnInsert", {})}
+        elif not matches_query(doc, query):
+            if upsert:
+                # The upsert inserts a second document with the same _id
+                raise DuplicateKeyError("duplicate key", 11000)
+            return 0
+        for path, delta in update.get("$inc", {}).items():
+            target = doc
+            *parents, leaf = path.split(".")
+            for part in parents:
+                target = target.setdefault(part, {})
+            target[leaf] = target.get(leaf, 0) + delta
+        doc.update(update.get("$set", {}))
+        return 1
+
+    async def bulk_write(self, operations, ordered=True):
+        errors = []
+        for index, op in enumerate(operations):
+            try:
+                self._update(op._filter, op._doc, upsert=op._upsert)
+            except DuplicateKeyError:
+                errors.append({"index": index, "code": 11000, "errmsg": "duplicate key"})
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+
+    async def update_one(self, query, update, upsert=False):
+        return MagicMock(modified_count=self._update(query, update, upsert))
+
+    async def find_one(self, query):
+        return self.docs.get(query["_id"])
+
+    def find(self, query):
+        return FakeCursor([doc for doc in self.docs.values() if matches_query(doc, query)])
+
+
+def _db():
+    db = MagicMock()
+    db.activity_log_rollups = FakeRollups()
+    db.activity_logs.insert_one = AsyncMock(return_value=MagicMock(inserted_id=ObjectId()))
+    return db
+
+
+def _event(timestamp, action="login", entity_type="user", user_email="a@example.com"):
+    return {"timestamp": timestamp, "action": action, "entity_type": entity_type, "user_email": user_email}
+
+
+NOW = datetime(2026, 10, 16, 14, 30, tzinfo=timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def reset_service():
+    activity_rollups._activity_rollup_service = None
+    yield
+    activity_rollups._activity_rollup_service = None
+
+
+class TestRecord:
+    @pytest.mark.asyncio
+    async def test_one_write_per_rollup(self):
+        db = _db()
+        service = ActivityRollupService(db)
+        await service.record_many([
+            _event(NOW),
+            _event(NOW + timedelta(minutes=10), action="update", user_email="b@example.com"),
+        ])
+
+        assert set(db.activity_log_rollups.docs) == {"hour:2026-10-16T14", "day:2026-10-16"}
+        day = db.activity_log_rollups.docs["day:2026-10-16"]
+        assert day["total"] == 2
+        assert day["granularity"] == "day"
+        assert day["bucket"] == datetime(2026, 10, 16, tzinfo=timezone.utc)
+        assert day["actions"] == {"login": 1, "update": 1}
+        # Dots in emails are escaped so they are not read as field paths
+        assert len(day["users"]) == 2 and all("." not in key for key in day["users"])
+
+    @pytest.mark.asyncio
+    async def test_activity_log_service_records(self):
+        db = _db()
+        service = ActivityLogService(db, rollups=ActivityRollupService(db))
+        await service.log(action="create", entity_type="role", entity_id="r1", user_email="a@example.com")
+        [day] = [doc for doc in db.activity_log_rollups.docs.values() if doc.get("granularity") == "day"]
+        assert day["entities"] == {"role": 1}
+
+    @pytest.mark.asyncio
+    async def test_failures_are_swallowed(self):
+        db = _db()
+        db.activity_log_rollups.bulk_write = AsyncMock(side_effect=Exception("down"))
+        await ActivityRollupService(db).record(_event(NOW))
+
+
+class TestStats:
+    @pytest.mark.asyncio
+    async def test_window_uses_hours_for_partial_first_day(self):
+        db = _db()
+        service = ActivityRollupService(db)
+        await service.record_many([
+            _event(NOW - timedelta(days=2, hours=3)),   # before the window
+            _event(NOW - timedelta(days=2)),            # first (partial) day, inside
+            _event(NOW - timedelta(days=1), action="update"),
+            _event(NOW, user_email="b@example.com"),
+            _event(NOW, user_email="b@example.com"),
+        ])
+
+        stats = await service.stats(NOW - timedelta(days=2))
+        assert stats["total"] == 4
+        assert stats["actions"] == {"login": 3, "update": 1}
+        assert stats["users"] == {"a@example.com": 2, "b@example.com": 2}
+        assert stats["timeline"] == {"2026-10-14": 1, "2026-10-15": 1, "2026-10-16": 2}
+
+    @pytest.mark.asyncio
+    async def test_window_starting_at_midnight(self):
+        db = _db()
+        service = ActivityRollupService(db)
+        await service.record_many([_event(NOW - timedelta(days=1)), _event(NOW)])
+        stats = await service.stats(datetime(2026, 10, 16, tzinfo=timezone.utc))
+        assert stats["total"] == 1
+
+    def test_ranked(self):
+        assert ranked({"a": 1, "b": 3, None: 2}, 2) == [("b", 3), (None, 2)]
+
+
+class TestCoverage:
+    @pytest.mark.asyncio
+    async def test_not_covered_without_state(self):
+        db = _db()
+        init_activity_rollup_service(db)
+        assert await activity_rollups_covering(db, NOW) is None
+
+    @pytest.mark.asyncio
+    async def test_covered_from_maintained_since(self):
+        db = _db()
+        service = init_activity_rollup_service(db)
+        db.activity_log_rollups.docs[STATE_ID] = {
+            "_id": STATE_ID, "maintained_since": NOW - timedelta(days=1), "backfilled": False
+        }
+        assert await activity_rollups_covering(db, NOW) is service
+        assert await activity_rollups_covering(db, NOW - timedelta(days=7)) is None
+        assert await activity_rollups_covering(_db(), NOW) is None
+
+        db.activity_log_rollups.docs[STATE_ID]["backfilled"] = True
+        assert await activity_rollups_covering(db, NOW - timedelta(days=7)) is service
+
+
+class TestBackfill:
+    @pytest.mark.asyncio
+    async def test_start_backfills_older_events_once(self):
+        db = _db()
+        groups = [{"_id": {"hour": "2026-10-01T09", "action": "login", "entity_type": "user",
+                           "user_email": "a@example.com"}, "count": 5}]
+        db.activity_logs.aggregate = MagicMock(side_effect=lambda pipeline: FakeCursor(groups))
+        service = ActivityRollupService(db)
+
+        await service._start()
+        state = db.activity_log_rollups.docs[STATE_ID]
+        assert state["backfilled"] is True
+        assert db.activity_log_rollups.docs["day:2026-10-01"]["total"] == 5
+        assert db.activity_log_rollups.docs["hour:2026-10-01T09"]["actions"] == {"login": 5}
+
+        # Already backfilled: a restart does not count the raw events again
+        await service._start()
+        assert db.activity_logs.aggregate.call_count == 1
+        assert db.activity_log_rollups.docs["day:2026-10-01"]["total"] == 5
+
+    @staticmethod
+    def _groups(count=5):
+        return [{"_id": {"hour": "2026-10-01T09", "action": "login", "entity_type": "user",
+                         "user_email": "a@example.com"}, "count": count}]
+
+    @pytest.mark.asyncio
+    async def test_cancelled_backfill_releases_its_claim(self):
+        db = _db()
+        aggregating = asyncio.Event()
+
+        class _SlowCursor(FakeCursor):
+            async def __anext__(self):
+                aggregating.set()
+                await asyncio.sleep(60)
+
+        db.activity_logs.aggregate = MagicMock(return_value=_SlowCursor([]))
+        service = ActivityRollupService(db)
+        service.start()
+        await aggregating.wait()
+        await service.shutdown()
+        assert db.activity_log_rollups.docs[STATE_ID]["backfilling"] is False
+
+        db.activity_logs.aggregate = MagicMock(side_effect=lambda pipeline: FakeCursor(self._groups()))
+        await ActivityRollupService(db)._start()
+        assert db.activity_log_rollups.docs[STATE_ID]["backfilled"] is True
+        assert db.activity_log_rollups.docs["day:2026-10-01"]["total"] == 5
+
+    @pytest.mark.asyncio
+    async def test_partly_applied_backfill_is_not_counted_twice(self):
+        db = _db()
+        db.activity_logs.aggregate = MagicMock(side_effect=lambda pipeline: FakeCursor(self._groups()))
+        rollups = db.activity_log_rollups
+        bulk_write = rollups.bulk_write
+
+        async def fail_after_first(operations, ordered=True):
+            await bulk_write(operations[:1], ordered)
+            raise Exception("primary stepped down")
+
+        rollups.bulk_write = fail_after_first
+        await ActivityRollupService(db)._start()
+        assert rollups.docs[STATE_ID]["backfilling"] is False
+        assert rollups.docs[STATE_ID]["backfilled"] is False
+
+        rollups.bulk_write = bulk_write
+        await ActivityRollupService(db)._start()
+        assert rollups.docs[STATE_ID]["backfilled"] is True
+        assert rollups.docs["hour:2026-10-01T09"]["total"] == 5
+        assert rollups.docs["day:2026-10-01"]["total"] == 5
+
+    @pytest.mark.asyncio
+    async def test_claim_of_a_dead_worker_expires(self):
+        db = _db()
+        db.activity_logs.aggregate = MagicMock(side_effect=lambda pipeline: FakeCursor(self._groups()))
+        db.activity_log_rollups.docs[STATE_ID] = {
+            "_id": STATE_ID, "maintained_since": NOW, "backfilled": False, "backfilling": True,
+            "backfill_claimed_until": datetime.now(timezone.utc) + timedelta(minutes=5),
+        }
+        service = ActivityRollupService(db)
+        await service._start()
+        db.activity_logs.aggregate.assert_not_called()
+
+        db.activity_log_rollups.docs[STATE_ID]["backfill_claimed_until"] = datetime.now(timezone.utc) - timedelta(seconds=1)
+        await service._start()
+        assert db.activity_log_rollups.docs[STATE_ID]["backfilled"] is True
+        assert db.activity_log_rollups.docs["day:2026-10-01"]["total"] == 5
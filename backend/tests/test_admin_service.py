@@ -201,6 +201,7 @@ class TestAdminService:
 
         mock_db.users.find = MagicMock(return_value=mock_cursor)
         mock_db.users.count_documents = AsyncMock(return_value=1)
+        mock_db.users.estimated_document_count = AsyncMock(return_value=1)
 
         result = await admin_service.get_all_users(
             current_user={"roles": [STR_SUPER_ADMINISTRATOR]},
@@ -259,6 +260,7 @@ class TestAdminService:
 
         mock_db.users.find = MagicMock(return_value=mock_cursor)
         mock_db.users.count_documents = AsyncMock(return_value=1)
+        mock_db.users.estimated_document_count = AsyncMock(return_value=1)
 
         result = await admin_service.get_all_users(
             current_user=None,
@@ -766,6 +768,23 @@ class TestAdminService:
         assert result["message"] == "User deleted successfully"
         mock_db.tokens.delete_many.assert_called_once_with({"user_id": target_user_id})
 
+    @pytest.mark.asyncio
+    async def test_delete_user_revokes_cached_tokens(self, mock_db):
+        """A deleted user's cached access tokens stop verifying after the delete"""
+        calls = []
+        token_manager = MagicMock()
+        token_manager.revoke_user_tokens = AsyncMock(side_effect=lambda user_id: calls.append("revoke"))
+        mock_db.users.find_one = AsyncMock(return_value={"_id": ObjectId(OID_9011), "email": MOCK_EMAIL_DELETE})
+        mock_db.users.delete_one = AsyncMock(return_value=MagicMock(deleted_count=1))
+        mock_db.tokens.delete_many = AsyncMock(side_effect=lambda query: calls.append("delete"))
+
+        await AdminService(mock_db, token_manager).delete_user(
+            OID_9011, current_user={"user_id": "different_user_id", "roles": [STR_SUPER_ADMINISTRATOR]}
+        )
+
+        token_manager.revoke_user_tokens.assert_awaited_once_with(OID_9011)
+        assert calls == ["delete", "revoke"]
+
     @pytest.mark.asyncio
     async def test_delete_user_not_super_admin(self, admin_service, mock_db):
         """Test that non-super-admin cannot delete users"""
@@ -0,0 +1,113 @@
+"""Tests for the dashboard analytics snapshot"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+import easylifeauth.services.analytics_snapshot as analytics_snapshot
+from easylifeauth.services.analytics_snapshot import (
+    AnalyticsSnapshotService,
+    compute_analytics,
+    get_analytics,
+    init_analytics_snapshot_service,
+)
+
+
+def _empty_cursor():
+    cursor = MagicMock()
+    cursor.sort = MagicMock(return_value=cursor)
+    cursor.limit = MagicMock(return_value=cursor)
+    cursor.__aiter__ = lambda self: self
+    cursor.__anext__ = AsyncMock(side_effect=StopAsyncIteration)
+    return cursor
+
+
+def _db():
+    """Users answer $unwind distributions by the unwound field; other pipelines are empty"""
+    distributions = {
+        "$roles": [{"_id": "user", "count": 1500}, {"_id": "administrator", "count": 3}],
+        "$groups": [{"_id": "viewer", "count": 1200}],
+        "$domains": [{"_id": "finance", "count": 40}],
+    }
+
+    def users_aggregate(pipeline):
+        unwind = next((stage["$unwind"] for stage in pipeline if "$unwind" in stage), None)
+        result = MagicMock()
+        result.to_list = AsyncMock(return_value=distributions.get(unwind, []))
+        return result
+
+    empty = MagicMock()
+    empty.to_list = AsyncMock(return_value=[])
+    db = MagicMock()
+    db.users.aggregate = MagicMock(side_effect=users_aggregate)
+    db.users.find = MagicMock(return_value=_empty_cursor())
+    db.activity_logs.aggregate = MagicMock(return_value=empty)
+    db.permissions.aggregate = MagicMock(return_value=empty)
+    return db
+
+
+@pytest.fixture(autouse=True)
+def reset_service():
+    analytics_snapshot._analytics_snapshot_service = None
+    yield
+    analytics_snapshot._analytics_snapshot_service = None
+
+
+class TestComputeAnalytics:
+    @pytest.mark.asyncio
+    async def test_distributions_are_aggregated_server_side(self):
+        db = _db()
+        analytics = await compute_analytics(db)
+        assert analytics["role_distribution"] == [
+            {"role": "user", "count": 1500},
+            {"role": "administrator", "count": 3},
+        ]
+        assert analytics["group_distribution"] == [{"group": "viewer", "count": 1200}]
+        assert analytics["domain_distribution"] == [{"domain": "finance", "count": 40}]
+        assert "generated_at" in analytics
+
+        # Users are never loaded into the application for counting
+        db.users.find.assert_called_once()
+        pipelines = [call.args[0] for call in db.users.aggregate.call_args_list]
+        unwinds = [stage["$unwind"] for pipeline in pipelines for stage in pipeline if "$unwind" in stage]
+        assert sorted(unwinds) == ["$domains", "$groups", "$roles"]
+
+    @pytest.mark.asyncio
+    async def test_optional_collections(self):
+        db = _db()
+        del db.activity_logs
+        del db.permissions
+        analytics = await compute_analytics(db)
+        assert analytics["activity_trend"] == []
+        assert analytics["top_active_users"] == []
+        assert analytics["permission_distribution"] == []
+
+
+class TestAnalyticsSnapshotService:
+    @pytest.mark.asyncio
+    async def test_snapshot_is_reused_until_refreshed(self):
+        db = _db()
+        service = AnalyticsSnapshotService(db, {"refresh_seconds": 3600})
+        first = await service.get()
+        assert await service.get() is first
+        calls = db.users.aggregate.call_count
+
+        refreshed = await service.refresh()
+        assert refreshed is not first
+        assert db.users.aggregate.call_count == calls * 2
+
+    @pytest.mark.asyncio
+    async def test_refresh_job(self):
+        service = AnalyticsSnapshotService(_db(), {"refresh_seconds": 3600})
+        service.start()
+        assert service._refresh_task is not None
+        await service.shutdown()
+        assert service._refresh_task is None
+
+    @pytest.mark.asyncio
+    async def test_get_analytics_uses_service_for_its_db(self):
+        db = _db()
+        service = init_analytics_snapshot_service(db, {"refresh_seconds": 3600})
+        snapshot = await get_analytics(db)
+        assert await service.get() is snapshot
+
+        # A different database is computed directly
+        assert await get_analytics(_db()) is not snapshot
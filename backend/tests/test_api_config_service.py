@@ -1,4 +1,5 @@
 """Tests for API Configuration Service"""
+import re
 import pytest
 import ssl
 from datetime import datetime, timezone
@@ -149,9 +150,9 @@ class TestListConfigs:
 
         expected_query = {
             "$or": [
-                {"name": {MONGO_REGEX: SEARCH_MY_API, MONGO_OPTIONS: REGEX_CASE_INSENSITIVE}},
-                {"key": {MONGO_REGEX: SEARCH_MY_API, MONGO_OPTIONS: REGEX_CASE_INSENSITIVE}},
-                {"description": {MONGO_REGEX: SEARCH_MY_API, MONGO_OPTIONS: REGEX_CASE_INSENSITIVE}}
+                {"name": {MONGO_REGEX: re.escape(SEARCH_MY_API), MONGO_OPTIONS: REGEX_CASE_INSENSITIVE}},
+                {"key": {MONGO_REGEX: re.escape(SEARCH_MY_API), MONGO_OPTIONS: REGEX_CASE_INSENSITIVE}},
+                {"description": {MONGO_REGEX: re.escape(SEARCH_MY_API), MONGO_OPTIONS: REGEX_CASE_INSENSITIVE}}
             ]
         }
         mock_collection.count_documents.assert_called_once_with(expected_query)
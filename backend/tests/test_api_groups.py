@@ -6,7 +6,8 @@ from fastapi import FastAPI
 from fastapi.testclient import TestClient
 from bson import ObjectId
 
-from easylifeauth.api.groups_routes import router, create_pagination_meta, notify_users_of_group_change
+from easylifeauth.api.groups_routes import router, notify_users_of_group_change
+from easylifeauth.api.pagination import create_pagination_meta
 from easylifeauth.api import dependencies
 from easylifeauth.security.access_control import CurrentUser, require_super_admin, require_group_admin
 from mock_data import MOCK_EMAIL_ADMIN, MOCK_EMAIL_USER1, MOCK_EMAIL_USER2, empty_async_gen
@@ -151,6 +152,7 @@ class TestGroupsRoutes:
     def test_list_groups_empty(self, client, mock_db):
         """Test listing groups when empty"""
         mock_db.groups.count_documents = AsyncMock(return_value=0)
+        mock_db.groups.estimated_document_count = AsyncMock(return_value=0)
 
         empty_cursor = empty_async_gen
 
@@ -6,7 +6,8 @@ from fastapi import FastAPI
 from fastapi.testclient import TestClient
 from bson import ObjectId
 
-from easylifeauth.api.users_routes import router, create_pagination_meta
+from easylifeauth.api.users_routes import router
+from easylifeauth.api.pagination import create_pagination_meta
 from easylifeauth.api import dependencies
 from easylifeauth.security.access_control import CurrentUser, require_super_admin, require_admin, require_group_admin, get_current_user
 from mock_data import MOCK_EMAIL, MOCK_EMAIL_ADMIN, MOCK_EMAIL_ALICE, MOCK_EMAIL_BOB, MOCK_EMAIL_EXISTING, MOCK_EMAIL_GROUPADMIN, MOCK_EMAIL_NEW, MOCK_EMAIL_NEWUSER, MOCK_EMAIL_TARGET, MOCK_EMAIL_USER, MOCK_PASSWORD, MOCK_PASSWORD_HASH, empty_async_gen
@@ -148,6 +149,7 @@ class TestUsersRoutes:
     def test_list_users_empty(self, client, mock_db):
         """Test listing users when empty"""
         mock_db.users.count_documents = AsyncMock(return_value=0)
+        mock_db.users.estimated_document_count = AsyncMock(return_value=0)
 
         empty_cursor = empty_async_gen
 
@@ -1359,6 +1361,7 @@ class TestListUsersExtended:
             },
         ]
         mock_db.users.count_documents = AsyncMock(return_value=2)
+        mock_db.users.estimated_document_count = AsyncMock(return_value=2)
         self._setup_cursor(mock_db, users)
 
         response = client.get(PATH_USERS)
@@ -1381,6 +1384,7 @@ class TestListUsersExtended:
     def test_list_users_pagination(self, client, mock_db):
         """Test listing users with custom pagination."""
         mock_db.users.count_documents = AsyncMock(return_value=50)
+        mock_db.users.estimated_document_count = AsyncMock(return_value=50)
         self._setup_cursor(mock_db, [])
 
         response = client.get("/users?page=2&limit=10")
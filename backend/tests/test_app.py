@@ -32,6 +32,14 @@ class TestCreateApp:
         assert app is not None
         assert app.title == "EasyLife Auth API"
 
+    def test_create_app_route_classifier(self):
+        """Test middleware route classifier is loaded with the app routes"""
+        from easylifeauth.middleware.route_classes import RouteClass
+        app = create_app()
+        classifier = app.state.route_classifier
+        assert classifier.classify(PATH_REDOC).route_class == RouteClass.DOCS
+        assert classifier.classify("/health/live").template == "/health/live"
+
     def test_create_app_custom_title(self):
         """Test creating app with custom title"""
         app = create_app(
@@ -0,0 +1,362 @@
+"""Tests for background bulk upload jobs"""
+import asyncio
+import pytest
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+from bson import ObjectId
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from easylifeauth.api.bulk_upload_routes import get_bulk_upload_service, get_gcs_service, router
+from easylifeauth.security.access_control import require_super_admin
+from easylifeauth.services.bulk_upload_job_service import (
+    MAX_STORED_ERRORS, STATUS_CANCELLED, STATUS_COMPLETED, STATUS_FAILED, STATUS_QUEUED, STATUS_RUNNING,
+    BulkUploadJobService, get_bulk_upload_job_service,
+)
+from easylifeauth.services.bulk_upload_service import BulkUploadService
+from conftest import FakeCursor, matches_query
+from mock_data import MOCK_EMAIL_ADMIN_TEST
+
+ROLES_CSV = "roleId,name\nr1,A\nr2,B\nr3,C\nr1,D\n,E\n"
+
+
+class _JobsCollection:
+    """Minimal in-memory stand-in for the bulk_upload_jobs collection"""
+
+    def __init__(self):
+        self.docs = {}
+
+    async def insert_one(self, doc):
+        self.docs[doc["job_id"]] = dict(doc)
+
+    async def update_one(self, query, update):
+        doc = self.docs.get(query["job_id"])
+        matched = doc is not None and matches_query(doc, query)
+        if matched:
+            doc.update(update["$set"])
+        return SimpleNamespace(matched_count=int(matched))
+
+    async def find_one(self, query, projection=None):
+        doc = self.docs.get(query["job_id"])
+        return dict(doc) if doc else None
+
+    async def delete_many(self, query):
+        expired = [
+            job_id for job_id, doc in self.docs.items()
+            if doc["expires_at"] < query["expires_at"]["$lt"] and doc["status"] in query["status"]["$in"]
+        ]
+        for job_id in expired:
+            del self.docs[job_id]
+        return MagicMock(deleted_count=len(expired))
+
+    def find(self, query=None, projection=None):
+        docs = list(self.docs.values())
+        if query and "created_by" in query:
+            docs = [d for d in docs if d["created_by"] == query["created_by"]]
+        return FakeCursor(docs)
+
+
+def _db():
+    db = MagicMock()
+    for name in BulkUploadService.COLLECTION_MAP.values():
+        collection = MagicMock()
+        collection.find = MagicMock(side_effect=lambda *args, **kwargs: FakeCursor())
+        collection.bulk_write = AsyncMock(
+            side_effect=lambda ops, ordered=True: MagicMock(upserted_ids={i: ObjectId() for i in range(len(ops))})
+        )
+        setattr(db, name, collection)
+    db.bulk_upload_jobs = _JobsCollection()
+    return db
+
+
+async def _wait(service):
+    await asyncio.gather(*list(service._tasks.values()), return_exceptions=True)
+
+
+def _roles_file(tmp_path, content=ROLES_CSV):
+    path = tmp_path / "roles.csv"
+    path.write_text(content)
+    return str(path)
+
+
+class TestBulkUploadJobService:
+    """Job lifecycle"""
+
+    @pytest.fixture
+    def db(self):
+        return _db()
+
+    @pytest.fixture
+    def bulk_service(self, db):
+        return BulkUploadService(db, chunk_rows=2)
+
+    @pytest.mark.asyncio
+    async def test_job_records_progress_and_result(self, db, bulk_service, tmp_path):
+        service = BulkUploadJobService(db)
+        path = _roles_file(tmp_path)
+        job = await service.create_job(bulk_service, "roles", "roles.csv", path, created_by=MOCK_EMAIL_ADMIN_TEST)
+        assert job["status"] == STATUS_QUEUED
+        await _wait(service)
+
+        finished = await service.get_job(job["job_id"])
+        assert finished["status"] == STATUS_COMPLETED
+        assert finished["progress"] == {"rows": 5, "successful": 3, "failed": 2, "chunks": 3}
+        assert finished["result"]["errors"][0] == {"row": 5, "error": "Duplicate roleId r1 (first seen at row 2)"}
+        assert finished["result"]["errors_truncated"] is False
+        assert finished["completed_at"]
+        assert not (tmp_path / "roles.csv").exists()
+
+    @pytest.mark.asyncio
+    async def test_invalid_file_fails_job(self, db, bulk_service, tmp_path):
+        service = BulkUploadJobService(db)
+        job = await service.create_job(bulk_service, "roles", "roles.csv", _roles_file(tmp_path, "name\nA\n"))
+        await _wait(service)
+
+        finished = await service.get_job(job["job_id"])
+        assert finished["status"] == STATUS_FAILED
+        assert "Missing required columns" in finished["error"]
+        assert not (tmp_path / "roles.csv").exists()
+
+    @pytest.mark.asyncio
+    async def test_unknown_entity(self, db, bulk_service, tmp_path):
+        service = BulkUploadJobService(db)
+        with pytest.raises(ValueError):
+            await service.create_job(bulk_service, "tokens", "x.csv", _roles_file(tmp_path))
+
+    @pytest.mark.asyncio
+    async def test_cancel_stops_at_chunk_boundary(self, db, bulk_service, tmp_path):
+        service = BulkUploadJobService(db)
+        writes = db.roles.bulk_write.side_effect
+
+        async def cancel_after_first_write(ops, ordered=True):
+            job_id = next(iter(db.bulk_upload_jobs.docs))
+            await service.cancel_job(job_id)
+            return writes(ops, ordered)
+
+        db.roles.bulk_write.side_effect = cancel_after_first_write
+        job = await service.create_job(bulk_service, "roles", "roles.csv", _roles_file(tmp_path))
+        await _wait(service)
+
+        finished = await service.get_job(job["job_id"])
+        assert finished["status"] == STATUS_CANCELLED
+        assert finished["progress"]["chunks"] == 1
+        assert finished["result"]["successful"] == 2
+        assert db.roles.bulk_write.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_queued_job_cancelled_before_start(self, db, bulk_service, tmp_path):
+        service = BulkUploadJobService(db, config={"max_concurrent": 1})
+        await service._semaphore.acquire()
+        job = await service.create_job(bulk_service, "roles", "roles.csv", _roles_file(tmp_path))
+        cancelled = await service.cancel_job(job["job_id"])
+        assert cancelled["cancel_requested"] is True
+        service._semaphore.release()
+        await _wait(service)
+
+        assert db.bulk_upload_jobs.docs[job["job_id"]]["status"] == STATUS_CANCELLED
+        db.roles.bulk_write.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_cancel_finished_job_is_noop(self, db, bulk_service, tmp_path):
+        service = BulkUploadJobService(db)
+        job = await service.create_job(bulk_service, "roles", "roles.csv", _roles_file(tmp_path))
+        await _wait(service)
+        assert (await service.cancel_job(job["job_id"]))["status"] == STATUS_COMPLETED
+        assert await service.cancel_job("missing") is None
+
+    @pytest.mark.asyncio
+    async def test_stored_errors_are_capped(self, db, bulk_service, tmp_path):
+        service = BulkUploadJobService(db)
+        rows = "".join(",x\n" for _ in range(MAX_STORED_ERRORS + 5))
+        job = await service.create_job(bulk_service, "roles", "roles.csv", _roles_file(tmp_path, "roleId,name\n" + rows))
+        await _wait(service)
+
+        finished = await service.get_job(job["job_id"])
+        assert finished["progress"]["failed"] == MAX_STORED_ERRORS + 5
+        assert len(finished["result"]["errors"]) == MAX_STORED_ERRORS
+        assert finished["result"]["errors_truncated"] is True
+
+    @pytest.mark.asyncio
+    async def test_gcs_source_downloaded_by_job(self, db, bulk_service, tmp_path):
+        async def download(file_path, local_path, bucket_name=None):
+            with open(local_path, "w") as f:
+                f.write(ROLES_CSV)
+            return True
+
+        gcs = MagicMock()
+        gcs.is_configured = MagicMock(return_value=True)
+        gcs.download_to_path = AsyncMock(side_effect=download)
+        service = BulkUploadJobService(db, gcs_service=gcs)
+        local_path = str(tmp_path / "download.csv")
+        job = await service.create_job(
+            bulk_service, "roles", "uploads/roles.csv", local_path, gcs_path="uploads/roles.csv", gcs_bucket="b"
+        )
+        await _wait(service)
+
+        assert job["source"] == "gcs"
+        assert (await service.get_job(job["job_id"]))["progress"]["successful"] == 3
+        gcs.download_to_path.assert_awaited_once_with("uploads/roles.csv", local_path, "b")
+
+    @pytest.mark.asyncio
+    async def test_missing_gcs_file_fails_job(self, db, bulk_service, tmp_path):
+        gcs = MagicMock()
+        gcs.is_configured = MagicMock(return_value=True)
+        gcs.download_to_path = AsyncMock(return_value=False)
+        service = BulkUploadJobService(db, gcs_service=gcs)
+        job = await service.create_job(
+            bulk_service, "roles", "x.csv", str(tmp_path / "x.csv"), gcs_path="x.csv"
+        )
+        await _wait(service)
+        assert "not found" in (await service.get_job(job["job_id"]))["error"]
+
+    @pytest.mark.asyncio
+    async def test_shutdown_marks_running_job_interrupted(self, db, bulk_service, tmp_path):
+        service = BulkUploadJobService(db)
+        started = asyncio.Event()
+
+        async def slow_write(ops, ordered=True):
+            started.set()
+            await asyncio.sleep(10)
+
+        db.roles.bulk_write.side_effect = slow_write
+        job = await service.create_job(bulk_service, "roles", "roles.csv", _roles_file(tmp_path))
+        await started.wait()
+        await service.shutdown()
+
+        doc = db.bulk_upload_jobs.docs[job["job_id"]]
+        assert doc["status"] == STATUS_FAILED
+        assert doc["error"] == "Upload interrupted"
+
+    @pytest.mark.asyncio
+    async def test_job_with_expired_lease_reported_failed(self, db):
+        service = BulkUploadJobService(db)
+        await db.bulk_upload_jobs.insert_one({
+            "job_id": "orphan", "status": STATUS_RUNNING, "owner": "gone",
+            "lease_expires_at": datetime.now(timezone.utc) - timedelta(seconds=1),
+        })
+        assert (await service.get_job("orphan"))["status"] == STATUS_FAILED
+
+    @pytest.mark.asyncio
+    async def test_job_leased_by_another_worker_keeps_running(self, db):
+        service = BulkUploadJobService(db)
+        await db.bulk_upload_jobs.insert_one({
+            "job_id": "elsewhere", "status": STATUS_RUNNING, "owner": "other-pod",
+            "updated_at": datetime.now(timezone.utc) - timedelta(hours=1),
+            "lease_expires_at": datetime.now(timezone.utc) + timedelta(seconds=30),
+        })
+        job = await service.get_job("elsewhere")
+        assert job["status"] == STATUS_RUNNING
+        assert "owner" not in job and "lease_expires_at" not in job
+
+    @pytest.mark.asyncio
+    async def test_heartbeat_renews_lease_during_a_slow_chunk(self, db, bulk_service, tmp_path):
+        service = BulkUploadJobService(db, config={"lease_seconds": 0.06})
+        release = asyncio.Event()
+
+        async def slow_write(ops, ordered=True):
+            await release.wait()
+            return MagicMock(upserted_ids={i: ObjectId() for i in range(len(ops))})
+
+        db.roles.bulk_write.side_effect = slow_write
+        job = await service.create_job(bulk_service, "roles", "roles.csv", _roles_file(tmp_path))
+        await asyncio.sleep(0.2)
+
+        # Polled from another worker, which does not run the job itself
+        other_worker = BulkUploadJobService(db)
+        assert (await other_worker.get_job(job["job_id"]))["status"] == STATUS_RUNNING
+        release.set()
+        await _wait(service)
+        assert db.bulk_upload_jobs.docs[job["job_id"]]["status"] == STATUS_COMPLETED
+
+    @pytest.mark.asyncio
+    async def test_job_stops_when_its_lease_is_lost(self, db, bulk_service, tmp_path):
+        service = BulkUploadJobService(db, config={"lease_seconds": 0.06})
+        started = asyncio.Event()
+
+        async def slow_write(ops, ordered=True):
+            started.set()
+            await asyncio.sleep(10)
+
+        db.roles.bulk_write.side_effect = slow_write
+        job = await service.create_job(bulk_service, "roles", "roles.csv", _roles_file(tmp_path))
+        await started.wait()
+        db.bulk_upload_jobs.docs[job["job_id"]]["owner"] = "other-pod"
+        await asyncio.wait_for(_wait(service), timeout=1)
+        assert db.bulk_upload_jobs.docs[job["job_id"]]["status"] == STATUS_FAILED
+
+    @pytest.mark.asyncio
+    async def test_expired_jobs_cleaned_up(self, db):
+        service = BulkUploadJobService(db)
+        await db.bulk_upload_jobs.insert_one({
+            "job_id": "old", "status": STATUS_COMPLETED,
+            "expires_at": datetime.now(timezone.utc) - timedelta(hours=1),
+        })
+        assert await service.cleanup_expired() == 1
+        assert "old" not in db.bulk_upload_jobs.docs
+
+
+class TestBulkUploadJobRoutes:
+    """HTTP API for bulk upload jobs"""
+
+    @pytest.fixture
+    def db(self):
+        return _db()
+
+    @pytest.fixture
+    def service(self, db):
+        return BulkUploadJobService(db)
+
+    @pytest.fixture
+    def client(self, db, service):
+        app = FastAPI()
+        app.include_router(router)
+        app.dependency_overrides[get_bulk_upload_job_service] = lambda: service
+        app.dependency_overrides[get_bulk_upload_service] = lambda: BulkUploadService(db, chunk_rows=2)
+        app.dependency_overrides[get_gcs_service] = lambda: None
+        app.dependency_overrides[require_super_admin] = lambda: SimpleNamespace(email=MOCK_EMAIL_ADMIN_TEST)
+        # One event loop for all requests, so background jobs keep running
+        with TestClient(app) as client:
+            yield client
+
+    def _upload(self, client):
+        response = client.post(
+            "/bulk/jobs/upload/roles",
+            files={"file": ("roles.csv", ROLES_CSV.encode(), "text/csv")}
+        )
+        assert response.status_code == 202
+        return response.json()["job_id"]
+
+    def _completed_job(self, client, job_id):
+        for _ in range(100):
+            job = client.get(f"/bulk/jobs/{job_id}").json()
+            if job["status"] == STATUS_COMPLETED:
+                return job
+        pytest.fail("bulk upload job did not complete")
+
+    def test_upload_and_poll(self, client):
+        job = self._completed_job(client, self._upload(client))
+        assert job["progress"]["successful"] == 3
+        assert job["created_by"] == MOCK_EMAIL_ADMIN_TEST
+
+    def test_list_jobs(self, client):
+        self._completed_job(client, self._upload(client))
+        jobs = client.get("/bulk/jobs?mine=true").json()["data"]
+        assert len(jobs) == 1
+        assert jobs[0]["entity_type"] == "roles"
+
+    def test_cancel_and_missing_jobs(self, client):
+        job_id = self._upload(client)
+        assert client.post(f"/bulk/jobs/{job_id}/cancel").status_code == 200
+        assert client.post("/bulk/jobs/missing/cancel").status_code == 404
+        assert client.get("/bulk/jobs/missing").status_code == 404
+
+    def test_invalid_requests(self, client):
+        response = client.post("/bulk/jobs/upload/tokens", files={"file": ("x.csv", b"a\n1\n", "text/csv")})
+        assert response.status_code == 400
+        response = client.post("/bulk/jobs/gcs/roles", json={"file_path": "roles.csv"})
+        assert response.status_code == 503
+
+    def test_service_not_initialized(self, client):
+        client.app.dependency_overrides[get_bulk_upload_job_service] = lambda: None
+        assert client.get("/bulk/jobs").status_code == 503
@@ -1,7 +1,8 @@
 from mock_data import MOCK_EMAIL_ADMIN
 """Tests for Bulk Upload API Routes"""
 import pytest
-from unittest.mock import AsyncMock, MagicMock, patch
+import os
+from unittest.mock import ANY, AsyncMock, MagicMock, patch
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
 from io import BytesIO
@@ -12,6 +13,7 @@ from easylifeauth.api.bulk_upload_routes import (
     get_bulk_upload_service,
     get_gcs_service,
 )
+from easylifeauth.services.email_outbox import EmailOutbox, get_email_outbox
 from easylifeauth.security.access_control import CurrentUser, require_super_admin
 
 EXPECTED_USERS_CSV = "users.csv"
@@ -52,14 +54,23 @@ def mock_super_admin():
 def mock_bulk_service():
     """Create a fully-mocked BulkUploadService."""
     svc = MagicMock()
-    svc.process_entity = AsyncMock(return_value=MagicMock(
+    svc.spooled = []
+    result = MagicMock(
         to_dict=MagicMock(return_value={
             "total": 5,
             "successful": 4,
             "failed": 1,
             "errors": [{"row": 3, "error": "duplicate email"}],
         })
-    ))
+    )
+
+    async def process_entity_file(entity_type, path, filename, send_password_emails=True):
+        # The spooled file is removed after the request; capture its content
+        with open(path, "rb") as f:
+            svc.spooled.append(f.read())
+        return result
+
+    svc.process_entity_file = AsyncMock(side_effect=process_entity_file)
     svc.get_template = MagicMock(return_value=pd.DataFrame({"col1": [], "col2": []}))
     return svc
 
@@ -71,7 +82,7 @@ def mock_gcs_service_configured():
     svc.is_configured = MagicMock(return_value=True)
     svc.bucket_name = "test-bucket"
     svc.get_init_error = MagicMock(return_value=None)
-    svc.download_file = AsyncMock(return_value=b"csv,data\n1,2")
+    svc.download_to_path = AsyncMock(return_value=True)
     svc.list_files = AsyncMock(return_value=[
         {"name": EXPECTED_USERS_CSV, "size": 1234, "updated": "2026-01-01T00:00:00Z"},
         {"name": "roles.xlsx", "size": 5678, "updated": "2026-01-02T00:00:00Z"},
@@ -151,9 +162,10 @@ class TestBulkUpload:
         assert data["successful"] == 4
         assert data["failed"] == 1
         mock_validate.assert_called_once()
-        mock_bulk_service.process_entity.assert_awaited_once_with(
-            entity_type, csv_content, FILE_DATA_CSV, True
-        )
+        args = mock_bulk_service.process_entity_file.call_args.args
+        assert (args[0], args[2], args[3]) == (entity_type, FILE_DATA_CSV, True)
+        assert mock_bulk_service.spooled == [csv_content]
+        assert not os.path.exists(args[1])
 
     @patch(PATCH_FILE_VALIDATION_VALIDATE_UPLOAD)
     def test_upload_xlsx_file(self, mock_validate, client, mock_bulk_service):
@@ -165,30 +177,29 @@ class TestBulkUpload:
                             "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")},
         )
         assert response.status_code == 200
-        mock_bulk_service.process_entity.assert_awaited_once()
+        mock_bulk_service.process_entity_file.assert_awaited_once()
 
     @patch(PATCH_FILE_VALIDATION_VALIDATE_UPLOAD)
     def test_upload_send_password_emails_false(
         self, mock_validate, client, mock_bulk_service
     ):
-        """The send_password_emails query param is forwarded to process_entity."""
+        """The send_password_emails query param is forwarded to process_entity_file."""
         csv_content = b"email\nuser@test.com"
         response = client.post(
             "/bulk/upload/users?send_password_emails=false",
             files={"file": (EXPECTED_USERS_CSV, BytesIO(csv_content), MIME_TEXT_CSV)},
         )
         assert response.status_code == 200
-        mock_bulk_service.process_entity.assert_awaited_once_with(
-            "users", csv_content, EXPECTED_USERS_CSV, False
-        )
+        args = mock_bulk_service.process_entity_file.call_args.args
+        assert (args[0], args[2], args[3]) == ("users", EXPECTED_USERS_CSV, False)
 
-    # -- process_entity returns plain dict (no to_dict) --------------------
+    # -- process_entity_file returns plain dict (no to_dict) --------------------
 
     @patch(PATCH_FILE_VALIDATION_VALIDATE_UPLOAD)
     def test_upload_result_plain_dict(self, mock_validate, client, mock_bulk_service):
-        """When process_entity returns a plain dict (no to_dict), it is used as-is."""
+        """When process_entity_file returns a plain dict (no to_dict), it is used as-is."""
         plain = {"total": 2, "successful": 2, "failed": 0, "errors": []}
-        mock_bulk_service.process_entity = AsyncMock(return_value=plain)
+        mock_bulk_service.process_entity_file = AsyncMock(return_value=plain)
         response = client.post(
             PATH_BULK_UPLOAD_USERS,
             files={"file": (FILE_U_CSV, BytesIO(b"c\n1"), MIME_TEXT_CSV)},
@@ -207,12 +218,12 @@ class TestBulkUpload:
         assert response.status_code == 400
         assert EXPECTED_INVALID_ENTITY_TYPE in response.json()["detail"]
 
-    # -- ValueError from process_entity ------------------------------------
+    # -- ValueError from process_entity_file ------------------------------------
 
     @patch(PATCH_FILE_VALIDATION_VALIDATE_UPLOAD)
     def test_upload_value_error(self, mock_validate, client, mock_bulk_service):
-        """A ValueError from process_entity maps to 400."""
-        mock_bulk_service.process_entity = AsyncMock(
+        """A ValueError from process_entity_file maps to 400."""
+        mock_bulk_service.process_entity_file = AsyncMock(
             side_effect=ValueError("Missing required column: email")
         )
         response = client.post(
@@ -222,12 +233,12 @@ class TestBulkUpload:
         assert response.status_code == 400
         assert "Missing required column" in response.json()["detail"]
 
-    # -- Generic exception from process_entity -----------------------------
+    # -- Generic exception from process_entity_file -----------------------------
 
     @patch(PATCH_FILE_VALIDATION_VALIDATE_UPLOAD)
     def test_upload_internal_error(self, mock_validate, client, mock_bulk_service):
-        """An unexpected exception from process_entity maps to 500."""
-        mock_bulk_service.process_entity = AsyncMock(
+        """An unexpected exception from process_entity_file maps to 500."""
+        mock_bulk_service.process_entity_file = AsyncMock(
             side_effect=RuntimeError("DB connection lost")
         )
         response = client.post(
@@ -255,6 +266,30 @@ class TestBulkUpload:
         assert "Invalid file type" in response.json()["detail"]
 
 
+    @patch(PATCH_FILE_VALIDATION_VALIDATE_UPLOAD)
+    @patch("easylifeauth.api.bulk_upload_routes.max_upload_size", return_value=4)
+    def test_upload_too_large(self, mock_size, mock_validate, client, mock_bulk_service):
+        """Uploads over the size limit are rejected while spooling."""
+        response = client.post(
+            PATH_BULK_UPLOAD_USERS,
+            files={"file": (FILE_U_CSV, BytesIO(b"email\nuser@test.com"), MIME_TEXT_CSV)},
+        )
+        assert response.status_code == 413
+        mock_bulk_service.process_entity_file.assert_not_awaited()
+
+    def test_default_upload_limit_matches_file_validation(self, monkeypatch):
+        """The default upload limit is the 10MB file validation limit."""
+        from easylifeauth.api.bulk_upload_routes import max_upload_size
+        from easylifeauth.utils.file_validation import MAX_FILE_SIZE
+        monkeypatch.delenv("BULK_UPLOAD_MAX_FILE_MB", raising=False)
+        assert max_upload_size() == MAX_FILE_SIZE == 10 * 1024 * 1024
+
+    def test_upload_request_limit_allows_multipart_framing(self, monkeypatch):
+        from easylifeauth.api.bulk_upload_routes import MULTIPART_OVERHEAD_BYTES, max_upload_request_size
+        monkeypatch.setenv("BULK_UPLOAD_MAX_FILE_MB", "20")
+        assert max_upload_request_size() == 20 * 1024 * 1024 + MULTIPART_OVERHEAD_BYTES
+
+
 # ===========================================================================
 # GET /bulk/template/{entity_type}
 # ===========================================================================
@@ -359,41 +394,41 @@ class TestBulkUploadFromGCS:
         data = response.json()
         assert data["total"] == 5
         assert data["successful"] == 4
-        mock_bulk_service.process_entity.assert_awaited_once()
+        mock_bulk_service.process_entity_file.assert_awaited_once()
 
     def test_gcs_upload_with_bucket_name(
         self, client_with_gcs, mock_gcs_service_configured, mock_bulk_service
     ):
-        """Optional bucket_name is forwarded to gcs_service.download_file."""
+        """Optional bucket_name is forwarded to gcs_service.download_to_path."""
         response = client_with_gcs.post(
             PATH_BULK_GCS_UPLOAD_USERS,
             json={"file_path": FILE_DATA_CSV, "bucket_name": "my-bucket"},
         )
         assert response.status_code == 200
-        mock_gcs_service_configured.download_file.assert_awaited_once_with(
-            FILE_DATA_CSV, "my-bucket"
+        mock_gcs_service_configured.download_to_path.assert_awaited_once_with(
+            FILE_DATA_CSV, ANY, "my-bucket"
         )
 
     def test_gcs_upload_send_password_emails_false(
         self, client_with_gcs, mock_bulk_service
     ):
-        """send_password_emails query param is forwarded to process_entity."""
+        """send_password_emails query param is forwarded to process_entity_file."""
         response = client_with_gcs.post(
             "/bulk/gcs/upload/users?send_password_emails=false",
             json={"file_path": FILE_DATA_CSV},
         )
         assert response.status_code == 200
-        call_args = mock_bulk_service.process_entity.call_args
+        call_args = mock_bulk_service.process_entity_file.call_args
         assert call_args[0][3] is False  # send_password_emails
 
-    # -- process_entity returns plain dict ---------------------------------
+    # -- process_entity_file returns plain dict ---------------------------------
 
     def test_gcs_upload_result_plain_dict(
         self, client_with_gcs, mock_bulk_service
     ):
-        """When process_entity returns a plain dict, it is used as-is."""
+        """When process_entity_file returns a plain dict, it is used as-is."""
         plain = {"total": 1, "successful": 1, "failed": 0, "errors": []}
-        mock_bulk_service.process_entity = AsyncMock(return_value=plain)
+        mock_bulk_service.process_entity_file = AsyncMock(return_value=plain)
         response = client_with_gcs.post(
             PATH_BULK_GCS_UPLOAD_USERS,
             json={"file_path": FILE_DATA_CSV},
@@ -439,8 +474,8 @@ class TestBulkUploadFromGCS:
     def test_gcs_upload_file_not_found(
         self, client_with_gcs, mock_gcs_service_configured
     ):
-        """When download_file returns None, yields 404."""
-        mock_gcs_service_configured.download_file = AsyncMock(return_value=None)
+        """When download_to_path finds no file, yields 404."""
+        mock_gcs_service_configured.download_to_path = AsyncMock(return_value=False)
         response = client_with_gcs.post(
             PATH_BULK_GCS_UPLOAD_USERS,
             json={"file_path": "missing.csv"},
@@ -448,13 +483,13 @@ class TestBulkUploadFromGCS:
         assert response.status_code == 404
         assert "File not found in GCS" in response.json()["detail"]
 
-    # -- ValueError from process_entity ------------------------------------
+    # -- ValueError from process_entity_file ------------------------------------
 
     def test_gcs_upload_value_error(
         self, client_with_gcs, mock_bulk_service
     ):
-        """A ValueError from process_entity maps to 400."""
-        mock_bulk_service.process_entity = AsyncMock(
+        """A ValueError from process_entity_file maps to 400."""
+        mock_bulk_service.process_entity_file = AsyncMock(
             side_effect=ValueError("bad column layout")
         )
         response = client_with_gcs.post(
@@ -464,13 +499,13 @@ class TestBulkUploadFromGCS:
         assert response.status_code == 400
         assert "bad column layout" in response.json()["detail"]
 
-    # -- Generic exception from process_entity -----------------------------
+    # -- Generic exception from process_entity_file -----------------------------
 
     def test_gcs_upload_internal_error(
         self, client_with_gcs, mock_bulk_service
     ):
-        """An unexpected exception from process_entity maps to 500."""
-        mock_bulk_service.process_entity = AsyncMock(
+        """An unexpected exception from process_entity_file maps to 500."""
+        mock_bulk_service.process_entity_file = AsyncMock(
             side_effect=RuntimeError("timeout")
         )
         response = client_with_gcs.post(
@@ -558,3 +593,20 @@ class TestGCSStatus:
         assert data["configured"] is False
         assert data["bucket_name"] is None
         assert data["error"] == "GCS service not initialized"
+
+
+class TestEmailBatchStatus:
+    """Tests for GET /bulk/emails/{batch_id}"""
+
+    def test_batch_status(self, app, client):
+        outbox = EmailOutbox(MagicMock())
+        batch_id = outbox.new_batch()
+        app.dependency_overrides[get_email_outbox] = lambda: outbox
+        response = client.get(f"/bulk/emails/{batch_id}")
+        assert response.status_code == 200
+        assert response.json() == {"batch_id": batch_id, "queued": 0, "sent": 0, "failed": 0, "pending": 0}
+        assert client.get("/bulk/emails/missing").status_code == 404
+
+    def test_outbox_not_configured(self, app, client):
+        app.dependency_overrides[get_email_outbox] = lambda: None
+        assert client.get("/bulk/emails/any").status_code == 503
@@ -6,6 +6,7 @@ from unittest.mock import AsyncMock, MagicMock
 from bson import ObjectId
 
 from easylifeauth.services.bulk_upload_service import BulkUploadService, BulkUploadResult
+from conftest import FakeCursor
 from mock_data import MOCK_EMAIL, MOCK_PASSWORD_HASH
 FILE_TEST_CSV = "test.csv"
 STR_CUST1 = "cust1"
@@ -18,6 +19,23 @@ STR_ROLEID = "roleId"
 STR_SCENARIO1 = "scenario1"
 
 
+async def _bulk_write(operations, ordered=True):
+    """Report every operation carrying $setOnInsert as an upsert"""
+    upserted = {i: ObjectId() for i, op in enumerate(operations) if "$setOnInsert" in op._doc}
+    return MagicMock(upserted_ids=upserted)
+
+
+def _collection(existing=()):
+    collection = MagicMock()
+    collection.find = MagicMock(side_effect=lambda *args, **kwargs: FakeCursor(list(existing)))
+    collection.bulk_write = AsyncMock(side_effect=_bulk_write)
+    return collection
+
+
+def _operations(collection):
+    """All operations sent to ``collection.bulk_write``"""
+    return [op for call in collection.bulk_write.call_args_list for op in call.args[0]]
+
 
 class TestBulkUploadResult:
     """Tests for BulkUploadResult class"""
@@ -54,34 +72,8 @@ class TestBulkUploadService:
     def mock_db(self):
         """Create mock database"""
         db = MagicMock()
-        db.users = MagicMock()
-        db.users.find_one = AsyncMock(return_value=None)
-        db.users.insert_one = AsyncMock(return_value=MagicMock(inserted_id=ObjectId()))
-        db.users.update_one = AsyncMock()
-        db.roles = MagicMock()
-        db.roles.find_one = AsyncMock(return_value=None)
-        db.roles.insert_one = AsyncMock(return_value=MagicMock(inserted_id=ObjectId()))
-        db.roles.update_one = AsyncMock()
-        db.groups = MagicMock()
-        db.groups.find_one = AsyncMock(return_value=None)
-        db.groups.insert_one = AsyncMock(return_value=MagicMock(inserted_id=ObjectId()))
-        db.groups.update_one = AsyncMock()
-        db.domains = MagicMock()
-        db.domains.find_one = AsyncMock(return_value=None)
-        db.domains.insert_one = AsyncMock(return_value=MagicMock(inserted_id=ObjectId()))
-        db.domains.update_one = AsyncMock()
-        db.domain_scenarios = MagicMock()
-        db.domain_scenarios.find_one = AsyncMock(return_value=None)
-        db.domain_scenarios.insert_one = AsyncMock(return_value=MagicMock(inserted_id=ObjectId()))
-        db.domain_scenarios.update_one = AsyncMock()
-        db.permissions = MagicMock()
-        db.permissions.find_one = AsyncMock(return_value=None)
-        db.permissions.insert_one = AsyncMock(return_value=MagicMock(inserted_id=ObjectId()))
-        db.permissions.update_one = AsyncMock()
-        db.customers = MagicMock()
-        db.customers.find_one = AsyncMock(return_value=None)
-        db.customers.insert_one = AsyncMock(return_value=MagicMock(inserted_id=ObjectId()))
-        db.customers.update_one = AsyncMock()
+        for name in BulkUploadService.COLLECTION_MAP.values():
+            setattr(db, name, _collection())
         return db
 
     @pytest.fixture
@@ -120,72 +112,6 @@ class TestBulkUploadService:
             service.parse_file(b"invalid xlsx content", "test.xlsx")
         assert "failed to parse" in str(exc.value).lower()
 
-    def test_parse_list_field_empty(self, service):
-        """Test parsing empty list field"""
-        result = service._parse_list_field("")
-        assert result == []
-
-    def test_parse_list_field_none(self, service):
-        """Test parsing None list field"""
-        result = service._parse_list_field(None)
-        assert result == []
-
-    def test_parse_list_field_pandas_na(self, service):
-        """Test parsing pandas NA value"""
-        import pandas as pd
-        result = service._parse_list_field(pd.NA)
-        assert result == []
-
-    def test_parse_list_field_string(self, service):
-        """Test parsing comma-separated string"""
-        result = service._parse_list_field("a, b, c")
-        assert result == ["a", "b", "c"]
-
-    def test_parse_bool_field_true_string(self, service):
-        """Test parsing 'true' string"""
-        assert service._parse_bool_field("true") is True
-        assert service._parse_bool_field("1") is True
-        assert service._parse_bool_field("yes") is True
-        assert service._parse_bool_field("active") is True
-
-    def test_parse_bool_field_false_string(self, service):
-        """Test parsing false string"""
-        assert service._parse_bool_field("false") is False
-
-    def test_parse_bool_field_none(self, service):
-        """Test parsing None returns True"""
-        import pandas as pd
-        assert service._parse_bool_field(pd.NA) is True
-
-    def test_parse_bool_field_bool(self, service):
-        """Test parsing actual boolean"""
-        assert service._parse_bool_field(True) is True
-        assert service._parse_bool_field(False) is False
-
-    def test_parse_int_field_valid(self, service):
-        """Test parsing valid integer"""
-        assert service._parse_int_field(5) == 5
-        assert service._parse_int_field("10") == 10
-
-    def test_parse_int_field_invalid(self, service):
-        """Test parsing invalid integer returns default"""
-        assert service._parse_int_field("not a number") == 0
-        assert service._parse_int_field("not a number", default=5) == 5
-
-    def test_parse_int_field_none(self, service):
-        """Test parsing None returns default"""
-        import pandas as pd
-        assert service._parse_int_field(pd.NA) == 0
-
-    def test_validate_email_valid(self, service):
-        """Test email validation with valid email"""
-        assert service._validate_email(MOCK_EMAIL) is True
-
-    def test_validate_email_invalid(self, service):
-        """Test email validation with invalid email"""
-        assert service._validate_email("invalid") is False
-        assert service._validate_email("test@") is False
-
     def test_generate_temp_password(self, service):
         """Test temporary password generation"""
         password = service._generate_temp_password()
@@ -233,7 +159,7 @@ class TestBulkUploadService:
     @pytest.mark.asyncio
     async def test_process_users_existing_user(self, service, mock_db):
         """Test processing existing user (update)"""
-        mock_db.users.find_one = AsyncMock(return_value={"email": MOCK_EMAIL})
+        mock_db.users = _collection([{"email": MOCK_EMAIL}])
 
         df = pd.DataFrame({
             "email": [MOCK_EMAIL],
@@ -242,7 +168,8 @@ class TestBulkUploadService:
 
         result = await service.process_users(df, send_password_emails=False)
         assert result.successful == 1
-        mock_db.users.update_one.assert_called_once()
+        [operation] = _operations(mock_db.users)
+        assert "$setOnInsert" not in operation._doc
 
     @pytest.mark.asyncio
     async def test_process_users_invalid_username(self, service, mock_db):
@@ -330,7 +257,7 @@ class TestBulkUploadService:
     @pytest.mark.asyncio
     async def test_process_roles_existing(self, service, mock_db):
         """Test processing existing role (update)"""
-        mock_db.roles.find_one = AsyncMock(return_value={STR_ROLEID: "admin"})
+        mock_db.roles = _collection([{STR_ROLEID: "admin"}])
 
         df = pd.DataFrame({
             STR_ROLEID: ["admin"],
@@ -339,7 +266,8 @@ class TestBulkUploadService:
 
         result = await service.process_roles(df)
         assert result.successful == 1
-        mock_db.roles.update_one.assert_called_once()
+        [operation] = _operations(mock_db.roles)
+        assert "$setOnInsert" not in operation._doc
 
     @pytest.mark.asyncio
     async def test_process_groups_success(self, service, mock_db):
@@ -367,7 +295,7 @@ class TestBulkUploadService:
     @pytest.mark.asyncio
     async def test_process_groups_existing(self, service, mock_db):
         """Test processing existing group (update)"""
-        mock_db.groups.find_one = AsyncMock(return_value={STR_GROUPID: "viewers"})
+        mock_db.groups = _collection([{STR_GROUPID: "viewers"}])
 
         df = pd.DataFrame({
             STR_GROUPID: ["viewers"],
@@ -376,7 +304,8 @@ class TestBulkUploadService:
 
         result = await service.process_groups(df)
         assert result.successful == 1
-        mock_db.groups.update_one.assert_called_once()
+        [operation] = _operations(mock_db.groups)
+        assert "$setOnInsert" not in operation._doc
 
     @pytest.mark.asyncio
     async def test_process_domains_success(self, service, mock_db):
@@ -405,7 +334,7 @@ class TestBulkUploadService:
     @pytest.mark.asyncio
     async def test_process_domains_existing(self, service, mock_db):
         """Test processing existing domain (update)"""
-        mock_db.domains.find_one = AsyncMock(return_value={"key": STR_DOMAIN1})
+        mock_db.domains = _collection([{"key": STR_DOMAIN1}])
 
         df = pd.DataFrame({
             "key": [STR_DOMAIN1],
@@ -414,7 +343,8 @@ class TestBulkUploadService:
 
         result = await service.process_domains(df)
         assert result.successful == 1
-        mock_db.domains.update_one.assert_called_once()
+        [operation] = _operations(mock_db.domains)
+        assert "$setOnInsert" not in operation._doc
 
     @pytest.mark.asyncio
     async def test_process_domain_scenarios_success(self, service, mock_db):
@@ -444,7 +374,7 @@ class TestBulkUploadService:
     @pytest.mark.asyncio
     async def test_process_domain_scenarios_existing(self, service, mock_db):
         """Test processing existing domain scenario (update)"""
-        mock_db.domain_scenarios.find_one = AsyncMock(return_value={"key": STR_SCENARIO1})
+        mock_db.domain_scenarios = _collection([{"key": STR_SCENARIO1}])
 
         df = pd.DataFrame({
             "key": [STR_SCENARIO1],
@@ -454,7 +384,8 @@ class TestBulkUploadService:
 
         result = await service.process_domain_scenarios(df)
         assert result.successful == 1
-        mock_db.domain_scenarios.update_one.assert_called_once()
+        [operation] = _operations(mock_db.domain_scenarios)
+        assert "$setOnInsert" not in operation._doc
 
     @pytest.mark.asyncio
     async def test_process_customers_success(self, service, mock_db):
@@ -493,7 +424,7 @@ class TestBulkUploadService:
     @pytest.mark.asyncio
     async def test_process_customers_existing(self, service, mock_db):
         """Test processing existing customer (update)"""
-        mock_db.customers.find_one = AsyncMock(return_value={STR_CUSTOMERID: STR_CUST1})
+        mock_db.customers = _collection([{STR_CUSTOMERID: STR_CUST1}])
 
         df = pd.DataFrame({
             STR_CUSTOMERID: [STR_CUST1],
@@ -502,7 +433,8 @@ class TestBulkUploadService:
 
         result = await service.process_customers(df)
         assert result.successful == 1
-        mock_db.customers.update_one.assert_called_once()
+        [operation] = _operations(mock_db.customers)
+        assert "$setOnInsert" not in operation._doc
 
     @pytest.mark.asyncio
     async def test_process_permissions_success(self, service, mock_db):
@@ -556,7 +488,7 @@ class TestBulkUploadService:
     @pytest.mark.asyncio
     async def test_process_permissions_existing(self, service, mock_db):
         """Test processing existing permission (update)"""
-        mock_db.permissions.find_one = AsyncMock(return_value={"key": STR_PERM1})
+        mock_db.permissions = _collection([{"key": STR_PERM1}])
 
         df = pd.DataFrame({
             "key": [STR_PERM1],
@@ -566,7 +498,8 @@ class TestBulkUploadService:
 
         result = await service.process_permissions(df)
         assert result.successful == 1
-        mock_db.permissions.update_one.assert_called_once()
+        [operation] = _operations(mock_db.permissions)
+        assert "$setOnInsert" not in operation._doc
 
     @pytest.mark.asyncio
     async def test_process_entity_users(self, service, mock_db):
@@ -628,3 +561,222 @@ class TestBulkUploadService:
         with pytest.raises(ValueError) as exc:
             service.get_template("unknown")
         assert "unknown entity type" in str(exc.value).lower()
+
+
+class TestBulkWritePipeline:
+    """Chunked prefetch + bulk_write upserts"""
+
+    @pytest.fixture
+    def mock_db(self):
+        db = MagicMock()
+        for name in BulkUploadService.COLLECTION_MAP.values():
+            setattr(db, name, _collection())
+        return db
+
+    @pytest.mark.asyncio
+    async def test_one_query_and_write_per_chunk(self, mock_db):
+        service = BulkUploadService(mock_db, batch_size=2)
+        df = pd.DataFrame({STR_ROLEID: ["r1", "r2", "r3", "r4", "r5"], "name": ["R"] * 5})
+
+        result = await service.process_roles(df)
+        assert result.successful == 5
+        assert mock_db.roles.find.call_count == 3
+        assert mock_db.roles.bulk_write.call_count == 3
+        assert mock_db.roles.find.call_args_list[0].args[0] == {STR_ROLEID: {"$in": ["r1", "r2"]}}
+        assert all(call.kwargs["ordered"] is False for call in mock_db.roles.bulk_write.call_args_list)
+
+    @pytest.mark.asyncio
+    async def test_existing_keys_are_not_given_insert_fields(self, mock_db):
+        mock_db.groups = _collection([{STR_GROUPID: "g1"}])
+        service = BulkUploadService(mock_db)
+        df = pd.DataFrame({STR_GROUPID: ["g1", "g2"], "name": ["G1", "G2"]})
+
+        await service.process_groups(df)
+        existing, new = _operations(mock_db.groups)
+        assert "$setOnInsert" not in existing._doc
+        assert "created_at" in new._doc["$setOnInsert"]
+        assert new._upsert is True
+
+    @pytest.mark.asyncio
+    async def test_write_errors_reported_per_row(self, mock_db):
+        from pymongo.errors import BulkWriteError
+        mock_db.permissions.bulk_write = AsyncMock(side_effect=BulkWriteError({
+            "writeErrors": [{"index": 1, "errmsg": "E11000 duplicate key"}],
+            "upserted": [{"index": 0, "_id": ObjectId()}],
+        }))
+        service = BulkUploadService(mock_db)
+        df = pd.DataFrame({
+            "key": [STR_PERM1, "perm2", ""],
+            "name": ["P1", "P2", "P3"],
+            "module": ["users"] * 3,
+        })
+
+        result = await service.process_permissions(df)
+        assert result.successful == 1
+        assert result.failed == 2
+        assert [error["row"] for error in result.errors] == [3, 4]
+        assert result.errors[0] == {"row": 3, "error": "E11000 duplicate key", "key": "perm2"}
+
+    @pytest.mark.asyncio
+    async def test_duplicate_keys_reported_before_writing(self, mock_db):
+        service = BulkUploadService(mock_db)
+        df = pd.DataFrame({"key": [STR_DOMAIN1, "domain2", STR_DOMAIN1], "name": ["First", "Other", "Again"]})
+
+        result = await service.process_domains(df)
+        assert result.successful == 2
+        assert result.errors == [{"row": 4, "error": "Duplicate key domain1 (first seen at row 2)"}]
+        names = [operation._doc["$set"]["name"] for operation in _operations(mock_db.domains)]
+        assert names == ["First", "Other"]
+
+    @pytest.mark.asyncio
+    async def test_invalid_rows_never_reach_the_database(self, mock_db):
+        service = BulkUploadService(mock_db)
+        df = pd.DataFrame({"email": ["bad", None], "username": ["a", "b"]})
+
+        result = await service.process_users(df, send_password_emails=False)
+        assert result.failed == 2
+        assert result.errors[0] == {"row": 2, "error": "Invalid email format: bad", "email": "bad"}
+        assert result.errors[1]["email"] == "N/A"
+        mock_db.users.find.assert_not_called()
+        mock_db.users.bulk_write.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_welcome_email_only_for_inserted_users(self, mock_db):
+        mock_db.users = _collection([{"email": "old@example.com"}])
+        email_service = MagicMock()
+        email_service.send_welcome_email = AsyncMock()
+        service = BulkUploadService(mock_db, email_service=email_service)
+        df = pd.DataFrame({"email": ["old@example.com", MOCK_EMAIL]})
+
+        result = await service.process_users(df, send_password_emails=True)
+        assert result.successful == 2
+        email_service.send_welcome_email.assert_called_once()
+        assert email_service.send_welcome_email.call_args.args[0] == MOCK_EMAIL
+        existing, new = _operations(mock_db.users)
+        assert "password_hash" not in existing._doc["$set"]
+        assert "password_hash" in new._doc["$setOnInsert"]
+
+    @pytest.mark.asyncio
+    async def test_welcome_emails_queued_on_outbox(self, mock_db):
+        email_service = MagicMock()
+        email_service.send_welcome_email = AsyncMock()
+        email_service.welcome_message = MagicMock(side_effect=lambda to, name, password: {"To": to})
+        outbox = MagicMock()
+        outbox.new_batch = MagicMock(return_value="batch-1")
+        service = BulkUploadService(mock_db, email_service=email_service, email_outbox=outbox)
+        df = pd.DataFrame({"email": [MOCK_EMAIL, "other@example.com"]})
+
+        result = await service.process_users(df, send_password_emails=True)
+        email_service.send_welcome_email.assert_not_called()
+        outbox.new_batch.assert_called_once()
+        assert [call.args for call in outbox.enqueue.call_args_list] == [
+            ({"To": MOCK_EMAIL}, "batch-1"), ({"To": "other@example.com"}, "batch-1"),
+        ]
+        assert result.to_dict()["email_batch_id"] == "batch-1"
+        assert result.to_dict()["emails_queued"] == 2
+
+    @pytest.mark.asyncio
+    async def test_batch_size_from_env(self, mock_db, monkeypatch):
+        monkeypatch.setenv("BULK_UPLOAD_BATCH_SIZE", "7")
+        assert BulkUploadService(mock_db).batch_size == 7
+
+
+class TestChunkedFileUpload:
+    """process_entity_file: read, validate and write one chunk at a time"""
+
+    @pytest.fixture
+    def mock_db(self):
+        db = MagicMock()
+        for name in BulkUploadService.COLLECTION_MAP.values():
+            setattr(db, name, _collection())
+        return db
+
+    @pytest.fixture
+    def service(self, mock_db):
+        return BulkUploadService(mock_db, chunk_rows=2)
+
+    @pytest.mark.asyncio
+    async def test_csv_processed_in_chunks(self, service, mock_db, tmp_path):
+        path = tmp_path / "roles.csv"
+        path.write_text("roleId,name\nr1,A\nr2,B\nr3,C\nr1,D\n,E\n")
+
+        result = await service.process_entity_file("roles", str(path), "roles.csv")
+        assert result.total == 5
+        assert result.successful == 3
+        # r1 repeats a key from the first chunk; row 6 has no roleId
+        assert result.errors == [
+            {"row": 5, "error": "Duplicate roleId r1 (first seen at row 2)"},
+            {"row": 6, "error": "roleId is required"},
+        ]
+        assert mock_db.roles.bulk_write.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_on_chunk_sees_running_result(self, service, tmp_path):
+        path = tmp_path / "roles.csv"
+        path.write_text("roleId,name\nr1,A\nr2,B\nr3,C\n")
+        totals = []
+
+        async def on_chunk(result):
+            totals.append(result.total)
+            if result.total >= 2:
+                raise RuntimeError("stop")
+
+        with pytest.raises(RuntimeError):
+            await service.process_entity_file("roles", str(path), "roles.csv", on_chunk=on_chunk)
+        assert totals == [2]
+
+    def test_iter_file_chunks_keeps_row_index(self, service, tmp_path):
+        path = tmp_path / "roles.csv"
+        path.write_text(" roleId ,name\nr1,A\nr2,B\nr3,C\n")
+        chunks = list(service.iter_file_chunks(str(path), "roles.csv"))
+        assert [chunk.index.tolist() for chunk in chunks] == [[0, 1], [2]]
+        assert list(chunks[0].columns) == [STR_ROLEID, "name"]
+
+    @pytest.mark.asyncio
+    async def test_xlsx_streamed(self, service, mock_db, tmp_path):
+        from openpyxl import Workbook
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(["email", "username", "is_active"])
+        sheet.append([MOCK_EMAIL, "testuser", True])
+        sheet.append(["other@example.com", None, "no"])
+        sheet.append(["bad", "x", None])
+        path = tmp_path / "users.xlsx"
+        workbook.save(path)
+
+        result = await service.process_entity_file("users", str(path), "users.xlsx", send_password_emails=False)
+        assert result.total == 3
+        assert result.successful == 2
+        assert result.errors == [{"row": 4, "error": "Invalid email format: bad", "email": "bad"}]
+        documents = [op._doc["$set"] for op in _operations(mock_db.users)]
+        assert documents[1]["username"] == "other"
+        assert documents[1]["is_active"] is False
+
+    @pytest.mark.asyncio
+    async def test_missing_columns_rejected_before_writing(self, service, mock_db, tmp_path):
+        path = tmp_path / "roles.csv"
+        path.write_text("name\nA\n")
+        with pytest.raises(ValueError) as exc:
+            await service.process_entity_file("roles", str(path), "roles.csv")
+        assert "missing required columns" in str(exc.value).lower()
+        mock_db.roles.bulk_write.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_empty_file(self, service, tmp_path):
+        path = tmp_path / "roles.csv"
+        path.write_text("roleId,name\n")
+        with pytest.raises(ValueError) as exc:
+            await service.process_entity_file("roles", str(path), "roles.csv")
+        assert "empty" in str(exc.value).lower()
+
+    @pytest.mark.asyncio
+    async def test_unparseable_and_unsupported_files(self, service, tmp_path):
+        path = tmp_path / "roles.xlsx"
+        path.write_bytes(b"not a workbook")
+        with pytest.raises(ValueError) as exc:
+            await service.process_entity_file("roles", str(path), "roles.xlsx")
+        assert "failed to parse" in str(exc.value).lower()
+        with pytest.raises(ValueError):
+            await service.process_entity_file("roles", str(path), "roles.txt")
+        with pytest.raises(ValueError):
+            await service.process_entity_file("widgets", str(path), "roles.csv")
@@ -15,9 +15,9 @@ from easylifeauth.api.configurations_routes import (
     get_gcs_service,
     generate_config_id,
     serialize_config,
-    create_pagination_meta,
     DbConfigurationTypes
 )
+from easylifeauth.api.pagination import create_pagination_meta
 from easylifeauth.api.dependencies import get_db
 from easylifeauth.security.access_control import require_super_admin
 
@@ -208,6 +208,7 @@ class TestConfigurationsRoutes:
         }
 
         mock_db.configurations.count_documents = AsyncMock(return_value=1)
+        mock_db.configurations.estimated_document_count = AsyncMock(return_value=1)
         mock_cursor = MagicMock()
         mock_cursor.skip = MagicMock(return_value=mock_cursor)
         mock_cursor.limit = MagicMock(return_value=mock_cursor)
@@ -6,7 +6,8 @@ from fastapi import FastAPI
 from fastapi.testclient import TestClient
 from bson import ObjectId
 
-from easylifeauth.api.customers_routes import router, create_pagination_meta
+from easylifeauth.api.customers_routes import router
+from easylifeauth.api.pagination import create_pagination_meta
 from easylifeauth.api import dependencies
 from easylifeauth.security.access_control import CurrentUser, require_group_admin
 from mock_data import MOCK_EMAIL_GROUPADMIN, MOCK_EMAIL_USER, MOCK_EMAIL_USER1, MOCK_PASSWORD_HASH
@@ -185,13 +186,14 @@ class TestCustomersRoutes:
     def _make_cursor_mock(documents):
         """Build a MagicMock that behaves like an async Motor cursor.
 
-        Supports chained .skip().limit().sort() and to_list().
+        Supports chained .skip().limit().sort(), to_list() and async iteration.
         """
         cursor = MagicMock()
         cursor.skip.return_value = cursor
         cursor.limit.return_value = cursor
         cursor.sort.return_value = cursor
         cursor.to_list = AsyncMock(return_value=documents)
+        cursor.__aiter__.return_value = documents
         return cursor
 
     # ======================================================================
@@ -201,6 +203,7 @@ class TestCustomersRoutes:
     def test_list_customers_empty(self, client, mock_db):
         """Test listing customers when collection is empty."""
         mock_db.customers.count_documents = AsyncMock(return_value=0)
+        mock_db.customers.estimated_document_count = AsyncMock(return_value=0)
         mock_db.customers.find.return_value = self._make_cursor_mock([])
 
         response = client.get(PATH_CUSTOMERS)
@@ -215,6 +218,7 @@ class TestCustomersRoutes:
         """Test listing customers returns paginated results."""
         doc = self._sample_customer_doc()
         mock_db.customers.count_documents = AsyncMock(return_value=1)
+        mock_db.customers.estimated_document_count = AsyncMock(return_value=1)
         mock_db.customers.find.return_value = self._make_cursor_mock([doc])
 
         response = client.get(PATH_CUSTOMERS)
@@ -229,6 +233,7 @@ class TestCustomersRoutes:
     def test_list_customers_pagination_params(self, client, mock_db):
         """Test that page and limit query params are forwarded."""
         mock_db.customers.count_documents = AsyncMock(return_value=100)
+        mock_db.customers.estimated_document_count = AsyncMock(return_value=100)
         cursor = self._make_cursor_mock([])
         mock_db.customers.find.return_value = cursor
 
@@ -324,6 +329,7 @@ class TestCustomersRoutes:
         oid = ObjectId()
         doc = self._sample_customer_doc(_id=oid)
         mock_db.customers.count_documents = AsyncMock(return_value=1)
+        mock_db.customers.estimated_document_count = AsyncMock(return_value=1)
         mock_db.customers.find.return_value = self._make_cursor_mock([doc])
 
         response = client.get(PATH_CUSTOMERS)
@@ -1209,13 +1215,14 @@ class TestCustomersRoutes:
     def test_list_customers_sort_by_created_at_desc(self, client, mock_db):
         """Test that list endpoint sorts by created_at descending."""
         mock_db.customers.count_documents = AsyncMock(return_value=0)
+        mock_db.customers.estimated_document_count = AsyncMock(return_value=0)
         cursor = self._make_cursor_mock([])
         mock_db.customers.find.return_value = cursor
 
         response = client.get(PATH_CUSTOMERS)
 
         assert response.status_code == 200
-        cursor.sort.assert_called_once_with("created_at", -1)
+        cursor.sort.assert_called_once_with([("created_at", -1), ("_id", -1)])
 
     def test_assign_users_uses_addtoset(self, client, mock_db):
         """Test that assign-users uses $addToSet to avoid duplicates."""
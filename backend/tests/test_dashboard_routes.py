@@ -9,12 +9,38 @@ from datetime import datetime, timezone, timedelta
 from easylifeauth.api.dashboard_routes import router
 from easylifeauth.api.dependencies import get_db
 from easylifeauth.security.access_control import require_super_admin, require_group_admin
+from easylifeauth.services.dashboard_stats import invalidate_dashboard_stats
 from mock_data import MOCK_EMAIL_ADMIN_TEST, MOCK_EMAIL_USER_TEST
 
 PATH_DASHBOARD_ANALYTICS = "/dashboard/analytics"
 PATH_DASHBOARD_STATS = "/dashboard/stats"
 
 
+def _facets(total=0, active=0, inactive=0, by_value=None):
+    """Result document of a dashboard count aggregation"""
+    doc = {
+        "total": [{"count": total}] if total else [],
+        "active": [{"count": active}] if active else [],
+        "inactive": [{"count": inactive}] if inactive else [],
+    }
+    if by_value is not None:
+        doc["by_value"] = [{"_id": k, "count": v} for k, v in by_value.items()]
+    return doc
+
+
+def _mock_counts(collection, doc):
+    aggregate = MagicMock()
+    aggregate.to_list = AsyncMock(return_value=[doc])
+    collection.aggregate = MagicMock(return_value=aggregate)
+
+
+@pytest.fixture(autouse=True)
+def fresh_dashboard_cache():
+    invalidate_dashboard_stats()
+    yield
+    invalidate_dashboard_stats()
+
+
 
 class TestDashboardRoutes:
     """Tests for dashboard API routes"""
@@ -61,15 +87,15 @@ class TestDashboardRoutes:
     def test_get_dashboard_stats(self, client, mock_db):
         """Test get dashboard stats endpoint"""
         # Mock count_documents for all collections
-        mock_db.users.count_documents = AsyncMock(side_effect=[10, 8])  # total, active
-        mock_db.roles.count_documents = AsyncMock(return_value=5)
-        mock_db.groups.count_documents = AsyncMock(return_value=3)
-        mock_db.domains.count_documents = AsyncMock(return_value=2)
-        mock_db.domain_scenarios.count_documents = AsyncMock(return_value=4)
-        mock_db.playboards.count_documents = AsyncMock(return_value=6)
-        mock_db.customers.count_documents = AsyncMock(return_value=15)
-        mock_db.configurations.count_documents = AsyncMock(return_value=8)
-        mock_db.permissions.count_documents = AsyncMock(return_value=12)
+        _mock_counts(mock_db.users, _facets(total=10, active=8, inactive=2))
+        _mock_counts(mock_db.roles, _facets(total=5))
+        _mock_counts(mock_db.groups, _facets(total=3))
+        _mock_counts(mock_db.domains, _facets(total=2))
+        _mock_counts(mock_db.domain_scenarios, _facets(total=4))
+        _mock_counts(mock_db.playboards, _facets(total=6))
+        _mock_counts(mock_db.customers, _facets(total=15))
+        _mock_counts(mock_db.configurations, _facets(total=8, by_value={}))
+        _mock_counts(mock_db.permissions, _facets(total=12, by_value={}))
 
         # Mock activity logs cursor
         mock_cursor = MagicMock()
@@ -82,21 +108,23 @@ class TestDashboardRoutes:
         response = client.get(PATH_DASHBOARD_STATS)
         assert response.status_code == 200
         data = response.json()
-        assert "total_users" in data
-        assert "active_users" in data
-        assert "total_roles" in data
+        assert data["total_users"] == 10
+        assert data["active_users"] == 8
+        assert data["total_roles"] == 5
+        assert data["total_customers"] == 15
+        assert data["total_configurations"] == 8
 
     def test_get_dashboard_stats_with_activity_logs(self, client, mock_db):
         """Test get dashboard stats with activity logs"""
-        mock_db.users.count_documents = AsyncMock(side_effect=[10, 8])
-        mock_db.roles.count_documents = AsyncMock(return_value=5)
-        mock_db.groups.count_documents = AsyncMock(return_value=3)
-        mock_db.domains.count_documents = AsyncMock(return_value=2)
-        mock_db.domain_scenarios.count_documents = AsyncMock(return_value=4)
-        mock_db.playboards.count_documents = AsyncMock(return_value=6)
-        mock_db.customers.count_documents = AsyncMock(return_value=15)
-        mock_db.configurations.count_documents = AsyncMock(return_value=8)
-        mock_db.permissions.count_documents = AsyncMock(return_value=12)
+        _mock_counts(mock_db.users, _facets(total=10, active=8, inactive=2))
+        _mock_counts(mock_db.roles, _facets(total=5))
+        _mock_counts(mock_db.groups, _facets(total=3))
+        _mock_counts(mock_db.domains, _facets(total=2))
+        _mock_counts(mock_db.domain_scenarios, _facets(total=4))
+        _mock_counts(mock_db.playboards, _facets(total=6))
+        _mock_counts(mock_db.customers, _facets(total=15))
+        _mock_counts(mock_db.configurations, _facets(total=8, by_value={}))
+        _mock_counts(mock_db.permissions, _facets(total=12, by_value={}))
 
         activity_log = {"_id": ObjectId(), "action": "login", "timestamp": datetime.now(timezone.utc)}
         mock_cursor = MagicMock()
@@ -114,16 +142,17 @@ class TestDashboardRoutes:
     def test_get_summary(self, client, mock_db):
         """Test get summary endpoint"""
         # Mock all count_documents calls
-        mock_db.users.count_documents = AsyncMock(side_effect=[5, 3])  # active, inactive
-        mock_db.roles.count_documents = AsyncMock(side_effect=[4, 1])
-        mock_db.groups.count_documents = AsyncMock(side_effect=[3, 0])
-        mock_db.customers.count_documents = AsyncMock(side_effect=[10, 2])
-        mock_db.domains.count_documents = AsyncMock(side_effect=[2, 0])
-        mock_db.domain_scenarios.count_documents = AsyncMock(side_effect=[4, 1])
-        mock_db.configurations.count_documents = AsyncMock(side_effect=[3, 2, 1, 0])
-        mock_db.playboards.count_documents = AsyncMock(side_effect=[5, 1])
-        mock_db.permissions.distinct = AsyncMock(return_value=["users", "admin"])
-        mock_db.permissions.count_documents = AsyncMock(side_effect=[3, 2])
+        _mock_counts(mock_db.users, _facets(total=8, active=5, inactive=3))
+        _mock_counts(mock_db.roles, _facets(total=5, active=4, inactive=1))
+        _mock_counts(mock_db.groups, _facets(total=3, active=3))
+        _mock_counts(mock_db.customers, _facets(total=12, active=10, inactive=2))
+        _mock_counts(mock_db.domains, _facets(total=2, active=2))
+        _mock_counts(mock_db.domain_scenarios, _facets(total=5, active=4, inactive=1))
+        _mock_counts(mock_db.configurations, _facets(
+            total=6, by_value={"process-config": 3, "lookup-data": 2, "gcs-data": 1}
+        ))
+        _mock_counts(mock_db.playboards, _facets(total=6, active=5, inactive=1))
+        _mock_counts(mock_db.permissions, _facets(total=5, by_value={"users": 3, "admin": 2}))
 
         response = client.get("/dashboard/summary")
         assert response.status_code == 200
@@ -136,7 +165,32 @@ class TestDashboardRoutes:
         assert "scenarios" in data
         assert "configurations" in data
         assert "playboards" in data
-        assert "permissions_by_module" in data
+        assert data["users"] == {"active": 5, "inactive": 3}
+        assert data["groups"] == {"active": 3, "inactive": 0}
+        assert data["configurations"] == {"process-config": 3, "lookup-data": 2, "gcs-data": 1, "snapshot-data": 0}
+        assert data["permissions_by_module"] == {"users": 3, "admin": 2}
+
+    def test_counts_cached_across_endpoints(self, client, mock_db):
+        """One aggregation per collection serves both stats and summary"""
+        for name in ["users", "roles", "groups", "domains", "domain_scenarios", "playboards", "customers"]:
+            _mock_counts(getattr(mock_db, name), _facets(total=1, active=1))
+        _mock_counts(mock_db.configurations, _facets(total=1, by_value={"gcs-data": 1}))
+        _mock_counts(mock_db.permissions, _facets(total=1, by_value={"users": 1}))
+        mock_cursor = MagicMock()
+        mock_cursor.sort = MagicMock(return_value=mock_cursor)
+        mock_cursor.limit = MagicMock(return_value=mock_cursor)
+        mock_cursor.__aiter__ = lambda self: self
+        mock_cursor.__anext__ = AsyncMock(side_effect=StopAsyncIteration)
+        mock_db.activity_logs.find = MagicMock(return_value=mock_cursor)
+
+        assert client.get(PATH_DASHBOARD_STATS).status_code == 200
+        assert client.get("/dashboard/summary").status_code == 200
+        assert mock_db.users.aggregate.call_count == 1
+        assert mock_db.permissions.aggregate.call_count == 1
+
+        invalidate_dashboard_stats()
+        assert client.get("/dashboard/summary").status_code == 200
+        assert mock_db.users.aggregate.call_count == 2
 
     def test_get_recent_logins(self, client, mock_db):
         """Test get recent logins endpoint"""
@@ -311,12 +365,12 @@ class TestDashboardRoutesWithoutOptionalCollections:
 
     def test_get_dashboard_stats_minimal(self, client, mock_db_minimal):
         """Test get dashboard stats without optional collections"""
-        mock_db_minimal.users.count_documents = AsyncMock(side_effect=[10, 8])
-        mock_db_minimal.roles.count_documents = AsyncMock(return_value=5)
-        mock_db_minimal.groups.count_documents = AsyncMock(return_value=3)
-        mock_db_minimal.domains.count_documents = AsyncMock(return_value=2)
-        mock_db_minimal.domain_scenarios.count_documents = AsyncMock(return_value=4)
-        mock_db_minimal.playboards.count_documents = AsyncMock(return_value=6)
+        _mock_counts(mock_db_minimal.users, _facets(total=10, active=8))
+        _mock_counts(mock_db_minimal.roles, _facets(total=5))
+        _mock_counts(mock_db_minimal.groups, _facets(total=3))
+        _mock_counts(mock_db_minimal.domains, _facets(total=2))
+        _mock_counts(mock_db_minimal.domain_scenarios, _facets(total=4))
+        _mock_counts(mock_db_minimal.playboards, _facets(total=6))
 
         response = client.get(PATH_DASHBOARD_STATS)
         assert response.status_code == 200
@@ -326,12 +380,12 @@ class TestDashboardRoutesWithoutOptionalCollections:
 
     def test_get_summary_minimal(self, client, mock_db_minimal):
         """Test get summary without optional collections"""
-        mock_db_minimal.users.count_documents = AsyncMock(side_effect=[5, 3])
-        mock_db_minimal.roles.count_documents = AsyncMock(side_effect=[4, 1])
-        mock_db_minimal.groups.count_documents = AsyncMock(side_effect=[3, 0])
-        mock_db_minimal.domains.count_documents = AsyncMock(side_effect=[2, 0])
-        mock_db_minimal.domain_scenarios.count_documents = AsyncMock(side_effect=[4, 1])
-        mock_db_minimal.playboards.count_documents = AsyncMock(side_effect=[5, 1])
+        _mock_counts(mock_db_minimal.users, _facets(total=8, active=5, inactive=3))
+        _mock_counts(mock_db_minimal.roles, _facets(total=5, active=4, inactive=1))
+        _mock_counts(mock_db_minimal.groups, _facets(total=3, active=3))
+        _mock_counts(mock_db_minimal.domains, _facets(total=2, active=2))
+        _mock_counts(mock_db_minimal.domain_scenarios, _facets(total=5, active=4, inactive=1))
+        _mock_counts(mock_db_minimal.playboards, _facets(total=6, active=5, inactive=1))
 
         response = client.get("/dashboard/summary")
         assert response.status_code == 200
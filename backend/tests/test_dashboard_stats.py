@@ -0,0 +1,146 @@
+"""Tests for cached dashboard counts"""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from easylifeauth.api.dependencies import invalidate_read_caches_on_write
+from easylifeauth.services.dashboard_stats import (
+    DashboardStatsCache,
+    compute_dashboard_counts,
+    get_dashboard_stats_cache,
+)
+
+
+def _db(delay=0):
+    """Database whose every collection answers aggregations with one facet document"""
+    async def to_list(length):
+        if delay:
+            await asyncio.sleep(delay)
+        return [{
+            "total": [{"count": 3}],
+            "active": [{"count": 2}],
+            "inactive": [],
+            "by_value": [{"_id": "process-config", "count": 2}, {"_id": None, "count": 1}],
+        }]
+
+    db = MagicMock()
+    for name in ["users", "roles", "groups", "customers", "domains", "domain_scenarios",
+                 "playboards", "configurations", "permissions"]:
+        aggregate = MagicMock()
+        aggregate.to_list = to_list
+        setattr(db, name, MagicMock(aggregate=MagicMock(return_value=aggregate)))
+    return db
+
+
+class TestComputeDashboardCounts:
+    """One aggregation per collection"""
+
+    @pytest.mark.asyncio
+    async def test_counts(self):
+        db = _db()
+        counts = await compute_dashboard_counts(db)
+        assert counts["users"] == {"total": 3, "active": 2, "inactive": 0}
+        assert counts["roles"]["active"] == 2
+        assert counts["configurations"] == {
+            "total": 3,
+            "by_type": {"process-config": 2, "lookup-data": 0, "gcs-data": 0, "snapshot-data": 0},
+        }
+        assert counts["permissions"] == {"total": 3, "by_module": {"process-config": 2}}
+        for name in ["users", "roles", "configurations", "permissions"]:
+            assert getattr(db, name).aggregate.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_pipelines(self):
+        db = _db()
+        await compute_dashboard_counts(db)
+        [users_facet] = db.users.aggregate.call_args.args[0]
+        assert users_facet["$facet"]["active"][0] == {"$match": {"is_active": True}}
+        [roles_facet] = db.roles.aggregate.call_args.args[0]
+        assert roles_facet["$facet"]["inactive"][0] == {"$match": {"status": {"$in": ["I", "inactive"]}}}
+        [permissions_facet] = db.permissions.aggregate.call_args.args[0]
+        assert permissions_facet["$facet"]["by_value"] == [{"$group": {"_id": "$module", "count": {"$sum": 1}}}]
+
+    @pytest.mark.asyncio
+    async def test_optional_collections_missing(self):
+        db = _db()
+        db.customers = None
+        del db.permissions
+        counts = await compute_dashboard_counts(db)
+        assert counts["customers"] == {"total": 0, "active": 0, "inactive": 0}
+        assert counts["permissions"] == {"total": 0, "by_module": {}}
+
+    @pytest.mark.asyncio
+    async def test_collections_aggregated_concurrently(self):
+        db = _db(delay=0.05)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await compute_dashboard_counts(db)
+        assert loop.time() - started < 0.3
+
+
+class TestDashboardStatsCache:
+    """TTL cache shared by the dashboard endpoints"""
+
+    @pytest.mark.asyncio
+    async def test_hit_within_ttl(self):
+        db = _db()
+        cache = DashboardStatsCache(ttl_seconds=60)
+        first = await cache.get(db)
+        assert await cache.get(db) is first
+        assert db.users.aggregate.call_count == 1
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    @pytest.mark.asyncio
+    async def test_other_database_misses(self):
+        cache = DashboardStatsCache(ttl_seconds=60)
+        await cache.get(_db())
+        other = _db()
+        await cache.get(other)
+        assert other.users.aggregate.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_share_one_computation(self):
+        db = _db(delay=0.02)
+        cache = DashboardStatsCache(ttl_seconds=60)
+        await asyncio.gather(*(cache.get(db) for _ in range(5)))
+        assert db.users.aggregate.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_invalidate_during_computation_not_stored(self):
+        db = _db(delay=0.02)
+        cache = DashboardStatsCache(ttl_seconds=60)
+        pending = asyncio.create_task(cache.get(db))
+        await asyncio.sleep(0.01)
+        cache.invalidate()
+        await pending
+        await cache.get(db)
+        assert db.users.aggregate.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_zero_ttl_disables_cache(self):
+        db = _db()
+        cache = DashboardStatsCache(ttl_seconds=0)
+        await cache.get(db)
+        await cache.get(db)
+        assert db.users.aggregate.call_count == 2
+
+    def test_write_requests_invalidate(self):
+        app = FastAPI(dependencies=[Depends(invalidate_read_caches_on_write)])
+
+        @app.get("/items")
+        async def read_items():
+            return {}
+
+        @app.post("/items")
+        async def create_item():
+            return {}
+
+        cache = get_dashboard_stats_cache()
+        cache._value = {"users": {}}
+        client = TestClient(app)
+        client.get("/items")
+        assert cache._value is not None
+        client.post("/items")
+        assert cache._value is None
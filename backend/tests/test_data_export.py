@@ -0,0 +1,155 @@
+"""Tests for the streaming data export engine"""
+import csv
+import io
+import json
+import pytest
+from bson import ObjectId
+from datetime import datetime, timezone
+
+from easylifeauth.services.data_export import (
+    CSV_OVERFLOW_COLUMN,
+    EXPORT_ENTITIES,
+    DocumentBatches,
+    build_projection,
+    csv_chunks,
+    encode_batches,
+    json_chunks,
+    ndjson_chunks,
+    open_document_batches,
+    parse_fields,
+)
+from conftest import FakeCursor
+
+
+async def _collect(chunks):
+    return [chunk async for chunk in chunks]
+
+
+def _docs(count, **extra):
+    return [{"_id": ObjectId(), "n": i, **extra} for i in range(count)]
+
+
+class TestDocumentBatches:
+    """Batching and prefetching"""
+
+    @pytest.mark.asyncio
+    async def test_reads_cursor_in_batches(self):
+        cursor = FakeCursor(_docs(25))
+        batches = await open_document_batches(cursor, batch_size=10)
+
+        # Only the first batch is read before streaming starts
+        assert cursor.pulled == 10
+        assert cursor.server_batch_size == 10
+        sizes = [len(batch) async for batch in batches]
+        assert sizes == [10, 10, 5]
+
+    @pytest.mark.asyncio
+    async def test_prepares_documents(self):
+        oid = ObjectId()
+        when = datetime(2024, 1, 2, tzinfo=timezone.utc)
+        batches = await open_document_batches(FakeCursor([{"_id": oid, "at": when}]))
+        [[doc]] = [batch async for batch in batches]
+        assert doc == {"_id": str(oid), "at": when.isoformat()}
+
+    @pytest.mark.asyncio
+    async def test_empty_cursor(self):
+        batches = await open_document_batches(FakeCursor([]))
+        assert batches.is_empty
+
+    @pytest.mark.asyncio
+    async def test_prefetch_is_replayed(self):
+        batches = DocumentBatches.from_cursor(FakeCursor(_docs(7)), batch_size=3)
+        sample = await batches.prefetch(4)
+        assert len(sample) == 6
+        assert [doc["n"] for batch in [b async for b in batches] for doc in batch] == list(range(7))
+
+    @pytest.mark.asyncio
+    async def test_from_documents(self):
+        batches = DocumentBatches.from_documents([{"a": 1}, {"a": 2}, {"a": 3}], batch_size=2)
+        assert not batches.is_empty
+        assert [batch async for batch in batches] == [[{"a": 1}, {"a": 2}], [{"a": 3}]]
+        assert DocumentBatches.from_documents([]).is_empty
+
+
+class TestEncoders:
+    """CSV, JSON and NDJSON encoding"""
+
+    @pytest.mark.asyncio
+    async def test_csv_one_chunk_per_batch(self):
+        batches = DocumentBatches.from_cursor(FakeCursor(_docs(5)), batch_size=2)
+        chunks = await _collect(csv_chunks(batches, fields=["n"]))
+        assert len(chunks) == 4  # header + 3 batches
+        assert "".join(chunks).split() == ["n", "0", "1", "2", "3", "4"]
+
+    @pytest.mark.asyncio
+    async def test_csv_columns_from_sample(self, monkeypatch):
+        monkeypatch.setenv("EXPORT_CSV_SAMPLE_SIZE", "2")
+        documents = [{"b": 1, "meta": {"x": 1}}, {"a": 2}, {"late": 3}]
+        batches = DocumentBatches.from_cursor(FakeCursor(documents), batch_size=1)
+
+        rows = list(csv.reader(io.StringIO("".join(await _collect(csv_chunks(batches))))))
+        assert rows[0] == ["a", "b", "meta_x", CSV_OVERFLOW_COLUMN]
+        # Keys first seen after the sample go to the overflow column
+        assert rows[1:] == [["", "1", "1", ""], ["2", "", "", ""], ["", "", "", '{"late": 3}']]
+
+    @pytest.mark.asyncio
+    async def test_csv_without_overflow_when_sample_covers_export(self, monkeypatch):
+        monkeypatch.setenv("EXPORT_CSV_SAMPLE_SIZE", "5")
+        batches = DocumentBatches.from_cursor(FakeCursor([{"b": 1}, {"a": 2}]), batch_size=1)
+
+        rows = list(csv.reader(io.StringIO("".join(await _collect(csv_chunks(batches))))))
+        assert rows == [["a", "b"], ["", "1"], ["2", ""]]
+
+    @pytest.mark.asyncio
+    async def test_json_is_valid_array(self):
+        batches = DocumentBatches.from_cursor(FakeCursor(_docs(5)), batch_size=2)
+        data = json.loads("".join(await _collect(json_chunks(batches))))
+        assert [doc["n"] for doc in data] == list(range(5))
+
+    @pytest.mark.asyncio
+    async def test_ndjson_lines(self):
+        batches = DocumentBatches.from_cursor(FakeCursor(_docs(3)), batch_size=2)
+        lines = "".join(await _collect(ndjson_chunks(batches))).splitlines()
+        assert [json.loads(line)["n"] for line in lines] == [0, 1, 2]
+
+    @pytest.mark.asyncio
+    async def test_encode_batches_unknown_format(self):
+        with pytest.raises(ValueError):
+            encode_batches(DocumentBatches.from_documents([]), "xml")
+
+    @pytest.mark.asyncio
+    async def test_non_serializable_values_are_stringified(self):
+        nested_id = ObjectId()
+        batches = DocumentBatches.from_documents([{"ref": nested_id}])
+        line = "".join(await _collect(ndjson_chunks(batches)))
+        assert json.loads(line) == {"ref": str(nested_id)}
+
+
+class TestProjection:
+    """Field selection pushed down as a projection"""
+
+    def test_default_projection_hides_excluded_and_optional_fields(self):
+        assert build_projection(EXPORT_ENTITIES["users"]) == {"password_hash": 0}
+        assert build_projection(EXPORT_ENTITIES["activity_logs"]) == {
+            "details": 0, "old_values": 0, "new_values": 0
+        }
+        assert build_projection(EXPORT_ENTITIES["roles"]) is None
+
+    def test_requested_fields(self):
+        projection = build_projection(EXPORT_ENTITIES["activity_logs"], ["action", "details.ip"])
+        assert projection == {"action": 1, "details.ip": 1, "_id": 0}
+        assert build_projection(EXPORT_ENTITIES["roles"], ["_id", "name"]) == {"_id": 1, "name": 1}
+
+    def test_parent_path_covers_children(self):
+        projection = build_projection(EXPORT_ENTITIES["activity_logs"], ["details.ip", "details"])
+        assert projection == {"details": 1, "_id": 0}
+
+    @pytest.mark.parametrize("field", ["password_hash", "password_hash.x", "$where", "a..b", ""])
+    def test_rejected_fields(self, field):
+        with pytest.raises(ValueError):
+            build_projection(EXPORT_ENTITIES["users"], [field])
+
+    def test_parse_fields(self):
+        assert parse_fields(" email, name ,,email") == ["email", "name"]
+        assert parse_fields("") is None
+        assert parse_fields(" , ") is None
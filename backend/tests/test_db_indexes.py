@@ -0,0 +1,108 @@
+"""Tests for the declared index registry"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from pymongo.errors import OperationFailure
+
+from easylifeauth.db.db_manager import DatabaseManager
+from easylifeauth.db.indexes import COLLECTION_INDEXES, ensure_collection_indexes, ensure_indexes
+
+
+def _collection(name, existing=None):
+    collection = MagicMock()
+    collection.name = name
+    collection.index_information = AsyncMock(return_value={
+        "_id_": {"key": [("_id", 1)], "v": 2},
+        **(existing or {}),
+    })
+    collection.create_indexes = AsyncMock()
+    return collection
+
+
+def _database(collections):
+    database = MagicMock()
+    database.__getitem__ = MagicMock(side_effect=lambda name: collections.setdefault(name, _collection(name)))
+    return database
+
+
+def _created(collection):
+    return [model.document["name"] for call in collection.create_indexes.call_args_list for model in call.args[0]]
+
+
+class TestEnsureCollectionIndexes:
+    @pytest.mark.asyncio
+    async def test_creates_missing_indexes(self):
+        tokens = _collection("tokens", {"token_hash_1": {"key": [("token_hash", 1)], "v": 2}})
+        report = await ensure_collection_indexes(tokens, COLLECTION_INDEXES["tokens"])
+        assert _created(tokens) == ["user_id_1_email_1", "refresh_token_hash_1", "expires_at_1"]
+        assert report["created"] == ["tokens.user_id_1_email_1", "tokens.refresh_token_hash_1", "tokens.expires_at_1"]
+        assert report["mismatched"] == [] and report["undeclared"] == []
+
+        ttl = [model for call in tokens.create_indexes.call_args_list for model in call.args[0]][-1]
+        assert ttl.document["expireAfterSeconds"] == 0
+
+    @pytest.mark.asyncio
+    async def test_existing_indexes_are_left_alone(self):
+        # Shell-created indexes store directions as doubles and may use other names
+        existing = {
+            "by_key": {"key": [("key", 1.0)], "unique": True, "v": 2},
+            "domainKey_1": {"key": [("domainKey", 1.0)], "v": 2},
+            "status_1": {"key": [("status", 1)], "v": 2},
+        }
+        scenarios = _collection("domain_scenarios", existing)
+        report = await ensure_collection_indexes(scenarios, COLLECTION_INDEXES["domain_scenarios"])
+        scenarios.create_indexes.assert_not_called()
+        assert report == {"created": [], "mismatched": [], "undeclared": [], "failed": []}
+
+    @pytest.mark.asyncio
+    async def test_reports_drift(self):
+        existing = {
+            "email_1": {"key": [("email", 1)], "v": 2},
+            "username_1": {"key": [("username", 1)], "unique": True, "v": 2},
+            "legacy_idx": {"key": [("full_name", 1)], "v": 2},
+        }
+        users = _collection("users", existing)
+        report = await ensure_collection_indexes(users, COLLECTION_INDEXES["users"])
+
+        assert report["mismatched"] == [
+            {"index": "users.email_1", "declared": {"unique": True}, "actual": {"unique": False}},
+            {"index": "users.username_1", "declared": {"unique": False}, "actual": {"unique": True}},
+        ]
+        assert report["undeclared"] == ["users.legacy_idx"]
+        # Drifted indexes are not rebuilt
+        assert "email_1" not in _created(users)
+
+    @pytest.mark.asyncio
+    async def test_failed_creation_does_not_stop_the_rest(self):
+        roles = _collection("roles")
+        roles.create_indexes = AsyncMock(side_effect=[OperationFailure("E11000 duplicate key"), None])
+        report = await ensure_collection_indexes(roles, COLLECTION_INDEXES["roles"])
+        assert report["failed"] == [{"index": "roles.roleId_1", "error": "E11000 duplicate key"}]
+        assert report["created"] == ["roles.status_1"]
+
+
+class TestEnsureIndexes:
+    @pytest.mark.asyncio
+    async def test_only_requested_collections(self):
+        collections = {}
+        report = await ensure_indexes(_database(collections), ["users", "custom_collection"])
+        assert set(collections) == {"users"}
+        assert len(report["created"]) == len(COLLECTION_INDEXES["users"])
+
+    @pytest.mark.asyncio
+    async def test_unreachable_collection_is_reported(self):
+        collections = {"tokens": _collection("tokens")}
+        collections["tokens"].index_information = AsyncMock(side_effect=Exception("not authorized"))
+        report = await ensure_indexes(_database(collections), ["tokens", "roles"])
+        assert report["failed"] == [{"index": "tokens.*", "error": "not authorized"}]
+        assert report["created"] == ["roles.roleId_1", "roles.status_1"]
+
+    @pytest.mark.asyncio
+    @patch("easylifeauth.db.db_manager.AsyncIOMotorClient")
+    async def test_database_manager_uses_set_up_collections(self, mock_client):
+        collections = {}
+        mock_client.return_value.__getitem__ = MagicMock(return_value=_database(collections))
+        manager = DatabaseManager(config={"host": "localhost:27017", "database": "testdb",
+                                          "collections": ["users", "activity_logs"]})
+        report = await manager.ensure_indexes()
+        assert set(collections) == {"users", "activity_logs"}
+        assert "activity_logs.timestamp_-1" in report["created"]
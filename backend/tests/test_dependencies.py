@@ -411,7 +411,7 @@ class TestInitDependencies:
 
         mock_set_token.assert_called_once_with(mock_token_manager)
         mock_user.assert_called_once_with(mock_db, mock_token_manager)
-        mock_admin.assert_called_once_with(mock_db)
+        mock_admin.assert_called_once_with(mock_db, mock_token_manager)
         mock_file_storage.assert_called_once()
         mock_init_bulk.assert_called_once()
         mock_init_gcs.assert_called_once()
@@ -519,7 +519,7 @@ class TestInitDependencies:
 
         init_dependencies(mock_db, mock_token_manager, gcs_config=gcs_config)
 
-        mock_init_bulk.assert_called_once_with(mock_db, gcs_config)
+        mock_init_bulk.assert_called_once_with(mock_db, gcs_config, None)
         mock_init_gcs.assert_called_once_with(gcs_config)
 
     @patch(PATCH_DEPENDENCIES_INIT_ACTIVITY_LOG_SERVICE)
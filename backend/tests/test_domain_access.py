@@ -560,6 +560,7 @@ class TestPlayboardDomainAccess:
             yield {"key": STR_SC1}
         db.domain_scenarios.find.return_value = sc_cursor()
         db.playboards.count_documents = AsyncMock(return_value=0)
+        db.playboards.estimated_document_count = AsyncMock(return_value=0)
 
         mock_cursor = MagicMock()
         mock_cursor.skip.return_value = mock_cursor
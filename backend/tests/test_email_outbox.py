@@ -0,0 +1,129 @@
+"""Tests for the email outbox"""
+import asyncio
+import pytest
+from email.message import Message
+from unittest.mock import AsyncMock, MagicMock
+
+from easylifeauth.services.email_outbox import EmailOutbox
+from mock_data import MOCK_EMAIL_USER_TEST
+
+
+class _SMTP:
+    """Connected SMTP client stand-in that records sent messages"""
+
+    def __init__(self, fail=0):
+        self.is_connected = True
+        self.sent = []
+        self.fail = fail
+
+    async def send_message(self, message):
+        if self.fail:
+            self.fail -= 1
+            raise ConnectionError("connection dropped")
+        self.sent.append(message["To"])
+
+    async def quit(self):
+        self.is_connected = False
+
+    def close(self):
+        self.is_connected = False
+
+
+def _message(to):
+    message = Message()
+    message["To"] = to
+    return message
+
+
+def _email_service(*clients):
+    email_service = MagicMock()
+    email_service.connect = AsyncMock(side_effect=list(clients))
+    return email_service
+
+
+def _outbox(email_service, **config):
+    config = {"workers": 1, "batch_size": 50, "rate_per_second": 0, "max_retries": 2, "retry_delay": 0.01, **config}
+    return EmailOutbox(email_service, config)
+
+
+class TestEmailOutbox:
+    """Queued delivery"""
+
+    @pytest.mark.asyncio
+    async def test_batch_sent_over_one_connection(self):
+        smtp = _SMTP()
+        email_service = _email_service(smtp)
+        outbox = _outbox(email_service)
+        for i in range(10):
+            outbox.enqueue(_message(f"user{i}@example.com"))
+
+        assert await outbox.drain(timeout=5)
+        assert smtp.sent == [f"user{i}@example.com" for i in range(10)]
+        assert email_service.connect.await_count == 1
+        # Connection is closed once the queue is empty
+        assert smtp.is_connected is False
+        await outbox.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_enqueue_does_not_wait_for_delivery(self):
+        email_service = MagicMock()
+        email_service.connect = AsyncMock(side_effect=lambda: asyncio.sleep(10))
+        outbox = _outbox(email_service)
+        outbox.enqueue(_message(MOCK_EMAIL_USER_TEST))
+        assert outbox.stats()["queued"] == 1
+        await outbox.shutdown(timeout=0.01)
+
+    @pytest.mark.asyncio
+    async def test_failed_send_retried_on_new_connection(self):
+        first, second = _SMTP(fail=1), _SMTP()
+        outbox = _outbox(_email_service(first, second))
+        batch_id = outbox.new_batch()
+        outbox.enqueue(_message(MOCK_EMAIL_USER_TEST), batch_id)
+
+        assert await outbox.drain(timeout=5)
+        assert second.sent == [MOCK_EMAIL_USER_TEST]
+        assert outbox.stats()["retried"] == 1
+        assert outbox.batch_status(batch_id) == {
+            "batch_id": batch_id, "queued": 1, "sent": 1, "failed": 0, "pending": 0,
+        }
+        await outbox.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_retries(self):
+        email_service = MagicMock()
+        email_service.connect = AsyncMock(side_effect=ConnectionRefusedError("smtp down"))
+        outbox = _outbox(email_service, max_retries=2)
+        batch_id = outbox.new_batch()
+        outbox.enqueue(_message(MOCK_EMAIL_USER_TEST), batch_id)
+
+        assert await outbox.drain(timeout=5)
+        assert email_service.connect.await_count == 3
+        assert outbox.batch_status(batch_id)["failed"] == 1
+        assert outbox.stats()["failed"] == 1
+        await outbox.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_shared_by_workers(self):
+        outbox = _outbox(_email_service(*[_SMTP() for _ in range(4)]), workers=4, batch_size=1, rate_per_second=50)
+        for i in range(6):
+            outbox.enqueue(_message(f"user{i}@example.com"))
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        assert await outbox.drain(timeout=5)
+        # Six sends at 50/s need at least five 20ms intervals
+        assert loop.time() - started >= 0.09
+        assert outbox.stats()["sent"] == 6
+        await outbox.shutdown()
+
+    def test_unknown_batch(self):
+        assert _outbox(MagicMock()).batch_status("missing") is None
+
+    @pytest.mark.asyncio
+    async def test_oldest_batches_forgotten(self, monkeypatch):
+        monkeypatch.setattr("easylifeauth.services.email_outbox.MAX_TRACKED_BATCHES", 2)
+        outbox = _outbox(MagicMock())
+        first = outbox.new_batch()
+        outbox.new_batch()
+        outbox.new_batch()
+        assert outbox.batch_status(first) is None
@@ -0,0 +1,204 @@
+"""Tests for the incrementally maintained entity counters"""
+import pytest
+from unittest.mock import MagicMock
+
+import easylifeauth.services.entity_counters as entity_counters
+from easylifeauth.services.dashboard_stats import compute_dashboard_counts
+from easylifeauth.services.entity_counters import (
+    EntityCounterService,
+    bucket_key,
+    entity_counters_for,
+    init_entity_counter_service,
+    record_entity_insert,
+)
+from conftest import FakeCursor, matches_query
+
+
+class FakeCounters:
+    """In-memory stand-in for the entity_counters collection"""
+
+    def __init__(self):
+        self.docs = {}
+
+    async def find_one(self, query):
+        doc = self.docs.get(query["_id"])
+        return dict(doc) if doc else None
+
+    def find(self, query):
+        return FakeCursor([dict(d) for d in self.docs.values() if matches_query(d, query)])
+
+    async def update_one(self, query, update):
+        doc = self.docs.get(query["_id"])
+        if doc is None or not matches_query(doc, query):
+            return
+        for path, delta in update.get("$inc", {}).items():
+            target = doc
+            *parents, leaf = path.split(".")
+            for part in parents:
+                target = target.setdefault(part, {})
+            target[leaf] = target.get(leaf, 0) + delta
+        doc.update(update.get("$set", {}))
+
+    async def replace_one(self, query, doc, upsert=False):
+        self.docs[query["_id"]] = {**doc, "by": dict(doc["by"])}
+
+
+def _source(values):
+    """Collection whose $group aggregation buckets ``values``"""
+    def aggregate(pipeline):
+        groups = {}
+        for value in values:
+            groups[value] = groups.get(value, 0) + 1
+        return FakeCursor([{"_id": value, "count": count} for value, count in groups.items()])
+
+    return MagicMock(aggregate=MagicMock(side_effect=aggregate))
+
+
+def _db(**sources):
+    db = MagicMock()
+    db.entity_counters = FakeCounters()
+    for name in entity_counters.COUNTED_FIELDS:
+        setattr(db, name, _source(sources.get(name, [])))
+    return db
+
+
+@pytest.fixture(autouse=True)
+def reset_service():
+    entity_counters._entity_counter_service = None
+    yield
+    entity_counters._entity_counter_service = None
+
+
+class TestBucketKey:
+    def test_keys(self):
+        assert bucket_key(None) == "none"
+        assert bucket_key(True) == "true"
+        assert bucket_key(False) == "false"
+        assert bucket_key("A") == "A"
+        assert "." not in bucket_key("a.b") and "$" not in bucket_key("$x")
+
+
+class TestEntityCounterService:
+    @pytest.mark.asyncio
+    async def test_first_read_reconciles(self):
+        db = _db(roles=["A", "A", "I"])
+        service = EntityCounterService(db)
+        assert await service.get_counts("roles") == {"total": 3, "by": {"A": 2, "I": 1}}
+        assert db.roles.aggregate.call_count == 1
+
+        # Fresh counters are served without touching the collection
+        assert await service.count("roles", "A") == 2
+        assert db.roles.aggregate.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_increments(self):
+        db = _db(users=[True, False])
+        service = EntityCounterService(db)
+        await service.get_counts("users")
+
+        await service.record_insert("users", {"is_active": True})
+        await service.record_change("users", True, False)
+        await service.record_delete("users", {"is_active": False})
+
+        assert await service.get_counts("users") == {"total": 2, "by": {"true": 1, "false": 1}}
+        assert await service.count("users", True) == 1
+        assert await service.count("users") == 2
+        assert db.users.aggregate.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_unchanged_bucket_is_not_written(self):
+        db = _db(roles=["A"])
+        service = EntityCounterService(db)
+        await service.get_counts("roles")
+        await service.record_change("roles", "A", "A")
+        assert await service.count("roles") == 1
+
+    @pytest.mark.asyncio
+    async def test_delete_without_document_marks_stale(self):
+        db = _db(playboards=["A", "A"])
+        service = EntityCounterService(db)
+        await service.get_counts("playboards")
+
+        db.playboards = _source(["A"])
+        await service.record_delete("playboards", None)
+        assert db.entity_counters.docs["playboards"]["stale"] is True
+
+        # Increments are not applied to a stale counter; the next read recounts
+        await service.record_insert("playboards", {"status": "A"})
+        assert await service.count("playboards") == 1
+        assert db.entity_counters.docs["playboards"]["stale"] is False
+
+    @pytest.mark.asyncio
+    async def test_increment_before_first_reconcile_is_ignored(self):
+        db = _db(groups=["A"])
+        service = EntityCounterService(db)
+        await service.record_insert("groups", {"status": "A"})
+        assert "groups" not in db.entity_counters.docs
+        assert await service.count("groups") == 1
+
+    @pytest.mark.asyncio
+    async def test_dotted_values_round_trip(self):
+        db = _db(permissions=["auth.users", "auth.users", None])
+        service = EntityCounterService(db)
+        counts = await service.get_counts("permissions")
+        assert counts["by"] == {"auth.users": 2, "none": 1}
+        assert await service.count("permissions", "auth.users") == 2
+
+    @pytest.mark.asyncio
+    async def test_get_all_counts(self):
+        db = _db(roles=["A"], groups=["I", "I"])
+        service = EntityCounterService(db)
+        counts = await service.get_all_counts(["roles", "groups"])
+        assert counts == {"roles": {"total": 1, "by": {"A": 1}}, "groups": {"total": 2, "by": {"I": 2}}}
+
+    @pytest.mark.asyncio
+    async def test_reconcile_corrects_drift(self):
+        db = _db(domains=["A", "A"])
+        service = EntityCounterService(db)
+        assert await service.reconcile() == len(entity_counters.COUNTED_FIELDS)
+        assert await service.reconcile() == 0
+
+        # Written outside the counted paths
+        db.domains = _source(["A", "A", "I"])
+        assert await service.reconcile() == 1
+        assert await service.get_counts("domains") == {"total": 3, "by": {"A": 2, "I": 1}}
+
+    @pytest.mark.asyncio
+    async def test_start_and_shutdown(self):
+        service = EntityCounterService(_db(), {"reconcile_seconds": 3600})
+        service.start()
+        assert service._reconcile_task is not None
+        await service.shutdown()
+        assert service._reconcile_task is None
+
+
+class TestModuleHelpers:
+    @pytest.mark.asyncio
+    async def test_helpers_noop_without_service(self):
+        await record_entity_insert("roles", {"status": "A"})
+        assert entity_counters_for(_db()) is None
+
+    @pytest.mark.asyncio
+    async def test_service_only_used_for_its_db(self):
+        db = _db()
+        service = init_entity_counter_service(db)
+        assert entity_counters_for(db) is service
+        assert entity_counters_for(_db()) is None
+
+
+class TestDashboardFromCounters:
+    @pytest.mark.asyncio
+    async def test_dashboard_counts(self):
+        db = _db(
+            users=[True, True, False],
+            roles=["A", "active", "I"],
+            configurations=["process-config", "lookup-data", "lookup-data"],
+            permissions=["users", "roles", None],
+        )
+        init_entity_counter_service(db)
+        counts = await compute_dashboard_counts(db)
+        assert counts["users"] == {"total": 3, "active": 2, "inactive": 1}
+        assert counts["roles"] == {"total": 3, "active": 2, "inactive": 1}
+        assert counts["groups"] == {"total": 0, "active": 0, "inactive": 0}
+        assert counts["configurations"]["by_type"]["lookup-data"] == 2
+        assert counts["permissions"] == {"total": 3, "by_module": {"users": 1, "roles": 1}}
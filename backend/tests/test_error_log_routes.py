@@ -169,7 +169,7 @@ class TestErrorLogRoutes:
         assert data["pagination"]["limit"] == 25
 
         mock_service.get_current_logs.assert_awaited_once_with(
-            limit=25, offset=0, filters={}
+            limit=25, offset=0, filters={}, cursor=None, include_total=None, total=None
         )
 
     def test_list_error_logs_with_pagination(self, client, mock_service):
@@ -184,7 +184,7 @@ class TestErrorLogRoutes:
         assert data["pagination"]["limit"] == 10
 
         mock_service.get_current_logs.assert_awaited_once_with(
-            limit=10, offset=20, filters={}
+            limit=10, offset=20, filters={}, cursor=None, include_total=None, total=None
         )
 
     def test_list_error_logs_with_level_filter(self, client, mock_service):
@@ -195,7 +195,7 @@ class TestErrorLogRoutes:
         assert response.status_code == 200
 
         mock_service.get_current_logs.assert_awaited_once_with(
-            limit=25, offset=0, filters={"level": LEVEL_CRITICAL}
+            limit=25, offset=0, filters={"level": LEVEL_CRITICAL}, cursor=None, include_total=None, total=None
         )
 
     def test_list_error_logs_with_error_type_filter(self, client, mock_service):
@@ -206,7 +206,7 @@ class TestErrorLogRoutes:
         assert response.status_code == 200
 
         mock_service.get_current_logs.assert_awaited_once_with(
-            limit=25, offset=0, filters={"error_type": ERR_VALUEERROR}
+            limit=25, offset=0, filters={"error_type": ERR_VALUEERROR}, cursor=None, include_total=None, total=None
         )
 
     def test_list_error_logs_with_search_filter(self, client, mock_service):
@@ -217,7 +217,7 @@ class TestErrorLogRoutes:
         assert response.status_code == 200
 
         mock_service.get_current_logs.assert_awaited_once_with(
-            limit=25, offset=0, filters={"search": "database"}
+            limit=25, offset=0, filters={"search": "database"}, cursor=None, include_total=None, total=None
         )
 
     def test_list_error_logs_with_days_filter(self, client, mock_service):
@@ -228,7 +228,7 @@ class TestErrorLogRoutes:
         assert response.status_code == 200
 
         mock_service.get_current_logs.assert_awaited_once_with(
-            limit=25, offset=0, filters={"days": 7}
+            limit=25, offset=0, filters={"days": 7}, cursor=None, include_total=None, total=None
         )
 
     def test_list_error_logs_with_all_filters(self, client, mock_service):
@@ -248,7 +248,10 @@ class TestErrorLogRoutes:
                 "error_type": ERR_KEYERROR,
                 "search": "missing",
                 "days": 30,
-            }
+            },
+            cursor=None,
+            include_total=None,
+            total=None
         )
 
     def test_list_error_logs_empty_result(self, client, mock_service):
@@ -693,6 +693,7 @@ class TestGetCurrentLogs:
     async def test_basic_retrieval(self, service, mock_db):
         doc = _make_error_doc()
         mock_db.error_logs.count_documents = AsyncMock(return_value=1)
+        mock_db.error_logs.estimated_document_count = AsyncMock(return_value=1)
         mock_db.error_logs.find = MagicMock(
             return_value=_chainable_cursor_from_list([doc])
         )
@@ -709,6 +710,7 @@ class TestGetCurrentLogs:
     async def test_timestamp_and_created_at_serialized(self, service, mock_db):
         doc = _make_error_doc()
         mock_db.error_logs.count_documents = AsyncMock(return_value=1)
+        mock_db.error_logs.estimated_document_count = AsyncMock(return_value=1)
         mock_db.error_logs.find = MagicMock(
             return_value=_chainable_cursor_from_list([doc])
         )
@@ -722,6 +724,7 @@ class TestGetCurrentLogs:
     @pytest.mark.asyncio
     async def test_pagination_page_calculation(self, service, mock_db):
         mock_db.error_logs.count_documents = AsyncMock(return_value=50)
+        mock_db.error_logs.estimated_document_count = AsyncMock(return_value=50)
         mock_db.error_logs.find = MagicMock(
             return_value=_chainable_cursor_from_list([])
         )
@@ -833,28 +836,31 @@ class TestGetCurrentLogs:
     @pytest.mark.asyncio
     async def test_no_filters(self, service, mock_db):
         mock_db.error_logs.count_documents = AsyncMock(return_value=0)
+        mock_db.error_logs.estimated_document_count = AsyncMock(return_value=0)
         mock_db.error_logs.find = MagicMock(
             return_value=_chainable_cursor_from_list([])
         )
 
         await service.get_current_logs(filters=None)
-        query = mock_db.error_logs.count_documents.call_args[0][0]
-        assert query == {}
+        # Unfiltered totals come from the collection metadata
+        mock_db.error_logs.estimated_document_count.assert_awaited_once()
+        mock_db.error_logs.count_documents.assert_not_awaited()
 
     @pytest.mark.asyncio
     async def test_empty_filters(self, service, mock_db):
         mock_db.error_logs.count_documents = AsyncMock(return_value=0)
+        mock_db.error_logs.estimated_document_count = AsyncMock(return_value=0)
         mock_db.error_logs.find = MagicMock(
             return_value=_chainable_cursor_from_list([])
         )
 
         await service.get_current_logs(filters={})
-        query = mock_db.error_logs.count_documents.call_args[0][0]
-        assert query == {}
+        mock_db.error_logs.estimated_document_count.assert_awaited_once()
+        mock_db.error_logs.count_documents.assert_not_awaited()
 
     @pytest.mark.asyncio
     async def test_exception_returns_error(self, service, mock_db):
-        mock_db.error_logs.count_documents = AsyncMock(
+        mock_db.error_logs.estimated_document_count = AsyncMock(
             side_effect=Exception("DB timeout")
         )
 
@@ -868,6 +874,7 @@ class TestGetCurrentLogs:
     async def test_multiple_docs_returned(self, service, mock_db):
         docs = [_make_error_doc(message=f"err{i}") for i in range(5)]
         mock_db.error_logs.count_documents = AsyncMock(return_value=5)
+        mock_db.error_logs.estimated_document_count = AsyncMock(return_value=5)
         mock_db.error_logs.find = MagicMock(
             return_value=_chainable_cursor_from_list(docs)
         )
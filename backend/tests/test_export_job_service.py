@@ -0,0 +1,304 @@
+"""Tests for background export jobs"""
+import asyncio
+import gzip
+import json
+import pytest
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from easylifeauth.api.dependencies import get_export_job_service
+from easylifeauth.api.export_job_routes import router
+from easylifeauth.security.access_control import require_super_admin
+from easylifeauth.services.export_job_service import (
+    STATUS_CANCELLED, STATUS_COMPLETED, STATUS_FAILED, STATUS_RUNNING,
+    ExportJobService,
+)
+from conftest import FakeCursor, matches_query
+from mock_data import MOCK_EMAIL_ADMIN_TEST
+
+
+class _JobsCollection:
+    """Minimal in-memory stand-in for the export_jobs collection"""
+
+    def __init__(self):
+        self.docs = {}
+
+    async def insert_one(self, doc):
+        self.docs[doc["job_id"]] = dict(doc)
+
+    async def update_one(self, query, update):
+        doc = self.docs.get(query["job_id"])
+        matched = doc is not None and matches_query(doc, query)
+        if matched:
+            doc.update(update["$set"])
+        return SimpleNamespace(matched_count=int(matched))
+
+    async def find_one(self, query):
+        doc = self.docs.get(query["job_id"])
+        return dict(doc) if doc else None
+
+    async def delete_one(self, query):
+        self.docs.pop(query["job_id"], None)
+
+    def find(self, query=None):
+        query = query or {}
+        docs = list(self.docs.values())
+        if "expires_at" in query:
+            docs = [d for d in docs if d["expires_at"] < query["expires_at"]["$lt"]]
+        if "created_by" in query:
+            docs = [d for d in docs if d["created_by"] == query["created_by"]]
+        return FakeCursor(docs)
+
+
+def _db(documents, delay=0):
+    data = MagicMock()
+    data.count_documents = AsyncMock(return_value=len(documents))
+    data.find = MagicMock(side_effect=lambda *args: FakeCursor(documents, delay))
+    db = MagicMock()
+    db.db.__getitem__ = MagicMock(return_value=data)
+    db.export_jobs = _JobsCollection()
+    return db
+
+
+async def _wait(service):
+    await asyncio.gather(*list(service._tasks.values()), return_exceptions=True)
+
+
+@pytest.fixture
+def logs():
+    return [{"_id": i, "action": f"action-{i}", "details": {"big": "x" * 10}} for i in range(5)]
+
+
+class TestExportJobService:
+    """Job lifecycle"""
+
+    @pytest.mark.asyncio
+    async def test_job_writes_compressed_artifact(self, tmp_path, logs):
+        service = ExportJobService(_db(logs), config={"export_dir": str(tmp_path)})
+        job = await service.create_job("activity_logs", "ndjson", created_by=MOCK_EMAIL_ADMIN_TEST)
+        await _wait(service)
+
+        finished = await service.get_job(job["job_id"])
+        assert finished["status"] == STATUS_COMPLETED
+        assert finished["progress"] == {"documents": 5, "total": 5}
+        assert finished["file_name"].endswith(".ndjson.gz")
+
+        artifact = await service.get_artifact(job["job_id"])
+        with gzip.open(artifact["path"], "rt") as f:
+            lines = [json.loads(line) for line in f]
+        assert [line["action"] for line in lines] == [f"action-{i}" for i in range(5)]
+        assert artifact["media_type"] == "application/gzip"
+
+    @pytest.mark.asyncio
+    async def test_job_uses_default_projection(self, tmp_path, logs):
+        db = _db(logs)
+        service = ExportJobService(db, config={"export_dir": str(tmp_path)})
+        await service.create_job("activity_logs", "csv")
+        await _wait(service)
+        projection = db.db["activity_logs"].find.call_args[0][1]
+        assert projection == {"details": 0, "old_values": 0, "new_values": 0}
+
+    @pytest.mark.asyncio
+    async def test_invalid_requests(self, tmp_path):
+        service = ExportJobService(_db([]), config={"export_dir": str(tmp_path)})
+        with pytest.raises(ValueError):
+            await service.create_job("tokens", "csv")
+        with pytest.raises(ValueError):
+            await service.create_job("users", "xml")
+        with pytest.raises(ValueError):
+            await service.create_job("users", "csv", compression="rar")
+        with pytest.raises(ValueError):
+            await service.create_job("users", "csv", fields="password_hash")
+
+    @pytest.mark.asyncio
+    async def test_failed_job_removes_partial_file(self, tmp_path):
+        db = _db([])
+        db.db["users"].find = MagicMock(side_effect=RuntimeError("cursor died"))
+        service = ExportJobService(db, config={"export_dir": str(tmp_path)})
+        job = await service.create_job("users", "csv")
+        await _wait(service)
+
+        finished = await service.get_job(job["job_id"])
+        assert finished["status"] == STATUS_FAILED
+        assert finished["error"] == "cursor died"
+        assert list(tmp_path.iterdir()) == []
+
+    @pytest.mark.asyncio
+    async def test_delete_cancels_running_job(self, tmp_path, logs):
+        db = _db(logs * 100, delay=0.01)
+        service = ExportJobService(db, config={"export_dir": str(tmp_path)})
+        job = await service.create_job("activity_logs", "json")
+        await asyncio.sleep(0.05)
+
+        status = db.export_jobs.docs[job["job_id"]]["status"]
+        assert status == STATUS_RUNNING
+        assert await service.delete_job(job["job_id"])
+        assert job["job_id"] not in db.export_jobs.docs
+        assert list(tmp_path.iterdir()) == []
+
+    @pytest.mark.asyncio
+    async def test_cancellation_is_recorded(self, tmp_path, logs):
+        db = _db(logs * 100, delay=0.01)
+        service = ExportJobService(db, config={"export_dir": str(tmp_path)})
+        job = await service.create_job("activity_logs", "json")
+        await asyncio.sleep(0.05)
+
+        service._cancel_requested.add(job["job_id"])
+        service._tasks[job["job_id"]].cancel()
+        await _wait(service)
+        assert db.export_jobs.docs[job["job_id"]]["status"] == STATUS_CANCELLED
+
+    @pytest.mark.asyncio
+    async def test_job_with_expired_lease_reported_failed(self, tmp_path):
+        db = _db([])
+        service = ExportJobService(db, config={"export_dir": str(tmp_path)})
+        await db.export_jobs.insert_one({
+            "job_id": "orphan", "status": STATUS_RUNNING, "owner": "gone",
+            "lease_expires_at": datetime.now(timezone.utc) - timedelta(seconds=1),
+        })
+        job = await service.get_job("orphan")
+        assert job["status"] == STATUS_FAILED
+        assert db.export_jobs.docs["orphan"]["status"] == STATUS_FAILED
+
+    @pytest.mark.asyncio
+    async def test_job_leased_by_another_worker_keeps_running(self, tmp_path):
+        db = _db([])
+        service = ExportJobService(db, config={"export_dir": str(tmp_path)})
+        await db.export_jobs.insert_one({
+            "job_id": "elsewhere", "status": STATUS_RUNNING, "owner": "other-pod",
+            "updated_at": datetime.now(timezone.utc) - timedelta(hours=1),
+            "lease_expires_at": datetime.now(timezone.utc) + timedelta(seconds=30),
+        })
+        assert (await service.get_job("elsewhere"))["status"] == STATUS_RUNNING
+
+    @pytest.mark.asyncio
+    async def test_lease_renewed_while_export_runs(self, tmp_path, logs):
+        db = _db(logs * 30, delay=0.01)
+        service = ExportJobService(db, config={"export_dir": str(tmp_path), "lease_seconds": 0.06})
+        job = await service.create_job("activity_logs", "json")
+        await asyncio.sleep(0.2)
+
+        other_worker = ExportJobService(db, config={"export_dir": str(tmp_path)})
+        assert (await other_worker.get_job(job["job_id"]))["status"] == STATUS_RUNNING
+        await _wait(service)
+        assert db.export_jobs.docs[job["job_id"]]["status"] == STATUS_COMPLETED
+
+    @pytest.mark.asyncio
+    async def test_completion_is_written_after_the_heartbeat_stops(self, tmp_path, logs):
+        db = _db(logs)
+        service = ExportJobService(db, config={"export_dir": str(tmp_path), "lease_seconds": 0.03})
+        update = service._update
+
+        async def slow_completion(job_id, fields):
+            await update(job_id, fields)
+            if fields.get("status") == STATUS_COMPLETED:
+                # A renewal now finds the job finished and would cancel a running heartbeat's owner
+                await asyncio.sleep(0.05)
+
+        service._update = slow_completion
+        job = await service.create_job("activity_logs", "csv")
+        await _wait(service)
+
+        finished = db.export_jobs.docs[job["job_id"]]
+        assert finished["status"] == STATUS_COMPLETED
+        assert (await service.get_artifact(job["job_id"]))["path"]
+
+    @pytest.mark.asyncio
+    async def test_expired_jobs_cleaned_up(self, tmp_path):
+        db = _db([])
+        service = ExportJobService(db, config={"export_dir": str(tmp_path)})
+        artifact = tmp_path / "old.csv.gz"
+        artifact.write_bytes(b"x")
+        await db.export_jobs.insert_one({
+            "job_id": "old", "status": STATUS_COMPLETED, "storage": "local",
+            "storage_path": str(artifact),
+            "expires_at": datetime.now(timezone.utc) - timedelta(hours=1),
+        })
+        assert await service.cleanup_expired() == 1
+        assert not artifact.exists()
+        assert "old" not in db.export_jobs.docs
+
+    @pytest.mark.asyncio
+    async def test_artifact_uploaded_to_gcs(self, tmp_path, logs):
+        gcs = MagicMock()
+        gcs.is_configured = MagicMock(return_value=True)
+        gcs.upload_from_path = AsyncMock(return_value="gs://bucket/exports/x")
+        gcs.get_signed_url = AsyncMock(return_value="https://signed.example/x")
+        service = ExportJobService(_db(logs), gcs_service=gcs, config={"export_dir": str(tmp_path)})
+
+        job = await service.create_job("roles", "csv")
+        await _wait(service)
+
+        artifact = await service.get_artifact(job["job_id"])
+        assert artifact["storage"] == "gcs"
+        assert artifact["path"] == f"exports/{job['file_name']}"
+        assert list(tmp_path.iterdir()) == []
+        assert await service.get_download_url(artifact) == "https://signed.example/x"
+
+
+class TestExportJobRoutes:
+    """HTTP API for export jobs"""
+
+    @pytest.fixture
+    def service(self, tmp_path, logs):
+        return ExportJobService(_db(logs), config={"export_dir": str(tmp_path)})
+
+    @pytest.fixture
+    def client(self, service):
+        app = FastAPI()
+        app.include_router(router)
+        app.dependency_overrides[get_export_job_service] = lambda: service
+        app.dependency_overrides[require_super_admin] = lambda: SimpleNamespace(email=MOCK_EMAIL_ADMIN_TEST)
+        # One event loop for all requests, so background jobs keep running
+        with TestClient(app) as client:
+            yield client
+
+    def _completed_job(self, client):
+        response = client.post("/export/jobs", json={"entity": "activity_logs", "format": "ndjson"})
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+        for _ in range(100):
+            job = client.get(f"/export/jobs/{job_id}").json()
+            if job["status"] == STATUS_COMPLETED:
+                return job
+        pytest.fail("export job did not complete")
+
+    def test_create_poll_and_download(self, client):
+        job = self._completed_job(client)
+        response = client.get(f"/export/jobs/{job['job_id']}/download")
+        assert response.status_code == 200
+        assert response.headers["accept-ranges"] == "bytes"
+        assert len(gzip.decompress(response.content).splitlines()) == 5
+
+    def test_range_download(self, client):
+        job = self._completed_job(client)
+        full = client.get(f"/export/jobs/{job['job_id']}/download").content
+        response = client.get(f"/export/jobs/{job['job_id']}/download", headers={"Range": "bytes=10-"})
+        assert response.status_code == 206
+        assert response.content == full[10:]
+
+    def test_list_jobs(self, client):
+        self._completed_job(client)
+        jobs = client.get("/export/jobs?mine=true").json()["data"]
+        assert len(jobs) == 1
+        assert jobs[0]["created_by"] == MOCK_EMAIL_ADMIN_TEST
+        assert "storage_path" not in jobs[0]
+
+    def test_download_unfinished_job(self, client, service):
+        service.db.export_jobs.docs["queued"] = {
+            "job_id": "queued", "status": "queued", "updated_at": datetime.now(timezone.utc),
+        }
+        assert client.get("/export/jobs/queued/download").status_code == 409
+        assert client.get("/export/jobs/missing/download").status_code == 404
+
+    def test_invalid_job_request(self, client):
+        response = client.post("/export/jobs", json={"entity": "users", "fields": "password_hash"})
+        assert response.status_code == 400
+
+    def test_delete_job(self, client):
+        job = self._completed_job(client)
+        assert client.delete(f"/export/jobs/{job['job_id']}").status_code == 200
+        assert client.get(f"/export/jobs/{job['job_id']}").status_code == 404
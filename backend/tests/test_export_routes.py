@@ -1,4 +1,5 @@
 """Tests for Export Routes"""
+import json
 import pytest
 from unittest.mock import AsyncMock, MagicMock
 from fastapi.testclient import TestClient
@@ -164,6 +165,7 @@ class TestExportRoutes:
 
         mock_cursor = MagicMock()
         mock_cursor.__aiter__ = lambda self: async_iter()
+        mock_cursor.batch_size = MagicMock(return_value=mock_cursor)
         return mock_cursor
 
     def test_export_users_csv(self, client, mock_db):
@@ -339,6 +341,77 @@ class TestExportRoutes:
         response = client.get("/export/activity-logs/csv?days=7")
         assert response.status_code == 200
 
+    def test_export_users_excludes_password_hash(self, client, mock_db):
+        """Test users export drops password_hash with a projection"""
+        users = [{"_id": ObjectId(), "email": MOCK_EMAIL_USER1_TEST}]
+
+        mock_collection = MagicMock()
+        mock_collection.find = MagicMock(return_value=self._create_mock_cursor(users))
+        mock_db.db.__getitem__ = MagicMock(return_value=mock_collection)
+
+        response = client.get(PATH_EXPORT_USERS_CSV)
+        assert response.status_code == 200
+        assert mock_collection.find.call_args[0][1] == {"password_hash": 0}
+        assert response.text.splitlines()[0] == "_id,email"
+
+    def test_export_activity_logs_ndjson(self, client, mock_db):
+        """Test export activity logs to NDJSON"""
+        logs = [
+            {"_id": ObjectId(), "action": "create", "timestamp": datetime(2024, 5, 1, tzinfo=timezone.utc)},
+            {"_id": ObjectId(), "action": "delete"}
+        ]
+
+        mock_collection = MagicMock()
+        mock_collection.find = MagicMock(return_value=self._create_mock_cursor(logs))
+        mock_db.db.__getitem__ = MagicMock(return_value=mock_collection)
+
+        response = client.get("/export/activity-logs/ndjson")
+        assert response.status_code == 200
+        assert "application/x-ndjson" in response.headers["content-type"]
+        assert ".ndjson" in response.headers["content-disposition"]
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["action"] for line in lines] == ["create", "delete"]
+        assert lines[0]["timestamp"] == "2024-05-01T00:00:00+00:00"
+
+    def test_export_json_body(self, client, mock_db):
+        """Test streamed JSON export is a valid array"""
+        roles = [{"_id": ObjectId(), "name": "Admin"}, {"_id": ObjectId(), "name": "Viewer"}]
+
+        mock_collection = MagicMock()
+        mock_collection.find = MagicMock(return_value=self._create_mock_cursor(roles))
+        mock_db.db.__getitem__ = MagicMock(return_value=mock_collection)
+
+        response = client.get("/export/roles/json")
+        assert [role["name"] for role in response.json()] == ["Admin", "Viewer"]
+
+    def test_export_fields_projection(self, client, mock_db):
+        """Test requested fields are pushed down as a projection"""
+        logs = [{"action": "create", "user_email": MOCK_EMAIL_USER1_TEST}]
+
+        mock_collection = MagicMock()
+        mock_collection.find = MagicMock(return_value=self._create_mock_cursor(logs))
+        mock_db.db.__getitem__ = MagicMock(return_value=mock_collection)
+
+        response = client.get("/export/activity-logs/csv?fields=action,user_email")
+        assert response.status_code == 200
+        assert mock_collection.find.call_args[0][1] == {"action": 1, "user_email": 1, "_id": 0}
+        assert response.text.splitlines()[0] == "action,user_email"
+
+    def test_export_activity_logs_default_projection(self, client, mock_db):
+        """Test large activity log fields are excluded by default"""
+        mock_collection = MagicMock()
+        mock_collection.find = MagicMock(return_value=self._create_mock_cursor([{"action": "create"}]))
+        mock_db.db.__getitem__ = MagicMock(return_value=mock_collection)
+
+        client.get("/export/activity-logs/json")
+        assert mock_collection.find.call_args[0][1] == {"details": 0, "old_values": 0, "new_values": 0}
+
+    def test_export_excluded_field_rejected(self, client, mock_db):
+        """Test requesting a never-exported field is a bad request"""
+        response = client.get("/export/users/json?fields=email,password_hash")
+        assert response.status_code == 400
+        assert "password_hash" in response.json()["detail"]
+
     def test_export_no_db_attribute(self, app, mock_super_admin):
         """Test export when db has no db attribute"""
         mock_db = MagicMock(spec=[])  # No attributes
@@ -389,6 +462,7 @@ class TestExportRoutesEmptyData:
 
         mock_cursor = MagicMock()
         mock_cursor.__aiter__ = lambda self: async_iter()
+        mock_cursor.batch_size = MagicMock(return_value=mock_cursor)
         return mock_cursor
 
     def test_export_empty_users_csv(self, client, mock_db):
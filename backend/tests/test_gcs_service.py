@@ -314,6 +314,35 @@ class TestGCSServiceAsyncMethods:
         result = await mock_service.download_file(FILE_PATH_FILE_TXT, "custom-bucket")
         assert result == b"content"
 
+    @pytest.mark.asyncio
+    async def test_download_to_path_not_configured(self, tmp_path):
+        """Test download to path when not configured"""
+        service = GCSService()
+        assert await service.download_to_path(FILE_PATH_FILE_TXT, str(tmp_path / "f")) is False
+
+    @pytest.mark.asyncio
+    async def test_download_to_path_success(self, mock_service, tmp_path):
+        """Test async download to a local file"""
+        mock_blob = MagicMock()
+        mock_blob.exists.return_value = True
+        mock_bucket = MagicMock()
+        mock_bucket.blob.return_value = mock_blob
+        mock_service.client.bucket.return_value = mock_bucket
+
+        local_path = str(tmp_path / "file.txt")
+        assert await mock_service.download_to_path(FILE_PATH_FILE_TXT, local_path) is True
+        mock_blob.download_to_filename.assert_called_once_with(local_path)
+
+    @pytest.mark.asyncio
+    async def test_download_to_path_missing(self, mock_service, tmp_path):
+        """Test download to path when the blob does not exist"""
+        mock_blob = MagicMock()
+        mock_blob.exists.return_value = False
+        mock_service.client.bucket.return_value.blob.return_value = mock_blob
+
+        assert await mock_service.download_to_path(FILE_PATH_FILE_TXT, str(tmp_path / "f")) is False
+        mock_blob.download_to_filename.assert_not_called()
+
     @pytest.mark.asyncio
     async def test_upload_file_not_configured(self):
         """Test upload when not configured"""
@@ -334,6 +363,31 @@ class TestGCSServiceAsyncMethods:
         )
         assert "gs://" in result
 
+    @pytest.mark.asyncio
+    async def test_upload_from_path_not_configured(self, tmp_path):
+        """Test upload from path when not configured"""
+        service = GCSService()
+        result = await service.upload_from_path(str(tmp_path / "a.gz"), FILE_PATH_FILE_TXT)
+        assert result is None
+
+    @pytest.mark.asyncio
+    async def test_upload_from_path_success(self, mock_service, tmp_path):
+        """Test async upload from a local file"""
+        local_file = tmp_path / "export.csv.gz"
+        local_file.write_bytes(b"content")
+        mock_blob = MagicMock()
+        mock_bucket = MagicMock()
+        mock_bucket.blob.return_value = mock_blob
+        mock_service.client.bucket.return_value = mock_bucket
+
+        result = await mock_service.upload_from_path(
+            str(local_file), FILE_PATH_FILE_TXT, "application/gzip"
+        )
+        assert result == f"gs://{STR_TEST_BUCKET}/{FILE_PATH_FILE_TXT}"
+        mock_blob.upload_from_filename.assert_called_once_with(
+            str(local_file), content_type="application/gzip"
+        )
+
     @pytest.mark.asyncio
     async def test_list_files_not_configured(self):
         """Test list files when not configured"""
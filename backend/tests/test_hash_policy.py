@@ -0,0 +1,162 @@
+"""Tests for the password hash policy"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from werkzeug.security import generate_password_hash
+
+from easylifeauth.services import hash_policy as hash_policy_module
+from easylifeauth.services.hash_policy import (
+    HashPolicy, parse_hash_cost, init_hash_policy, get_hash_policy
+)
+from easylifeauth.services.user_service import UserService, verify_password_multi
+from conftest import FakeCursor
+from mock_data import MOCK_EMAIL, MOCK_PASSWORD
+
+FAST_SCRYPT = "scrypt:1024:8:1"
+
+
+class TestParseHashCost:
+    """Tests for parse_hash_cost"""
+
+    def test_scrypt(self):
+        assert parse_hash_cost("scrypt:32768:8:1$salt$hash") == ("scrypt", 32768 * 8)
+
+    def test_pbkdf2(self):
+        assert parse_hash_cost("pbkdf2:sha256:600000$salt$hash") == ("pbkdf2", 600000)
+
+    def test_pbkdf2_without_iterations(self):
+        assert parse_hash_cost("pbkdf2:sha256$salt$hash") == ("pbkdf2", None)
+
+    def test_bcrypt(self):
+        assert parse_hash_cost("$2b$12$abcdefghijklmnopqrstuv") == ("bcrypt", 12)
+
+    def test_unknown(self):
+        assert parse_hash_cost("5f4dcc3b5aa765d61d8327deb882cf99") == ("unknown", None)
+        assert parse_hash_cost(None) == ("unknown", None)
+        assert parse_hash_cost("scrypt:bad$x$y") == ("unknown", None)
+
+
+class TestHashPolicy:
+    """Tests for HashPolicy"""
+
+    def test_defaults(self, monkeypatch):
+        monkeypatch.delenv("PASSWORD_HASH_METHOD", raising=False)
+        monkeypatch.delenv("PASSWORD_HASH_ALGORITHM", raising=False)
+        policy = HashPolicy()
+        assert policy.method == "scrypt:32768:8:1"
+        assert policy.explicit is False
+
+    def test_explicit_method(self):
+        policy = HashPolicy(method="pbkdf2:sha256:200000")
+        assert policy.algorithm == "pbkdf2"
+        assert policy.calibrate() == "pbkdf2:sha256:200000"
+        assert policy.calibrated is False
+
+    def test_invalid_algorithm(self):
+        with pytest.raises(ValueError):
+            HashPolicy(algorithm="md5")
+
+    def test_invalid_method(self):
+        with pytest.raises(ValueError):
+            HashPolicy(method="bcrypt")
+
+    def test_hash_uses_target_method_and_verifies(self):
+        policy = HashPolicy(method=FAST_SCRYPT)
+        hashed = policy.hash(MOCK_PASSWORD)
+        assert hashed.startswith(FAST_SCRYPT + "$")
+        assert verify_password_multi(MOCK_PASSWORD, hashed)
+
+    def test_needs_rehash(self):
+        policy = HashPolicy(method="scrypt:32768:8:1")
+        assert not policy.needs_rehash("scrypt:32768:8:1$s$h")
+        # Within one doubling of the target is tolerated
+        assert not policy.needs_rehash("scrypt:16384:8:1$s$h")
+        assert not policy.needs_rehash("scrypt:65536:8:1$s$h")
+        assert policy.needs_rehash("scrypt:8192:8:1$s$h")
+        assert policy.needs_rehash("scrypt:131072:8:1$s$h")
+        assert policy.needs_rehash("pbkdf2:sha256:600000$s$h")
+        assert policy.needs_rehash("$2b$12$abcdefghijklmnopqrstuv")
+        assert policy.needs_rehash("legacy-sha256-hex")
+
+    def test_calibrate_scrypt_stays_within_budget(self):
+        policy = HashPolicy(algorithm="scrypt", budget_ms=50)
+        with patch.object(HashPolicy, "_time_scrypt", side_effect=lambda pw, salt, n: n / 16384 * 10):
+            method = policy.calibrate()
+        # 16384 -> 10ms, 32768 -> 20ms, 65536 -> 40ms, next step would be 80ms
+        assert method == "scrypt:65536:8:1"
+        assert policy.measured_ms == 40
+        assert policy.calibrated is True
+
+    def test_calibrate_scrypt_floor(self):
+        policy = HashPolicy(algorithm="scrypt", budget_ms=1)
+        with patch.object(HashPolicy, "_time_scrypt", return_value=70.0):
+            assert policy.calibrate() == "scrypt:16384:8:1"
+
+    def test_calibrate_pbkdf2(self):
+        policy = HashPolicy(algorithm="pbkdf2", budget_ms=50)
+        with patch.object(hash_policy_module, "_time_call", return_value=10.0):
+            assert policy.calibrate() == "pbkdf2:sha256:500000"
+
+    def test_stats(self):
+        stats = HashPolicy(method=FAST_SCRYPT).stats()
+        assert stats["method"] == FAST_SCRYPT
+        assert stats["rehashed"] == 0
+
+    def test_singleton_helpers(self):
+        policy = init_hash_policy({"method": FAST_SCRYPT})
+        assert get_hash_policy() is policy
+        init_hash_policy()
+
+
+class TestLoginRehash:
+    """login_user upgrades out-of-policy hashes"""
+
+    @pytest.fixture(autouse=True)
+    def fast_policy(self):
+        policy = init_hash_policy({"method": FAST_SCRYPT})
+        yield policy
+        init_hash_policy()
+
+    @pytest.fixture
+    def user_service(self, mock_db, mock_token_manager):
+        mock_db.roles.find = MagicMock(return_value=FakeCursor())
+        mock_db.groups.find = MagicMock(return_value=FakeCursor())
+        mock_db.users.update_one = AsyncMock()
+        return UserService(mock_db, mock_token_manager)
+
+    @pytest.mark.asyncio
+    async def test_legacy_hash_is_upgraded(self, user_service, mock_db, sample_user_data, fast_policy):
+        sample_user_data["password_hash"] = generate_password_hash(MOCK_PASSWORD, method="pbkdf2:sha256:1000")
+        mock_db.users.find_one = AsyncMock(return_value=sample_user_data)
+
+        await user_service.login_user(MOCK_EMAIL, MOCK_PASSWORD)
+
+        update = mock_db.users.update_one.call_args[0][1]["$set"]
+        assert update["password_hash"].startswith(FAST_SCRYPT + "$")
+        assert verify_password_multi(MOCK_PASSWORD, update["password_hash"])
+        assert "last_login" in update
+        assert fast_policy.rehashed == 1
+
+    @pytest.mark.asyncio
+    async def test_in_policy_hash_is_kept(self, user_service, mock_db, sample_user_data):
+        sample_user_data["password_hash"] = generate_password_hash(MOCK_PASSWORD, method=FAST_SCRYPT)
+        mock_db.users.find_one = AsyncMock(return_value=sample_user_data)
+
+        await user_service.login_user(MOCK_EMAIL, MOCK_PASSWORD)
+
+        update = mock_db.users.update_one.call_args[0][1]["$set"]
+        assert "password_hash" not in update
+
+    @pytest.mark.asyncio
+    async def test_busy_pool_skips_upgrade(self, user_service, mock_db, sample_user_data):
+        from easylifeauth.services.password_hash_pool import PasswordHashPoolBusy
+        sample_user_data["password_hash"] = generate_password_hash(MOCK_PASSWORD, method="pbkdf2:sha256:1000")
+        mock_db.users.find_one = AsyncMock(return_value=sample_user_data)
+
+        with patch("easylifeauth.services.user_service.verify_password_async", AsyncMock(return_value=True)), \
+                patch("easylifeauth.services.user_service.run_password_hash",
+                      AsyncMock(side_effect=PasswordHashPoolBusy("full"))):
+            await user_service.login_user(MOCK_EMAIL, MOCK_PASSWORD)
+
+        update = mock_db.users.update_one.call_args[0][1]["$set"]
+        assert "password_hash" not in update
+
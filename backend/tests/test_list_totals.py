@@ -0,0 +1,130 @@
+"""Tests for the list totals count strategy"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+import easylifeauth.services.list_totals as list_totals
+from easylifeauth.api.dependencies import invalidate_read_caches_on_write
+from easylifeauth.services.admin_service import AdminService
+from easylifeauth.services.list_totals import ListTotalsCache, count_list_total, normalize_query
+
+
+def _collection(total=7, estimated=100, name="testdb.users"):
+    collection = MagicMock(full_name=name)
+    collection.count_documents = AsyncMock(return_value=total)
+    collection.estimated_document_count = AsyncMock(return_value=estimated)
+    return collection
+
+
+class TestListTotalsCache:
+    @pytest.mark.asyncio
+    async def test_unfiltered_uses_estimate(self):
+        cache = ListTotalsCache(ttl_seconds=60)
+        collection = _collection()
+        assert await cache.count(collection, {}) == 100
+        collection.count_documents.assert_not_awaited()
+        assert cache.stats()["estimated"] == 1
+
+    @pytest.mark.asyncio
+    async def test_known_total_is_reused(self):
+        cache = ListTotalsCache(ttl_seconds=60)
+        collection = _collection()
+        assert await cache.count(collection, {"status": "A"}, known_total=42) == 42
+        assert await cache.count(collection, {}, known_total=0) == 0
+        collection.count_documents.assert_not_awaited()
+        collection.estimated_document_count.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_filtered_total_is_cached_per_normalised_query(self):
+        cache = ListTotalsCache(ttl_seconds=60)
+        collection = _collection()
+        assert await cache.count(collection, {"status": "A", "tags": "x"}) == 7
+        assert await cache.count(collection, {"tags": "x", "status": "A"}) == 7
+        assert collection.count_documents.await_count == 1
+
+        await cache.count(collection, {"status": "I"})
+        await cache.count(_collection(name="testdb.roles"), {"status": "A", "tags": "x"})
+        assert cache.stats() == {"entries": 3, "hits": 1, "misses": 3, "estimated": 0}
+
+    @pytest.mark.asyncio
+    async def test_expired_entries_are_recounted(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(list_totals.time, "monotonic", lambda: now[0])
+        cache = ListTotalsCache(ttl_seconds=10)
+        collection = _collection()
+        await cache.count(collection, {"status": "A"})
+        now[0] += 11
+        await cache.count(collection, {"status": "A"})
+        assert collection.count_documents.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_oldest_entries_are_evicted(self):
+        cache = ListTotalsCache(ttl_seconds=60, max_entries=2)
+        collection = _collection()
+        for status in ("A", "I", "X"):
+            await cache.count(collection, {"status": status})
+        assert len(cache._entries) == 2
+        await cache.count(collection, {"status": "A"})
+        assert collection.count_documents.await_count == 4
+
+    @pytest.mark.asyncio
+    async def test_count_running_across_invalidate_is_not_stored(self):
+        cache = ListTotalsCache(ttl_seconds=60)
+        collection = _collection()
+
+        async def count_during_write(query):
+            cache.invalidate()
+            return 7
+
+        collection.count_documents = AsyncMock(side_effect=count_during_write)
+        await cache.count(collection, {"status": "A"})
+        assert cache.stats()["entries"] == 0
+
+    @pytest.mark.asyncio
+    async def test_uncached_without_namespace_or_ttl(self):
+        collection = _collection(name=None)
+        cache = ListTotalsCache(ttl_seconds=60)
+        await cache.count(collection, {"status": "A"})
+        await cache.count(collection, {"status": "A"})
+        assert collection.count_documents.await_count == 2
+
+        disabled = ListTotalsCache(ttl_seconds=0)
+        named = _collection()
+        await disabled.count(named, {"status": "A"})
+        await disabled.count(named, {"status": "A"})
+        assert named.count_documents.await_count == 2
+
+    def test_normalize_query_handles_bson_values(self):
+        from bson import ObjectId
+        oid = ObjectId()
+        assert normalize_query({"b": 1, "a": oid}) == normalize_query({"a": oid, "b": 1})
+
+
+class TestModuleHelpers:
+    @pytest.mark.asyncio
+    async def test_write_requests_drop_cached_totals(self, monkeypatch):
+        cache = ListTotalsCache(ttl_seconds=60)
+        monkeypatch.setattr(list_totals, "_list_totals_cache", cache)
+        collection = _collection()
+        await count_list_total(collection, {"status": "A"})
+        assert cache.stats()["entries"] == 1
+
+        for method, expected in (("GET", 1), ("POST", 0)):
+            dependency = invalidate_read_caches_on_write(MagicMock(method=method))
+            await dependency.__anext__()
+            with pytest.raises(StopAsyncIteration):
+                await dependency.__anext__()
+            assert cache.stats()["entries"] == expected
+
+    @pytest.mark.asyncio
+    async def test_admin_user_listing_reuses_client_total(self, monkeypatch):
+        monkeypatch.setattr(list_totals, "_list_totals_cache", ListTotalsCache(ttl_seconds=60))
+        db = MagicMock()
+        db.users = _collection()
+        db.users.find.return_value.skip.return_value.limit.return_value.to_list = AsyncMock(return_value=[])
+        service = AdminService(db)
+
+        result = await service.get_all_users(pagination={"page": 1, "limit": 10, "total": "55"})
+        assert result["pagination"]["total"] == 55
+        result = await service.get_all_users(pagination={"page": 0, "limit": 10})
+        assert result["pagination"]["total"] == 100
+        db.users.count_documents.assert_not_awaited()
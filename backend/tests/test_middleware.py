@@ -1,6 +1,6 @@
 """Tests for Middleware modules"""
+import asyncio
 import pytest
-from datetime import datetime, timezone, timedelta
 from unittest.mock import MagicMock, AsyncMock, patch
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.testclient import TestClient
@@ -8,6 +8,7 @@ from httpx import AsyncClient, ASGITransport
 
 from easylifeauth.middleware.csrf import CSRFProtectMiddleware, get_csrf_token
 from easylifeauth.middleware.rate_limit import RateLimitMiddleware
+from easylifeauth.middleware.request_context import RequestContext
 from easylifeauth.middleware.security import (
     SecurityHeadersMiddleware,
     RequestValidationMiddleware
@@ -23,6 +24,17 @@ PATCH_ASYNCIO_CREATE_TASK = "asyncio.create_task"
 STR_CONTENT_SECURITY_POLICY = "Content-Security-Policy"
 
 
+def _context(method="GET", path=PATH_DATA, headers=None, client_host=None):
+    """Build the shared RequestContext for a minimal ASGI scope"""
+    return RequestContext({
+        "type": "http",
+        "method": method,
+        "path": path,
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+        "client": (client_host, 50000) if client_host else None,
+    })
+
+
 
 
 
@@ -114,9 +126,7 @@ class TestCSRFProtectMiddleware:
             app=MagicMock(),
             secret_key="test_secret"
         )
-        request = MagicMock()
-        request.method = "GET"
-        request.url.path = PATH_DATA
+        request = _context("GET", PATH_DATA)
         assert middleware._is_exempt(request) is True
 
     def test_is_exempt_options_request(self):
@@ -125,9 +135,7 @@ class TestCSRFProtectMiddleware:
             app=MagicMock(),
             secret_key="test_secret"
         )
-        request = MagicMock()
-        request.method = "OPTIONS"
-        request.url.path = PATH_DATA
+        request = _context("OPTIONS", PATH_DATA)
         assert middleware._is_exempt(request) is True
 
     def test_is_exempt_health_endpoint(self):
@@ -136,9 +144,7 @@ class TestCSRFProtectMiddleware:
             app=MagicMock(),
             secret_key="test_secret"
         )
-        request = MagicMock()
-        request.method = METHOD_POST
-        request.url.path = PATH_HEALTH
+        request = _context(METHOD_POST, PATH_HEALTH)
         assert middleware._is_exempt(request) is True
 
     def test_is_exempt_docs_endpoint(self):
@@ -147,9 +153,7 @@ class TestCSRFProtectMiddleware:
             app=MagicMock(),
             secret_key="test_secret"
         )
-        request = MagicMock()
-        request.method = METHOD_POST
-        request.url.path = "/docs"
+        request = _context(METHOD_POST, "/docs")
         assert middleware._is_exempt(request) is True
 
     def test_is_exempt_custom_path(self):
@@ -159,9 +163,7 @@ class TestCSRFProtectMiddleware:
             secret_key="test_secret",
             exempt_paths={"/api/exempt"}
         )
-        request = MagicMock()
-        request.method = METHOD_POST
-        request.url.path = "/api/exempt"
+        request = _context(METHOD_POST, "/api/exempt")
         assert middleware._is_exempt(request) is True
 
     def test_is_exempt_wildcard_path(self):
@@ -171,9 +173,7 @@ class TestCSRFProtectMiddleware:
             secret_key="test_secret",
             exempt_paths={"/api/auth/*"}
         )
-        request = MagicMock()
-        request.method = METHOD_POST
-        request.url.path = PATH_AUTH_LOGIN
+        request = _context(METHOD_POST, PATH_AUTH_LOGIN)
         assert middleware._is_exempt(request) is True
 
     def test_is_not_exempt_post_request(self):
@@ -182,9 +182,7 @@ class TestCSRFProtectMiddleware:
             app=MagicMock(),
             secret_key="test_secret"
         )
-        request = MagicMock()
-        request.method = METHOD_POST
-        request.url.path = PATH_DATA
+        request = _context(METHOD_POST, PATH_DATA)
         assert middleware._is_exempt(request) is False
 
     def test_get_request_sets_cookie(self, app_with_csrf):
@@ -266,33 +264,23 @@ class TestRateLimitMiddleware:
 
     def test_get_client_ip_forwarded(self):
         """Test getting IP from X-Forwarded-For header"""
-        middleware = RateLimitMiddleware(app=MagicMock(), enabled=True)
-        request = MagicMock()
-        request.headers = {"X-Forwarded-For": MOCK_IP_FORWARDED}
-        assert middleware._get_client_ip(request) == MOCK_IP_PRIVATE_1
+        request = _context(headers={"X-Forwarded-For": MOCK_IP_FORWARDED})
+        assert request.client_ip == MOCK_IP_PRIVATE_1
 
     def test_get_client_ip_real_ip(self):
         """Test getting IP from X-Real-IP header"""
-        middleware = RateLimitMiddleware(app=MagicMock(), enabled=True)
-        request = MagicMock()
-        request.headers = {"X-Real-IP": MOCK_IP_PRIVATE_2}
-        assert middleware._get_client_ip(request) == MOCK_IP_PRIVATE_2
+        request = _context(headers={"X-Real-IP": MOCK_IP_PRIVATE_2})
+        assert request.client_ip == MOCK_IP_PRIVATE_2
 
     def test_get_client_ip_direct(self):
         """Test getting IP from client directly"""
-        middleware = RateLimitMiddleware(app=MagicMock(), enabled=True)
-        request = MagicMock()
-        request.headers = {}
-        request.client.host = MOCK_IP_PRIVATE_3
-        assert middleware._get_client_ip(request) == MOCK_IP_PRIVATE_3
+        request = _context(client_host=MOCK_IP_PRIVATE_3)
+        assert request.client_ip == MOCK_IP_PRIVATE_3
 
     def test_get_client_ip_unknown(self):
         """Test getting IP when no client info available"""
-        middleware = RateLimitMiddleware(app=MagicMock(), enabled=True)
-        request = MagicMock()
-        request.headers = {}
-        request.client = None
-        assert middleware._get_client_ip(request) == "unknown"
+        request = _context()
+        assert request.client_ip == "unknown"
 
     def test_rate_limit_disabled(self, app_with_rate_limit):
         """Test rate limiting can be disabled"""
@@ -320,9 +308,7 @@ class TestRateLimitMiddleware:
 
         # First two requests should pass
         await middleware._check_rate_limit(MOCK_IP_PRIVATE_1, PATH_DATA)
-        middleware.request_log[MOCK_IP_PRIVATE_1].append((datetime.now(timezone.utc), PATH_DATA))
         await middleware._check_rate_limit(MOCK_IP_PRIVATE_1, PATH_DATA)
-        middleware.request_log[MOCK_IP_PRIVATE_1].append((datetime.now(timezone.utc), PATH_DATA))
 
         # Third should fail
         with pytest.raises(HTTPException) as exc_info:
@@ -341,7 +327,6 @@ class TestRateLimitMiddleware:
 
         # First auth request should pass
         await middleware._check_rate_limit(MOCK_IP_PRIVATE_1, PATH_AUTH_LOGIN)
-        middleware.request_log[MOCK_IP_PRIVATE_1].append((datetime.now(timezone.utc), PATH_AUTH_LOGIN))
 
         # Second should fail due to stricter auth limit
         with pytest.raises(HTTPException) as exc_info:
@@ -359,8 +344,8 @@ class TestRateLimitMiddleware:
         )
 
         # Fill up hour limit
-        middleware.request_log[MOCK_IP_PRIVATE_1].append((datetime.now(timezone.utc), PATH_DATA))
-        middleware.request_log[MOCK_IP_PRIVATE_1].append((datetime.now(timezone.utc), PATH_DATA))
+        await middleware._check_rate_limit(MOCK_IP_PRIVATE_1, PATH_DATA)
+        await middleware._check_rate_limit(MOCK_IP_PRIVATE_1, PATH_DATA)
 
         # Should fail hour limit
         with pytest.raises(HTTPException) as exc_info:
@@ -376,8 +361,8 @@ class TestRateLimitMiddleware:
             assert response.status_code == 200
 
     @pytest.mark.asyncio
-    async def test_get_remaining_requests(self):
-        """Test getting remaining requests count"""
+    async def test_remaining_requests(self):
+        """Test remaining requests count"""
         middleware = RateLimitMiddleware(
             app=MagicMock(),
             requests_per_minute=10,
@@ -385,13 +370,13 @@ class TestRateLimitMiddleware:
             enabled=True
         )
 
-        # No requests yet - should return full limit
-        remaining = await middleware._get_remaining_requests(MOCK_IP_PRIVATE_1, PATH_DATA)
-        assert remaining == 10
+        # First request leaves the rest of the limit
+        decision = await middleware._check_rate_limit(MOCK_IP_PRIVATE_1, PATH_DATA)
+        assert decision.remaining == 9
 
-        # For auth endpoint
-        remaining = await middleware._get_remaining_requests(MOCK_IP_PRIVATE_1, PATH_AUTH_LOGIN)
-        assert remaining == 5
+        # Auth endpoints report their own, stricter bucket
+        decision = await middleware._check_rate_limit(MOCK_IP_PRIVATE_1, PATH_AUTH_LOGIN)
+        assert decision.remaining == 4
 
     def test_start_cleanup_task(self):
         """Test starting cleanup task"""
@@ -410,44 +395,20 @@ class TestRateLimitMiddleware:
         assert middleware._cleanup_task is None
 
     @pytest.mark.asyncio
-    async def test_cleanup_old_entries_removes_old_requests(self):
-        """Test cleanup_old_entries removes entries older than 2 hours"""
-        middleware = RateLimitMiddleware(
-            app=MagicMock(),
-            enabled=True
-        )
+    async def test_cleanup_old_entries_prunes_backend(self):
+        """Test cleanup_old_entries drops idle buckets from the backend"""
+        middleware = RateLimitMiddleware(app=MagicMock(), enabled=True)
+        middleware.backend.prune = AsyncMock(return_value=3)
+
+        async def fake_sleep(seconds):
+            if middleware.backend.prune.await_count:
+                raise asyncio.CancelledError()
 
-        # Add old and new entries
-        old_time = datetime.now(timezone.utc) - timedelta(hours=3)
-        recent_time = datetime.now(timezone.utc)
-
-        middleware.request_log[MOCK_IP_PRIVATE_1] = [
-            (old_time, PATH_DATA),
-            (recent_time, PATH_DATA)
-        ]
-        middleware.request_log[MOCK_IP_PRIVATE_2] = [
-            (old_time, PATH_DATA)  # Only old entries
-        ]
-
-        # Run cleanup (just the cleanup part, not the infinite loop)
-        async with middleware.lock:
-            now = datetime.now(timezone.utc)
-            cutoff = now - timedelta(hours=2)
-
-            for ip in list(middleware.request_log.keys()):
-                middleware.request_log[ip] = [
-                    (timestamp, path)
-                    for timestamp, path in middleware.request_log[ip]
-                    if timestamp > cutoff
-                ]
-                if not middleware.request_log[ip]:
-                    del middleware.request_log[ip]
-
-        # Old entries should be removed
-        assert MOCK_IP_PRIVATE_1 in middleware.request_log
-        assert len(middleware.request_log[MOCK_IP_PRIVATE_1]) == 1
-        # IP with only old entries should be removed
-        assert MOCK_IP_PRIVATE_2 not in middleware.request_log
+        with patch("asyncio.sleep", side_effect=fake_sleep):
+            with pytest.raises(asyncio.CancelledError):
+                await middleware.cleanup_old_entries()
+
+        middleware.backend.prune.assert_awaited_once()
 
     def test_start_cleanup_task_only_starts_once(self):
         """Test cleanup task is not started multiple times"""
@@ -692,6 +653,31 @@ class TestRequestValidationMiddleware:
         assert response.status_code == 413
         assert "too large" in response.text
 
+    def test_upload_route_has_its_own_size_limit(self):
+        """Upload routes are capped at their own limit instead of the body cap"""
+        app = FastAPI()
+        app.add_middleware(
+            RequestValidationMiddleware,
+            max_body_size=1024,
+            upload_paths={"/api/bulk/upload/*"},
+            max_upload_body_size=4096
+        )
+
+        @app.post("/api/bulk/upload/{entity_type}")
+        async def upload(entity_type: str):
+            return {"entity_type": entity_type}
+
+        @app.post("/api/other")
+        async def other():
+            return {}
+
+        client = TestClient(app)
+        assert client.post("/api/bulk/upload/users", json={"data": "x" * 2000}).status_code == 200
+        response = client.post("/api/bulk/upload/users", json={"data": "x" * 5000})
+        assert response.status_code == 413
+        assert "4096" in response.text
+        assert client.post("/api/other", json={"data": "x" * 2000}).status_code == 413
+
     def test_get_request_allowed(self, app_with_validation):
         """Test GET requests are allowed regardless of validation"""
         app = FastAPI()
@@ -704,3 +690,152 @@ class TestRequestValidationMiddleware:
         client = TestClient(app)
         response = client.get(PATH_DATA)
         assert response.status_code == 200
+
+
+class TestCSRFRejection:
+    """CSRF failures are answered by the middleware itself"""
+
+    @pytest.fixture
+    def client(self):
+        app = FastAPI()
+        app.add_middleware(CSRFProtectMiddleware, secret_key="test_secret", cookie_secure=False)
+
+        @app.get(PATH_DATA)
+        async def get_data():
+            return {"message": "data"}
+
+        @app.post(PATH_DATA)
+        async def post_data():
+            return {"message": "data created"}
+
+        return TestClient(app)
+
+    def test_missing_token_returns_403(self, client):
+        response = client.post(PATH_DATA)
+        assert response.status_code == 403
+        assert response.json() == {"error": "CSRF token missing"}
+
+    def test_mismatched_token_returns_403(self, client):
+        token = client.get(PATH_DATA).cookies["csrf_token"]
+        response = client.post(PATH_DATA, headers={"X-CSRF-Token": token + "x"})
+        assert response.status_code == 403
+        assert response.json() == {"error": "CSRF token mismatch"}
+
+    def test_valid_token_passes(self, client):
+        token = client.get(PATH_DATA).cookies["csrf_token"]
+        response = client.post(PATH_DATA, headers={"X-CSRF-Token": token})
+        assert response.status_code == 200
+
+    def test_valid_cookie_is_not_reissued(self, client):
+        client.get(PATH_DATA)
+        response = client.get(PATH_DATA)
+        assert "set-cookie" not in response.headers
+
+
+class TestRequestContext:
+    """Tests for the shared per-request context"""
+
+    def test_from_scope_is_shared(self):
+        scope = {"type": "http", "method": "GET", "path": PATH_DATA, "headers": []}
+        context = RequestContext.from_scope(scope)
+        assert RequestContext.from_scope(scope) is context
+
+    def test_headers_and_cookies(self):
+        context = _context(headers={"Cookie": "a=1; csrf_token=abc", "Content-Length": "12"})
+        assert context.cookies == {"a": "1", "csrf_token": "abc"}
+        assert context.content_length == 12
+
+    def test_invalid_content_length(self):
+        assert _context(headers={"Content-Length": "nope"}).content_length is None
+
+    def test_full_stack_builds_one_context(self):
+        from easylifeauth.middleware import request_context as request_context_module
+        app = FastAPI()
+        app.add_middleware(RequestValidationMiddleware)
+        app.add_middleware(SecurityHeadersMiddleware)
+        app.add_middleware(RateLimitMiddleware, enabled=True, exempt_paths={PATH_HEALTH})
+
+        @app.get(PATH_DATA)
+        async def get_data():
+            return {"message": "data"}
+
+        with patch.object(request_context_module.RequestContext, "__init__",
+                          side_effect=request_context_module.RequestContext.__init__,
+                          autospec=True) as init:
+            response = TestClient(app).get(PATH_DATA)
+        assert response.status_code == 200
+        assert "X-RateLimit-Limit" in response.headers
+        assert init.call_count == 1
+
+
+class TestStreamingResponses:
+    """Pure ASGI middlewares pass streamed bodies through chunk by chunk"""
+
+    @pytest.mark.asyncio
+    async def test_stream_chunks_are_not_buffered(self):
+        from fastapi.responses import StreamingResponse
+        from easylifeauth.middleware.apigee_identity import ApigeeIdentityMiddleware
+        app = FastAPI()
+        app.add_middleware(SecurityHeadersMiddleware)
+        app.add_middleware(ApigeeIdentityMiddleware)
+
+        async def chunks():
+            for i in range(3):
+                yield f"chunk-{i}\n"
+
+        @app.get("/stream")
+        async def stream():
+            return StreamingResponse(chunks(), media_type="text/plain")
+
+        messages = []
+        request_sent = False
+
+        async def receive():
+            nonlocal request_sent
+            if request_sent:
+                # Client stays connected until the stream finishes
+                await asyncio.Event().wait()
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {
+            "type": "http", "method": "GET", "path": "/stream", "raw_path": b"/stream",
+            "root_path": "", "scheme": "http", "query_string": b"", "headers": [],
+            "client": ("127.0.0.1", 50000), "server": ("testserver", 80),
+            "http_version": "1.1", "asgi": {"version": "3.0"},
+        }
+        await app(scope, receive, send)
+
+        start = messages[0]
+        header_names = {name for name, _ in start["headers"]}
+        assert b"x-frame-options" in header_names
+        assert b"x-app-name" in header_names
+        bodies = [m["body"] for m in messages[1:] if m.get("body")]
+        assert bodies == [b"chunk-0\n", b"chunk-1\n", b"chunk-2\n"]
+
+
+class TestSystemLogMiddleware:
+    """Tests for the per-request system log line"""
+
+    def test_logs_status_and_user(self, caplog):
+        import logging
+        from easylifeauth.middleware.system_log import SystemLogMiddleware
+        app = FastAPI()
+        app.add_middleware(SystemLogMiddleware)
+
+        @app.get(PATH_DATA)
+        async def get_data(request: Request):
+            request.state.user_email = "user@example.com"
+            raise HTTPException(status_code=404, detail="missing")
+
+        with caplog.at_level(logging.INFO, logger="easylife.http"):
+            response = TestClient(app).get(PATH_DATA)
+
+        assert response.status_code == 404
+        record = next(r for r in caplog.records if r.name == "easylife.http")
+        assert record.response_status == 404
+        assert record.request_path == PATH_DATA
+        assert record.user_email == "user@example.com"
@@ -2,25 +2,27 @@
 Tests for uncovered lines in rate_limit.py and db_health.py middleware.
 
 Covers:
-  - rate_limit.py lines 63-90 (dispatch rate limit flow, 429 response, headers)
-  - rate_limit.py line 131 (auth endpoint path branch)
-  - rate_limit.py lines 76-78 (request_log overflow guard)
-  - rate_limit.py lines 164-181 (cleanup_old_entries)
+  - rate_limit.py (dispatch rate limit flow, 429 response, headers)
+  - rate_limit.py (auth endpoint path branch)
+  - rate_limit_backend.py (bounded in-memory bucket store)
+  - rate_limit.py (cleanup_old_entries)
   - db_health.py lines 55, 68-89 (health check logic, exception handling)
 """
 import pytest
 import asyncio
 import time
-from datetime import datetime, timezone, timedelta
 from unittest.mock import AsyncMock, MagicMock, patch
 
-from starlette.requests import Request
+from types import SimpleNamespace
+
 from starlette.responses import JSONResponse
 from starlette.datastructures import Headers
 
 from easylifeauth.middleware.rate_limit import RateLimitMiddleware
+from easylifeauth.middleware.rate_limit_backend import InMemoryRateLimitBackend
 from easylifeauth.middleware.db_health import DatabaseHealthMiddleware
-from mock_data import MOCK_IP_FORWARDED_TEST, MOCK_IP_LOCALHOST, MOCK_IP_PUBLIC_1, MOCK_IP_PUBLIC_2, MOCK_IP_PUBLIC_3, MOCK_IP_RANDOM, MOCK_IP_TEST_1, MOCK_IP_TEST_3, MOCK_IP_TEST_4
+from easylifeauth.middleware.request_context import RequestContext
+from mock_data import MOCK_IP_FORWARDED_TEST, MOCK_IP_LOCALHOST, MOCK_IP_PUBLIC_1, MOCK_IP_PUBLIC_2, MOCK_IP_RANDOM, MOCK_IP_TEST_1, MOCK_IP_TEST_3, MOCK_IP_TEST_4
 PATCH_ASYNCIO_WAIT_FOR = "asyncio.wait_for"
 SUBPATH_API_AUTH_LOGIN = "/api/auth/login"
 SUBPATH_API_DATA = "/api/data"
@@ -32,27 +34,41 @@ SUBPATH_NO_EXEMPT = "/_no_exempt_"
 # Helpers
 # ---------------------------------------------------------------------------
 
-def _make_request(path=SUBPATH_API_DATA, client_host=MOCK_IP_LOCALHOST, headers=None):
-    """Create a mock Starlette Request."""
-    scope = {
+def _make_scope(path=SUBPATH_API_DATA, client_host=MOCK_IP_LOCALHOST, headers=None):
+    """Create a minimal ASGI HTTP scope."""
+    return {
         "type": "http",
         "method": "GET",
         "path": path,
         "query_string": b"",
         "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+        "client": (client_host, 50000),
     }
-    mock_client = MagicMock()
-    mock_client.host = client_host
-    request = Request(scope)
-    request._client = mock_client  # starlette stores client info here
-    # Patch the client property
-    scope["client"] = (client_host, 50000)
-    return request
 
 
-async def _ok_call_next(request):
-    """A call_next that returns a 200 JSON response."""
-    return JSONResponse({"message": "ok"})
+async def _ok_app(scope, receive, send):
+    """An ASGI app that returns a 200 JSON response."""
+    await JSONResponse({"message": "ok"})(scope, receive, send)
+
+
+async def _dispatch(middleware, scope):
+    """Run the middleware around _ok_app and return the captured response."""
+    middleware.app = _ok_app
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await middleware(scope, receive, send)
+    start = messages[0]
+    return SimpleNamespace(
+        status_code=start["status"],
+        headers=Headers(raw=start["headers"]),
+        body=b"".join(m.get("body", b"") for m in messages[1:]),
+    )
 
 
 # ===================================================================
@@ -75,15 +91,16 @@ class TestRateLimitDispatchFlow:
 
         # First two requests should succeed
         for _ in range(2):
-            req = _make_request(SUBPATH_API_DATA)
-            resp = await middleware.dispatch(req, _ok_call_next)
+            req = _make_scope(SUBPATH_API_DATA)
+            resp = await _dispatch(middleware, req)
             assert resp.status_code == 200
 
         # Third request should be rate-limited (lines 63-70)
-        req = _make_request(SUBPATH_API_DATA)
-        resp = await middleware.dispatch(req, _ok_call_next)
+        req = _make_scope(SUBPATH_API_DATA)
+        resp = await _dispatch(middleware, req)
         assert resp.status_code == 429
-        assert resp.headers.get("Retry-After") == "60"
+        # Two requests per minute refill one every 30 seconds
+        assert resp.headers.get("Retry-After") == "30"
         body = resp.body.decode()
         assert "Rate limit exceeded" in body
 
@@ -97,8 +114,8 @@ class TestRateLimitDispatchFlow:
             exempt_paths={SUBPATH_NO_EXEMPT},
         )
 
-        req = _make_request(SUBPATH_API_DATA)
-        resp = await middleware.dispatch(req, _ok_call_next)
+        req = _make_scope(SUBPATH_API_DATA)
+        resp = await _dispatch(middleware, req)
         assert resp.status_code == 200
         assert "X-RateLimit-Limit" in resp.headers
         assert resp.headers["X-RateLimit-Limit"] == "100"
@@ -117,13 +134,13 @@ class TestRateLimitDispatchFlow:
         )
 
         # First auth request succeeds
-        req = _make_request(SUBPATH_API_AUTH_LOGIN)
-        resp = await middleware.dispatch(req, _ok_call_next)
+        req = _make_scope(SUBPATH_API_AUTH_LOGIN)
+        resp = await _dispatch(middleware, req)
         assert resp.status_code == 200
 
         # Second auth request should be rate-limited
-        req = _make_request(SUBPATH_API_AUTH_LOGIN)
-        resp = await middleware.dispatch(req, _ok_call_next)
+        req = _make_scope(SUBPATH_API_AUTH_LOGIN)
+        resp = await _dispatch(middleware, req)
         assert resp.status_code == 429
 
     @pytest.mark.asyncio
@@ -138,8 +155,8 @@ class TestRateLimitDispatchFlow:
         )
 
         for _ in range(10):
-            req = _make_request(SUBPATH_API_DATA)
-            resp = await middleware.dispatch(req, _ok_call_next)
+            req = _make_scope(SUBPATH_API_DATA)
+            resp = await _dispatch(middleware, req)
             assert resp.status_code == 200
 
     @pytest.mark.asyncio
@@ -152,13 +169,13 @@ class TestRateLimitDispatchFlow:
         )
 
         # /health is in the default exempt paths
-        req = _make_request("/health")
-        resp = await middleware.dispatch(req, _ok_call_next)
+        req = _make_scope("/health")
+        resp = await _dispatch(middleware, req)
         assert resp.status_code == 200
 
         # Second request to /health should also succeed (not rate limited)
-        req = _make_request("/health")
-        resp = await middleware.dispatch(req, _ok_call_next)
+        req = _make_scope("/health")
+        resp = await _dispatch(middleware, req)
         assert resp.status_code == 200
 
     @pytest.mark.asyncio
@@ -171,8 +188,8 @@ class TestRateLimitDispatchFlow:
         )
 
         for _ in range(10):
-            req = _make_request(SUBPATH_API_DATA)
-            resp = await middleware.dispatch(req, _ok_call_next)
+            req = _make_scope(SUBPATH_API_DATA)
+            resp = await _dispatch(middleware, req)
             assert resp.status_code == 200
 
     @pytest.mark.asyncio
@@ -188,82 +205,69 @@ class TestRateLimitDispatchFlow:
 
         # Two requests succeed
         for _ in range(2):
-            req = _make_request(SUBPATH_API_DATA)
-            resp = await middleware.dispatch(req, _ok_call_next)
+            req = _make_scope(SUBPATH_API_DATA)
+            resp = await _dispatch(middleware, req)
             assert resp.status_code == 200
 
         # Third request hits hourly limit
-        req = _make_request(SUBPATH_API_DATA)
-        resp = await middleware.dispatch(req, _ok_call_next)
+        req = _make_scope(SUBPATH_API_DATA)
+        resp = await _dispatch(middleware, req)
         assert resp.status_code == 429
         body = resp.body.decode()
         assert "requests per hour" in body
 
 
 # ===================================================================
-# RateLimitMiddleware - request_log overflow guard (lines 76-78)
+# InMemoryRateLimitBackend - bounded key count
 # ===================================================================
 
 class TestRateLimitOverflowGuard:
-    """Cover the branch where len(request_log) > 10000."""
+    """The in-memory backend never holds more than max_keys buckets."""
 
     @pytest.mark.asyncio
-    async def test_overflow_guard_evicts_oldest_ip(self):
-        """When request_log exceeds 10000 unique IPs, the oldest IP
-        entry is evicted (lines 76-78)."""
+    async def test_overflow_guard_evicts_least_recent_ip(self):
+        """When max_keys is reached the least recently used bucket is evicted."""
         middleware = RateLimitMiddleware(
             app=MagicMock(),
             requests_per_minute=100_000,
             enabled=True,
             exempt_paths={SUBPATH_NO_EXEMPT},
+            backend=InMemoryRateLimitBackend(max_keys=4),
         )
 
-        # Pre-populate request_log with 10001 unique IPs
-        now = datetime.now(timezone.utc)
-        for i in range(10_001):
-            ip = f"10.0.{i // 256}.{i % 256}"
-            middleware.request_log[ip].append((now, SUBPATH_API_DATA))
-
-        first_ip = next(iter(middleware.request_log))
-        assert len(middleware.request_log) == 10_001
+        # Two IPs fill the four buckets (minute + hour each)
+        await _dispatch(middleware, _make_scope(client_host=MOCK_IP_PUBLIC_1))
+        await _dispatch(middleware, _make_scope(client_host=MOCK_IP_PUBLIC_2))
+        assert len(middleware.backend) == 4
 
         # Make a request from a new IP
-        req = _make_request(SUBPATH_API_DATA, client_host=MOCK_IP_RANDOM)
-        resp = await middleware.dispatch(req, _ok_call_next)
+        resp = await _dispatch(middleware, _make_scope(SUBPATH_API_DATA, client_host=MOCK_IP_RANDOM))
 
         assert resp.status_code == 200
+        assert len(middleware.backend) == 4
+        keys = set(middleware.backend._tats)
         # The oldest IP should have been evicted
-        assert first_ip not in middleware.request_log
+        assert not any(key.startswith(MOCK_IP_PUBLIC_1) for key in keys)
         # New IP should be present
-        assert MOCK_IP_RANDOM in middleware.request_log
+        assert f"{MOCK_IP_RANDOM}:minute" in keys
 
 
 # ===================================================================
-# RateLimitMiddleware - cleanup_old_entries (lines 164-181)
+# RateLimitMiddleware - cleanup_old_entries
 # ===================================================================
 
 class TestRateLimitCleanup:
     """Cover the cleanup_old_entries coroutine method."""
 
     @pytest.mark.asyncio
-    async def test_cleanup_old_entries_removes_stale_ips(self):
-        """cleanup_old_entries removes entries older than 2 hours and
-        deletes IPs with no remaining entries (lines 164-181)."""
-        middleware = RateLimitMiddleware(app=MagicMock(), enabled=True)
-
-        old_time = datetime.now(timezone.utc) - timedelta(hours=3)
-        recent_time = datetime.now(timezone.utc)
+    async def test_cleanup_old_entries_removes_idle_buckets(self):
+        """cleanup_old_entries drops buckets that have fully refilled."""
+        backend = InMemoryRateLimitBackend()
+        middleware = RateLimitMiddleware(app=MagicMock(), enabled=True, backend=backend)
 
-        middleware.request_log[MOCK_IP_PUBLIC_1] = [
-            (old_time, "/api/old"),
-            (recent_time, "/api/recent"),
-        ]
-        middleware.request_log[MOCK_IP_PUBLIC_2] = [
-            (old_time, "/api/old"),
-        ]
-        middleware.request_log[MOCK_IP_PUBLIC_3] = [
-            (recent_time, "/api/recent"),
-        ]
+        now = time.monotonic_ns()
+        backend._tats[f"{MOCK_IP_PUBLIC_1}:minute"] = now + 10 ** 12
+        backend._tats[f"{MOCK_IP_PUBLIC_2}:minute"] = now - 1
 
         call_count = 0
 
@@ -277,57 +281,52 @@ class TestRateLimitCleanup:
             with pytest.raises(asyncio.CancelledError):
                 await middleware.cleanup_old_entries()
 
-        # MOCK_IP_PUBLIC_1 should still exist but only with the recent entry
-        assert MOCK_IP_PUBLIC_1 in middleware.request_log
-        assert len(middleware.request_log[MOCK_IP_PUBLIC_1]) == 1
-
-        # MOCK_IP_PUBLIC_2 had only old entries so should be deleted
-        assert MOCK_IP_PUBLIC_2 not in middleware.request_log
-
-        # MOCK_IP_PUBLIC_3 had only recent entries so should remain
-        assert MOCK_IP_PUBLIC_3 in middleware.request_log
+        # A bucket still refilling is kept, an idle one is dropped
+        assert f"{MOCK_IP_PUBLIC_1}:minute" in backend._tats
+        assert f"{MOCK_IP_PUBLIC_2}:minute" not in backend._tats
 
     @pytest.mark.asyncio
-    async def test_cleanup_handles_empty_request_log(self):
-        """cleanup_old_entries does not error on an empty request_log."""
+    async def test_cleanup_survives_backend_errors(self):
+        """A failing prune is logged and the loop keeps running."""
         middleware = RateLimitMiddleware(app=MagicMock(), enabled=True)
+        middleware.backend.prune = AsyncMock(side_effect=ConnectionError("down"))
 
         call_count = 0
 
         async def fake_sleep(seconds):
             nonlocal call_count
             call_count += 1
-            if call_count > 1:
+            if call_count > 2:
                 raise asyncio.CancelledError()
 
         with patch("asyncio.sleep", side_effect=fake_sleep):
             with pytest.raises(asyncio.CancelledError):
                 await middleware.cleanup_old_entries()
 
-        assert len(middleware.request_log) == 0
+        assert middleware.backend.prune.await_count == 2
 
 
 # ===================================================================
-# RateLimitMiddleware - _get_client_ip branches
+# RequestContext - client IP resolution used by RateLimitMiddleware
 # ===================================================================
 
 class TestRateLimitClientIP:
-    """Cover _get_client_ip branches (lines 92-107)."""
+    """Cover RequestContext.client_ip branches."""
 
     def test_x_forwarded_for(self):
         middleware = RateLimitMiddleware(app=MagicMock())
-        req = _make_request(headers={"X-Forwarded-For": MOCK_IP_FORWARDED_TEST})
-        assert middleware._get_client_ip(req) == MOCK_IP_TEST_1
+        req = _make_scope(headers={"X-Forwarded-For": MOCK_IP_FORWARDED_TEST})
+        assert RequestContext(req).client_ip == MOCK_IP_TEST_1
 
     def test_x_real_ip(self):
         middleware = RateLimitMiddleware(app=MagicMock())
-        req = _make_request(headers={"X-Real-IP": MOCK_IP_TEST_3})
-        assert middleware._get_client_ip(req) == MOCK_IP_TEST_3
+        req = _make_scope(headers={"X-Real-IP": MOCK_IP_TEST_3})
+        assert RequestContext(req).client_ip == MOCK_IP_TEST_3
 
     def test_client_host(self):
         middleware = RateLimitMiddleware(app=MagicMock())
-        req = _make_request(client_host=MOCK_IP_TEST_4)
-        assert middleware._get_client_ip(req) == MOCK_IP_TEST_4
+        req = _make_scope(client_host=MOCK_IP_TEST_4)
+        assert RequestContext(req).client_ip == MOCK_IP_TEST_4
 
     def test_unknown_when_no_client(self):
         middleware = RateLimitMiddleware(app=MagicMock())
@@ -338,8 +337,7 @@ class TestRateLimitClientIP:
             "query_string": b"",
             "headers": [],
         }
-        req = Request(scope)
-        assert middleware._get_client_ip(req) == "unknown"
+        assert RequestContext(scope).client_ip == "unknown"
 
 
 # ===================================================================
@@ -347,7 +345,7 @@ class TestRateLimitClientIP:
 # ===================================================================
 
 class TestRateLimitRemaining:
-    """Cover _get_remaining_requests (lines 149-160)."""
+    """Cover the remaining count reported by _check_rate_limit."""
 
     @pytest.mark.asyncio
     async def test_remaining_for_auth_path(self):
@@ -356,8 +354,8 @@ class TestRateLimitRemaining:
             requests_per_minute=100,
             auth_requests_per_minute=5,
         )
-        remaining = await middleware._get_remaining_requests(MOCK_IP_PUBLIC_1, SUBPATH_API_AUTH_LOGIN)
-        assert remaining == 5
+        decision = await middleware._check_rate_limit(MOCK_IP_PUBLIC_1, SUBPATH_API_AUTH_LOGIN)
+        assert decision.remaining == 4
 
     @pytest.mark.asyncio
     async def test_remaining_for_regular_path(self):
@@ -365,8 +363,8 @@ class TestRateLimitRemaining:
             app=MagicMock(),
             requests_per_minute=100,
         )
-        remaining = await middleware._get_remaining_requests(MOCK_IP_PUBLIC_1, SUBPATH_API_DATA)
-        assert remaining == 100
+        decision = await middleware._check_rate_limit(MOCK_IP_PUBLIC_1, SUBPATH_API_DATA)
+        assert decision.remaining == 99
 
 
 # ===================================================================
@@ -425,8 +423,8 @@ class TestDbHealthDispatchEnabled:
         # Force check by making last check time far in the past
         middleware._last_check_time = 0
 
-        req = _make_request(SUBPATH_API_DATA)
-        resp = await middleware.dispatch(req, _ok_call_next)
+        req = _make_scope(SUBPATH_API_DATA)
+        resp = await _dispatch(middleware, req)
         assert resp.status_code == 200
         mock_db.ensure_connected.assert_called_once()
 
@@ -445,8 +443,8 @@ class TestDbHealthDispatchEnabled:
         # Force check by making last check time far in the past
         middleware._last_check_time = 0
 
-        req = _make_request(SUBPATH_API_DATA)
-        resp = await middleware.dispatch(req, _ok_call_next)
+        req = _make_scope(SUBPATH_API_DATA)
+        resp = await _dispatch(middleware, req)
         assert resp.status_code == 200
         assert middleware._last_check_success is False
 
@@ -463,8 +461,8 @@ class TestDbHealthDispatchEnabled:
             enabled=True,
         )
 
-        req = _make_request("/health/live")
-        resp = await middleware.dispatch(req, _ok_call_next)
+        req = _make_scope("/health/live")
+        resp = await _dispatch(middleware, req)
         assert resp.status_code == 200
         mock_db.ensure_connected.assert_not_called()
 
@@ -481,8 +479,8 @@ class TestDbHealthDispatchEnabled:
             enabled=False,
         )
 
-        req = _make_request(SUBPATH_API_DATA)
-        resp = await middleware.dispatch(req, _ok_call_next)
+        req = _make_scope(SUBPATH_API_DATA)
+        resp = await _dispatch(middleware, req)
         assert resp.status_code == 200
         mock_db.ensure_connected.assert_not_called()
 
@@ -496,8 +494,8 @@ class TestDbHealthDispatchEnabled:
             enabled=True,
         )
 
-        req = _make_request(SUBPATH_API_DATA)
-        resp = await middleware.dispatch(req, _ok_call_next)
+        req = _make_scope(SUBPATH_API_DATA)
+        resp = await _dispatch(middleware, req)
         assert resp.status_code == 200
 
 
@@ -524,8 +522,8 @@ class TestDbHealthTiming:
         middleware._last_check_time = time.time()
         middleware._last_check_success = True
 
-        req = _make_request(SUBPATH_API_DATA)
-        resp = await middleware.dispatch(req, _ok_call_next)
+        req = _make_scope(SUBPATH_API_DATA)
+        resp = await _dispatch(middleware, req)
         assert resp.status_code == 200
         mock_db.ensure_connected.assert_not_called()
 
@@ -545,8 +543,8 @@ class TestDbHealthTiming:
         middleware._last_check_time = time.time()
         middleware._last_check_success = False
 
-        req = _make_request(SUBPATH_API_DATA)
-        resp = await middleware.dispatch(req, _ok_call_next)
+        req = _make_scope(SUBPATH_API_DATA)
+        resp = await _dispatch(middleware, req)
         assert resp.status_code == 200
         mock_db.ensure_connected.assert_called_once()
 
@@ -571,8 +569,8 @@ class TestDbHealthDbGetterReturnsNone:
         # Force check by making last check time far in the past
         middleware._last_check_time = 0
 
-        req = _make_request(SUBPATH_API_DATA)
-        resp = await middleware.dispatch(req, _ok_call_next)
+        req = _make_scope(SUBPATH_API_DATA)
+        resp = await _dispatch(middleware, req)
         assert resp.status_code == 200
 
 
@@ -599,8 +597,8 @@ class TestDbHealthExceptionHandling:
         middleware._last_check_time = 0
 
         with patch(PATCH_ASYNCIO_WAIT_FOR, side_effect=asyncio.TimeoutError()):
-            req = _make_request(SUBPATH_API_DATA)
-            resp = await middleware.dispatch(req, _ok_call_next)
+            req = _make_scope(SUBPATH_API_DATA)
+            resp = await _dispatch(middleware, req)
 
         assert resp.status_code == 200
         assert middleware._last_check_success is False
@@ -623,8 +621,8 @@ class TestDbHealthExceptionHandling:
         middleware._last_check_time = 0
 
         with patch(PATCH_ASYNCIO_WAIT_FOR, side_effect=RuntimeError("not ready")):
-            req = _make_request(SUBPATH_API_DATA)
-            resp = await middleware.dispatch(req, _ok_call_next)
+            req = _make_scope(SUBPATH_API_DATA)
+            resp = await _dispatch(middleware, req)
 
         assert resp.status_code == 200
         assert middleware._last_check_success is True
@@ -645,8 +643,8 @@ class TestDbHealthExceptionHandling:
         middleware._last_check_time = 0
 
         with patch(PATCH_ASYNCIO_WAIT_FOR, side_effect=ConnectionError("refused")):
-            req = _make_request(SUBPATH_API_DATA)
-            resp = await middleware.dispatch(req, _ok_call_next)
+            req = _make_scope(SUBPATH_API_DATA)
+            resp = await _dispatch(middleware, req)
 
         assert resp.status_code == 200
         assert middleware._last_check_success is False
@@ -0,0 +1,154 @@
+"""Tests for offset and keyset pagination of the list routes"""
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock
+from bson import ObjectId
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from easylifeauth.api.dependencies import get_db
+from easylifeauth.api.pagination import create_pagination_meta
+from easylifeauth.api.roles_routes import router as roles_router
+from easylifeauth.db.pagination import InvalidCursor, decode_cursor, encode_cursor, fetch_page, keyset_filter
+from easylifeauth.security.access_control import CurrentUser, require_group_admin
+from conftest import FakeCursor, matches_query
+from mock_data import MOCK_EMAIL_ADMIN_TEST
+
+
+class FakeCollection:
+    def __init__(self, docs):
+        self.docs = docs
+        self.count_documents = AsyncMock(side_effect=lambda query: sum(matches_query(d, query) for d in self.docs))
+        self.estimated_document_count = AsyncMock(side_effect=lambda: len(self.docs))
+
+    def find(self, query):
+        return FakeCursor([d for d in self.docs if matches_query(d, query)])
+
+
+def _docs():
+    base = datetime(2026, 1, 1)
+    docs = [{"_id": ObjectId(), "created_at": base + timedelta(minutes=i // 2), "n": i} for i in range(9)]
+    docs.append({"_id": ObjectId(), "n": 9})  # no sort value
+    return docs
+
+
+async def _walk(collection, field, direction, limit):
+    seen = []
+    first = await fetch_page(collection, {}, field, direction, limit=limit)
+    seen.extend(doc["n"] for doc in first.docs)
+    cursor = first.next_cursor
+    while cursor:
+        page = await fetch_page(collection, {}, field, direction, limit=limit, cursor=cursor)
+        assert page.keyset and page.total is None
+        seen.extend(doc["n"] for doc in page.docs)
+        cursor = page.next_cursor
+    return seen
+
+
+class TestCursorTokens:
+    def test_round_trip_keeps_types(self):
+        doc = {"_id": ObjectId(), "created_at": datetime(2026, 3, 1, 12, 30)}
+        value, doc_id = decode_cursor(encode_cursor("created_at", doc), "created_at")
+        assert value == doc["created_at"] and doc_id == doc["_id"]
+
+    def test_cursor_is_bound_to_its_sort_field(self):
+        token = encode_cursor("priority", {"_id": 1, "priority": 3})
+        with pytest.raises(InvalidCursor):
+            decode_cursor(token, "created_at")
+
+    @pytest.mark.parametrize("token", ["", "not-base64!", "bm90IGpzb24"])
+    def test_garbage_is_rejected(self, token):
+        with pytest.raises(InvalidCursor):
+            decode_cursor(token, "created_at")
+
+    def test_descending_filter_includes_missing_values(self):
+        assert keyset_filter("created_at", -1, 5, 1) == {"$or": [
+            {"created_at": {"$lt": 5}}, {"created_at": None}, {"created_at": 5, "_id": {"$lt": 1}}
+        ]}
+
+
+class TestFetchPage:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("direction", [1, -1])
+    @pytest.mark.parametrize("limit", [1, 3, 4, 20])
+    async def test_keyset_walk_matches_full_sort(self, direction, limit):
+        collection = FakeCollection(_docs())
+        expected = [doc["n"] async for doc in collection.find({}).sort(
+            [("created_at", direction), ("_id", direction)])]
+        assert await _walk(collection, "created_at", direction, limit) == expected
+
+    @pytest.mark.asyncio
+    async def test_offset_page_counts_and_offers_a_cursor(self):
+        collection = FakeCollection(_docs())
+        page = await fetch_page(collection, {}, "created_at", -1, skip=4, limit=4)
+        assert page.total == 10 and not page.keyset
+        assert len(page.docs) == 4 and page.next_cursor
+
+        last = await fetch_page(collection, {}, "created_at", -1, skip=8, limit=4)
+        assert len(last.docs) == 2 and last.next_cursor is None
+
+    @pytest.mark.asyncio
+    async def test_keyset_keeps_the_query_and_counts_on_request(self):
+        collection = FakeCollection(_docs())
+        first = await fetch_page(collection, {"n": {"$gt": 4}}, "created_at", 1, limit=2)
+        page = await fetch_page(collection, {"n": {"$gt": 4}}, "created_at", 1, limit=2,
+                                cursor=first.next_cursor, include_total=True)
+        assert page.total == 5
+        assert all(doc["n"] > 4 for doc in page.docs)
+        collection.count_documents.assert_awaited_with({"n": {"$gt": 4}})
+
+    @pytest.mark.asyncio
+    async def test_total_can_be_skipped(self):
+        collection = FakeCollection(_docs())
+        page = await fetch_page(collection, {}, "created_at", -1, limit=4, include_total=False)
+        assert page.total is None and page.next_cursor
+        collection.count_documents.assert_not_awaited()
+
+
+class TestPaginationMeta:
+    def test_keyset_meta(self):
+        meta = create_pagination_meta(None, 0, 25, next_cursor="abc", keyset=True)
+        assert meta.total is None and meta.pages is None
+        assert meta.has_next is True and meta.has_prev is True
+        assert meta.next_cursor == "abc"
+
+    def test_last_keyset_page(self):
+        meta = create_pagination_meta(None, 0, 25, keyset=True)
+        assert meta.has_next is False
+
+
+class TestListRoute:
+    @pytest.fixture
+    def client(self):
+        app = FastAPI()
+        app.include_router(roles_router)
+        db = MagicMock()
+        db.roles = FakeCollection([
+            {"_id": ObjectId(), "roleId": f"role-{i}", "name": f"Role {i}", "priority": i, "status": "active"}
+            for i in range(5)
+        ])
+        app.dependency_overrides[get_db] = lambda: db
+        app.dependency_overrides[require_group_admin] = lambda: CurrentUser(
+            user_id="test", email=MOCK_EMAIL_ADMIN_TEST, roles=["administrator"], groups=[], domains=[]
+        )
+        return TestClient(app)
+
+    def test_pages_through_with_cursors(self, client):
+        first = client.get("/roles", params={"limit": 2}).json()
+        assert first["pagination"]["total"] == 5
+        second = client.get("/roles", params={"limit": 2, "cursor": first["pagination"]["next_cursor"]}).json()
+        assert [role["roleId"] for role in second["data"]] == ["role-2", "role-3"]
+        assert second["pagination"]["total"] is None
+        assert second["pagination"]["has_prev"] is True and second["pagination"]["has_next"] is True
+
+    def test_client_total_is_reused(self, client):
+        second = client.get("/roles", params={"limit": 2, "page": 1, "total": 5}).json()
+        assert second["pagination"]["total"] == 5 and second["pagination"]["pages"] == 3
+        keyset = client.get("/roles", params={"limit": 2, "cursor": second["pagination"]["next_cursor"],
+                                              "total": 5}).json()
+        assert keyset["pagination"]["total"] == 5
+        assert client.get("/roles", params={"total": -1}).status_code == 422
+
+    def test_invalid_cursor_is_rejected(self, client):
+        response = client.get("/roles", params={"cursor": "bogus"})
+        assert response.status_code == 400
@@ -0,0 +1,161 @@
+"""Tests for the bounded password hashing pool"""
+import asyncio
+import threading
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from werkzeug.security import generate_password_hash
+
+from easylifeauth.services.password_hash_pool import (
+    PasswordHashPool, PasswordHashPoolBusy, init_password_hash_pool,
+    get_password_hash_pool, run_password_hash
+)
+from easylifeauth.errors.auth_error import AuthError
+from conftest import FakeCursor
+from mock_data import MOCK_EMAIL, MOCK_PASSWORD
+
+
+class TestPasswordHashPool:
+    """Tests for PasswordHashPool"""
+
+    @pytest.mark.asyncio
+    async def test_run_returns_result(self):
+        pool = PasswordHashPool(max_workers=1, max_queue=1, queue_timeout=5)
+        assert await pool.run(lambda a, b: a + b, 1, 2) == 3
+        stats = pool.stats()
+        assert stats["completed"] == 1
+        assert stats["running"] == 0
+        assert stats["queued"] == 0
+        pool.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_runs_off_event_loop_thread(self):
+        pool = PasswordHashPool(max_workers=1, max_queue=1, queue_timeout=5)
+        thread_name = await pool.run(lambda: threading.current_thread().name)
+        assert thread_name.startswith("password-hash")
+        pool.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_rejects_when_queue_full(self):
+        pool = PasswordHashPool(max_workers=1, max_queue=1, queue_timeout=5)
+        gate = threading.Event()
+        first = asyncio.create_task(pool.run(gate.wait))
+        second = asyncio.create_task(pool.run(gate.wait))
+        await asyncio.sleep(0.05)
+
+        assert pool.queued == 1
+        assert pool.running == 1
+        with pytest.raises(PasswordHashPoolBusy):
+            await pool.run(lambda: None)
+        assert pool.stats()["rejected"] == 1
+
+        gate.set()
+        await asyncio.gather(first, second)
+        assert pool.stats()["max_pending_seen"] == 2
+        pool.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_times_out(self):
+        pool = PasswordHashPool(max_workers=1, max_queue=1, queue_timeout=0.05)
+        gate = threading.Event()
+        with pytest.raises(PasswordHashPoolBusy):
+            await pool.run(gate.wait)
+        gate.set()
+        assert pool.stats()["timed_out"] == 1
+        pool.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_timed_out_job_counts_until_it_finishes(self):
+        pool = PasswordHashPool(max_workers=1, max_queue=0, queue_timeout=0.05)
+        gate = threading.Event()
+        with pytest.raises(PasswordHashPoolBusy):
+            await pool.run(gate.wait)
+
+        # The thread is still hashing, so there is no room for another job
+        assert pool.running == 1
+        with pytest.raises(PasswordHashPoolBusy):
+            await pool.run(lambda: None)
+        assert pool.stats()["rejected"] == 1
+
+        gate.set()
+        for _ in range(100):
+            if pool.running == 0 and pool._pending == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert await pool.run(lambda: "ok") == "ok"
+        pool.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_propagates_exceptions(self):
+        pool = PasswordHashPool(max_workers=1, max_queue=1, queue_timeout=5)
+
+        def boom():
+            raise ValueError("bad hash")
+
+        with pytest.raises(ValueError):
+            await pool.run(boom)
+        assert pool.stats()["running"] == 0
+        pool.shutdown()
+
+    def test_env_defaults(self, monkeypatch):
+        monkeypatch.setenv("PASSWORD_HASH_WORKERS", "3")
+        monkeypatch.setenv("PASSWORD_HASH_MAX_QUEUE", "7")
+        monkeypatch.setenv("PASSWORD_HASH_QUEUE_TIMEOUT", "2.5")
+        pool = PasswordHashPool()
+        assert (pool.max_workers, pool.max_queue, pool.queue_timeout) == (3, 7, 2.5)
+
+    @pytest.mark.asyncio
+    async def test_singleton_helpers(self):
+        pool = init_password_hash_pool({"max_workers": 2, "max_queue": 4})
+        assert get_password_hash_pool() is pool
+        assert pool.max_workers == 2
+        assert await run_password_hash(str.upper, "abc") == "ABC"
+        init_password_hash_pool()
+
+
+class TestPasswordHashPoolCallers:
+    """Services hash and verify passwords through the pool"""
+
+    @pytest.mark.asyncio
+    async def test_login_verifies_on_pool(self, mock_db, mock_token_manager, sample_user_data):
+        from easylifeauth.services.user_service import UserService
+        sample_user_data["password_hash"] = generate_password_hash(MOCK_PASSWORD)
+        mock_db.users.find_one = AsyncMock(return_value=sample_user_data)
+        mock_db.roles.find = MagicMock(return_value=FakeCursor())
+        mock_db.groups.find = MagicMock(return_value=FakeCursor())
+
+        completed_before = get_password_hash_pool().completed
+        result = await UserService(mock_db, mock_token_manager).login_user(MOCK_EMAIL, MOCK_PASSWORD)
+
+        assert result["email"] == MOCK_EMAIL
+        assert get_password_hash_pool().completed == completed_before + 1
+
+    @pytest.mark.asyncio
+    async def test_login_busy_returns_503(self, mock_db, mock_token_manager, sample_user_data):
+        from easylifeauth.services.user_service import UserService
+        mock_db.users.find_one = AsyncMock(return_value=sample_user_data)
+
+        with patch("easylifeauth.services.user_service.run_password_hash",
+                   AsyncMock(side_effect=PasswordHashPoolBusy("full"))):
+            with pytest.raises(AuthError) as exc_info:
+                await UserService(mock_db, mock_token_manager).login_user(MOCK_EMAIL, MOCK_PASSWORD)
+        assert exc_info.value.status_code == 503
+
+    @pytest.mark.asyncio
+    async def test_bulk_upload_hashes_on_pool(self, mock_db):
+        import pandas as pd
+        from easylifeauth.services.bulk_upload_service import BulkUploadService
+        mock_db.users = MagicMock()
+        mock_db.users.find = MagicMock(return_value=FakeCursor())
+        mock_db.users.bulk_write = AsyncMock(return_value=MagicMock(upserted_ids={0: "id"}))
+        hasher_threads = []
+
+        def hasher(password):
+            hasher_threads.append(threading.current_thread().name)
+            return "hashed"
+
+        service = BulkUploadService(mock_db, password_hasher=hasher)
+        result = await service.process_users(pd.DataFrame([{"email": MOCK_EMAIL}]), send_password_emails=False)
+
+        assert result.successful == 1
+        assert hasher_threads and hasher_threads[0].startswith("password-hash")
+
@@ -238,6 +238,7 @@ class TestPlayboardGroupAccessRoutes:
         pb2 = make_playboard("pb2", "Restricted", STR_SCENARIO1, groups=[GROUP_MANAGERS])
 
         mock_db.playboards.count_documents = AsyncMock(return_value=2)
+        mock_db.playboards.estimated_document_count = AsyncMock(return_value=2)
         mock_db.playboards.find = MagicMock(return_value=make_cursor([pb1, pb2]))
 
         mock_db.users.find_one = AsyncMock(return_value=None)
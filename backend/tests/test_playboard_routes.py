@@ -222,6 +222,7 @@ class TestPlayboardRoutes:
         }
 
         mock_db.playboards.count_documents = AsyncMock(return_value=1)
+        mock_db.playboards.estimated_document_count = AsyncMock(return_value=1)
         mock_cursor = MagicMock()
         mock_cursor.skip = MagicMock(return_value=mock_cursor)
         mock_cursor.limit = MagicMock(return_value=mock_cursor)
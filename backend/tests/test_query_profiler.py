@@ -0,0 +1,239 @@
+"""Tests for the slow-query profiler"""
+import pytest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from easylifeauth.api.health_routes import router
+from easylifeauth.db import query_profiler as query_profiler_module
+from easylifeauth.db.db_manager import DatabaseManager
+from easylifeauth.db.query_profiler import (
+    QueryProfiler, current_route, init_query_profiler, query_profiling_enabled,
+    query_shape, summarize_explain
+)
+from easylifeauth.middleware.query_route import QueryRouteMiddleware
+from easylifeauth.middleware.route_classes import RouteClassifier
+from easylifeauth.security.access_control import CurrentUser, require_admin
+from mock_data import MOCK_EMAIL_ADMIN_TEST
+
+COLLSCAN_EXPLAIN = {
+    "queryPlanner": {"winningPlan": {"stage": "COLLSCAN", "filter": {"status": {"$eq": "active"}}}},
+    "executionStats": {"nReturned": 3, "totalDocsExamined": 5000, "totalKeysExamined": 0,
+                       "executionTimeMillis": 120},
+}
+
+
+def _started(command_name, command, request_id=1, database="testdb"):
+    return SimpleNamespace(command_name=command_name, command=command, request_id=request_id,
+                           connection_id=("localhost", 27017), database_name=database)
+
+
+def _succeeded(command_name, reply, duration_ms, request_id=1):
+    return SimpleNamespace(command_name=command_name, reply=reply, request_id=request_id,
+                           connection_id=("localhost", 27017), duration_micros=int(duration_ms * 1000))
+
+
+def _run(profiler, command_name, command, reply, duration_ms, request_id=1):
+    profiler.started(_started(command_name, command, request_id))
+    profiler.succeeded(_succeeded(command_name, reply, duration_ms, request_id))
+
+
+def _find(status, batch=2, cursor_id=0):
+    command = {"find": "users", "filter": {"status": status, "roles": {"$in": ["a", "b"]}},
+               "sort": {"created_at": -1}, "lsid": {"id": "x"}, "$db": "testdb"}
+    reply = {"cursor": {"id": cursor_id, "firstBatch": [{}] * batch}, "ok": 1}
+    return command, reply
+
+
+class TestQueryShape:
+    def test_values_are_replaced(self):
+        assert query_shape({"status": "active", "age": {"$gt": 3}}) == {"status": "?", "age": {"$gt": "?"}}
+
+    def test_value_lists_collapse(self):
+        assert query_shape({"key": {"$in": [1, 2, 3]}}) == query_shape({"key": {"$in": [4]}})
+
+    def test_nested_lists_keep_structure(self):
+        pipeline = [{"$match": {"a": 1}}, {"$group": {"_id": "$b", "n": {"$sum": 1}}}]
+        assert query_shape(pipeline) == [{"$match": {"a": "?"}}, {"$group": {"_id": "?", "n": {"$sum": "?"}}}]
+
+
+class TestSummarizeExplain:
+    def test_collection_scan(self):
+        plan = summarize_explain(COLLSCAN_EXPLAIN)
+        assert plan["collection_scan"] is True
+        assert plan["docs_examined"] == 5000
+        assert plan["n_returned"] == 3
+
+    def test_index_scan_in_aggregate_explain(self):
+        explain = {"stages": [{"$cursor": {
+            "queryPlanner": {"winningPlan": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN",
+                                                                             "indexName": "status_1"}}},
+            "executionStats": {"nReturned": 3, "totalDocsExamined": 3, "totalKeysExamined": 3},
+        }}]}
+        plan = summarize_explain(explain)
+        assert plan["stages"] == ["FETCH", "IXSCAN"]
+        assert plan["indexes"] == ["status_1"]
+        assert plan["collection_scan"] is False
+
+
+class TestQueryProfiler:
+    def test_calls_accumulate_per_shape(self):
+        profiler = QueryProfiler(slow_ms=1000, max_shapes=10)
+        token = current_route.set("GET /api/v1/users")
+        try:
+            _run(profiler, "find", *_find("active"), duration_ms=5, request_id=1)
+            _run(profiler, "find", *_find("inactive", batch=3), duration_ms=15, request_id=2)
+        finally:
+            current_route.reset(token)
+
+        [shape] = profiler.top()
+        assert shape["namespace"] == "testdb.users"
+        assert shape["count"] == 2
+        assert shape["total_ms"] == 20.0 and shape["max_ms"] == 15.0
+        assert shape["docs_returned"] == 5
+        assert shape["routes"] == {"GET /api/v1/users": 2}
+        assert profiler.stats()["commands"] == 2
+
+    def test_ignores_unprofiled_commands(self):
+        profiler = QueryProfiler()
+        _run(profiler, "ping", {"ping": 1}, {"ok": 1}, duration_ms=1)
+        assert profiler.top() == []
+
+    def test_get_more_counts_towards_the_original_query(self):
+        profiler = QueryProfiler(slow_ms=1000)
+        _run(profiler, "find", *_find("active", cursor_id=42), duration_ms=5, request_id=1)
+        _run(profiler, "getMore", {"getMore": 42, "collection": "users"},
+             {"cursor": {"id": 0, "nextBatch": [{}] * 4}}, duration_ms=3, request_id=2)
+
+        [shape] = profiler.top()
+        assert shape["count"] == 1
+        assert shape["docs_returned"] == 6
+        assert shape["total_ms"] == 8.0
+        assert profiler._cursors == {}
+
+    def test_failed_command(self):
+        profiler = QueryProfiler()
+        command, _ = _find("active")
+        profiler.started(_started("find", command))
+        profiler.failed(SimpleNamespace(command_name="find", request_id=1, connection_id=("localhost", 27017),
+                                        duration_micros=2000, failure={"errmsg": "boom"}))
+        [shape] = profiler.top()
+        assert shape["failures"] == 1
+
+    def test_evicts_cheapest_shape(self):
+        profiler = QueryProfiler(slow_ms=1000, max_shapes=2)
+        _run(profiler, "count", {"count": "a", "query": {}}, {"n": 1}, duration_ms=50, request_id=1)
+        _run(profiler, "count", {"count": "b", "query": {}}, {"n": 1}, duration_ms=1, request_id=2)
+        _run(profiler, "count", {"count": "c", "query": {}}, {"n": 1}, duration_ms=20, request_id=3)
+        assert [shape["namespace"] for shape in profiler.top()] == ["testdb.a", "testdb.c"]
+
+    def test_slow_query_is_explained_once_per_interval(self):
+        profiler = QueryProfiler(slow_ms=10, explain_interval=300, explain_sample_rate=1.0)
+        motor_client = MagicMock()
+        client = motor_client.delegate
+        client.__getitem__.return_value.command.return_value = COLLSCAN_EXPLAIN
+        profiler.attach(motor_client, "testdb")
+
+        _run(profiler, "find", *_find("active"), duration_ms=50, request_id=1)
+        _run(profiler, "find", *_find("active"), duration_ms=50, request_id=2)
+        profiler._explain_executor.shutdown(wait=True)
+
+        client.__getitem__.assert_called_once_with("testdb")
+        explain = client.__getitem__.return_value.command.call_args.args[0]
+        assert explain["verbosity"] == "executionStats"
+        assert "lsid" not in explain["explain"] and "$db" not in explain["explain"]
+        [shape] = profiler.top()
+        assert shape["slow_count"] == 2
+        assert shape["plan"]["collection_scan"] is True
+        assert profiler.stats()["collection_scans"] == 1
+
+    def test_explain_failure_is_counted(self):
+        profiler = QueryProfiler(slow_ms=10, explain_sample_rate=1.0)
+        client = MagicMock()
+        client.delegate.__getitem__.return_value.command.side_effect = Exception("not authorized")
+        profiler.attach(client, "testdb")
+        _run(profiler, "find", *_find("active"), duration_ms=50)
+        profiler._explain_executor.shutdown(wait=True)
+        assert profiler.stats()["explain_failures"] == 1
+        assert profiler._explains_pending == 0
+
+    def test_writing_pipelines_are_not_explained(self):
+        profiler = QueryProfiler(slow_ms=10, explain_sample_rate=1.0)
+        profiler.attach(MagicMock(), "testdb")
+        _run(profiler, "aggregate", {"aggregate": "logs", "pipeline": [{"$match": {}}, {"$out": "copy"}]},
+             {"cursor": {"id": 0, "firstBatch": []}}, duration_ms=50)
+        assert profiler._explain_executor is None
+
+    def test_reset(self):
+        profiler = QueryProfiler()
+        _run(profiler, "find", *_find("active"), duration_ms=5)
+        profiler.reset()
+        assert profiler.top() == [] and profiler.stats()["commands"] == 0
+
+
+class TestProfilingSetup:
+    def test_enabled_by_config_or_env(self, monkeypatch):
+        monkeypatch.delenv("DB_QUERY_PROFILING", raising=False)
+        assert query_profiling_enabled({}) is False
+        assert query_profiling_enabled({"query_profiling": "true"}) is True
+        monkeypatch.setenv("DB_QUERY_PROFILING", "true")
+        assert query_profiling_enabled(None) is True
+
+    @patch("easylifeauth.db.db_manager.AsyncIOMotorClient")
+    def test_database_manager_registers_listener(self, mock_client, monkeypatch):
+        monkeypatch.setattr(query_profiler_module, "_query_profiler", None)
+        manager = DatabaseManager(config={"host": "localhost:27017", "database": "testdb",
+                                          "query_profiling": True, "query_profiler": {"slow_ms": 5}})
+        assert manager.query_profiler.slow_ms == 5
+        assert mock_client.call_args.kwargs["event_listeners"] == [manager.query_profiler]
+        assert "testdb" in manager.query_profiler._clients
+
+    @patch("easylifeauth.db.db_manager.AsyncIOMotorClient")
+    def test_database_manager_without_profiling(self, mock_client, monkeypatch):
+        monkeypatch.delenv("DB_QUERY_PROFILING", raising=False)
+        manager = DatabaseManager(config={"host": "localhost:27017", "database": "testdb"})
+        assert manager.query_profiler is None
+        assert "event_listeners" not in mock_client.call_args.kwargs
+
+    def test_middleware_sets_route(self):
+        app = FastAPI()
+        seen = []
+
+        @app.get("/items/{item_id}")
+        async def item(item_id: str):
+            seen.append(current_route.get())
+            return {}
+
+        app.add_middleware(QueryRouteMiddleware, route_classifier=RouteClassifier(app.routes))
+        TestClient(app).get("/items/7")
+        assert seen == ["GET /items/{item_id}"]
+        assert current_route.get() is None
+
+
+class TestSlowQueryRoutes:
+    @pytest.fixture
+    def client(self):
+        app = FastAPI()
+        app.include_router(router)
+        app.dependency_overrides[require_admin] = lambda: CurrentUser(
+            user_id="test", email=MOCK_EMAIL_ADMIN_TEST, roles=["administrator"], groups=[], domains=[]
+        )
+        return TestClient(app)
+
+    def test_disabled(self, client, monkeypatch):
+        monkeypatch.setattr(query_profiler_module, "_query_profiler", None)
+        assert client.get("/health/queries").json() == {"enabled": False, "queries": []}
+
+    def test_lists_and_resets_shapes(self, client, monkeypatch):
+        monkeypatch.setattr(query_profiler_module, "_query_profiler", None)
+        profiler = init_query_profiler({"slow_ms": 1000})
+        _run(profiler, "find", *_find("active"), duration_ms=5)
+
+        data = client.get("/health/queries", params={"sort": "max_ms", "limit": 5}).json()
+        assert data["enabled"] is True
+        assert data["queries"][0]["namespace"] == "testdb.users"
+        assert client.get("/health/queries", params={"sort": "bogus"}).status_code == 400
+
+        assert client.delete("/health/queries").json() == {"enabled": True, "reset": True}
+        assert profiler.top() == []
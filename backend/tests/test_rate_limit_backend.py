@@ -0,0 +1,181 @@
+"""Tests for the GCRA rate limit backends"""
+import sys
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from easylifeauth.middleware.rate_limit_backend import (
+    InMemoryRateLimitBackend, RateLimitBackend, RedisRateLimitBackend, create_rate_limit_backend
+)
+
+SECOND = 1_000_000_000
+
+
+class _Clock:
+    """Controllable monotonic clock in nanoseconds"""
+
+    def __init__(self):
+        self.now = 10 * SECOND
+
+    def advance(self, seconds):
+        self.now += int(seconds * SECOND)
+
+
+@pytest.fixture
+def clock():
+    clock = _Clock()
+    with patch.object(InMemoryRateLimitBackend, "_now", side_effect=lambda: clock.now):
+        yield clock
+
+
+class TestInMemoryRateLimitBackend:
+    """GCRA semantics of the process-local backend"""
+
+    @pytest.mark.asyncio
+    async def test_allows_burst_up_to_limit(self, clock):
+        backend = InMemoryRateLimitBackend()
+        rules = [("ip:minute", 3, 60)]
+        remaining = [(await backend.hit(rules)).remaining for _ in range(3)]
+        assert remaining == [2, 1, 0]
+
+        decision = await backend.hit(rules)
+        assert not decision.allowed
+        assert decision.rule_index == 0
+        assert decision.retry_after == pytest.approx(20)
+
+    @pytest.mark.asyncio
+    async def test_refills_one_request_per_interval(self, clock):
+        backend = InMemoryRateLimitBackend()
+        rules = [("ip:minute", 3, 60)]
+        for _ in range(3):
+            await backend.hit(rules)
+
+        clock.advance(19)
+        assert not (await backend.hit(rules)).allowed
+        clock.advance(1)
+        assert (await backend.hit(rules)).allowed
+        assert not (await backend.hit(rules)).allowed
+
+        # After a full period the bucket is full again
+        clock.advance(60)
+        assert (await backend.hit(rules)).remaining == 2
+
+    @pytest.mark.asyncio
+    async def test_rejection_does_not_consume_other_rules(self, clock):
+        backend = InMemoryRateLimitBackend()
+        await backend.hit([("ip:auth", 1, 60), ("ip:minute", 10, 60)])
+
+        decision = await backend.hit([("ip:auth", 1, 60), ("ip:minute", 10, 60)])
+        assert not decision.allowed
+        assert decision.rule_index == 0
+
+        # Only the allowed request was counted against the minute bucket
+        assert (await backend.hit([("ip:minute", 10, 60)])).remaining == 8
+
+    @pytest.mark.asyncio
+    async def test_second_rule_rejects(self, clock):
+        backend = InMemoryRateLimitBackend()
+        rules = [("ip:minute", 100, 60), ("ip:hour", 1, 3600)]
+        await backend.hit(rules)
+        decision = await backend.hit(rules)
+        assert not decision.allowed
+        assert decision.rule_index == 1
+
+    @pytest.mark.asyncio
+    async def test_one_integer_per_bucket(self, clock):
+        backend = InMemoryRateLimitBackend()
+        for _ in range(1000):
+            await backend.hit([("ip:minute", 10_000, 60), ("ip:hour", 100_000, 3600)])
+        assert len(backend) == 2
+        assert all(isinstance(tat, int) for tat in backend._tats.values())
+
+    @pytest.mark.asyncio
+    async def test_prune_drops_refilled_buckets(self, clock):
+        backend = InMemoryRateLimitBackend()
+        await backend.hit([("a:minute", 10, 60)])
+        clock.advance(30)
+        await backend.hit([("b:minute", 10, 60)])
+
+        assert await backend.prune() == 1
+        assert set(backend._tats) == {"b:minute"}
+
+    def test_max_keys_from_env(self, monkeypatch):
+        monkeypatch.setenv("RATE_LIMIT_MAX_KEYS", "42")
+        assert InMemoryRateLimitBackend().max_keys == 42
+
+
+class TestRedisRateLimitBackend:
+    """Redis backend delegates the GCRA update to a Lua script"""
+
+    def _backend(self, script):
+        redis_client = MagicMock()
+        redis_client.register_script = MagicMock(return_value=script)
+        redis_client.aclose = AsyncMock()
+        return RedisRateLimitBackend(redis_client, key_prefix="rl:")
+
+    @pytest.mark.asyncio
+    async def test_passes_keys_and_args(self):
+        script = AsyncMock(return_value=[1, -1, 9, 0, 6_000_000])
+        backend = self._backend(script)
+
+        decision = await backend.hit([("ip:minute", 10, 60), ("ip:hour", 100, 3600)])
+
+        script.assert_awaited_once_with(keys=["rl:ip:minute", "rl:ip:hour"], args=[10, 60, 100, 3600])
+        assert decision.allowed
+        assert decision.remaining == 9
+        assert decision.reset_after == 6
+
+    @pytest.mark.asyncio
+    async def test_rejection(self):
+        backend = self._backend(AsyncMock(return_value=[0, 1, 0, 2_500_000, 0]))
+        decision = await backend.hit([("ip:minute", 10, 60), ("ip:hour", 1, 3600)])
+        assert not decision.allowed
+        assert decision.rule_index == 1
+        assert decision.retry_after == 2.5
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_local_limits(self):
+        script = AsyncMock(side_effect=ConnectionError("down"))
+        backend = self._backend(script)
+        rules = [("ip:minute", 1, 60)]
+
+        assert (await backend.hit(rules)).allowed
+        assert not (await backend.hit(rules)).allowed
+        assert backend._degraded
+
+        script.side_effect = None
+        script.return_value = [1, -1, 0, 0, 60_000_000]
+        assert (await backend.hit(rules)).allowed
+        assert not backend._degraded
+
+    @pytest.mark.asyncio
+    async def test_close(self):
+        backend = self._backend(AsyncMock())
+        await backend.close()
+        backend.redis.aclose.assert_awaited_once()
+
+
+class TestCreateRateLimitBackend:
+    """Factory selection"""
+
+    def test_defaults_to_in_memory(self, monkeypatch):
+        monkeypatch.delenv("RATE_LIMIT_REDIS_URL", raising=False)
+        assert isinstance(create_rate_limit_backend(), InMemoryRateLimitBackend)
+
+    def test_uses_redis_when_configured(self):
+        fake_module = MagicMock()
+        with patch.dict(sys.modules, {"redis.asyncio": fake_module}):
+            backend = create_rate_limit_backend("redis://localhost:6379/0")
+        assert isinstance(backend, RedisRateLimitBackend)
+        fake_module.from_url.assert_called_once_with("redis://localhost:6379/0")
+
+    def test_falls_back_without_redis_package(self):
+        with patch.dict(sys.modules, {"redis.asyncio": None}):
+            backend = create_rate_limit_backend("redis://localhost:6379/0")
+        assert isinstance(backend, InMemoryRateLimitBackend)
+
+    def test_incomplete_backend_fails_on_construction(self):
+        class NoHit(RateLimitBackend):
+            pass
+
+        with pytest.raises(TypeError):
+            NoHit()
@@ -467,6 +467,7 @@ class TestRolesRoutesExtended:
                 yield r
 
         mock_db.roles.count_documents = AsyncMock(return_value=2)
+        mock_db.roles.estimated_document_count = AsyncMock(return_value=2)
         mock_cursor = MagicMock()
         mock_cursor.skip.return_value = mock_cursor
         mock_cursor.limit.return_value = mock_cursor
@@ -204,6 +204,7 @@ class TestGroupRouteAccess:
 
             db = _mock_db()
             db.groups.count_documents = AsyncMock(return_value=0)
+            db.groups.estimated_document_count = AsyncMock(return_value=0)
             mock_cursor = MagicMock()
             mock_cursor.skip.return_value = mock_cursor
             mock_cursor.limit.return_value = mock_cursor
@@ -0,0 +1,163 @@
+"""Tests for the route classifier used by the middleware exemption checks"""
+import pytest
+from fastapi import FastAPI, HTTPException
+from starlette.routing import Mount, Route
+
+from easylifeauth.middleware.csrf import CSRFProtectMiddleware
+from easylifeauth.middleware.db_health import DatabaseHealthMiddleware
+from easylifeauth.middleware.rate_limit import RateLimitMiddleware
+from easylifeauth.middleware.rate_limit_backend import InMemoryRateLimitBackend
+from easylifeauth.middleware.request_context import RequestContext
+from easylifeauth.middleware.route_classes import RouteClass, RouteClassifier
+
+
+async def _endpoint(request):
+    pass
+
+
+ROUTES = [
+    Route("/", _endpoint),
+    Route("/health", _endpoint),
+    Route("/health/live", _endpoint),
+    Route("/docs", _endpoint),
+    Route("/api/v1/auth/login", _endpoint),
+    Route("/api/v1/users/{user_id}", _endpoint),
+    Route("/api/v1/users/me", _endpoint),
+    Route("/api/v1/users/{user_id}/roles/{role_id}", _endpoint),
+    Route("/api/v1/files/{file_path:path}", _endpoint),
+    Mount("/static", app=_endpoint),
+]
+
+
+@pytest.fixture
+def classifier():
+    return RouteClassifier(ROUTES)
+
+
+class TestRouteLookup:
+    """Paths resolve to their registered templates"""
+
+    def test_static_route(self, classifier):
+        assert classifier.classify("/health/live").template == "/health/live"
+
+    def test_static_segment_wins_over_param(self, classifier):
+        assert classifier.classify("/api/v1/users/me").template == "/api/v1/users/me"
+
+    def test_param_routes(self, classifier):
+        assert classifier.classify("/api/v1/users/42").template == "/api/v1/users/{user_id}"
+        assert classifier.classify("/api/v1/users/42/roles/7").template == \
+            "/api/v1/users/{user_id}/roles/{role_id}"
+
+    def test_catch_all_and_mount(self, classifier):
+        assert classifier.classify("/api/v1/files/a/b/c.csv").template == "/api/v1/files/{file_path:path}"
+        assert classifier.classify("/static/js/app.js").template == "/static/{path:path}"
+
+    def test_unrouted_path(self, classifier):
+        match = classifier.classify("/api/v1/users/42/unknown")
+        assert match.template is None
+        assert match.route_class == RouteClass.NONE
+
+    def test_cache_is_bounded(self):
+        classifier = RouteClassifier(ROUTES, cache_size=2)
+        for user_id in range(10):
+            classifier.classify(f"/api/v1/users/{user_id}")
+        assert len(classifier._cache) == 2
+
+
+class TestRouteClasses:
+    """Flags assigned to templates"""
+
+    def test_builtin_classes(self, classifier):
+        assert classifier.classify("/").route_class == RouteClass.ROOT
+        assert classifier.classify("/health/live").route_class == RouteClass.HEALTH
+        assert classifier.classify("/docs").route_class == RouteClass.DOCS
+        assert classifier.classify("/api/v1/auth/login").route_class == \
+            RouteClass.AUTH | RouteClass.CREDENTIALS
+        assert classifier.classify("/api/v1/auth/profile").route_class == RouteClass.AUTH
+        assert classifier.classify("/api/v1/users/42").route_class == RouteClass.NONE
+
+    def test_root_does_not_prefix_match(self, classifier):
+        assert not classifier.classify("/api/v1/users/42").route_class & RouteClass.ROOT
+
+    def test_tag_exact_and_prefix(self, classifier):
+        classifier.tag(RouteClass.CSRF_EXEMPT, {"/api/v1/auth/login", "/api/v1/files/*"})
+        assert classifier.classify("/api/v1/auth/login").route_class == \
+            RouteClass.AUTH | RouteClass.CREDENTIALS | RouteClass.CSRF_EXEMPT
+        assert classifier.classify("/api/v1/files/x.csv").route_class & RouteClass.CSRF_EXEMPT
+        assert not classifier.classify("/api/v1/users/42").route_class & RouteClass.CSRF_EXEMPT
+
+    def test_tag_applies_to_parametrized_template_not_raw_path(self, classifier):
+        classifier.tag(RouteClass.RATE_LIMIT_EXEMPT, {"/api/v1/users/{user_id}"})
+        assert classifier.classify("/api/v1/users/42").route_class & RouteClass.RATE_LIMIT_EXEMPT
+
+    def test_unrouted_path_uses_same_rules(self):
+        classifier = RouteClassifier()
+        classifier.tag(RouteClass.CSRF_EXEMPT, {"/webhooks/*"})
+        assert classifier.classify("/health/ready").route_class == RouteClass.HEALTH
+        assert classifier.classify("/webhooks/github").route_class == RouteClass.CSRF_EXEMPT
+
+
+class TestRequestContextRoute:
+    """RequestContext resolves the route once, without root_path"""
+
+    def test_strips_root_path(self, classifier):
+        context = RequestContext({
+            "type": "http", "path": "/proxy/base/health/live", "root_path": "/proxy/base",
+        })
+        assert context.route_path == "/health/live"
+        assert context.route(classifier).route_class == RouteClass.HEALTH
+
+    def test_route_is_cached_per_classifier(self, classifier):
+        context = RequestContext({"type": "http", "path": "/api/v1/users/1"})
+        first = context.route(classifier)
+        assert context.route(classifier) is first
+        assert context.route(RouteClassifier()).template is None
+
+
+class TestMiddlewareExemptions:
+    """Middlewares share one classifier"""
+
+    def test_middlewares_tag_shared_classifier(self, classifier):
+        CSRFProtectMiddleware(None, secret_key="x", exempt_paths={"/api/v1/auth/login"},
+                              route_classifier=classifier)
+        RateLimitMiddleware(None, backend=InMemoryRateLimitBackend(), route_classifier=classifier)
+        DatabaseHealthMiddleware(None, route_classifier=classifier)
+
+        login = classifier.classify("/api/v1/auth/login").route_class
+        assert login & RouteClass.CSRF_EXEMPT
+        assert classifier.classify("/health/live").route_class & RouteClass.DB_HEALTH_EXEMPT
+        assert not classifier.classify("/health").route_class & RouteClass.DB_HEALTH_EXEMPT
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_default_does_not_exempt_every_path(self):
+        middleware = RateLimitMiddleware(None, backend=InMemoryRateLimitBackend())
+        assert middleware._rules("1.2.3.4", RouteClass.NONE)
+        context = RequestContext({"type": "http", "path": "/api/v1/users"})
+        assert not context.route(middleware.route_classifier).route_class & middleware.exempt_routes
+        context = RequestContext({"type": "http", "path": "/health"})
+        assert context.route(middleware.route_classifier).route_class & middleware.exempt_routes
+
+    @pytest.mark.asyncio
+    async def test_auth_limit_only_applies_to_credential_routes(self):
+        middleware = RateLimitMiddleware(
+            None, requests_per_minute=100, auth_requests_per_minute=1, backend=InMemoryRateLimitBackend()
+        )
+        for path in ("/api/v1/auth/profile", "/api/v1/auth/csrf-token", "/api/v1/auth/refresh"):
+            for _ in range(3):
+                await middleware._check_rate_limit("1.2.3.4", path)
+
+        await middleware._check_rate_limit("1.2.3.4", "/api/v1/auth/login")
+        with pytest.raises(HTTPException):
+            await middleware._check_rate_limit("1.2.3.4", "/api/v1/auth/forgot_password")
+
+    def test_app_classifier_loaded_with_routes(self):
+        app = FastAPI()
+
+        @app.get("/api/v1/items/{item_id}")
+        async def get_item(item_id: str):
+            return {}
+
+        classifier = RouteClassifier()
+        classifier.load_routes(app.routes)
+        assert classifier.classify("/api/v1/items/9").template == "/api/v1/items/{item_id}"
+        assert classifier.classify("/openapi.json").route_class == RouteClass.DOCS
@@ -0,0 +1,203 @@
+"""Tests for the trigram listing search index"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from pymongo import ReplaceOne
+
+import easylifeauth.services.search_index as search_index
+from easylifeauth.services.search_index import (
+    MAX_QUERY_GRAMS,
+    SearchIndexService,
+    build_entry,
+    grams,
+    init_search_index_service,
+    query_grams,
+    regex_search_filter,
+)
+from conftest import FakeCursor, matches_query
+
+
+class FakeTokens:
+    """In-memory stand-in for the search_tokens collection"""
+
+    def __init__(self):
+        self.docs = {}
+
+    async def find_one(self, query):
+        doc = self.docs.get(query["_id"])
+        return dict(doc) if doc else None
+
+    def find(self, query, projection=None):
+        return FakeCursor([dict(d) for d in self.docs.values() if matches_query(d, query)])
+
+    async def replace_one(self, query, doc, upsert=False):
+        self.docs[query["_id"]] = dict(doc)
+
+    async def delete_one(self, query):
+        self.docs.pop(query["_id"], None)
+
+    async def update_one(self, query, update, upsert=False):
+        doc = self.docs.get(query["_id"])
+        if doc is None:
+            doc = {"_id": query["_id"]}
+            self.docs[query["_id"]] = doc
+        elif not matches_query(doc, query):
+            return
+        for key, delta in update.get("$inc", {}).items():
+            doc[key] = doc.get(key, 0) + delta
+        doc.update(update.get("$set", {}))
+
+    async def bulk_write(self, operations, ordered=True):
+        for op in operations:
+            if isinstance(op, ReplaceOne):
+                self.docs[op._filter["_id"]] = dict(op._doc)
+            else:
+                self.docs.pop(op._filter["_id"], None)
+
+
+class FakeSource:
+    def __init__(self, docs):
+        self.docs = {doc["_id"]: dict(doc) for doc in docs}
+
+    async def find_one(self, query, projection=None):
+        return self.docs.get(query["_id"])
+
+    def find(self, query, projection=None):
+        return FakeCursor(self.docs.values())
+
+
+USERS = [
+    {"_id": 1, "email": "alice@example.com", "username": "alice", "full_name": "Alice Admin"},
+    {"_id": 2, "email": "bob@example.com", "username": "bob", "full_name": "Bob Builder"},
+]
+
+
+@pytest.fixture
+def service():
+    db = MagicMock(search_tokens=FakeTokens(), users=FakeSource(USERS))
+    return SearchIndexService(db, {"reconcile_seconds": 0, "max_candidates": 10})
+
+
+class TestTokens:
+    def test_grams_are_lower_case_and_distinct(self):
+        assert grams("AbAbA") == ["aba", "bab"]
+        assert grams("ab") == []
+        assert grams(None) == []
+
+    def test_query_grams_are_capped(self):
+        term_grams = query_grams("abcdefghijklmnopqrstuvwxyz")
+        assert len(term_grams) == MAX_QUERY_GRAMS
+        assert term_grams[0] == "abc" and term_grams[-1] == "xyz"
+
+    def test_regex_filter_is_escaped(self):
+        assert regex_search_filter("roles", "a.b", fields=("name",)) == {
+            "$or": [{"name": {"$regex": r"a\.b", "$options": "i"}}]
+        }
+
+    def test_build_entry(self):
+        entry = build_entry("users", USERS[1])
+        assert entry["_id"] == "users:2" and entry["doc_id"] == 2
+        assert {"bob", "exa", "bui"} <= set(entry["tokens"])
+        assert build_entry("users", dict(USERS[1]))["key"] == entry["key"]
+        assert build_entry("users", {**USERS[1], "full_name": "Bob"})["key"] != entry["key"]
+
+
+class TestSearchFilter:
+    @pytest.mark.asyncio
+    async def test_stale_index_uses_regex(self, service):
+        assert await service.search_filter("users", "alice") == regex_search_filter("users", "alice")
+
+    @pytest.mark.asyncio
+    async def test_short_terms_use_regex(self, service):
+        await service.reconcile_one("users")
+        assert await service.search_filter("users", "al") == regex_search_filter("users", "al")
+
+    @pytest.mark.asyncio
+    async def test_reconciled_index_narrows_candidates(self, service):
+        assert await service.reconcile_one("users") == 2
+        assert await service.search_filter("users", "ALIC") == {
+            "$and": [{"_id": {"$in": [1]}}, regex_search_filter("users", "ALIC")]
+        }
+        assert (await service.search_filter("users", "example"))["$and"][0] == {"_id": {"$in": [1, 2]}}
+
+    @pytest.mark.asyncio
+    async def test_unselective_terms_use_regex(self, service):
+        await service.reconcile_one("users")
+        service.max_candidates = 1
+        assert await service.search_filter("users", "example") == regex_search_filter("users", "example")
+
+    @pytest.mark.asyncio
+    async def test_lookup_failure_uses_regex(self, service):
+        service.db.search_tokens.find_one = AsyncMock(side_effect=Exception("down"))
+        assert await service.search_filter("users", "alice") == regex_search_filter("users", "alice")
+
+    @pytest.mark.asyncio
+    async def test_module_helper_ignores_other_databases(self, service, monkeypatch):
+        monkeypatch.setattr(search_index, "_search_index_service", service)
+        await service.reconcile_one("users")
+        assert "$and" in await search_index.search_filter(service.db, "users", "alice")
+        assert await search_index.search_filter(MagicMock(), "users", "alice") == \
+            regex_search_filter("users", "alice")
+
+
+class TestMaintenance:
+    @pytest.mark.asyncio
+    async def test_index_document_upserts_and_removes(self, service):
+        tokens = service.db.search_tokens
+        service.db.users.docs[3] = {"_id": 3, "email": "carol@example.com"}
+        await service.index_document("users", 3)
+        assert "car" in tokens.docs["users:3"]["tokens"]
+
+        del service.db.users.docs[3]
+        await service.index_document("users", 3)
+        assert "users:3" not in tokens.docs
+
+    @pytest.mark.asyncio
+    async def test_failed_write_marks_stale(self, service):
+        await service.reconcile_one("users")
+        service.db.search_tokens.replace_one = AsyncMock(side_effect=Exception("down"))
+        await service.index_document("users", 1)
+        assert service.db.search_tokens.docs["meta:users"]["stale"] is True
+
+    @pytest.mark.asyncio
+    async def test_mark_stale_survives_a_concurrent_reconcile(self, service):
+        tokens = service.db.search_tokens
+        await service.reconcile_one("users")
+        assert tokens.docs["meta:users"]["stale"] is False
+
+        original_find = service.db.users.find
+
+        def find_and_mark(query, projection=None):
+            tokens.docs["meta:users"]["generation"] = tokens.docs["meta:users"].get("generation", 0) + 1
+            tokens.docs["meta:users"]["stale"] = True
+            return original_find(query, projection)
+
+        service.db.users.find = find_and_mark
+        await service.reconcile_one("users")
+        assert tokens.docs["meta:users"]["stale"] is True
+
+    @pytest.mark.asyncio
+    async def test_reconcile_only_rewrites_drifted_entries(self, service):
+        tokens = service.db.search_tokens
+        assert await service.reconcile_one("users") == 2
+        assert await service.reconcile_one("users") == 0
+
+        service.db.users.docs[2]["full_name"] = "Robert"
+        tokens.docs["users:99"] = {"_id": "users:99", "entity": "users", "doc_id": 99, "tokens": []}
+        assert await service.reconcile_one("users") == 2
+        assert "rob" in tokens.docs["users:2"]["tokens"]
+        assert "users:99" not in tokens.docs
+
+    @pytest.mark.asyncio
+    async def test_module_helpers(self, monkeypatch):
+        monkeypatch.setattr(search_index, "_search_index_service", None)
+        await search_index.index_search_document("users", 1)
+        await search_index.mark_search_index_stale("users")
+
+        db = MagicMock(search_tokens=FakeTokens(), users=FakeSource(USERS))
+        service = init_search_index_service(db, {"reconcile_seconds": 0})
+        assert search_index.get_search_index_service() is service
+        await search_index.index_search_document("users", 1)
+        await search_index.mark_search_index_stale("users")
+        assert set(db.search_tokens.docs) == {"users:1", "meta:users"}
+        assert db.search_tokens.docs["meta:users"] == {"_id": "meta:users", "stale": True, "generation": 1}
+        monkeypatch.setattr(search_index, "_search_index_service", None)
@@ -0,0 +1,209 @@
+"""Tests for the verified-token cache"""
+import time
+import pytest
+from datetime import datetime, timezone, timedelta
+from unittest.mock import AsyncMock, MagicMock
+import jwt
+
+from easylifeauth.services.token_cache import TokenCache, token_digest
+from easylifeauth.services.token_manager import TokenManager
+from mock_data import MOCK_EMAIL
+
+OID_9011 = "507f1f77bcf86cd799439011"
+OID_9012 = "507f1f77bcf86cd799439012"
+TEST_SECRET_KEY = "test_secret_key"
+TEST_ISSUER = "easylife-auth"
+TEST_AUDIENCE = "easylife-api"
+
+
+def _payload(user_id=OID_9011, exp_in=900):
+    return {"user_id": user_id, "email": MOCK_EMAIL, "type": "access", "exp": int(time.time()) + exp_in}
+
+
+class TestTokenCache:
+    """Tests for TokenCache"""
+
+    def test_digest_is_stable(self):
+        assert token_digest("abc") == token_digest("abc")
+        assert token_digest("abc") != token_digest("abd")
+
+    def test_set_and_get(self):
+        cache = TokenCache(max_size=10, ttl_seconds=60, enabled=True)
+        cache.set("tok", _payload())
+        assert cache.get("tok")["user_id"] == OID_9011
+        assert cache.stats()["hits"] == 1
+
+    def test_miss(self):
+        cache = TokenCache(max_size=10, ttl_seconds=60, enabled=True)
+        assert cache.get("unknown") is None
+        assert cache.stats()["misses"] == 1
+
+    def test_returns_copy(self):
+        cache = TokenCache(max_size=10, ttl_seconds=60, enabled=True)
+        cache.set("tok", _payload())
+        cache.get("tok")["user_id"] = "tampered"
+        assert cache.get("tok")["user_id"] == OID_9011
+
+    def test_expired_token_not_cached(self):
+        cache = TokenCache(max_size=10, ttl_seconds=60, enabled=True)
+        cache.set("tok", _payload(exp_in=-5))
+        assert len(cache) == 0
+
+    def test_entry_expires_with_ttl(self, monkeypatch):
+        cache = TokenCache(max_size=10, ttl_seconds=60, enabled=True)
+        cache.set("tok", _payload())
+        now = time.monotonic()
+        monkeypatch.setattr(time, "monotonic", lambda: now + 61)
+        assert cache.get("tok") is None
+        assert len(cache) == 0
+
+    def test_lru_eviction(self):
+        cache = TokenCache(max_size=2, ttl_seconds=60, enabled=True)
+        cache.set("a", _payload())
+        cache.set("b", _payload())
+        cache.get("a")
+        cache.set("c", _payload())
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.stats()["evictions"] == 1
+
+    def test_invalidate_single_token(self):
+        cache = TokenCache(max_size=10, ttl_seconds=60, enabled=True)
+        cache.set("a", _payload())
+        cache.set("b", _payload())
+        cache.invalidate("a")
+        assert cache.get("a") is None
+        assert cache.get("b") is not None
+
+    def test_invalidate_user(self):
+        cache = TokenCache(max_size=10, ttl_seconds=60, enabled=True)
+        cache.set("a", _payload())
+        cache.set("b", _payload())
+        cache.set("c", _payload(user_id=OID_9012))
+        assert cache.invalidate_user(OID_9011) == 2
+        assert cache.get("a") is None
+        assert cache.get("c") is not None
+
+    def test_disabled(self):
+        cache = TokenCache(max_size=10, ttl_seconds=60, enabled=False)
+        cache.set("tok", _payload())
+        assert cache.get("tok") is None
+
+    def test_env_defaults(self, monkeypatch):
+        monkeypatch.setenv("TOKEN_CACHE_MAX_SIZE", "5")
+        monkeypatch.setenv("TOKEN_CACHE_TTL_SECONDS", "7")
+        monkeypatch.setenv("TOKEN_CACHE_ENABLED", "false")
+        cache = TokenCache()
+        assert cache.max_size == 5
+        assert cache.ttl_seconds == 7
+        assert cache.enabled is False
+
+    def test_clear(self):
+        cache = TokenCache(max_size=10, ttl_seconds=60, enabled=True)
+        cache.set("tok", _payload())
+        cache.clear()
+        assert len(cache) == 0
+
+
+class TestTokenManagerCaching:
+    """verify_token should hit MongoDB once per token until invalidated"""
+
+    @pytest.fixture
+    def mock_db(self):
+        db = MagicMock()
+        db.tokens = MagicMock()
+        db.tokens.find_one = AsyncMock(return_value=None)
+        db.tokens.insert_one = AsyncMock()
+        db.tokens.update_one = AsyncMock()
+        return db
+
+    @pytest.fixture
+    def token_manager(self, mock_db):
+        return TokenManager(
+            secret_key=TEST_SECRET_KEY,
+            db=mock_db,
+            issuer=TEST_ISSUER,
+            audience=TEST_AUDIENCE,
+            token_cache=TokenCache(max_size=100, ttl_seconds=300, enabled=True),
+        )
+
+    def _access_token(self):
+        now = datetime.now(timezone.utc)
+        return jwt.encode({
+            "sub": "access_token", "iss": TEST_ISSUER, "aud": TEST_AUDIENCE,
+            "user_id": OID_9011, "email": MOCK_EMAIL, "roles": ["user"],
+            "iat": now, "exp": now + timedelta(minutes=15), "type": "access",
+        }, TEST_SECRET_KEY, algorithm="HS256")
+
+    def _backend_record(self, token):
+        return {
+            "user_id": OID_9011, "email": MOCK_EMAIL, "token_hash": token,
+            "refresh_token_hash": "r", "expires_at": datetime.now(timezone.utc) + timedelta(hours=1),
+        }
+
+    @pytest.mark.asyncio
+    async def test_second_verify_skips_db(self, token_manager, mock_db):
+        token = self._access_token()
+        mock_db.tokens.find_one = AsyncMock(return_value=self._backend_record(token))
+
+        await token_manager.verify_token(token)
+        result = await token_manager.verify_token(token)
+
+        assert result["user_id"] == OID_9011
+        assert mock_db.tokens.find_one.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_rejected_token_not_cached(self, token_manager, mock_db):
+        from easylifeauth.errors.auth_error import AuthError
+        token = self._access_token()
+
+        with pytest.raises(AuthError):
+            await token_manager.verify_token(token)
+        assert len(token_manager.token_cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_cached_access_token_rejected_as_refresh(self, token_manager, mock_db):
+        from easylifeauth.errors.auth_error import AuthError
+        token = self._access_token()
+        mock_db.tokens.find_one = AsyncMock(return_value=self._backend_record(token))
+        await token_manager.verify_token(token)
+
+        with pytest.raises(AuthError):
+            await token_manager.verify_token(token, token_type="refresh")
+
+    @pytest.mark.asyncio
+    async def test_sync_access_token_invalidates(self, token_manager, mock_db):
+        token = self._access_token()
+        mock_db.tokens.find_one = AsyncMock(return_value=self._backend_record(token))
+        await token_manager.verify_token(token)
+
+        await token_manager.sync_access_token(OID_9011, MOCK_EMAIL, "new", "new_refresh")
+
+        assert len(token_manager.token_cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_sync_access_token_revokes_after_write(self, token_manager, mock_db):
+        token = self._access_token()
+        mock_db.tokens.find_one = AsyncMock(return_value=self._backend_record(token))
+
+        async def concurrent_verify(*args, **kwargs):
+            # Another request verifies the old token while the pair is being replaced
+            await token_manager.verify_token(token)
+
+        mock_db.tokens.update_one = AsyncMock(side_effect=concurrent_verify)
+
+        await token_manager.sync_access_token(OID_9011, MOCK_EMAIL, "new", "new_refresh")
+
+        assert len(token_manager.token_cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_logout_invalidates(self, token_manager, mock_db):
+        from easylifeauth.services.user_service import UserService
+        token = self._access_token()
+        mock_db.tokens.find_one = AsyncMock(return_value=self._backend_record(token))
+        mock_db.tokens.delete_many = AsyncMock()
+        await token_manager.verify_token(token)
+
+        await UserService(mock_db, token_manager).logout_user(OID_9011, MOCK_EMAIL)
+
+        assert len(token_manager.token_cache) == 0
@@ -0,0 +1,291 @@
+"""Tests for the cross-worker token revocation bus"""
+import asyncio
+import json
+import sys
+import time
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from easylifeauth.services.token_cache import TokenCache
+from easylifeauth.services.token_manager import TokenManager
+from easylifeauth.services.token_revocation import (
+    InMemoryRevocationBus, RedisRevocationBus, create_revocation_bus
+)
+from mock_data import MOCK_EMAIL
+
+OID_9011 = "507f1f77bcf86cd799439011"
+OID_9012 = "507f1f77bcf86cd799439012"
+
+
+def _payload(user_id=OID_9011):
+    return {"user_id": user_id, "email": MOCK_EMAIL, "type": "access", "exp": int(time.time()) + 900}
+
+
+def _worker(bus):
+    db = MagicMock()
+    db.tokens = MagicMock()
+    db.tokens.find_one = AsyncMock(return_value=None)
+    db.tokens.insert_one = AsyncMock()
+    return TokenManager(
+        secret_key="secret", db=db,
+        token_cache=TokenCache(max_size=100, ttl_seconds=300, enabled=True),
+        revocation_bus=bus,
+    )
+
+
+class FakePubSub:
+    """Minimal stand-in for redis.asyncio PubSub backed by an asyncio.Queue"""
+
+    def __init__(self, broker):
+        self.broker = broker
+        self.queue = asyncio.Queue()
+        self.closed = False
+
+    async def subscribe(self, channel):
+        self.broker.setdefault(channel, []).append(self.queue)
+
+    async def unsubscribe(self, channel):
+        self.broker.get(channel, []).remove(self.queue)
+
+    async def close(self):
+        self.closed = True
+
+    async def get_message(self, ignore_subscribe_messages=True, timeout=1.0):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class FakeRedis:
+    """In-memory fake of the redis pub/sub API used by RedisRevocationBus"""
+
+    def __init__(self, broker=None):
+        self.broker = broker if broker is not None else {}
+
+    def pubsub(self):
+        return FakePubSub(self.broker)
+
+    async def publish(self, channel, message):
+        for queue in self.broker.get(channel, []):
+            queue.put_nowait({"type": "message", "data": message.encode("utf-8")})
+
+
+class TestInMemoryRevocationBus:
+    """Workers sharing an in-memory bus"""
+
+    @pytest.mark.asyncio
+    async def test_revocation_reaches_other_workers(self):
+        bus = InMemoryRevocationBus()
+        worker_a, worker_b = _worker(bus), _worker(bus)
+        await worker_a.start_revocation_listener()
+        await worker_b.start_revocation_listener()
+        worker_a.token_cache.set("tok", _payload())
+        worker_b.token_cache.set("tok", _payload())
+        worker_b.token_cache.set("other", _payload(OID_9012))
+
+        await worker_a.revoke_user_tokens(OID_9011)
+
+        assert worker_a.token_cache.get("tok") is None
+        assert worker_b.token_cache.get("tok") is None
+        assert worker_b.token_cache.get("other") is not None
+
+    @pytest.mark.asyncio
+    async def test_none_flushes_cache(self):
+        bus = InMemoryRevocationBus()
+        worker = _worker(bus)
+        await worker.start_revocation_listener()
+        worker.token_cache.set("tok", _payload(OID_9012))
+
+        await bus.publish(None)
+
+        assert len(worker.token_cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_failing_handler_does_not_block_others(self):
+        bus = InMemoryRevocationBus()
+        received = []
+        await bus.start(MagicMock(side_effect=RuntimeError("boom")))
+        await bus.start(received.append)
+
+        await bus.publish(OID_9011)
+
+        assert received == [OID_9011]
+
+    @pytest.mark.asyncio
+    async def test_stop_unsubscribes(self):
+        bus = InMemoryRevocationBus()
+        received = []
+        await bus.start(received.append)
+        await bus.stop()
+        await bus.publish(OID_9011)
+        assert received == []
+
+
+class TestRedisRevocationBus:
+    """Workers sharing a Redis channel"""
+
+    @pytest.mark.asyncio
+    async def test_revocation_reaches_other_workers(self):
+        broker = {}
+        bus_a = RedisRevocationBus(FakeRedis(broker), poll_timeout=0.05)
+        bus_b = RedisRevocationBus(FakeRedis(broker), poll_timeout=0.05)
+        worker_a, worker_b = _worker(bus_a), _worker(bus_b)
+        await worker_a.start_revocation_listener()
+        await worker_b.start_revocation_listener()
+        worker_b.token_cache.set("tok", _payload())
+
+        await worker_a.revoke_user_tokens(OID_9011)
+        for _ in range(20):
+            if len(worker_b.token_cache) == 0:
+                break
+            await asyncio.sleep(0.01)
+
+        assert worker_b.token_cache.get("tok") is None
+        await worker_a.stop_revocation_listener()
+        await worker_b.stop_revocation_listener()
+
+    @pytest.mark.asyncio
+    async def test_ignores_own_messages(self):
+        bus = RedisRevocationBus(FakeRedis())
+        handler = MagicMock()
+        bus._dispatch(handler, json.dumps({"user_id": OID_9011, "origin": bus.origin}))
+        handler.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_ignores_malformed_messages(self):
+        bus = RedisRevocationBus(FakeRedis())
+        handler = MagicMock()
+        bus._dispatch(handler, b"not-json")
+        handler.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_listener_error_flushes_cache(self):
+        bus = RedisRevocationBus(FakeRedis(), poll_timeout=0.01)
+        bus._pubsub = MagicMock()
+        bus._pubsub.get_message = AsyncMock(side_effect=ConnectionError("lost"))
+        handler = MagicMock()
+
+        task = asyncio.create_task(bus._listen(handler))
+        await asyncio.sleep(0.03)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        handler.assert_any_call(None)
+
+    @pytest.mark.asyncio
+    async def test_reconnect_flushes_cache_again(self):
+        bus = RedisRevocationBus(FakeRedis(), poll_timeout=0.01)
+        bus._pubsub = MagicMock()
+        failures = [ConnectionError("lost")]
+
+        async def get_message(**kwargs):
+            if failures:
+                raise failures.pop()
+            await asyncio.sleep(0.005)
+
+        bus._pubsub.get_message = get_message
+        handler = MagicMock()
+
+        task = asyncio.create_task(bus._listen(handler))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert handler.call_count == 2
+        handler.assert_called_with(None)
+
+    @pytest.mark.asyncio
+    async def test_start_is_idempotent_and_stop_closes(self):
+        bus = RedisRevocationBus(FakeRedis(), poll_timeout=0.01)
+        await bus.start(MagicMock())
+        task = bus._task
+        await bus.start(MagicMock())
+        assert bus._task is task
+        pubsub = bus._pubsub
+        await bus.stop()
+        assert pubsub.closed
+        assert bus._task is None
+
+    @pytest.mark.asyncio
+    async def test_publish_failure_disables_cache(self):
+        bus = RedisRevocationBus(FakeRedis())
+        bus.redis.publish = AsyncMock(side_effect=ConnectionError("down"))
+        worker = _worker(bus)
+        worker.token_cache.set("tok", _payload())
+        worker.token_cache.set("other", _payload(OID_9012))
+
+        await worker.revoke_user_tokens(OID_9011)
+
+        assert len(worker.token_cache) == 0
+        worker.token_cache.set("tok", _payload())
+        assert worker.token_cache.get("tok") is None
+
+    @pytest.mark.asyncio
+    async def test_listener_start_failure_disables_cache(self):
+        bus = RedisRevocationBus(FakeRedis())
+        bus.redis.pubsub = MagicMock(side_effect=ConnectionError("redis down"))
+        worker = _worker(bus)
+        worker.token_cache.set("tok", _payload())
+
+        with pytest.raises(ConnectionError):
+            await worker.start_revocation_listener()
+
+        assert worker.token_cache.enabled is False
+        assert len(worker.token_cache) == 0
+
+
+class TestCreateRevocationBus:
+    """Factory selection"""
+
+    def test_defaults_to_in_memory(self, monkeypatch):
+        monkeypatch.delenv("TOKEN_REVOCATION_REDIS_URL", raising=False)
+        assert isinstance(create_revocation_bus(), InMemoryRevocationBus)
+
+    def test_uses_redis_when_configured(self):
+        fake_module = MagicMock()
+        with patch.dict(sys.modules, {"redis.asyncio": fake_module}):
+            bus = create_revocation_bus("redis://localhost:6379/0")
+        assert isinstance(bus, RedisRevocationBus)
+        fake_module.from_url.assert_called_once_with("redis://localhost:6379/0")
+
+    def test_falls_back_without_redis_package(self):
+        with patch.dict(sys.modules, {"redis.asyncio": None}):
+            bus = create_revocation_bus("redis://localhost:6379/0")
+        assert isinstance(bus, InMemoryRevocationBus)
+
+
+class TestTokenCacheDefault:
+    """The cache is only on by default when revocations reach every worker"""
+
+    def _manager(self, bus):
+        return TokenManager(secret_key="secret", db=MagicMock(), revocation_bus=bus)
+
+    def test_off_without_shared_bus(self, monkeypatch):
+        monkeypatch.delenv("TOKEN_CACHE_ENABLED", raising=False)
+        assert not self._manager(None).token_cache.enabled
+        assert not self._manager(InMemoryRevocationBus()).token_cache.enabled
+
+    def test_on_with_redis_bus(self, monkeypatch):
+        monkeypatch.delenv("TOKEN_CACHE_ENABLED", raising=False)
+        assert self._manager(RedisRevocationBus(FakeRedis())).token_cache.enabled
+
+    def test_explicit_setting_wins(self, monkeypatch, caplog):
+        monkeypatch.setenv("TOKEN_CACHE_ENABLED", "true")
+        assert self._manager(InMemoryRevocationBus()).token_cache.enabled
+        assert "TOKEN_REVOCATION_REDIS_URL" in caplog.text
+
+        monkeypatch.setenv("TOKEN_CACHE_ENABLED", "false")
+        assert not self._manager(RedisRevocationBus(FakeRedis())).token_cache.enabled
+
+    def test_incomplete_bus_fails_on_construction(self):
+        from easylifeauth.services.token_revocation import RevocationBus
+
+        class PublishOnly(RevocationBus):
+            async def publish(self, user_id):
+                pass
+
+        with pytest.raises(TypeError):
+            PublishOnly()
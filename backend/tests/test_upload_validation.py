@@ -0,0 +1,130 @@
+"""Tests for column-wise bulk upload validation"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from easylifeauth.services.upload_validation import (
+    bool_column,
+    int_column,
+    list_column,
+    optional_text_column,
+    text_column,
+    validate_frame,
+)
+from mock_data import MOCK_EMAIL
+
+
+class TestColumns:
+    """Column normalisers"""
+
+    def test_text_column(self):
+        df = pd.DataFrame({"name": [" a ", np.nan, 3]})
+        assert text_column(df, "name").tolist() == ["a", "", "3"]
+        assert text_column(df, "missing", "x").tolist() == ["x", "x", "x"]
+        assert optional_text_column(df, "name").tolist() == ["a", None, "3"]
+
+    def test_list_column(self):
+        df = pd.DataFrame({"roles": ["a, b,,c", "", np.nan, pd.NA]})
+        assert list_column(df, "roles").tolist() == [["a", "b", "c"], [], [], []]
+
+    def test_bool_column_strings(self):
+        df = pd.DataFrame({"flag": ["true", "1", "yes", "Active", "false", "no", np.nan]})
+        assert bool_column(df, "flag", True).tolist() == [True, True, True, True, False, False, True]
+        assert bool_column(df, "flag", False).tolist()[-1] is False
+
+    def test_bool_column_typed(self):
+        df = pd.DataFrame({"b": [True, False], "n": [1, 0]})
+        assert bool_column(df, "b", True).tolist() == [True, False]
+        assert bool_column(df, "n", True).tolist() == [True, False]
+        assert bool_column(df, "missing", False).tolist() == [False, False]
+
+    def test_int_column(self):
+        df = pd.DataFrame({"priority": [5, "10", "not a number", np.nan]})
+        assert int_column(df, "priority").tolist() == [5, 10, 0, 0]
+        assert int_column(df, "priority", default=5).tolist() == [5, 10, 5, 5]
+
+    def test_int_column_non_finite(self):
+        df = pd.DataFrame({"priority": [1.0, np.inf, -np.inf, 1e30]})
+        assert int_column(df, "priority").tolist() == [1, 0, 0, 0]
+
+
+class TestValidateFrame:
+    """Whole-frame validation"""
+
+    def test_user_errors_in_one_pass(self):
+        df = pd.DataFrame({
+            "email": [MOCK_EMAIL, "invalid", "", "test@", "ok@example.com"],
+            "username": ["testuser", "u", "u", "u", "bad name!"],
+        })
+        result = validate_frame("users", df)
+        assert result.errors.tolist() == [
+            "",
+            "Invalid email format: invalid",
+            "Email is required",
+            "Invalid email format: test@",
+            "Username can only contain letters, numbers, hyphens, and underscores",
+        ]
+        assert result.error_mask.tolist() == [False, True, True, True, True]
+        assert result.row_numbers == [2]
+
+    def test_user_documents(self):
+        df = pd.DataFrame({"email": [" " + MOCK_EMAIL], "roles": ["admin, user"], "is_active": ["no"]})
+        [document] = validate_frame("users", df).documents()
+        assert document == {
+            "email": MOCK_EMAIL,
+            "username": MOCK_EMAIL.split("@")[0],
+            "full_name": "",
+            "roles": ["admin", "user"],
+            "groups": [],
+            "customers": [],
+            "is_active": False,
+        }
+
+    def test_first_failing_check_wins(self):
+        df = pd.DataFrame({"key": ["", "k"], "name": ["", ""], "module": ["", "m"]})
+        assert validate_frame("permissions", df).errors.tolist() == ["key is required", "name is required"]
+
+    def test_duplicates_point_at_first_row(self):
+        df = pd.DataFrame({"roleId": ["r1", "", "r2", "r1", "r1"], "name": ["R"] * 5})
+        errors = validate_frame("roles", df).errors.tolist()
+        assert errors == [
+            "",
+            "roleId is required",
+            "",
+            "Duplicate roleId r1 (first seen at row 2)",
+            "Duplicate roleId r1 (first seen at row 2)",
+        ]
+
+    def test_invalid_row_does_not_claim_key(self):
+        df = pd.DataFrame({"email": [MOCK_EMAIL, MOCK_EMAIL], "username": ["bad!", "good"]})
+        assert validate_frame("users", df).row_numbers == [3]
+
+    def test_row_numbers_follow_index(self):
+        df = pd.DataFrame({"key": ["d1", "d2"], "name": ["a", "b"]}, index=[0, 5])
+        assert validate_frame("domains", df).row_numbers == [2, 7]
+
+    def test_domain_scenario_documents(self):
+        df = pd.DataFrame({"key": ["s1"], "name": ["S"], "domainKey": ["d1"], "order": ["3"]})
+        [document] = validate_frame("domain_scenarios", df).documents()
+        assert document["domainKey"] == "d1"
+        assert document["order"] == 3
+        assert document["description"] is None
+        assert document["defaultSelected"] is False
+        assert document["subDomains"] == []
+
+    def test_non_finite_number_is_a_row_error(self):
+        df = pd.DataFrame({"roleId": ["a", "b", "c"], "priority": [1, np.inf, "-inf"]})
+        result = validate_frame("roles", df)
+        assert result.errors.tolist() == ["", "Invalid priority: inf", "Invalid priority: -inf"]
+        assert [doc["roleId"] for doc in result.documents()] == ["a"]
+
+    def test_unknown_entity(self):
+        with pytest.raises(ValueError):
+            validate_frame("unknown", pd.DataFrame())
+
+    def test_large_frame(self):
+        emails = [f"user{i}@example.com" for i in range(20_000)]
+        emails[500] = "broken"
+        result = validate_frame("users", pd.DataFrame({"email": emails}))
+        assert int(result.error_mask.sum()) == 1
+        assert len(result.documents()) == 19_999
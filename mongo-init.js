@@ -17,6 +17,9 @@ db.createCollection('easylife_domain');
 db.createCollection('easylife_scenerios');
 db.createCollection('easylife_sceneario_playboard');
 
+// Indexes of the application collections are declared in
+// backend/src/easylifeauth/db/indexes.py and created by the backend at startup.
+
 // Create indexes for users collection
 db.users.createIndex({ "email": 1 }, { unique: true });
 db.users.createIndex({ "username": 1 });